@@ -20,6 +20,10 @@ DEFAULTS = {
     "PERMISSION_CLASSES": ["bk_dataview.grafana.permissions.IsAuthenticated"],
     "PROVISIONING_CLASSES": ["bk_dataview.grafana.provisioning.SimpleProvisioning"],
     "PROVISIONING_PATH": "",
+    # 同一个org注入数据源和面板的缓存时间(秒)，缓存期内的请求不再重复注入
+    "PROVISIONING_CACHE_TTL": 300,
+    # 流式代理grafana响应时每次读取的字节数
+    "STREAM_CHUNK_SIZE": 64 * 1024,
     "CODE_INJECTIONS": {
         "<head>": """<head>
             <style>
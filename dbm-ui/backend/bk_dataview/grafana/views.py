@@ -9,11 +9,12 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 import logging
+import time
 from urllib import parse
 
 import requests
 from django.conf import settings
-from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.http import Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
 from django.utils.decorators import method_decorator
 from django.utils.encoding import smart_str
 from django.utils.translation import gettext_lazy as _
@@ -41,6 +42,8 @@ _ORG_CACHE = {}
 _ORG_CACHE_REVERSE = {}
 _ORG_DASHBOARDS_CACHE = {}
 _ORG_USERS = {}
+# org最近一次完成注入的时间
+_ORG_PROVISIONING_CACHE = {}
 
 
 class ForbiddenError(Exception):
@@ -111,16 +114,22 @@ class ProxyBaseView(View):
             logger.warning("perform_provisioning: provisioning_classes len is  %s", len(self.provisioning_classes))
             return
 
-        logger.warning("perform_provisioning: %s", self.provisioning_classes)
         org_name = request.org_name
+        # 缓存期内已经完成注入的org，无需每次请求都重复注入
+        provisioned_at = _ORG_PROVISIONING_CACHE.get(org_name)
+        if provisioned_at and time.time() - provisioned_at < grafana_settings.PROVISIONING_CACHE_TTL:
+            return
+
+        logger.warning("perform_provisioning: %s", self.provisioning_classes)
         # 默认-1, 和 grafana保持一致
         org_id = _ORG_CACHE.get(org_name, -1)
+        has_dbm_token = SystemSettings.objects.filter(key=SystemSettingsEnum.BKM_DBM_TOKEN.value).exists()
 
         for provisioning_cls in self.provisioning_classes:
             provisioning = provisioning_cls()
 
             # 仅当db中配置了监控的token，才进行数据源初始化
-            if SystemSettings.objects.filter(key=SystemSettingsEnum.BKM_DBM_TOKEN.value).exists():
+            if has_dbm_token:
                 # 注入数据源
                 ds_list = []
                 logger.info("create datasource monitor for grafana")
@@ -139,6 +148,10 @@ class ProxyBaseView(View):
 
                 self.provision_dashboard(request, org_name, org_id, db)
 
+        # 数据源未注入时不缓存，待配置监控token后的请求可以重新注入
+        if has_dbm_token:
+            _ORG_PROVISIONING_CACHE[org_name] = time.time()
+
     def provision_user(self, request, username: str):
         """注入用户"""
         if username in _USER_CACHE:
@@ -318,12 +331,19 @@ class ProxyBaseView(View):
         return proxy_response
 
     def get_django_response(self, proxy_response):
-        """"""
+        """仅需要代码注入的页面读取全部内容，其余响应(面板json、数据源查询等)直接流式返回"""
         content_type = proxy_response.headers.get("Content-Type", "")
 
-        content = self.update_response(proxy_response, proxy_response.content)
+        if self.need_code_injection(proxy_response):
+            content = self.update_response(proxy_response, proxy_response.content)
+            response = HttpResponse(content, status=proxy_response.status_code, content_type=content_type)
+        else:
+            response = StreamingHttpResponse(
+                self.iter_response_content(proxy_response),
+                status=proxy_response.status_code,
+                content_type=content_type,
+            )
 
-        response = HttpResponse(content, status=proxy_response.status_code, content_type=content_type)
         for header in CACHE_HEADERS:
             value = proxy_response.headers.get(header)
             if value:
@@ -331,12 +351,21 @@ class ProxyBaseView(View):
 
         return response
 
-    def update_response(self, response, content):
+    def iter_response_content(self, proxy_response):
+        """分块读取grafana的响应，结束后释放连接"""
+        try:
+            yield from proxy_response.iter_content(chunk_size=grafana_settings.STREAM_CHUNK_SIZE)
+        finally:
+            proxy_response.close()
+
+    def need_code_injection(self, response) -> bool:
         # 管理员跳过代码注入
         skip_code_injection = self.request.user.is_superuser and "develop" in self.request.GET
+        return "text/html" in response.headers.get("Content-Type", "") and not skip_code_injection
 
+    def update_response(self, response, content):
         # 注入控制代码
-        if "text/html" in response.headers.get("Content-Type", "") and not skip_code_injection:
+        if self.need_code_injection(response):
             content = smart_str(content)
             for tag, code in grafana_settings.CODE_INJECTIONS.items():
                 content = content.replace(tag, code)
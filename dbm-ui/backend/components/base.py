@@ -27,6 +27,7 @@ from backend import env
 from backend.components.constants import CLIENT_CRT_PATH, SSL_KEY, SSLEnum
 from backend.components.domains import ESB_PREFIX
 from backend.components.exception import DataAPIException
+from backend.components.session import SessionPool
 from backend.components.utils.params import add_esb_info_before_request, remove_auth_args
 from backend.configuration.models.system import SystemSettings
 from backend.exceptions import ApiError, ApiRequestError, ApiResultError, AppBaseException
@@ -395,9 +396,8 @@ class DataAPI(object):
         """
 
         # 增加request id
-        session = requests.session()
-        session.headers.update(headers)
-        session.headers.update(
+        request_headers = dict(headers)
+        request_headers.update(
             {
                 "X-Bkapi-Request-Id": self.request_id,
                 "blueking-language": translation.get_language(),
@@ -405,7 +405,7 @@ class DataAPI(object):
         )
         # 增加鉴权信息
         if isinstance(params, dict):
-            session.headers.update(
+            request_headers.update(
                 {
                     "X-Bkapi-Authorization": json.dumps(
                         {
@@ -423,33 +423,36 @@ class DataAPI(object):
         except AppBaseException:
             local_request = None
 
+        cookies = None
         if local_request and local_request.COOKIES and not use_admin:
-            session.cookies.update(local_request.COOKIES)
+            cookies = dict(local_request.COOKIES)
 
         # headers 申明重载请求方法
         if self.method_override is not None:
-            session.headers.update({"X-METHOD-OVERRIDE": self.method_override})
+            request_headers.update({"X-METHOD-OVERRIDE": self.method_override})
 
         url = self.build_actual_url(params)
         # 发出请求并返回结果
         non_file_data, file_data = self._split_file_data(params)
         request_method = self.method.upper()
 
+        # 复用进程级别的连接池，请求相关的 headers/cookies/cert 只作用于本次请求
+        session = SessionPool.get_session(url, module=self.module)
+        request_kwargs = {"headers": request_headers, "cookies": cookies, "verify": False, "timeout": self.timeout}
+
         # 如果是https链接，则需要带上client证书
         if self.ssl:
             client_crt, client_key = self._fetch_client_crt()
-            session.cert = (client_crt, client_key)
+            request_kwargs["cert"] = (client_crt, client_key)
 
         if request_method == "GET":
-            result = session.request(method=self.method, url=url, params=params, verify=False, timeout=self.timeout)
+            result = session.request(method=self.method, url=url, params=params, **request_kwargs)
         elif request_method == "DELETE":
-            session.headers.update({"Content-Type": "application/json; charset=utf-8"})
-            result = session.request(
-                method=self.method, url=url, data=json.dumps(non_file_data), verify=False, timeout=self.timeout
-            )
+            request_headers.update({"Content-Type": "application/json; charset=utf-8"})
+            result = session.request(method=self.method, url=url, data=json.dumps(non_file_data), **request_kwargs)
         elif request_method in ["PUT", "PATCH", "POST"]:
             if not file_data:
-                session.headers.update({"Content-Type": "application/json; charset=utf-8"})
+                request_headers.update({"Content-Type": "application/json; charset=utf-8"})
                 params = json.dumps(non_file_data)
             else:
                 params = non_file_data
@@ -457,11 +460,9 @@ class DataAPI(object):
             # PUT 方法上传文件时，data需作为
             if request_method == "PUT" and file_data:
                 data = list(file_data.values())[0]
-                result = session.request(method=self.method, url=url, data=data, verify=False, timeout=self.timeout)
+                result = session.request(method=self.method, url=url, data=data, **request_kwargs)
             else:
-                result = session.request(
-                    method=self.method, url=url, data=params, files=file_data, verify=False, timeout=self.timeout
-                )
+                result = session.request(method=self.method, url=url, data=params, files=file_data, **request_kwargs)
         else:
             raise ApiRequestError(_("异常请求方式，{method}").format(method=self.method))
 
@@ -11,8 +11,10 @@ specific language governing permissions and limitations under the License.
 
 import json
 import logging
+from collections import defaultdict
 from datetime import datetime
-from typing import Dict, List
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
 
 from backend import env
 from backend.components import BKLogApi
@@ -22,9 +24,96 @@ from backend.utils.time import datetime2str
 logger = logging.getLogger("root")
 
 
+# 单页查询条数，ES默认的 max_result_window 为10000，from+size 分页无法越过该限制
+BKLOG_QUERY_PAGE_SIZE = 1000
+# 日志的排序字段，search_after 依赖稳定且唯一的排序
+BKLOG_SORT_LIST = [["dtEventTimeStamp", "asc"], ["gseIndex", "asc"], ["iterationIndex", "asc"]]
+
+
 class BKLogHandler(object):
     """封装bklog查询的通用函数"""
 
+    @staticmethod
+    def _parse_hit(hit: Dict) -> Dict:
+        raw_log = json.loads(hit["_source"]["log"])
+        return {pascal_to_snake(key): value for key, value in raw_log.items()}
+
+    @staticmethod
+    def hit_sort_key(hit: Dict) -> List:
+        """命中记录的排序值，与 BKLOG_SORT_LIST 一致，可作为 search_after 的游标"""
+        if hit.get("sort"):
+            return hit["sort"]
+        return [hit["_source"].get(field) for field, __ in BKLOG_SORT_LIST]
+
+    @classmethod
+    def iter_hits(
+        cls,
+        collector: str,
+        start_time: datetime,
+        end_time: datetime,
+        query_string: str = "*",
+        page_size: int = BKLOG_QUERY_PAGE_SIZE,
+        limit: Optional[int] = None,
+        search_after: Optional[List] = None,
+        use_admin: bool = True,
+    ) -> Iterator[Dict]:
+        """
+        流式获取采集项在时间范围内的原始命中记录，按 BKLOG_SORT_LIST 升序返回，不会截断结果
+        优先使用 search_after 翻页，日志平台未返回排序值时回退为 start/size 翻页
+        @param collector: 采集项名称
+        @param start_time: 开始时间
+        @param end_time: 结束时间
+        @param query_string: 过滤条件
+        @param page_size: 单页查询条数
+        @param limit: 最多返回的条数，为空表示不限制
+        @param search_after: 游标，只返回排序值在该游标之后的记录
+        @param use_admin: 是否使用平台账号查询
+        """
+        params = {
+            "indices": f"{env.DBA_APP_BK_BIZ_ID}_bklog.{collector}",
+            "start_time": datetime2str(start_time),
+            "end_time": datetime2str(end_time),
+            "query_string": query_string,
+            "start": 0,
+            "size": page_size,
+            "sort_list": BKLOG_SORT_LIST,
+        }
+        if search_after:
+            params["search_after"] = search_after
+
+        count = 0
+        while True:
+            if limit is not None:
+                params["size"] = min(page_size, limit - count)
+            hits = BKLogApi.esquery_search(params, use_admin=use_admin)["hits"]["hits"]
+            yield from hits
+            count += len(hits)
+
+            if len(hits) < params["size"] or (limit is not None and count >= limit):
+                return
+
+            search_after = hits[-1].get("sort")
+            if search_after:
+                params.update(start=0, search_after=search_after)
+            else:
+                params["start"] += len(hits)
+
+    @classmethod
+    def iter_logs(
+        cls,
+        collector: str,
+        start_time: datetime,
+        end_time: datetime,
+        query_string: str = "*",
+        page_size: int = BKLOG_QUERY_PAGE_SIZE,
+        limit: Optional[int] = None,
+    ) -> Iterator[Dict]:
+        """
+        流式获取采集项在时间范围内的全部日志，参数同 iter_hits
+        """
+        for hit in cls.iter_hits(collector, start_time, end_time, query_string, page_size, limit):
+            yield cls._parse_hit(hit)
+
     @classmethod
     def query_logs(
         cls, collector: str, start_time: datetime, end_time: datetime, query_string="*", size=1000
@@ -37,21 +126,31 @@ class BKLogHandler(object):
         @param query_string: 过滤条件
         @param size: 返回条数
         """
-        resp = BKLogApi.esquery_search(
-            {
-                "indices": f"{env.DBA_APP_BK_BIZ_ID}_bklog.{collector}",
-                "start_time": datetime2str(start_time),
-                "end_time": datetime2str(end_time),
-                "query_string": query_string,
-                "start": 0,
-                "size": size,
-                "sort_list": [["dtEventTimeStamp", "asc"], ["gseIndex", "asc"], ["iterationIndex", "asc"]],
-            },
-            use_admin=True,
-        )
-        backup_logs = []
-        for hit in resp["hits"]["hits"]:
-            raw_log = json.loads(hit["_source"]["log"])
-            backup_logs.append({pascal_to_snake(key): value for key, value in raw_log.items()})
-
-        return backup_logs
+        return list(cls.iter_logs(collector, start_time, end_time, query_string, limit=size))
+
+    @classmethod
+    def query_logs_group_by(
+        cls,
+        collector: str,
+        start_time: datetime,
+        end_time: datetime,
+        group_key: Union[str, Callable[[Dict], Any]],
+        query_string: str = "*",
+    ) -> Dict[Any, List[Dict]]:
+        """
+        批量模式：一次性拉取采集项在时间范围内的全部日志，在本地按照指定字段分组
+        适用于周期任务中逐个集群查询日志的场景，如按照 cluster_id 分组的备份日志
+        @param collector: 采集项名称
+        @param start_time: 开始时间
+        @param end_time: 结束时间
+        @param group_key: 分组字段名(snake格式)，或者从日志中获取分组值的函数
+        @param query_string: 过滤条件
+        """
+        get_key = group_key if callable(group_key) else itemgetter(group_key)
+        grouped_logs: Dict[Any, List[Dict]] = defaultdict(list)
+        for log in cls.iter_logs(collector, start_time, end_time, query_string):
+            try:
+                grouped_logs[get_key(log)].append(log)
+            except (KeyError, TypeError, ValueError):
+                logger.warning(f"bklog {collector} log without group key: {log}")
+        return grouped_logs
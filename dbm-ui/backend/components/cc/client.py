@@ -216,6 +216,11 @@ class _CCApi(BaseApi):
             url="search_object_attribute/",
             description=_("查询对象属性"),
         )
+        self.resource_watch = self.generate_data_api(
+            method="POST",
+            url="resource_watch/",
+            description=_("监听资源变化事件"),
+        )
 
 
 CCApi = _CCApi()
@@ -14,7 +14,7 @@ from django.utils.translation import gettext as _
 from backend import env
 from backend.components.base import DataAPI
 from backend.components.exception import DataAPIException
-from backend.db_proxy.models import DBCloudProxy
+from backend.db_proxy.routing import CloudProxyRouter
 
 
 class ProxyAPI(DataAPI):
@@ -34,8 +34,10 @@ class ProxyAPI(DataAPI):
         except KeyError:
             raise DataAPIException(_("ProxyApi 必须传入 bk_cloud_id 参数"))
 
-        # 只取最新的nginx作为转发服务
-        proxy = DBCloudProxy.objects.filter(bk_cloud_id=bk_cloud_id).last()
+        # 从进程内路由表获取转发的nginx，默认只取最新的nginx
+        proxy_address = CloudProxyRouter.get_external_address(bk_cloud_id)
+        if not proxy_address:
+            raise DataAPIException(_("云区域{}未找到可用的代理服务").format(bk_cloud_id))
         host = "https://" if self.ssl else "http://"
-        external_address = f"{host}{proxy.external_address}"
+        external_address = f"{host}{proxy_address}"
         return url.replace(self.base.rstrip("/"), external_address)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import os
+import threading
+from collections import defaultdict
+from http.cookiejar import DefaultCookiePolicy
+from typing import Dict, Tuple
+from urllib import parse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from backend import env
+
+
+class RejectAllCookiePolicy(DefaultCookiePolicy):
+    """共享的session不允许保存服务端返回的cookie，防止不同用户的登录态串用"""
+
+    def set_ok(self, cookie, request):
+        return False
+
+
+class SessionPool(object):
+    """
+    进程级别的HTTP连接池，按照 scheme://host:port 维度复用 requests.Session
+    - 同一进程内所有 DataAPI/ProxyAPI 共享，复用TCP/TLS连接(keep-alive)
+    - 以pid作为key的一部分，celery prefork 等fork出的子进程不会复用父进程的socket
+    - 请求级别的 headers/cookies/cert 由调用方在 request 时传入，不写入session
+    """
+
+    _lock = threading.Lock()
+    _sessions: Dict[Tuple[int, str], requests.Session] = {}
+    # 按模块记录连接池命中情况: {module: {"hit": x, "miss": y}}
+    _stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hit": 0, "miss": 0})
+
+    @staticmethod
+    def _pool_key(url: str) -> str:
+        parsed = parse.urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}"
+
+    @staticmethod
+    def _create_session() -> requests.Session:
+        session = requests.Session()
+        session.cookies.set_policy(RejectAllCookiePolicy())
+        # 只对建立连接失败的场景做重试，读超时由 DataAPI 自身的重试逻辑处理，避免非幂等请求重复提交
+        retries = Retry(
+            total=env.HTTP_POOL_MAX_RETRIES,
+            connect=env.HTTP_POOL_MAX_RETRIES,
+            read=0,
+            status=0,
+            backoff_factor=env.HTTP_POOL_RETRY_BACKOFF,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=env.HTTP_POOL_CONNECTIONS, pool_maxsize=env.HTTP_POOL_MAXSIZE, max_retries=retries
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        if not env.HTTP_POOL_KEEP_ALIVE:
+            session.headers["Connection"] = "close"
+        return session
+
+    @classmethod
+    def get_session(cls, url: str, module: str = "") -> requests.Session:
+        """获取url对应host的共享session，并记录模块的命中情况"""
+        key = (os.getpid(), cls._pool_key(url))
+        with cls._lock:
+            session = cls._sessions.get(key)
+            if session is None:
+                cls._stats[module]["miss"] += 1
+                session = cls._sessions[key] = cls._create_session()
+            else:
+                cls._stats[module]["hit"] += 1
+        return session
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Dict[str, int]]:
+        """获取各个模块的连接池命中统计"""
+        with cls._lock:
+            return {module: dict(stat) for module, stat in cls._stats.items()}
+
+    @classmethod
+    def clear(cls):
+        """关闭并清理当前进程的所有session，其他进程的session由各自进程清理"""
+        with cls._lock:
+            for key, session in list(cls._sessions.items()):
+                if key[0] == os.getpid():
+                    session.close()
+                    cls._sessions.pop(key)
+            cls._stats.clear()
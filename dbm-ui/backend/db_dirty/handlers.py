@@ -20,6 +20,7 @@ from backend.components.dbresource.client import DBResourceApi
 from backend.configuration.constants import SystemSettingsEnum
 from backend.configuration.models import SystemSettings
 from backend.db_dirty.models import DirtyMachine
+from backend.db_services.dbresource.host_index import ResourcePoolHostIndex
 from backend.db_services.ipchooser.constants import IDLE_HOST_MODULE
 from backend.db_services.ipchooser.handlers.topo_handler import TopoHandler
 from backend.flow.consts import FAILED_STATES
@@ -54,6 +55,7 @@ class DBDirtyMachineHandler(object):
         # 删除污点池记录，并从资源池移除(忽略删除错误，因为机器可能不来自资源池)
         dirty_machines.delete()
         DBResourceApi.resource_delete(params={"bk_host_ids": bk_host_ids}, raise_exception=False)
+        ResourcePoolHostIndex.remove(bk_host_ids)
 
     @classmethod
     def insert_dirty_machines(cls, bk_biz_id: int, bk_host_ids: List[Dict[str, Any]], ticket: Ticket, flow: Flow):
@@ -11,7 +11,7 @@ specific language governing permissions and limitations under the License.
 import logging
 from collections import defaultdict
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple, Type, Union
 
 import validators
 from django.core.exceptions import ObjectDoesNotExist
@@ -21,6 +21,7 @@ from django.utils.translation import ugettext_lazy as _
 
 from backend.constants import DEFAULT_BK_CLOUD_ID, IP_PORT_DIVIDER
 from backend.db_meta import flatten, meta_validator, request_validator
+from backend.db_meta.api.dbha.snapshot import invalidate_topology
 from backend.db_meta.enums import (
     ClusterEntryType,
     ClusterStatus,
@@ -38,8 +39,10 @@ from backend.db_meta.exceptions import (
 )
 from backend.db_meta.models import (
     BKCity,
+    CLBEntryDetail,
     Cluster,
     ClusterDBHAExt,
+    PolarisEntryDetail,
     ProxyInstance,
     StorageInstance,
     StorageInstanceTuple,
@@ -49,32 +52,54 @@ from backend.flow.utils.cc_manage import CcManage
 
 logger = logging.getLogger("root")
 
+# 批量更新实例状态时，每批写入的实例数量
+DBHA_UPDATE_STATUS_BATCH_SIZE = 500
+
 
 def cities():
     return flatten.cities(BKCity.objects.all())
 
 
+def _get_entry_detail(model: Type[Union[CLBEntryDetail, PolarisEntryDetail]], entry_details: List, entry: str):
+    """从预取的详情中获取访问入口唯一的详情记录，与 queryset.get() 的行为保持一致"""
+    if not entry_details:
+        raise model.DoesNotExist(_("访问入口{}的详情不存在").format(entry))
+    if len(entry_details) > 1:
+        raise model.MultipleObjectsReturned(_("访问入口{}存在多条详情").format(entry))
+    return entry_details[0]
+
+
 def entry_detail(domains: List[str]) -> Dict[str, Dict[Any, list]]:
+    """
+    查询集群的访问入口详情
+    通过 prefetch_related 一次性加载集群、入口、绑定实例及机器、CLB/北极星详情，查询次数与域名数量无关
+    """
+    clusters = defaultdict(list)
+    for cluster_obj in Cluster.objects.filter(immute_domain__in=domains).prefetch_related(
+        "clusterentry_set__storageinstance_set__machine",
+        "clusterentry_set__proxyinstance_set__machine",
+        "clusterentry_set__clbentrydetail_set",
+        "clusterentry_set__polarisentrydetail_set",
+    ):
+        clusters[cluster_obj.immute_domain].append(cluster_obj)
+
     entries = {}
     for domain in domains:
-        clusterentry_set = defaultdict(list)
-        try:
-            cluster_obj = Cluster.objects.get(immute_domain=domain)
-        except ObjectDoesNotExist:
+        if not clusters[domain]:
             raise ClusterNotExistException(cluster=domain)
+        if len(clusters[domain]) > 1:
+            raise Cluster.MultipleObjectsReturned(_("域名{}对应多个集群").format(domain))
+        cluster_obj = clusters[domain][0]
 
+        clusterentry_set = defaultdict(list)
         for cluster_entry_obj in cluster_obj.clusterentry_set.all():
             if cluster_entry_obj.cluster_entry_type == ClusterEntryType.DNS:
-
-                if cluster_entry_obj.storageinstance_set.exists():
-                    bind_ips = list(set([ele.machine.ip for ele in list(cluster_entry_obj.storageinstance_set.all())]))
-                    bind_port = cluster_entry_obj.storageinstance_set.first().port
-                elif cluster_entry_obj.proxyinstance_set.exists():
-                    bind_ips = list(set([ele.machine.ip for ele in list(cluster_entry_obj.proxyinstance_set.all())]))
-                    bind_port = cluster_entry_obj.proxyinstance_set.first().port
-                else:
-                    bind_ips = []
-                    bind_port = 0
+                # 预取的实例列表按照模型默认排序，首个实例即 queryset.first()
+                bind_instances = list(cluster_entry_obj.storageinstance_set.all()) or list(
+                    cluster_entry_obj.proxyinstance_set.all()
+                )
+                bind_ips = list(set([ele.machine.ip for ele in bind_instances]))
+                bind_port = bind_instances[0].port if bind_instances else 0
 
                 clusterentry_set[cluster_entry_obj.cluster_entry_type].append(
                     {
@@ -86,7 +111,9 @@ def entry_detail(domains: List[str]) -> Dict[str, Dict[Any, list]]:
                     }
                 )
             elif cluster_entry_obj.cluster_entry_type == ClusterEntryType.CLB:
-                de = cluster_entry_obj.clbentrydetail_set.get()
+                de = _get_entry_detail(
+                    CLBEntryDetail, list(cluster_entry_obj.clbentrydetail_set.all()), cluster_entry_obj.entry
+                )
                 clusterentry_set[cluster_entry_obj.cluster_entry_type].append(
                     {
                         "clb_ip": de.clb_ip,
@@ -96,7 +123,9 @@ def entry_detail(domains: List[str]) -> Dict[str, Dict[Any, list]]:
                     }
                 )
             elif cluster_entry_obj.cluster_entry_type == ClusterEntryType.POLARIS:
-                de = cluster_entry_obj.polarisentrydetail_set.get()
+                de = _get_entry_detail(
+                    PolarisEntryDetail, list(cluster_entry_obj.polarisentrydetail_set.all()), cluster_entry_obj.entry
+                )
                 clusterentry_set[cluster_entry_obj.cluster_entry_type].append(
                     {
                         "polaris_name": de.polaris_name,
@@ -164,39 +193,84 @@ def instances(
     return [ele for ele in flat_instances if ele["cluster_id"] not in disabled_dbha_cluster_ids]
 
 
+def _get_instances_by_address(
+    addresses: Set[Tuple[str, int]], bk_cloud_id: int, models: List[Type[Union[StorageInstance, ProxyInstance]]]
+) -> Dict[Tuple[str, int], Union[StorageInstance, ProxyInstance]]:
+    """
+    批量查询实例，每张表只查询一次。同一地址在多张表中都存在时，以先出现的表为准
+    @param addresses: 实例地址集合 {(ip, port)}
+    @param bk_cloud_id: 云区域ID
+    @param models: 按优先级排列的实例表
+    """
+    ips, ports = {ip for ip, __ in addresses}, {port for __, port in addresses}
+    instances: Dict[Tuple[str, int], Union[StorageInstance, ProxyInstance]] = {}
+    for model in models:
+        for obj in model.objects.select_related("machine").filter(
+            machine__ip__in=ips, port__in=ports, machine__bk_cloud_id=bk_cloud_id
+        ):
+            address = (obj.machine.ip, obj.port)
+            if address in addresses and address not in instances:
+                instances[address] = obj
+    return instances
+
+
 @transaction.atomic
 def update_status(payloads: List, bk_cloud_id: int):
     """
-    ToDo 验证 status
+    批量更新实例状态，并同步更新集群状态
+    - 所有实例地址在存储/接入层表中各查询一次，状态变更通过 bulk_update 写入
+    - 集群状态按照状态标志重新计算，实例不可用的集群标记为异常，每种状态只执行一次UPDATE
     """
     DBHAUpdateStatusRequestSerializer(data={"payloads": payloads}).is_valid(raise_exception=True)
-    for pl in payloads:
-        ip = pl["ip"]
-        port = pl["port"]
-
-        try:
-            storage_obj = StorageInstance.objects.get(machine__ip=ip, port=port, machine__bk_cloud_id=bk_cloud_id)
-            cluster = storage_obj.cluster.first()
-
-            storage_obj.status = pl["status"]
-            storage_obj.save(update_fields=["status"])
-        except ObjectDoesNotExist:
-            try:
-                proxy_obj = ProxyInstance.objects.get(machine__ip=ip, port=port, machine__bk_cloud_id=bk_cloud_id)
-                cluster = proxy_obj.cluster.first()
-
-                proxy_obj.status = pl["status"]
-                proxy_obj.save(update_fields=["status"])
-            except ObjectDoesNotExist:
-                raise InstanceNotExistException(_("实例ip={}, port={}不存在，请检查输入参数或相关数据").format(ip, port))
-            except Exception as e:
-                raise e
-        except Exception as e:
-            raise e
-
-        if cluster and pl["status"] == InstanceStatus.UNAVAILABLE.value:
-            cluster.status = ClusterStatus.ABNORMAL.value
-            cluster.save(update_fields=["status"])
+
+    # 同一实例多次出现时，以最后一次为准
+    statuses = {(pl["ip"], int(pl["port"])): pl["status"] for pl in payloads}
+    instances = _get_instances_by_address(set(statuses), bk_cloud_id, [StorageInstance, ProxyInstance])
+    for ip, port in statuses:
+        if (ip, port) not in instances:
+            raise InstanceNotExistException(_("实例ip={}, port={}不存在，请检查输入参数或相关数据").format(ip, port))
+
+    changed_instances: Dict[Type, List] = defaultdict(list)
+    for address, obj in instances.items():
+        if obj.status != statuses[address]:
+            obj.status = statuses[address]
+            changed_instances[type(obj)].append(obj)
+    for model, objs in changed_instances.items():
+        model.objects.bulk_update(objs, fields=["status"], batch_size=DBHA_UPDATE_STATUS_BATCH_SIZE)
+
+    # 查询实例所属的集群，状态不可用的实例所属的集群需要标记为异常
+    cluster_ids, unavailable_cluster_ids = set(), set()
+    for model in [StorageInstance, ProxyInstance]:
+        instance_status = {obj.id: obj.status for obj in instances.values() if isinstance(obj, model)}
+        if not instance_status:
+            continue
+        instance_field = f"{model._meta.model_name}_id"
+        relations = model.cluster.through.objects.filter(**{f"{instance_field}__in": instance_status.keys()})
+        for instance_id, cluster_id in relations.values_list(instance_field, "cluster_id"):
+            cluster_ids.add(cluster_id)
+            if instance_status[instance_id] == InstanceStatus.UNAVAILABLE.value:
+                unavailable_cluster_ids.add(cluster_id)
+
+    # 与逐个保存实例时触发的 update_cluster_status 保持一致：忽略临时集群，按照状态标志计算集群状态
+    cluster_type_map = dict(
+        Cluster.objects.filter(id__in=cluster_ids)
+        .exclude(status=ClusterStatus.TEMPORARY.value)
+        .values_list("id", "cluster_type")
+    )
+    status_flags = Cluster._build_status_flags(cluster_type_map)
+    abnormal_cluster_ids = {cluster_id for cluster_id in cluster_type_map if status_flags[cluster_id]}
+    # 存在不可用实例的集群(包括临时集群)总是标记为异常
+    abnormal_cluster_ids |= unavailable_cluster_ids
+    normal_cluster_ids = set(cluster_type_map) - abnormal_cluster_ids
+    Cluster.objects.filter(id__in=abnormal_cluster_ids).exclude(status=ClusterStatus.ABNORMAL.value).update(
+        status=ClusterStatus.ABNORMAL.value
+    )
+    Cluster.objects.filter(id__in=normal_cluster_ids).exclude(status=ClusterStatus.NORMAL.value).update(
+        status=ClusterStatus.NORMAL.value
+    )
+
+    # 批量更新不会触发信号，需要主动使dbha拓扑快照失效
+    invalidate_topology()
 
 
 @transaction.atomic
@@ -205,21 +279,30 @@ def swap_role(payloads: List, bk_cloud_id: int):
     可以用来操作 tendbha 和 tendbcluster 的存储层
     """
     DBHASwapRequestSerializer(data={"payloads": payloads}).is_valid(raise_exception=True)
-    for pl in payloads:
-        ins1 = pl["instance1"]
-        ins2 = pl["instance2"]
 
-        ins1_obj = StorageInstance.objects.get(
-            machine__ip=ins1["ip"], port=ins1["port"], machine__bk_cloud_id=bk_cloud_id
-        )
-        ins2_obj = StorageInstance.objects.get(
-            machine__ip=ins2["ip"], port=ins2["port"], machine__bk_cloud_id=bk_cloud_id
+    # 一次性查询所有实例和主从关系，避免逐个查询
+    pairs = [
+        ((pl["instance1"]["ip"], int(pl["instance1"]["port"])), (pl["instance2"]["ip"], int(pl["instance2"]["port"])))
+        for pl in payloads
+    ]
+    instances = _get_instances_by_address(
+        {address for pair in pairs for address in pair}, bk_cloud_id, [StorageInstance]
+    )
+    for ip, port in {address for pair in pairs for address in pair}:
+        if (ip, port) not in instances:
+            raise StorageInstance.DoesNotExist(_("实例ip={}, port={}不存在，请检查输入参数或相关数据").format(ip, port))
+
+    instance_ids = [obj.id for obj in instances.values()]
+    tuples = set(
+        StorageInstanceTuple.objects.filter(ejector_id__in=instance_ids, receiver_id__in=instance_ids).values_list(
+            "ejector_id", "receiver_id"
         )
+    )
 
-        if (
-            not StorageInstanceTuple.objects.filter(ejector=ins1_obj, receiver=ins2_obj).exists()
-            and not StorageInstanceTuple.objects.filter(ejector=ins2_obj, receiver=ins1_obj).exists()
-        ):
+    for address1, address2 in pairs:
+        ins1_obj, ins2_obj = instances[address1], instances[address2]
+
+        if (ins1_obj.id, ins2_obj.id) not in tuples and (ins2_obj.id, ins1_obj.id) not in tuples:
             raise Exception(
                 "no replicate relate between {}:{} {}:{}".format(
                     ins1_obj.machine.ip, ins1_obj.port, ins2_obj.machine.ip, ins2_obj.port
@@ -233,6 +316,9 @@ def swap_role(payloads: List, bk_cloud_id: int):
             raise Exception("repeater found, may be not prod cluster")
 
         __swap(ins1_obj, ins2_obj)
+        # 交换后主从关系反转，后续的交换需要基于最新的关系判断
+        tuples.discard((ins1_obj.id, ins2_obj.id))
+        tuples.add((ins2_obj.id, ins1_obj.id))
 
 
 def __swap(ins1: StorageInstance, ins2: StorageInstance):
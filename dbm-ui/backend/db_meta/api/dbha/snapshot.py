@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from django.db import transaction
+from django.db.models import Q
+
+from backend import env
+from backend.constants import DEFAULT_BK_CLOUD_ID, IP_PORT_DIVIDER
+from backend.db_meta import flatten
+from backend.db_meta.enums import InstancePhase
+from backend.db_meta.models import ClusterDBHAExt, ProxyInstance, StorageInstance
+from backend.utils.redis import RedisConn
+
+logger = logging.getLogger("root")
+
+# db_meta 的写入计数，元数据变更时递增，快照据此判断是否失效
+DBHA_TOPOLOGY_SOURCE_KEY = "dbha_topology_source"
+# 全局单调递增的快照版本序号，所有(云区域, 城市)共用，因此多个城市的版本可以直接比较
+DBHA_TOPOLOGY_SEQUENCE_KEY = "dbha_topology_sequence"
+# 快照元信息: {"version": 版本, "source": 构建时的写入计数, "expire_at": 过期时间}
+DBHA_TOPOLOGY_META_KEY = "dbha_topology_meta_{bk_cloud_id}_{city}"
+# 快照数据: {"instances": {address: [变更版本, 实例信息]}, "tombstones": {address: 删除版本}, "min_version": 可做增量的最小版本}
+DBHA_TOPOLOGY_DATA_KEY = "dbha_topology_data_{bk_cloud_id}_{city}"
+# 快照构建锁，避免并发重复构建
+DBHA_TOPOLOGY_LOCK_KEY = "dbha_topology_lock_{bk_cloud_id}_{city}"
+DBHA_TOPOLOGY_LOCK_EXPIRE = 60
+# 快照数据的保留时间，超过后重新全量构建
+DBHA_TOPOLOGY_DATA_EXPIRE = 24 * 60 * 60
+# 保留的删除记录数量，更早的删除无法做增量，客户端需要全量拉取
+DBHA_TOPOLOGY_TOMBSTONE_LIMIT = 10000
+# 不指定城市时的快照
+ALL_CITIES = "all"
+
+
+def invalidate_topology():
+    """元数据变更后(事务提交时)递增写入计数，使所有拓扑快照失效"""
+    transaction.on_commit(lambda: RedisConn.incr(DBHA_TOPOLOGY_SOURCE_KEY))
+
+
+class DBHATopologySnapshot(object):
+    """
+    dbha 探测实例的拓扑快照，按照 (bk_cloud_id, logical_city_id) 预先计算
+    - 快照带有全局单调递增的版本号，内容无变化时版本号不变，客户端可以用 ETag/since_version 跳过未变化的轮询
+    - 元数据写入时通过信号递增写入计数使快照失效；批量update等绕过信号的写入，由快照过期时间(DBHA_TOPOLOGY_SNAPSHOT_TTL)兜底
+    - 屏蔽中的集群在构建时过滤，屏蔽到期时快照自动失效
+    """
+
+    def __init__(self, bk_cloud_id: int = DEFAULT_BK_CLOUD_ID, logical_city_ids: Optional[List[int]] = None):
+        self.bk_cloud_id = bk_cloud_id
+        self.cities: List[Union[int, str]] = sorted(set(logical_city_ids)) if logical_city_ids else [ALL_CITIES]
+
+    def _key(self, tpl: str, city: Union[int, str]) -> str:
+        return tpl.format(bk_cloud_id=self.bk_cloud_id, city=city)
+
+    @staticmethod
+    def _address(item: Dict) -> str:
+        return f"{item['ip']}{IP_PORT_DIVIDER}{item['port']}"
+
+    @staticmethod
+    def _digest(item: Any) -> str:
+        return hashlib.md5(json.dumps(item, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _query_instances(self, city: Union[int, str]) -> Tuple[List[Dict], float]:
+        """查询城市下需要探测的实例，返回实例列表和最近一个屏蔽到期的时间"""
+        # 清理屏蔽到期的集群，与 instances 接口的逻辑保持一致
+        now = datetime.now(timezone.utc)
+        ClusterDBHAExt.objects.filter(end_time__lt=now).delete()
+
+        queries = Q(machine__bk_cloud_id=self.bk_cloud_id) & ~Q(phase=InstancePhase.TRANS_STAGE)
+        if city != ALL_CITIES:
+            queries &= Q(machine__bk_city__logical_city_id=city)
+        flat_instances = flatten.storage_instance(StorageInstance.objects.filter(queries)) + flatten.proxy_instance(
+            ProxyInstance.objects.filter(queries)
+        )
+
+        disabled_end_times = dict(
+            ClusterDBHAExt.objects.filter(end_time__gte=now).values_list("cluster_id", "end_time")
+        )
+        next_expire_at = min([end_time.timestamp() for end_time in disabled_end_times.values()], default=float("inf"))
+        return [ele for ele in flat_instances if ele["cluster_id"] not in disabled_end_times], next_expire_at
+
+    def _build(self, city: Union[int, str], source: int) -> Dict:
+        """构建快照，与上一份快照对比，内容有变化时分配新的版本号，并记录每个实例的变更版本"""
+        instances, next_expire_at = self._query_instances(city)
+
+        data_key, meta_key = self._key(DBHA_TOPOLOGY_DATA_KEY, city), self._key(DBHA_TOPOLOGY_META_KEY, city)
+        old_meta, old_data = RedisConn.mget(meta_key, data_key)
+        old_version = json.loads(old_meta)["version"] if old_meta and old_data else 0
+        old_data = (
+            json.loads(old_data) if old_meta and old_data else {"instances": {}, "tombstones": {}, "min_version": 0}
+        )
+
+        # 与快照中反序列化后的数据保持同样的格式，便于比较
+        new_instances = {self._address(item): item for item in json.loads(json.dumps(instances, default=str))}
+        changed = {
+            address
+            for address, item in new_instances.items()
+            if address not in old_data["instances"] or old_data["instances"][address][1] != item
+        }
+        deleted = [address for address in old_data["instances"] if address not in new_instances]
+
+        version, data = old_version, old_data
+        if changed or deleted or not old_version:
+            version = RedisConn.incr(DBHA_TOPOLOGY_SEQUENCE_KEY)
+            tombstones = {address: v for address, v in old_data["tombstones"].items() if address not in new_instances}
+            tombstones.update({address: version for address in deleted})
+            min_version = old_data["min_version"] if old_version else version
+            if len(tombstones) > DBHA_TOPOLOGY_TOMBSTONE_LIMIT:
+                # 丢弃最早的删除记录，早于这些记录的版本无法再做增量
+                pruned = sorted(tombstones.items(), key=lambda x: x[1])[
+                    : len(tombstones) - DBHA_TOPOLOGY_TOMBSTONE_LIMIT
+                ]
+                min_version = max(min_version, max(v for __, v in pruned))
+                tombstones = {address: v for address, v in tombstones.items() if address not in dict(pruned)}
+            data = {
+                "instances": {
+                    address: [version if address in changed else old_data["instances"][address][0], item]
+                    for address, item in new_instances.items()
+                },
+                "tombstones": tombstones,
+                "min_version": min_version,
+            }
+
+        meta = {
+            "version": version,
+            "source": source,
+            "expire_at": min(time.time() + env.DBHA_TOPOLOGY_SNAPSHOT_TTL, next_expire_at),
+        }
+        pipeline = RedisConn.pipeline()
+        pipeline.set(data_key, json.dumps(data), ex=DBHA_TOPOLOGY_DATA_EXPIRE)
+        pipeline.set(meta_key, json.dumps(meta), ex=DBHA_TOPOLOGY_DATA_EXPIRE)
+        pipeline.execute()
+        return meta
+
+    def _get_metas(self) -> Dict[Union[int, str], Dict]:
+        """获取各个城市的快照元信息，快照失效时重新构建"""
+        meta_keys = [self._key(DBHA_TOPOLOGY_META_KEY, city) for city in self.cities]
+        source, *metas = RedisConn.mget(DBHA_TOPOLOGY_SOURCE_KEY, *meta_keys)
+        source = int(source or 0)
+
+        city_metas = {}
+        for city, meta in zip(self.cities, metas):
+            meta = json.loads(meta) if meta else None
+            if meta and meta["source"] == source and meta["expire_at"] > time.time():
+                city_metas[city] = meta
+                continue
+
+            # 其他进程正在构建时，沿用旧快照
+            lock_key = self._key(DBHA_TOPOLOGY_LOCK_KEY, city)
+            locked = RedisConn.set(lock_key, 1, nx=True, ex=DBHA_TOPOLOGY_LOCK_EXPIRE)
+            if meta and not locked:
+                city_metas[city] = meta
+                continue
+            try:
+                city_metas[city] = self._build(city, source)
+            finally:
+                if locked:
+                    RedisConn.delete(lock_key)
+        return city_metas
+
+    def query(
+        self,
+        statuses: Optional[List[str]] = None,
+        cluster_types: Optional[List[str]] = None,
+        since_version: Optional[int] = None,
+        etag: Optional[str] = None,
+    ) -> Tuple[str, Optional[Union[List, Dict]]]:
+        """
+        查询需要探测的实例，返回 (etag, 数据)，etag未变化时数据为None
+        @param statuses: 实例状态过滤
+        @param cluster_types: 集群类型过滤
+        @param since_version: 客户端已有的版本，指定时返回增量数据
+        @param etag: 客户端上次获取到的etag
+        """
+        city_metas = self._get_metas()
+        version = max(meta["version"] for meta in city_metas.values())
+        current_etag = self._digest(
+            [
+                self.bk_cloud_id,
+                statuses,
+                cluster_types,
+                since_version,
+                [(city, meta["version"]) for city, meta in city_metas.items()],
+            ]
+        )
+        if etag and etag == current_etag:
+            return current_etag, None
+
+        def _match(item):
+            return (not statuses or item["status"] in statuses) and (
+                not cluster_types or item["cluster_type"] in cluster_types
+            )
+
+        # 客户端已是最新版本，无需读取快照数据
+        if since_version is not None and since_version == version:
+            return current_etag, {"version": version, "full": False, "instances": [], "deleted": []}
+
+        datas = RedisConn.mget(*[self._key(DBHA_TOPOLOGY_DATA_KEY, city) for city in self.cities])
+        # 快照数据缺失时，min_version 视为无穷大，退化为全量
+        datas = [json.loads(data) if data else {"instances": {}, "min_version": float("inf")} for data in datas]
+        if since_version is None:
+            return current_etag, [item for data in datas for __, item in data["instances"].values() if _match(item)]
+
+        # 客户端版本比当前版本还新(如快照被重置)，或者早于保留的删除记录时，返回全量数据
+        full = since_version > version or any(since_version < data["min_version"] for data in datas)
+        if full:
+            instances = [item for data in datas for __, item in data["instances"].values() if _match(item)]
+            return current_etag, {"version": version, "full": True, "instances": instances, "deleted": []}
+
+        instances, deleted = [], set()
+        for data in datas:
+            for address, (changed_version, item) in data["instances"].items():
+                if changed_version <= since_version:
+                    continue
+                # 变更后不再满足过滤条件的实例，客户端需要删除
+                if _match(item):
+                    instances.append(item)
+                else:
+                    deleted.add(address)
+            deleted.update(address for address, v in data["tombstones"].items() if v > since_version)
+
+        # 实例可能在城市间迁移，同时出现在删除和变更中时以变更为准
+        deleted -= {self._address(item) for item in instances}
+        return current_etag, {"version": version, "full": False, "instances": instances, "deleted": sorted(deleted)}
@@ -12,7 +12,7 @@ import logging
 
 from django.apps import AppConfig
 from django.db import IntegrityError
-from django.db.models.signals import post_delete, post_migrate, post_save
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
 
 logger = logging.getLogger("root")
 
@@ -43,8 +43,19 @@ class DBMeta(AppConfig):
     name = "backend.db_meta"
 
     def ready(self):
-        from backend.db_meta.models import ProxyInstance, StorageInstance
-        from backend.db_meta.signals import update_cluster_status
+        from backend.db_meta.models import (
+            CLBEntryDetail,
+            Cluster,
+            ClusterDBHAExt,
+            ClusterEntry,
+            ExtraProcessInstance,
+            Machine,
+            PolarisEntryDetail,
+            ProxyInstance,
+            StorageInstance,
+            StorageInstanceTuple,
+        )
+        from backend.db_meta.signals import invalidate_dbha_topology, update_cluster_status
 
         post_migrate.connect(init_db_meta, sender=self)
         # 当实例进行修改或者删除时，更新集群状态
@@ -52,3 +63,27 @@ class DBMeta(AppConfig):
         post_save.connect(update_cluster_status, sender=ProxyInstance)
         post_delete.connect(update_cluster_status, sender=StorageInstance)
         post_delete.connect(update_cluster_status, sender=ProxyInstance)
+
+        # dbha 探测拓扑相关的元数据变更时，使拓扑快照失效
+        for model in [
+            Machine,
+            Cluster,
+            ClusterDBHAExt,
+            ClusterEntry,
+            CLBEntryDetail,
+            PolarisEntryDetail,
+            StorageInstance,
+            ProxyInstance,
+            StorageInstanceTuple,
+            ExtraProcessInstance,
+        ]:
+            post_save.connect(invalidate_dbha_topology, sender=model)
+            post_delete.connect(invalidate_dbha_topology, sender=model)
+        for through in [
+            StorageInstance.cluster.through,
+            StorageInstance.bind_entry.through,
+            ProxyInstance.cluster.through,
+            ProxyInstance.storageinstance.through,
+            ProxyInstance.bind_entry.through,
+        ]:
+            m2m_changed.connect(invalidate_dbha_topology, sender=through)
@@ -11,13 +11,14 @@ specific language governing permissions and limitations under the License.
 
 import json
 import logging
+from collections import defaultdict
 from datetime import datetime, timezone
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
-from django.db.models import Count, Q, QuerySet
+from django.db.models import Count, QuerySet
 from django.forms import model_to_dict
 from django.utils.translation import ugettext_lazy as _
 
@@ -129,8 +130,15 @@ class Cluster(AuditedModel):
         """
         处理当前的动作是否和集群正在运行的动作存在执行互斥
         """
+        if not ticket_type:
+            return
+
+        # 一次性查询所有集群正在运行的互斥单据
+        cluster_exclusive_infos = ClusterOperateRecord.objects.has_exclusive_operations_bulk(
+            ticket_type, cluster_ids, **kwargs
+        )
         for cluster_id in cluster_ids:
-            exclusive_infos = cls.is_exclusive(cluster_id, ticket_type, **kwargs)
+            exclusive_infos = cluster_exclusive_infos.get(cluster_id)
             if not exclusive_infos:
                 continue
 
@@ -173,41 +181,75 @@ class Cluster(AuditedModel):
             return TwemproxyVersion.TwemproxyLatest
         return LATEST
 
+    @classmethod
+    def _build_status_flags(cls, cluster_type_map: Dict[int, str]) -> Dict[int, ClusterStatusFlags]:
+        """
+        根据集群中异常实例的角色计算状态标志，每类实例只查询一次
+        @param cluster_type_map: key 是 cluster.id, value 是 cluster_type
+        """
+        flag_cluster_ids = [
+            cluster_id
+            for cluster_id, cluster_type in cluster_type_map.items()
+            if cluster_type in [ClusterType.TenDBHA, ClusterType.TenDBCluster, ClusterType.TenDBSingle]
+        ]
+        unavailable_proxy_clusters, unavailable_storage_roles = set(), defaultdict(set)
+        if flag_cluster_ids:
+            unavailable_proxy_clusters = set(
+                cls.objects.filter(
+                    id__in=flag_cluster_ids, proxyinstance__status=InstanceStatus.UNAVAILABLE.value
+                ).values_list("id", flat=True)
+            )
+            unavailable_storages = (
+                cls.objects.filter(id__in=flag_cluster_ids, storageinstance__status=InstanceStatus.UNAVAILABLE.value)
+                .values_list("id", "storageinstance__instance_inner_role")
+                .distinct()
+            )
+            for cluster_id, inner_role in unavailable_storages:
+                unavailable_storage_roles[cluster_id].add(inner_role)
+
+        status_flags: Dict[int, ClusterStatusFlags] = {}
+        for cluster_id, cluster_type in cluster_type_map.items():
+            proxy_unavailable = cluster_id in unavailable_proxy_clusters
+            storage_roles = unavailable_storage_roles.get(cluster_id, set())
+            if cluster_type == ClusterType.TenDBHA.value:
+                flag_obj = ClusterDBHAStatusFlags(0)
+                if proxy_unavailable:
+                    flag_obj |= ClusterDBHAStatusFlags.ProxyUnavailable
+                if InstanceInnerRole.MASTER.value in storage_roles:
+                    flag_obj |= ClusterDBHAStatusFlags.BackendMasterUnavailable
+                if InstanceInnerRole.SLAVE.value in storage_roles:
+                    flag_obj |= ClusterDBHAStatusFlags.BackendSlaveUnavailable
+            elif cluster_type == ClusterType.TenDBCluster.value:
+                flag_obj = ClusterTenDBClusterStatusFlag(0)
+                if proxy_unavailable:
+                    flag_obj |= ClusterTenDBClusterStatusFlag.SpiderUnavailable
+                if InstanceInnerRole.MASTER.value in storage_roles:
+                    flag_obj |= ClusterTenDBClusterStatusFlag.RemoteMasterUnavailable
+                if InstanceInnerRole.SLAVE.value in storage_roles:
+                    flag_obj |= ClusterTenDBClusterStatusFlag.RemoteSlaveUnavailable
+            elif cluster_type == ClusterType.TenDBSingle.value:
+                flag_obj = ClusterDBSingleStatusFlags(0)
+                if storage_roles:
+                    flag_obj |= ClusterDBSingleStatusFlags.SingleUnavailable
+            else:
+                logger.debug(_("{} 未实现 status flag,".format(cluster_type)))
+                flag_obj = ClusterStatusFlags(0)
+            status_flags[cluster_id] = flag_obj
+
+        return status_flags
+
+    @classmethod
+    def bulk_status_flags(cls, cluster_ids: List[int]) -> Dict[int, ClusterStatusFlags]:
+        """
+        批量获取集群的状态标志，列表页等场景请使用该方法代替逐个集群访问 status_flag
+        @param cluster_ids: 集群ID列表
+        """
+        cluster_type_map = dict(cls.objects.filter(id__in=cluster_ids).values_list("id", "cluster_type"))
+        return cls._build_status_flags(cluster_type_map)
+
     @property
     def __status_flag(self):
-        if self.cluster_type == ClusterType.TenDBHA.value:
-            flag_obj = ClusterDBHAStatusFlags(0)
-            if self.proxyinstance_set.filter(status=InstanceStatus.UNAVAILABLE.value).exists():
-                flag_obj |= ClusterDBHAStatusFlags.ProxyUnavailable
-            if self.storageinstance_set.filter(
-                status=InstanceStatus.UNAVAILABLE.value, instance_inner_role=InstanceInnerRole.MASTER.value
-            ).exists():
-                flag_obj |= ClusterDBHAStatusFlags.BackendMasterUnavailable
-            if self.storageinstance_set.filter(
-                status=InstanceStatus.UNAVAILABLE.value, instance_inner_role=InstanceInnerRole.SLAVE.value
-            ).exists():
-                flag_obj |= ClusterDBHAStatusFlags.BackendSlaveUnavailable
-        elif self.cluster_type == ClusterType.TenDBCluster.value:
-            flag_obj = ClusterTenDBClusterStatusFlag(0)
-            if self.proxyinstance_set.filter(status=InstanceStatus.UNAVAILABLE.value).exists():
-                flag_obj |= ClusterTenDBClusterStatusFlag.SpiderUnavailable
-            if self.storageinstance_set.filter(
-                status=InstanceStatus.UNAVAILABLE.value, instance_inner_role=InstanceInnerRole.MASTER.value
-            ).exists():
-                flag_obj |= ClusterTenDBClusterStatusFlag.RemoteMasterUnavailable
-            if self.storageinstance_set.filter(
-                status=InstanceStatus.UNAVAILABLE.value, instance_inner_role=InstanceInnerRole.SLAVE.value
-            ).exists():
-                flag_obj |= ClusterTenDBClusterStatusFlag.RemoteSlaveUnavailable
-        elif self.cluster_type == ClusterType.TenDBSingle.value:
-            flag_obj = ClusterDBSingleStatusFlags(0)
-            if self.storageinstance_set.filter(status=InstanceStatus.UNAVAILABLE.value).exists():
-                flag_obj |= ClusterDBSingleStatusFlags.SingleUnavailable
-        else:
-            logger.debug(_("{} 未实现 status flag,".format(self.cluster_type)))
-            flag_obj = ClusterStatusFlags(0)
-
-        return flag_obj
+        return self._build_status_flags({self.id: self.cluster_type})[self.id]
 
     @property
     def status_flag(self):
@@ -243,31 +285,84 @@ class Cluster(AuditedModel):
         mongo_replicaset: 去存储节点的port
         sqlserver: ?
         """
-        try:
-            if self.cluster_type == ClusterType.TenDBSingle:
-                return self.storageinstance_set.first().port
-            elif self.cluster_type in [ClusterType.TenDBHA, *ClusterType.db_type_to_cluster_types(DBType.Redis)]:
-                return self.proxyinstance_set.first().port
-            elif self.cluster_type == ClusterType.TenDBCluster:
-                spider_master_filter = Q(tendbclusterspiderext__spider_role=TenDBClusterSpiderRole.SPIDER_MASTER)
-                return self.proxyinstance_set.filter(spider_master_filter).first().port
-            elif self.cluster_type == ClusterType.Es:
-                return self.storageinstance_set.filter(instance_role=InstanceRole.ES_MASTER).first().port
-            elif self.cluster_type == ClusterType.Kafka:
-                return self.storageinstance_set.filter(instance_role=InstanceRole.BROKER).first().port
-            elif self.cluster_type == ClusterType.Hdfs:
-                return self.storageinstance_set.filter(instance_role=InstanceRole.HDFS_NAME_NODE).first().port
-            elif self.cluster_type == ClusterType.Pulsar:
-                return self.storageinstance_set.filter(instance_role=InstanceRole.PULSAR_BROKER).first().port
-            elif self.cluster_type == ClusterType.Riak:
-                return DEFAULT_RIAK_PORT
-            elif self.cluster_type == ClusterType.MongoShardedCluster:
-                return self.proxyinstance_set.filter(machine_type=MachineType.MONGOS).first().port
-            elif self.cluster_type == ClusterType.MongoReplicaSet:
-                return self.storageinstance_set.filter(machine_type=MachineType.MONGODB).first().port
-        except AttributeError:
+        if self.cluster_type == ClusterType.Riak:
+            return DEFAULT_RIAK_PORT
+
+        rule = self.get_access_port_rule(self.cluster_type)
+        if not rule:
+            return None
+
+        instance_set, filters = rule
+        instance = getattr(self, f"{instance_set}_set").filter(**filters).first()
+        if not instance:
             logger.warning(_("无法访问集群[]的访问端口，请检查实例信息").format(self.name))
             return 0
+        return instance.port
+
+    @staticmethod
+    def get_access_port_rule(cluster_type: str) -> Optional[Tuple[str, Dict[str, str]]]:
+        """获取集群访问端口所在的实例集合及过滤条件，规则见 access_port"""
+        if cluster_type == ClusterType.TenDBSingle:
+            return "storageinstance", {}
+        elif cluster_type in [ClusterType.TenDBHA, *ClusterType.db_type_to_cluster_types(DBType.Redis)]:
+            return "proxyinstance", {}
+        elif cluster_type == ClusterType.TenDBCluster:
+            return "proxyinstance", {"tendbclusterspiderext__spider_role": TenDBClusterSpiderRole.SPIDER_MASTER.value}
+        elif cluster_type == ClusterType.Es:
+            return "storageinstance", {"instance_role": InstanceRole.ES_MASTER.value}
+        elif cluster_type == ClusterType.Kafka:
+            return "storageinstance", {"instance_role": InstanceRole.BROKER.value}
+        elif cluster_type == ClusterType.Hdfs:
+            return "storageinstance", {"instance_role": InstanceRole.HDFS_NAME_NODE.value}
+        elif cluster_type == ClusterType.Pulsar:
+            return "storageinstance", {"instance_role": InstanceRole.PULSAR_BROKER.value}
+        elif cluster_type == ClusterType.MongoShardedCluster:
+            return "proxyinstance", {"machine_type": MachineType.MONGOS.value}
+        elif cluster_type == ClusterType.MongoReplicaSet:
+            return "storageinstance", {"machine_type": MachineType.MONGODB.value}
+        return None
+
+    @classmethod
+    def bulk_access_ports(cls, cluster_ids: List[int]) -> Dict[int, Optional[int]]:
+        """
+        批量获取集群的访问端口，proxy和storage实例各查询一次，结果与逐个集群访问 access_port 一致
+        @param cluster_ids: 集群ID列表
+        """
+        access_ports: Dict[int, Optional[int]] = {}
+        cluster_rules: Dict[int, Tuple[str, Dict[str, str]]] = {}
+        for cluster_id, cluster_type in cls.objects.filter(id__in=cluster_ids).values_list("id", "cluster_type"):
+            rule = cls.get_access_port_rule(cluster_type)
+            if cluster_type == ClusterType.Riak:
+                access_ports[cluster_id] = DEFAULT_RIAK_PORT
+            elif rule:
+                cluster_rules[cluster_id] = rule
+                access_ports[cluster_id] = 0
+            else:
+                access_ports[cluster_id] = None
+
+        for instance_set in ["proxyinstance", "storageinstance"]:
+            rule_cluster_ids = [cluster_id for cluster_id, rule in cluster_rules.items() if rule[0] == instance_set]
+            if not rule_cluster_ids:
+                continue
+
+            filter_fields = {field for cluster_id in rule_cluster_ids for field in cluster_rules[cluster_id][1]}
+            # 与 .first() 保持一致，按照实例的默认排序取第一个满足条件的实例
+            instances = (
+                cls.objects.filter(id__in=rule_cluster_ids, **{f"{instance_set}__isnull": False})
+                .order_by(f"-{instance_set}__create_at")
+                .values("id", f"{instance_set}__port", *[f"{instance_set}__{field}" for field in filter_fields])
+            )
+            matched_cluster_ids = set()
+            for inst in instances:
+                cluster_id = inst["id"]
+                if cluster_id in matched_cluster_ids:
+                    continue
+                filters = cluster_rules[cluster_id][1]
+                if all(inst[f"{instance_set}__{field}"] == value for field, value in filters.items()):
+                    access_ports[cluster_id] = inst[f"{instance_set}__port"]
+                    matched_cluster_ids.add(cluster_id)
+
+        return access_ports
 
     def get_partition_port(self):
         """
@@ -10,6 +10,7 @@ specific language governing permissions and limitations under the License.
 """
 from typing import Union
 
+from backend.db_meta.api.dbha.snapshot import invalidate_topology
 from backend.db_meta.enums import ClusterStatus
 from backend.db_meta.models import ProxyInstance, StorageInstance
 
@@ -33,3 +34,8 @@ def update_cluster_status(sender, instance: Union[StorageInstance, ProxyInstance
         if origin_status != target_status:
             cluster.status = target_status
             cluster.save(update_fields=["status"])
+
+
+def invalidate_dbha_topology(sender, **kwargs):
+    """dbha 探测拓扑相关的元数据变更时，使拓扑快照失效"""
+    invalidate_topology()
@@ -11,8 +11,17 @@ specific language governing permissions and limitations under the License.
 
 
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class DBPackageConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "backend.db_package"
+
+    def ready(self):
+        from backend.db_package.models import Package
+        from backend.db_package.signals import invalidate_package_registry
+
+        # 介质包修改或删除时，失效介质注册表
+        post_save.connect(invalidate_package_registry, sender=Package)
+        post_delete.connect(invalidate_package_registry, sender=Package)
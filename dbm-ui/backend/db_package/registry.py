@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from django.db import transaction
+
+from backend import env
+from backend.configuration.constants import DBType
+from backend.db_package.exceptions import PackageNotExistException
+from backend.db_package.models import Package
+from backend.flow.consts import MediumEnum
+from backend.utils.redis import RedisConn
+
+# 介质注册表的全局版本号，Package 变更时递增，各进程据此判断本地注册表是否过期
+PACKAGE_REGISTRY_VERSION_KEY = "db_package_registry_version"
+
+
+class PackageRegistry(object):
+    """
+    进程内的介质包注册表，缓存所有启用的 Package，按照 (db_type, pkg_type) 分组，组内按更新时间倒序
+    - 介质解析(如 GetFileList)直接在内存中查找，不再访问DB
+    - Package 保存/删除时通过信号递增redis中的全局版本号，并清空当前进程的注册表
+    - 其他进程每隔 PACKAGE_REGISTRY_CHECK_INTERVAL 秒比对一次版本号，不一致时重新加载
+    注意：注册表返回的 Package 对象在进程内共享，调用方只能读取，不可修改
+    """
+
+    _lock = threading.Lock()
+    # 注册表: {(db_type, pkg_type): [package, ...]}
+    _packages: Optional[Dict[Tuple[str, str], List[Package]]] = None
+    # 介质路径索引: {path: package}
+    _paths: Dict[str, Package] = {}
+    # 本地注册表对应的全局版本号，以及下一次比对版本号的时间
+    _version: Optional[str] = None
+    _next_check_time: float = 0
+
+    @staticmethod
+    def _get_version() -> str:
+        return RedisConn.get(PACKAGE_REGISTRY_VERSION_KEY) or "0"
+
+    @classmethod
+    def _load(cls, version: str) -> Dict[Tuple[str, str], List[Package]]:
+        packages: Dict[Tuple[str, str], List[Package]] = defaultdict(list)
+        paths: Dict[str, Package] = {}
+        for package in Package.objects.filter(enable=True).order_by("-update_at", "-id"):
+            packages[(package.db_type, package.pkg_type)].append(package)
+            paths.setdefault(package.path, package)
+        packages = dict(packages)
+
+        with cls._lock:
+            cls._packages, cls._paths, cls._version = packages, paths, version
+            cls._next_check_time = time.time() + env.PACKAGE_REGISTRY_CHECK_INTERVAL
+        return packages
+
+    @classmethod
+    def _get_packages(cls) -> Dict[Tuple[str, str], List[Package]]:
+        packages = cls._packages
+        if packages is not None and time.time() < cls._next_check_time:
+            return packages
+
+        version = cls._get_version()
+        if packages is not None and version == cls._version:
+            cls._next_check_time = time.time() + env.PACKAGE_REGISTRY_CHECK_INTERVAL
+            return packages
+        return cls._load(version)
+
+    @classmethod
+    def get_latest_package(
+        cls,
+        version: str,
+        pkg_type: str,
+        bk_biz_id: Optional[int] = None,
+        db_type: Optional[str] = DBType.MySQL,
+    ) -> Package:
+        """
+        根据版本和包类型获取最新的介质包，语义与 Package.get_latest_package 保持一致
+        @param version: 介质版本，MediumEnum.Latest 表示最近上传的介质
+        @param pkg_type: 介质包类型
+        @param bk_biz_id: 业务id，指定时只返回该业务可用(灰度业务包含该业务或未指定业务)的介质
+        @param db_type: 存储类型
+        """
+        for package in cls._get_packages().get((db_type, pkg_type), []):
+            if version != MediumEnum.Latest and package.version != version:
+                continue
+            if bk_biz_id and package.allow_biz_ids is not None and bk_biz_id not in package.allow_biz_ids:
+                continue
+            return package
+
+        raise PackageNotExistException(version=version, pkg_type=pkg_type, db_type=db_type)
+
+    @classmethod
+    def get_package_by_path(cls, path: str) -> Optional[Package]:
+        """
+        根据制品库路径获取启用的介质包，不存在时返回None
+        @param path: 介质包在制品库中的路径(不含项目和仓库)
+        """
+        cls._get_packages()
+        return cls._paths.get(path)
+
+    @classmethod
+    def invalidate(cls):
+        """递增全局版本号，并清空当前进程的注册表"""
+        with cls._lock:
+            cls._packages, cls._paths, cls._version = None, {}, None
+
+        # 事务提交后再递增版本号，避免其他进程在提交前重新加载到旧数据
+        transaction.on_commit(lambda: RedisConn.incr(PACKAGE_REGISTRY_VERSION_KEY))
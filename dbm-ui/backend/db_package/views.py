@@ -26,6 +26,7 @@ from backend.db_package.constants import DB_PACKAGE_TAG, INSTALL_PACKAGE_LIST, P
 from backend.db_package.exceptions import PackageNotExistException
 from backend.db_package.filters import PackageListFilter
 from backend.db_package.models import Package
+from backend.db_package.registry import PackageRegistry
 from backend.db_package.serializers import (
     ListPackageVersionSerializer,
     PackageSerializer,
@@ -104,6 +105,8 @@ class DBPackageViewSet(viewsets.AuditedModelViewSet):
         with atomic():
             old_packages.delete()
             Package.objects.bulk_create([Package(**info) for info in sync_medium_infos])
+            # bulk_create 不会触发信号，需要主动使介质注册表失效
+            PackageRegistry.invalidate()
 
         return Response()
 
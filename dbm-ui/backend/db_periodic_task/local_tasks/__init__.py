@@ -14,6 +14,8 @@ from backend.db_periodic_task.local_tasks.db_meta import *
 from backend.db_periodic_task.local_tasks.db_monitor import *
 from backend.db_periodic_task.local_tasks.db_proxy import *
 from backend.db_periodic_task.local_tasks.dbmon_heartbeat import *
+from backend.db_periodic_task.local_tasks.ipchooser_mirror import *
+from backend.db_periodic_task.local_tasks.job_poller import *
 from backend.db_periodic_task.local_tasks.mysql_backup import *
 from backend.db_periodic_task.local_tasks.randomize_password import *
 from backend.db_periodic_task.local_tasks.redis_autofix import *
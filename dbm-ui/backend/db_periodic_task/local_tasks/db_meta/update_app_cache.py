@@ -20,9 +20,16 @@ from backend.components import CCApi
 from backend.db_meta.models import AppCache
 from backend.db_periodic_task.local_tasks.register import register_periodic_task
 from backend.dbm_init.constants import CC_APP_ABBR_ATTR
+from backend.utils.batch_request import batch_request
+from backend.utils.redis import RedisConn
 
 logger = logging.getLogger("celery")
 
+# 每页拉取及每批写入的业务数量
+BATCH_SIZE = 1000
+# 最近一次同步的统计信息
+APP_CACHE_SYNC_METRICS_KEY = "db_meta_app_cache_sync_metrics"
+
 
 def update_app_cache():
     """TODO: deprecated: 缓存空闲机拓扑"""
@@ -112,77 +119,66 @@ def bulk_update_app_cache():
 
         return db_app_abbr
 
-    # 批量同步准备
-    LIMIT = 1000
-    start = 0
-    total = CCApi.search_business({"page": {"start": 0, "limit": 1}}).get("count", 0)
-
     begin_at = datetime.datetime.now(timezone.utc)
-    logger.warning("bulk_update_app_cache: start update app cache total: %s", total)
 
-    # 批量创建和更新
-    create_cnt, update_cnt = 0, 0
+    # 并发分页拉取全部业务
+    bizs = batch_request(CCApi.search_business, params={}, limit=BATCH_SIZE, sort="bk_biz_id")
+    biz_map = {biz["bk_biz_id"]: biz for biz in bizs}
+    fetch_cost = datetime.datetime.now(timezone.utc) - begin_at
+    logger.warning("bulk_update_app_cache: fetch %s apps cost %s", len(biz_map), fetch_cost)
+
+    # 整理需要批量创建和更新的app，只写入内容有变化的记录
     update_fields = [CC_APP_ABBR_ATTR, "bk_biz_name", "time_zone", "bk_biz_maintainer"]
-    while start < total:
-        info = CCApi.search_business({"page": {"start": start, "limit": LIMIT}}).get("info", [])
-        biz_map = {i["bk_biz_id"]: i for i in info}
-
-        bk_biz_ids = list(biz_map.keys())
-        exists = list(AppCache.objects.filter(bk_biz_id__in=bk_biz_ids).values_list("bk_biz_id", flat=True))
-        not_exists = list(set(bk_biz_ids) - set(exists))
-
-        # 整理需要批量创建的app
-        new_apps = []
-        for bk_biz_id in not_exists:
-            cc_app = biz_map[bk_biz_id]
-            db_app_abbr = get_app_abbr(cc_app)
+    apps = AppCache.objects.in_bulk(list(biz_map.keys()))
+    new_apps, update_apps = [], []
+    for bk_biz_id, cc_app in biz_map.items():
+        app = apps.get(bk_biz_id)
+        if not app:
             new_apps.append(
                 AppCache(
                     bk_biz_id=bk_biz_id,
                     bk_biz_name=cc_app["bk_biz_name"],
                     time_zone=cc_app["time_zone"],
                     bk_biz_maintainer=cc_app["bk_biz_maintainer"],
-                    db_app_abbr=db_app_abbr,
+                    db_app_abbr=get_app_abbr(cc_app),
                 )
             )
-
-        # 整理需要批量更新的app
-        update_apps = []
-        for app in AppCache.objects.filter(bk_biz_id__in=exists):
-            need_update = False
-            for field in update_fields:
-                cc_app = biz_map[app.bk_biz_id]
-                old_value = getattr(app, field)
-                new_value = cc_app.get(field, "")
-
-                # 英文名需要清洗后使用
-                if field == CC_APP_ABBR_ATTR:
-                    new_value = format_app_abbr(new_value)
-                    # 清理无效则不同步
-                    new_value = new_value if REGEX_APP_ABBR.match(new_value) else ""
-
-                # 不为空且不一致才更新
-                if new_value and new_value != old_value:
-                    logger.info(
-                        "bulk_update_app_cache[%s]: field=%s: %s -> %s", app.bk_biz_id, field, old_value, new_value
-                    )
-                    setattr(app, field, new_value)
-                    need_update = True
-
-                if need_update:
-                    update_apps.append(app)
-
-        AppCache.objects.bulk_create(new_apps)
-        AppCache.objects.bulk_update(update_apps, fields=update_fields)
-        create_cnt += len(new_apps)
-        update_cnt += len(update_apps)
-        logger.info("bulk_update_app_cache[%s]: new: %s, update: %s", start, len(new_apps), len(update_apps))
-
-        start += LIMIT
-
-    logger.warning(
-        "bulk_update_app_cache [%s] finish update app cache end, create_cnt: %s, update_cnt: %s",
-        (datetime.datetime.now(timezone.utc) - begin_at),
-        create_cnt,
-        update_cnt,
-    )
+            continue
+
+        old_values = [getattr(app, field) for field in update_fields]
+        new_values = []
+        for field, old_value in zip(update_fields, old_values):
+            new_value = cc_app.get(field, "")
+            # 英文名需要清洗后使用，清理无效则不同步
+            if field == CC_APP_ABBR_ATTR:
+                new_value = format_app_abbr(new_value)
+                new_value = new_value if REGEX_APP_ABBR.match(new_value) else ""
+            # 为空则保留原值
+            new_values.append(new_value or old_value)
+
+        if old_values == new_values:
+            continue
+
+        for field, old_value, new_value in zip(update_fields, old_values, new_values):
+            if new_value != old_value:
+                logger.info(
+                    "bulk_update_app_cache[%s]: field=%s: %s -> %s", app.bk_biz_id, field, old_value, new_value
+                )
+                setattr(app, field, new_value)
+        update_apps.append(app)
+
+    AppCache.objects.bulk_create(new_apps, batch_size=BATCH_SIZE)
+    AppCache.objects.bulk_update(update_apps, fields=update_fields, batch_size=BATCH_SIZE)
+
+    # 记录本次同步的耗时和变更统计
+    metrics = {
+        "begin_at": begin_at.isoformat(),
+        "fetch_cost": fetch_cost.total_seconds(),
+        "total_cost": (datetime.datetime.now(timezone.utc) - begin_at).total_seconds(),
+        "total_cnt": len(biz_map),
+        "create_cnt": len(new_apps),
+        "update_cnt": len(update_apps),
+        "unchanged_cnt": len(biz_map) - len(new_apps) - len(update_apps),
+    }
+    RedisConn.hset(APP_CACHE_SYNC_METRICS_KEY, mapping=metrics)
+    logger.warning("bulk_update_app_cache: finish update app cache, metrics: %s", metrics)
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from backend import env
+from backend.db_periodic_task.local_tasks import register_periodic_task
+from backend.db_services.ipchooser.query.mirror import TopoMirror
+
+
+@register_periodic_task(run_every=30)
+def watch_ipchooser_mirror():
+    """根据CMDB资源变更事件，刷新发生变化的业务拓扑镜像"""
+    if not env.IPCHOOSER_MIRROR_ENABLE:
+        return
+
+    for bk_biz_id in TopoMirror.watch():
+        TopoMirror.refresh(bk_biz_id)
+
+
+@register_periodic_task(run_every=10 * 60)
+def refresh_ipchooser_mirror():
+    """定期全量比对活跃业务的拓扑镜像，兜底遗漏的变更事件"""
+    if not env.IPCHOOSER_MIRROR_ENABLE:
+        return
+
+    for bk_biz_id in TopoMirror.active_bizs():
+        TopoMirror.refresh(bk_biz_id)
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from backend import env
+from backend.db_periodic_task.local_tasks import register_periodic_task
+from backend.flow.utils.job_poller import JobStatusPoller
+from backend.flow.utils.node_callback import NodeCallbackHandler
+
+
+@register_periodic_task(run_every=5)
+def poll_inflight_job_status():
+    """集中轮询flow节点登记的job任务状态"""
+    JobStatusPoller.poll()
+
+
+@register_periodic_task(run_every=5)
+def poll_callback_waiting_nodes():
+    """回调模式下，兜底轮询迟迟没有收到回调的flow节点"""
+    if env.FLOW_CALLBACK_SCHEDULE_ENABLE:
+        NodeCallbackHandler.poll()
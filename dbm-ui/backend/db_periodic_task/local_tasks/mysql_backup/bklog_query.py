@@ -9,13 +9,10 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 import datetime
-import json
-from typing import Dict, List
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
 
-from backend import env
-from backend.components.bklog.client import BKLogApi
-from backend.utils.string import pascal_to_snake
-from backend.utils.time import datetime2str
+from backend.components.bklog.handler import BKLogHandler
 
 
 def _get_log_from_bklog(collector, start_time, end_time, query_string="*") -> List[Dict]:
@@ -26,25 +23,8 @@ def _get_log_from_bklog(collector, start_time, end_time, query_string="*") -> Li
     @param end_time: 结束时间
     @param query_string: 过滤条件
     """
-    resp = BKLogApi.esquery_search(
-        {
-            "indices": f"{env.DBA_APP_BK_BIZ_ID}_bklog.{collector}",
-            "start_time": datetime2str(start_time),
-            "end_time": datetime2str(end_time),
-            # 这里需要精确查询集群域名，所以可以通过log: "key: \"value\""的格式查询
-            "query_string": query_string,
-            "start": 0,
-            "size": 6000,
-            "sort_list": [["dtEventTimeStamp", "asc"], ["gseIndex", "asc"], ["iterationIndex", "asc"]],
-        },
-        use_admin=True,
-    )
-    backup_logs = []
-    for hit in resp["hits"]["hits"]:
-        raw_log = json.loads(hit["_source"]["log"])
-        backup_logs.append({pascal_to_snake(key): value for key, value in raw_log.items()})
-
-    return backup_logs
+    # 分页拉取全部日志，避免超过单次查询条数后结果被截断
+    return list(BKLogHandler.iter_logs(collector, start_time, end_time, query_string))
 
 
 class ClusterBackup:
@@ -58,13 +38,93 @@ class ClusterBackup:
         self.backups = {}
         self.success = False
 
+    @staticmethod
+    def to_backup_file(log: Dict) -> Dict:
+        """将全备日志转换为备份记录"""
+        return {
+            "bk_biz_id": log["bk_biz_id"],
+            "backup_id": log["backup_id"],
+            "cluster_domain": log["cluster_address"],
+            "cluster_id": log["cluster_id"],
+            "mysql_host": log["backup_host"],
+            "mysql_port": log["backup_port"],
+            "mysql_role": log["mysql_role"],
+            "backup_type": log["backup_type"],
+            "file_list": log["file_list"],
+            "data_schema_grant": log["data_schema_grant"],
+            "is_full_backup": log["is_full_backup"],
+            "total_filesize": log["total_filesize"],
+            "encrypt_enable": log["encrypt_enable"],
+            "mysql_version": log["mysql_version"],
+            "backup_begin_time": log["backup_begin_time"],
+            "backup_end_time": log["backup_end_time"],
+            "backup_consistent_time": log["backup_consistent_time"],
+            "shard_value": log["shard_value"],
+        }
+
+    @staticmethod
+    def to_binlog(log: Dict) -> Dict:
+        """将binlog备份日志转换为备份记录"""
+        return {
+            "cluster_domain": log["cluster_domain"],
+            "cluster_id": log["cluster_id"],
+            "task_id": log["task_id"],
+            "file_name": log["filename"],  # file_name
+            "file_size": log["size"],
+            "file_mtime": log["file_mtime"],
+            "file_type": "binlog",
+            "mysql_host": log["host"],
+            "mysql_port": log["port"],
+            "mysql_role": log["db_role"],
+            "backup_status": log["backup_status"],
+            "backup_status_info": log["backup_status_info"],
+        }
+
+    @classmethod
+    def query_backup_log_group_by_domain(
+        cls,
+        start_time: datetime.datetime,
+        end_time: datetime.datetime,
+        domains: Optional[Set[str]] = None,
+        full_backup_only: bool = False,
+    ) -> Dict[str, List[Dict]]:
+        """
+        批量模式：一次性分页查询时间范围内所有集群的全备记录，按照集群域名分组
+        :param start_time: 开始时间
+        :param end_time: 结束时间
+        :param domains: 只保留这些集群的记录，为空表示全部保留
+        :param full_backup_only: 是否只保留全量备份的记录
+        """
+        domain_backups: Dict[str, List[Dict]] = defaultdict(list)
+        # 边拉取边过滤，避免将全天的备份日志都保留在内存中
+        for log in BKLogHandler.iter_logs("mysql_dbbackup_result", start_time, end_time):
+            if domains is not None and log.get("cluster_address") not in domains:
+                continue
+            if full_backup_only and not log.get("is_full_backup"):
+                continue
+            domain_backups[log["cluster_address"]].append(cls.to_backup_file(log))
+        return domain_backups
+
+    @classmethod
+    def query_binlog_group_by_cluster(
+        cls, start_time: datetime.datetime, end_time: datetime.datetime
+    ) -> Dict[int, List[Dict]]:
+        """
+        批量模式：一次性查询时间范围内所有集群的binlog备份记录，按照集群ID分组
+        :param start_time: 开始时间
+        :param end_time: 结束时间
+        """
+        grouped_logs = BKLogHandler.query_logs_group_by(
+            "mysql_binlog_result", start_time, end_time, group_key=lambda log: int(log["cluster_id"])
+        )
+        return {cluster_id: [cls.to_binlog(log) for log in logs] for cluster_id, logs in grouped_logs.items()}
+
     def query_backup_log_from_bklog(self, start_time: datetime.datetime, end_time: datetime.datetime) -> List[Dict]:
         """
         通过日志平台查询集群的时间范围内的全备备份记录
         :param start_time: 开始时间
         :param end_time: 结束时间
         """
-        backup_files = []
         backup_logs = _get_log_from_bklog(
             collector="mysql_dbbackup_result",
             start_time=start_time,
@@ -72,29 +132,7 @@ class ClusterBackup:
             # query_string=f'log: "cluster_id: {self.cluster_id}"',
             query_string=f'log: "cluster_address: \\"{self.cluster_domain}\\""',
         )
-        for log in backup_logs:
-            bf = {
-                "bk_biz_id": log["bk_biz_id"],
-                "backup_id": log["backup_id"],
-                "cluster_domain": log["cluster_address"],
-                "cluster_id": log["cluster_id"],
-                "mysql_host": log["backup_host"],
-                "mysql_port": log["backup_port"],
-                "mysql_role": log["mysql_role"],
-                "backup_type": log["backup_type"],
-                "file_list": log["file_list"],
-                "data_schema_grant": log["data_schema_grant"],
-                "is_full_backup": log["is_full_backup"],
-                "total_filesize": log["total_filesize"],
-                "encrypt_enable": log["encrypt_enable"],
-                "mysql_version": log["mysql_version"],
-                "backup_begin_time": log["backup_begin_time"],
-                "backup_end_time": log["backup_end_time"],
-                "backup_consistent_time": log["backup_consistent_time"],
-                "shard_value": log["shard_value"],
-            }
-            backup_files.append(bf)
-        return backup_files
+        return [self.to_backup_file(log) for log in backup_logs]
 
     def query_binlog_from_bklog(self, start_time: datetime.datetime, end_time: datetime.datetime) -> List[Dict]:
         """
@@ -103,7 +141,6 @@ class ClusterBackup:
         :param start_time: 开始时间
         :param end_time: 结束时间
         """
-        binlogs = []
         backup_logs = _get_log_from_bklog(
             collector="mysql_binlog_result",
             start_time=start_time,
@@ -111,20 +148,4 @@ class ClusterBackup:
             query_string=f'log: "cluster_id: {self.cluster_id}"',
             # query_string=f'log: "cluster_address: \\"{self.cluster_domain}\\""',
         )
-        for log in backup_logs:
-            bl = {
-                "cluster_domain": log["cluster_domain"],
-                "cluster_id": log["cluster_id"],
-                "task_id": log["task_id"],
-                "file_name": log["filename"],  # file_name
-                "file_size": log["size"],
-                "file_mtime": log["file_mtime"],
-                "file_type": "binlog",
-                "mysql_host": log["host"],
-                "mysql_port": log["port"],
-                "mysql_role": log["db_role"],
-                "backup_status": log["backup_status"],
-                "backup_status_info": log["backup_status_info"],
-            }
-            binlogs.append(bl)
-        return binlogs
+        return [self.to_binlog(log) for log in backup_logs]
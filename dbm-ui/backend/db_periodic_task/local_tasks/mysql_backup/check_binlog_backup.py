@@ -57,6 +57,8 @@ def _check_binlog_backup(cluster_type):
             cluster_type, start_time, end_time
         )
     )
+    # 一次性拉取所有集群的binlog备份记录，在本地按照集群分组，避免逐个集群查询日志平台
+    cluster_binlogs = ClusterBackup.query_binlog_group_by_cluster(start_time, end_time)
     for c in Cluster.objects.filter(cluster_type=cluster_type):
         backup = ClusterBackup(c.id, c.immute_domain)
         logger.info(
@@ -66,7 +68,7 @@ def _check_binlog_backup(cluster_type):
         )
         # todo 需要获取集群的 master 分片实例，或者分片数
 
-        items = backup.query_binlog_from_bklog(start_time, end_time)
+        items = cluster_binlogs.get(c.id, [])
         instance_binlogs = defaultdict(list)
         shard_binlog_stat = {}
         for i in items:
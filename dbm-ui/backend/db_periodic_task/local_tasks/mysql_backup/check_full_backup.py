@@ -11,6 +11,7 @@ specific language governing permissions and limitations under the License.
 import logging
 from collections import defaultdict
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 
 from django.utils import timezone
 
@@ -23,6 +24,9 @@ from .bklog_query import ClusterBackup
 
 logger = logging.getLogger("root")
 
+# 巡检报告批量写入的批次大小
+REPORT_BATCH_SIZE = 500
+
 
 def get_last_date_time():
     now_time = datetime.now(timezone.utc)
@@ -32,9 +36,51 @@ def get_last_date_time():
     return start_time, end_time
 
 
-def check_full_backup():
-    _check_tendbha_full_backup()
-    _check_tendbcluster_full_backup()
+def check_full_backup(cluster_types: Optional[List[str]] = None):
+    """
+    巡检前一天的全备：一次性分页拉取全天的全备日志，在本地按照集群分组后，交给各集群类型的检查函数，异常报告批量写入
+    全天的全备日志只拉取一次，不同集群类型共用，避免每种集群类型各自拉取一遍
+    @param cluster_types: 集群类型，目前支持 tendbha 和 tendbcluster，为空表示全部支持的类型
+    """
+    cluster_types = cluster_types or list(FULL_BACKUP_CHECKERS.keys())
+    start_time, end_time = get_last_date_time()
+    logger.info(
+        "==== start check full backup for cluster types {}, time range[{},{}] ====".format(
+            cluster_types, start_time, end_time
+        )
+    )
+    clusters = list(
+        Cluster.objects.filter(cluster_type__in=cluster_types).values(
+            "bk_biz_id", "bk_cloud_id", "immute_domain", "cluster_type"
+        )
+    )
+    domain_backups = ClusterBackup.query_backup_log_group_by_domain(
+        start_time, end_time, domains={c["immute_domain"] for c in clusters}, full_backup_only=True
+    )
+
+    reports = []
+    for c in clusters:
+        backups = _build_backup_info_files(domain_backups.get(c["immute_domain"], []))
+        success, msg = FULL_BACKUP_CHECKERS[c["cluster_type"]](backups)
+        if success:
+            continue
+        reports.append(
+            MysqlBackupCheckReport(
+                bk_biz_id=c["bk_biz_id"],
+                bk_cloud_id=c["bk_cloud_id"],
+                cluster=c["immute_domain"],
+                cluster_type=c["cluster_type"],
+                status=False,
+                msg=msg,
+                subtype=MysqlBackupCheckSubType.FullBackup.value,
+            )
+        )
+    MysqlBackupCheckReport.objects.bulk_create(reports, batch_size=REPORT_BATCH_SIZE)
+    logger.info(
+        "==== finish check full backup for cluster types {}, {} clusters, {} failed ====".format(
+            cluster_types, len(clusters), len(reports)
+        )
+    )
 
 
 class BackupFile:
@@ -84,83 +130,42 @@ def _build_backup_info_files(backups_info: []):
     return backups
 
 
-def _check_tendbha_full_backup():
+def _check_tendbha_full_backup(backups: Dict[str, MysqlBackup]) -> Tuple[bool, str]:
     """
     tendbha 必须有一份完整的备份
     """
-    start_time, end_time = get_last_date_time()
-    logger.info(
-        "====  start check full backup for cluster type {}, time range[{},{}] ====".format(
-            ClusterType.TenDBHA, start_time, end_time
-        )
-    )
-    for c in Cluster.objects.filter(cluster_type=ClusterType.TenDBHA):
-        logger.info("==== start check full backup for cluster {} ====".format(c.immute_domain))
-        backup = ClusterBackup(c.id, c.immute_domain)
-
-        items = backup.query_backup_log_from_bklog(start_time, end_time)
-        backup.backups = _build_backup_info_files(items)
-
-        for bid, bk in backup.backups.items():
-            if bk.is_full_backup == 1:
-                if bk.file_index and bk.file_tar:
-                    backup.success = True
-                    break
-        if not backup.success:
-            MysqlBackupCheckReport.objects.create(
-                bk_biz_id=c.bk_biz_id,
-                bk_cloud_id=c.bk_cloud_id,
-                cluster=c.immute_domain,
-                cluster_type=ClusterType.TenDBHA,
-                status=False,
-                msg="no success full backup found",
-                subtype=MysqlBackupCheckSubType.FullBackup.value,
-            )
+    for bid, bk in backups.items():
+        if bk.is_full_backup == 1:
+            if bk.file_index and bk.file_tar:
+                return True, ""
+    return False, "no success full backup found"
 
 
-def _check_tendbcluster_full_backup():
+def _check_tendbcluster_full_backup(backups: Dict[str, MysqlBackup]) -> Tuple[bool, str]:
     """
     tendbcluster 集群必须有完整的备份
     """
-    start_time, end_time = get_last_date_time()
-    logger.info(
-        "==== start check full backup for cluster type {}, time range[{},{}] ====".format(
-            ClusterType.TenDBCluster, start_time, end_time
-        )
-    )
-
-    for c in Cluster.objects.filter(cluster_type=ClusterType.TenDBCluster):
-        logger.info("==== start check full backup for cluster {} ====".format(c.immute_domain))
-        backup = ClusterBackup(c.id, c.immute_domain)
-        items = backup.query_backup_log_from_bklog(start_time, end_time)
-        backup.backups = _build_backup_info_files(items)
-
-        backup_id_stat = defaultdict(list)
-        backup_id_invalid = {}
-        for bid, bk in backup.backups.items():
-            backup_id, shard_id = bid.split("#", 1)
-            if bk.is_full_backup == 1:
-                if bk.file_index and bk.file_tar:
-                    #  这一个 shard ok
-                    backup_id_stat[backup_id].append({shard_id: True})
-                else:
-                    # 这一个 shard 不ok，整个backup_id 无效
-                    backup_id_invalid[backup_id] = True
-                    backup_id_stat[backup_id].append({shard_id: False})
-        message = ""
-        for backup_id, stat in backup_id_stat.items():
-            if backup_id not in backup_id_invalid:
-                backup.success = True
-                message = "shard_id:{}".format(backup_id_stat[backup_id])
-                break
-
-        if not backup.success:
-            MysqlBackupCheckReport.objects.create(
-                bk_biz_id=c.bk_biz_id,
-                bk_cloud_id=c.bk_cloud_id,
-                cluster=c.immute_domain,
-                cluster_type=ClusterType.TenDBCluster,
-                status=False,
-                msg="no success full backup found:{}".format(message),
-                subtype=MysqlBackupCheckSubType.FullBackup.value,
-            )
+    backup_id_stat = defaultdict(list)
+    backup_id_invalid = {}
+    for bid, bk in backups.items():
+        backup_id, shard_id = bid.split("#", 1)
+        if bk.is_full_backup == 1:
+            if bk.file_index and bk.file_tar:
+                #  这一个 shard ok
+                backup_id_stat[backup_id].append({shard_id: True})
+            else:
+                # 这一个 shard 不ok，整个backup_id 无效
+                backup_id_invalid[backup_id] = True
+                backup_id_stat[backup_id].append({shard_id: False})
+    message = ""
+    for backup_id, stat in backup_id_stat.items():
+        if backup_id not in backup_id_invalid:
+            return True, "shard_id:{}".format(backup_id_stat[backup_id])
+    return False, "no success full backup found:{}".format(message)
+
+
+# 各集群类型的全备检查函数
+FULL_BACKUP_CHECKERS = {
+    ClusterType.TenDBHA.value: _check_tendbha_full_backup,
+    ClusterType.TenDBCluster.value: _check_tendbcluster_full_backup,
+}
@@ -10,6 +10,7 @@ specific language governing permissions and limitations under the License.
 """
 import logging
 
+from blueapps.core.celery.celery import app
 from celery.schedules import crontab
 
 from backend.db_periodic_task.local_tasks.register import register_periodic_task
@@ -25,5 +26,14 @@ def mysql_backup_check_task():
     """
     mysql 备份巡检
     """
-    check_full_backup()
+    # 全备巡检与binlog巡检互不依赖，拆分为子任务并行执行
+    mysql_full_backup_check_task.apply_async()
     check_binlog_backup()
+
+
+@app.task
+def mysql_full_backup_check_task():
+    """
+    mysql 全备巡检，各集群类型共用一次全天全备日志的拉取
+    """
+    check_full_backup()
@@ -9,16 +9,12 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 import datetime
-import json
 import logging
 from typing import Dict, List
 
 from django.utils.translation import ugettext as _
 
-from backend import env
-from backend.components.bklog.client import BKLogApi
-from backend.utils.string import pascal_to_snake
-from backend.utils.time import datetime2str
+from backend.components.bklog.handler import BKLogHandler
 
 logger = logging.getLogger("root")
 
@@ -33,25 +29,8 @@ def _get_log_from_bklog(
     @param end_time: 结束时间
     @param query_string: 过滤条件
     """
-    resp = BKLogApi.esquery_search(
-        {
-            "indices": f"{env.DBA_APP_BK_BIZ_ID}_bklog.{collector}",
-            "start_time": datetime2str(start_time),
-            "end_time": datetime2str(end_time),
-            # 这里需要精确查询集群域名，所以可以通过log: "key: \"value\""的格式查询
-            "query_string": query_string,
-            "start": 0,
-            "size": 6000,
-            "sort_list": [["dtEventTimeStamp", "asc"], ["gseIndex", "asc"], ["iterationIndex", "asc"]],
-        },
-        use_admin=True,
-    )
-    backup_logs = []
-    for hit in resp["hits"]["hits"]:
-        raw_log = json.loads(hit["_source"]["log"])
-        backup_logs.append({pascal_to_snake(key): value for key, value in raw_log.items()})
-
-    return backup_logs
+    # 分页拉取全部日志，避免超过单次查询条数后结果被截断
+    return list(BKLogHandler.iter_logs(collector, start_time, end_time, query_string))
 
 
 class ClusterBackup:
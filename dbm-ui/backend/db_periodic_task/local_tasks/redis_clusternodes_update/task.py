@@ -22,8 +22,7 @@ from django.utils import timezone
 from django.utils.crypto import get_random_string
 from django.utils.translation import ugettext_lazy as _
 
-from backend import env
-from backend.components.bklog.client import BKLogApi
+from backend.components.bklog.handler import BKLogHandler
 from backend.db_meta.enums import ClusterEntryRole, InstanceInnerRole, InstanceRole, InstanceStatus
 from backend.db_meta.models import Cluster, StorageInstance, StorageInstanceTuple
 from backend.db_periodic_task.local_tasks.register import register_periodic_task
@@ -39,8 +38,7 @@ from backend.flow.utils.redis.redis_cluster_nodes import ClusterNodeData, decode
 from backend.flow.utils.redis.redis_module_operate import RedisCCTopoOperator
 from backend.ticket.constants import TicketType
 from backend.ticket.models.ticket import ClusterOperateRecord
-from backend.utils.string import pascal_to_snake
-from backend.utils.time import datetime2str, strptime
+from backend.utils.time import strptime
 
 logger = logging.getLogger("celery")
 
@@ -54,25 +52,8 @@ def last_Nmin_clusternodes_report(minute: int = 2):
         "last_Nmin_redis_clusternodes_update_report ==>start_time: {}, end_time: {}".format(start_time, end_time)
     )
     collector = "redis_cluster_nodes_result"
-    resp = BKLogApi.esquery_search(
-        {
-            "indices": f"{env.DBA_APP_BK_BIZ_ID}_bklog.{collector}",
-            "start_time": datetime2str(start_time),
-            "end_time": datetime2str(end_time),
-            # 这里需要精确查询集群域名，所以可以通过log: "key: \"value\""的格式查询
-            "query_string": "*",
-            "start": 0,
-            "size": 6000,
-            "sort_list": [["dtEventTimeStamp", "asc"], ["gseIndex", "asc"], ["iterationIndex", "asc"]],
-        },
-        use_admin=True,
-    )
-    backup_logs = []
-    for hit in resp["hits"]["hits"]:
-        raw_log = json.loads(hit["_source"]["log"])
-        backup_logs.append({pascal_to_snake(key): value for key, value in raw_log.items()})
-
-    return backup_logs
+    # 分页拉取全部上报日志，避免集群数量较多时结果被截断
+    return list(BKLogHandler.iter_logs(collector, start_time, end_time))
 
 
 # 根据 immute_domain 聚合保存到 map[string]struct{}中,相同 immute_domain 根据update_at保留最新的一条数据
@@ -10,8 +10,17 @@ specific language governing permissions and limitations under the License.
 """
 
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class DBProxyConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "backend.db_proxy"
+
+    def ready(self):
+        from backend.db_proxy.models import DBCloudProxy
+        from backend.db_proxy.signals import invalidate_cloud_proxy_route
+
+        # 云区域代理修改或删除时，失效路由缓存
+        post_save.connect(invalidate_cloud_proxy_route, sender=DBCloudProxy)
+        post_delete.connect(invalidate_cloud_proxy_route, sender=DBCloudProxy)
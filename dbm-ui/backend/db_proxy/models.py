@@ -190,3 +190,27 @@ class ClusterExtension(AuditedModel):
             access_url = ""
 
         return access_url
+
+    @classmethod
+    def get_cluster_service_url_map(cls, clusters) -> Dict[int, str]:
+        """批量获取集群的服务访问地址，返回 {cluster_id: access_url}"""
+        service_clusters = [cluster for cluster in clusters if cluster.cluster_type in CLUSTER__SERVICE_MAP]
+        if not service_clusters:
+            return {}
+
+        extensions = cls.objects.filter(
+            bk_biz_id__in={cluster.bk_biz_id for cluster in service_clusters},
+            db_type__in={cluster.cluster_type for cluster in service_clusters},
+            cluster_name__in={cluster.name for cluster in service_clusters},
+            service_type__in={CLUSTER__SERVICE_MAP[cluster.cluster_type] for cluster in service_clusters},
+        ).values_list("bk_biz_id", "db_type", "cluster_name", "service_type", "access_url")
+        access_url_map = {
+            (bk_biz_id, db_type, cluster_name, service_type): access_url
+            for bk_biz_id, db_type, cluster_name, service_type, access_url in extensions
+        }
+        return {
+            cluster.id: access_url_map.get(
+                (cluster.bk_biz_id, cluster.cluster_type, cluster.name, CLUSTER__SERVICE_MAP[cluster.cluster_type]), ""
+            )
+            for cluster in service_clusters
+        }
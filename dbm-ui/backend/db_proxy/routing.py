@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from django.db import transaction
+
+from backend import env
+from backend.db_proxy.models import DBCloudProxy
+from backend.utils.redis import RedisConn
+
+# 路由版本号，DBCloudProxy 变更时递增，各进程发现版本变化后重新加载路由
+CLOUD_PROXY_ROUTE_VERSION_KEY = "cloud_proxy_route_version"
+
+
+class CloudProxyRouter(object):
+    """
+    进程内的云区域代理路由表，按照 bk_cloud_id 缓存 DBCloudProxy 的地址
+    - 路由在 CLOUD_PROXY_ROUTE_TTL 秒后过期，DBCloudProxy 变更时通过信号递增redis中的路由版本，所有进程的缓存随之失效
+    - 默认与原逻辑保持一致，只使用最新的代理；开启 CLOUD_PROXY_ROUND_ROBIN 后在云区域所有代理中轮询
+    """
+
+    _lock = threading.Lock()
+    # 路由表: {bk_cloud_id: (过期时间, 路由版本, 代理外部地址列表(按id升序), 轮询计数器)}
+    _routes: Dict[int, Tuple[float, str, List[str], itertools.count]] = {}
+
+    @staticmethod
+    def _version() -> str:
+        return RedisConn.get(CLOUD_PROXY_ROUTE_VERSION_KEY) or "0"
+
+    @classmethod
+    def _load(cls, bk_cloud_id: int, version: str) -> Tuple[float, str, List[str], itertools.count]:
+        addresses = list(
+            DBCloudProxy.objects.filter(bk_cloud_id=bk_cloud_id)
+            .order_by("id")
+            .values_list("external_address", flat=True)
+        )
+        route = (time.time() + env.CLOUD_PROXY_ROUTE_TTL, version, addresses, itertools.count())
+        with cls._lock:
+            cls._routes[bk_cloud_id] = route
+        return route
+
+    @classmethod
+    def get_external_address(cls, bk_cloud_id: int) -> Optional[str]:
+        """获取云区域代理的外部地址，云区域不存在代理时返回None"""
+        # 先读取版本再加载路由，加载期间发生的变更会在下一次获取时重新加载
+        version = cls._version()
+        route = cls._routes.get(bk_cloud_id)
+        if not route or route[0] < time.time() or route[1] != version:
+            route = cls._load(bk_cloud_id, version)
+
+        __, __, addresses, counter = route
+        if not addresses:
+            return None
+        if env.CLOUD_PROXY_ROUND_ROBIN:
+            return addresses[next(counter) % len(addresses)]
+        return addresses[-1]
+
+    @classmethod
+    def invalidate(cls, bk_cloud_id: Optional[int] = None):
+        """
+        使路由缓存失效，不指定云区域则清空全部
+        当前进程的缓存立即清空，其他进程的缓存在事务提交后通过递增路由版本失效
+        """
+        with cls._lock:
+            if bk_cloud_id is None:
+                cls._routes.clear()
+            else:
+                cls._routes.pop(bk_cloud_id, None)
+        transaction.on_commit(lambda: RedisConn.incr(CLOUD_PROXY_ROUTE_VERSION_KEY))
@@ -25,7 +25,11 @@ class InstancesSerializer(BaseProxyPassSerializer):
     statuses = serializers.ListField(
         help_text=_("状态列表"), child=serializers.CharField(), allow_null=True, allow_empty=True, required=False
     )
+    cluster_types = serializers.ListField(
+        help_text=_("集群类型列表"), child=serializers.CharField(), allow_null=True, allow_empty=True, required=False
+    )
     bk_cloud_id = serializers.IntegerField()
+    since_version = serializers.IntegerField(help_text=_("客户端已有的拓扑版本，指定时返回增量数据"), required=False)
 
 
 class InstancesResponseSerializer(serializers.Serializer):
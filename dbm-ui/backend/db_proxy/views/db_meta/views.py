@@ -13,10 +13,12 @@ from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from backend import env
 from backend.bk_web.swagger import common_swagger_auto_schema
 from backend.db_meta import api
 from backend.db_meta.api import dbha as DBHA
 from backend.db_meta.api.cluster import nosqlcomm as NOSQLMETA
+from backend.db_meta.api.dbha.snapshot import DBHATopologySnapshot
 from backend.db_meta.enums import ClusterType
 from backend.db_meta.models import BKCity
 from backend.db_proxy.constants import SWAGGER_TAG
@@ -54,7 +56,22 @@ class DBMetaApiProxyPassViewSet(BaseProxyPassViewSet):
     @action(methods=["POST"], detail=False, serializer_class=InstancesSerializer, url_path="dbmeta/dbha/instances")
     def instances(self, request):
         validated_data = self.params_validate(self.get_serializer_class())
-        return Response(DBHA.instances(**validated_data))
+        since_version = validated_data.pop("since_version", None)
+        if not env.DBHA_TOPOLOGY_SNAPSHOT_ENABLE or validated_data.get("addresses"):
+            return Response(DBHA.instances(**validated_data))
+
+        # 从拓扑快照中获取实例。POST请求不适用304，拓扑未变化时返回200和显式的unchanged标记
+        snapshot = DBHATopologySnapshot(validated_data["bk_cloud_id"], validated_data.get("logical_city_ids"))
+        etag, data = snapshot.query(
+            statuses=validated_data.get("statuses"),
+            cluster_types=validated_data.get("cluster_types"),
+            since_version=since_version,
+            etag=request.headers.get("If-None-Match", "").strip('"'),
+        )
+        headers = {"ETag": f'"{etag}"'}
+        if data is None:
+            return Response({"unchanged": True}, headers=headers)
+        return Response(data, headers=headers)
 
     @common_swagger_auto_schema(
         operation_summary=_("[dbmeta]实例角色交换"),
@@ -26,6 +26,9 @@ from backend.db_proxy.nginxconf_tpl import restart_nginx_tpl
 from backend.db_proxy.views.job_callback.serialiers import JobCallBackSerializer
 from backend.db_proxy.views.views import BaseProxyPassViewSet
 from backend.flow.consts import SUCCESS_LIST
+from backend.flow.plugins.components.collections.common.base_service import BkJobService
+from backend.flow.utils.job_poller import JobStatusPoller
+from backend.flow.utils.node_callback import CallbackSource, NodeCallbackHandler
 from backend.flow.utils.script_template import fast_execute_script_common_kwargs
 from backend.utils.redis import RedisConn
 from backend.utils.string import base64_encode
@@ -108,3 +111,32 @@ class JobCallBackViewSet(BaseProxyPassViewSet):
             logger.info(_("[{}]nginx重启成功").format(job_inst_id))
 
         return Response()
+
+    @common_swagger_auto_schema(
+        operation_summary=_("flow节点job任务回调视图"),
+        request_body=JobCallBackSerializer(),
+        tags=[SWAGGER_TAG],
+    )
+    @action(methods=["POST"], detail=False, serializer_class=JobCallBackSerializer, url_path="flow_job_callback")
+    def flow_job_callback(self, request):
+        validated_data = json.loads(list(dict(request.data).keys())[0])
+        job_inst_id = validated_data["job_instance_id"]
+        # 回调中不包含完整的任务状态，查询一次并缓存，节点唤醒后直接读取
+        resp = BkJobService.__status__(job_inst_id)
+        if resp["result"] and resp["data"]["finished"]:
+            JobStatusPoller.set_status(job_inst_id, resp)
+            NodeCallbackHandler.callback(CallbackSource.JOB.value, job_inst_id)
+        else:
+            logger.warning(_("[{}]job任务回调时任务未结束，等待兜底轮询唤醒节点").format(job_inst_id))
+        return Response()
+
+    @common_swagger_auto_schema(
+        operation_summary=_("flow节点标准运维任务回调视图"),
+        tags=[SWAGGER_TAG],
+    )
+    @action(methods=["POST"], detail=False, url_path="flow_sops_callback")
+    def flow_sops_callback(self, request):
+        task_id = request.data.get("task_id")
+        if task_id:
+            NodeCallbackHandler.callback(CallbackSource.SOPS.value, task_id)
+        return Response()
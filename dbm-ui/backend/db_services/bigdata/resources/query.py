@@ -84,6 +84,12 @@ class BigDataBaseListRetrieveResource(query.ListRetrieveResource):
             **kwargs,
         )
 
+    @classmethod
+    def _prefetch_cluster_extra_maps(cls, clusters: List[Cluster]) -> Dict[str, Any]:
+        extra_maps = super()._prefetch_cluster_extra_maps(clusters)
+        extra_maps.update(access_url_map=ClusterExtension.get_cluster_service_url_map(clusters))
+        return extra_maps
+
     @classmethod
     def _to_cluster_representation(
         cls,
@@ -102,7 +108,13 @@ class BigDataBaseListRetrieveResource(query.ListRetrieveResource):
         cluster_info["domain"] = cluster_info["master_domain"]
 
         # 获取集群访问url
-        cluster_info.update(access_url=ClusterExtension.get_cluster_service_url(cluster))
+        access_url_map = kwargs.get("access_url_map", {})
+        access_url = (
+            access_url_map[cluster.id]
+            if cluster.id in access_url_map
+            else ClusterExtension.get_cluster_service_url(cluster)
+        )
+        cluster_info.update(access_url=access_url)
 
         # 获取集群角色信息
         for role in cls.instance_roles:
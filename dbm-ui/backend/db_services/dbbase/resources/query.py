@@ -20,7 +20,16 @@ from django.utils.translation import ugettext_lazy as _
 from backend.constants import IP_PORT_DIVIDER
 from backend.db_meta.enums import ClusterEntryType, ClusterType
 from backend.db_meta.enums.comm import SystemTagEnum
-from backend.db_meta.models import AppCache, Cluster, ClusterEntry, DBModule, Machine, ProxyInstance, StorageInstance
+from backend.db_meta.models import (
+    AppCache,
+    Cluster,
+    ClusterEntry,
+    DBModule,
+    Machine,
+    ProxyInstance,
+    Spec,
+    StorageInstance,
+)
 from backend.db_services.dbbase.instances.handlers import InstanceHandler
 from backend.db_services.dbbase.resources.query_base import (
     build_q_for_domain_by_custer,
@@ -215,7 +224,8 @@ class CommonQueryResourceMixin(abc.ABC):
     @classmethod
     def get_temporary_cluster_info(cls, cluster, ticket_type):
         """如果当前集群是临时集群，则补充临时集群相关信息。注: 会存在N+1问题，不过临时集群较少先忽略"""
-        if not cluster.tag_set.filter(name=SystemTagEnum.TEMPORARY.value).exists():
+        # tag_set 在集群列表中已预取，这里直接遍历避免额外查询
+        if not any(tag.name == SystemTagEnum.TEMPORARY.value for tag in cluster.tag_set.all()):
             return {}
         record = ClusterOperateRecord.objects.filter(cluster_id=cluster.id, ticket__ticket_type=ticket_type).first()
         # 临时集群名称的构造规则是: {cluster_name}_{20201212}_{ticket_id}
@@ -470,10 +480,10 @@ class ListRetrieveResource(BaseListRetrieveResource):
             Prefetch("storageinstance_set", queryset=storage_queryset.select_related("machine"), to_attr="storages"),
             "tag_set",
         )
-        cluster_ids = list(cluster_queryset.values_list("id", flat=True))
+        cluster_ids = [cluster.id for cluster in cluster_queryset]
 
         # 获取集群与访问入口的映射
-        cluster_entry_map = ClusterEntry.get_cluster_entry_map([cluster.id for cluster in cluster_queryset])
+        cluster_entry_map = ClusterEntry.get_cluster_entry_map(cluster_ids)
 
         # 获取DB模块的映射信息
         db_module_names_map = {
@@ -484,6 +494,9 @@ class ListRetrieveResource(BaseListRetrieveResource):
         # 获取集群操作记录的映射关系
         cluster_operate_records_map = ClusterOperateRecord.get_cluster_records_map(cluster_ids)
 
+        # 批量获取业务名、云区域和机器规格信息，避免在序列化时逐个集群查询
+        kwargs.update(cls._prefetch_cluster_extra_maps(cluster_queryset))
+
         # 将集群的查询结果序列化为集群字典信息
         clusters: List[Dict[str, Any]] = []
         for cluster in cluster_queryset:
@@ -495,6 +508,27 @@ class ListRetrieveResource(BaseListRetrieveResource):
 
         return ResourceList(count=count, data=clusters)
 
+    @classmethod
+    def _prefetch_cluster_extra_maps(cls, clusters: List[Cluster]) -> Dict[str, Any]:
+        """
+        为一页集群批量预取序列化所需的公共信息
+        @param clusters: 已预取 storages 和 proxies 的集群列表
+        """
+        cluster_ids = [cluster.id for cluster in clusters]
+        bk_biz_ids = {cluster.bk_biz_id for cluster in clusters}
+        bk_biz_names_map = dict(
+            AppCache.objects.filter(bk_biz_id__in=bk_biz_ids).values_list("bk_biz_id", "bk_biz_name")
+        )
+        spec_ids = {inst.machine.spec_id for cluster in clusters for inst in [*cluster.storages, *cluster.proxies]}
+        spec_map = {spec.spec_id: spec for spec in Spec.objects.filter(spec_id__in=spec_ids)}
+        return {
+            "bk_biz_names_map": bk_biz_names_map,
+            "cloud_info": ResourceQueryHelper.search_cc_cloud(get_cache=True),
+            "spec_map": spec_map,
+            "access_port_map": Cluster.bulk_access_ports(cluster_ids),
+            "status_flag_map": Cluster.bulk_status_flags(cluster_ids),
+        }
+
     @classmethod
     def _to_cluster_representation(
         cls,
@@ -510,26 +544,36 @@ class ListRetrieveResource(BaseListRetrieveResource):
         @param db_module_names_map: key 是 db_module_id, value 是 db_module_name
         @param cluster_entry_map: key 是 cluster.id, value 是当前集群对应的 entry 映射
         @param cluster_operate_records_map: key 是 cluster.id, value 是当前集群对应的 操作记录 映射
+        @param kwargs: 可包含 _prefetch_cluster_extra_maps 预取的业务名、云区域、访问端口和状态标志等信息
         """
         cluster_entry = cluster_entry_map.get(cluster.id, {})
-        cloud_info = ResourceQueryHelper.search_cc_cloud(get_cache=True)
+        cloud_info = kwargs.get("cloud_info") or ResourceQueryHelper.search_cc_cloud(get_cache=True)
         bk_cloud_name = cloud_info.get(str(cluster.bk_cloud_id), {}).get("bk_cloud_name", "")
+        bk_biz_names_map = kwargs.get("bk_biz_names_map", {})
+        bk_biz_name = (
+            bk_biz_names_map.get(cluster.bk_biz_id) or AppCache.objects.get(bk_biz_id=cluster.bk_biz_id).bk_biz_name
+        )
+        access_port_map = kwargs.get("access_port_map", {})
+        access_port = access_port_map[cluster.id] if cluster.id in access_port_map else cluster.access_port
+        status_flag_map = kwargs.get("status_flag_map", {})
+        status_flag = status_flag_map[cluster.id].value if cluster.id in status_flag_map else cluster.status_flag
         return {
             "id": cluster.id,
             "phase": cluster.phase,
             "phase_name": cluster.get_phase_display(),
             "status": cluster.status,
+            "status_flag": status_flag,
             "operations": cluster_operate_records_map.get(cluster.id, []),
             "cluster_time_zone": cluster.time_zone,
             "cluster_name": cluster.name,
             "cluster_alias": cluster.alias,
-            "cluster_access_port": cluster.access_port,
+            "cluster_access_port": access_port,
             "cluster_type": cluster.cluster_type,
             "cluster_type_name": ClusterType.get_choice_label(cluster.cluster_type),
             "master_domain": cluster_entry.get("master_domain", ""),
             "slave_domain": cluster_entry.get("slave_domain", ""),
             "bk_biz_id": cluster.bk_biz_id,
-            "bk_biz_name": AppCache.objects.get(bk_biz_id=cluster.bk_biz_id).bk_biz_name,
+            "bk_biz_name": bk_biz_name,
             "bk_cloud_id": cluster.bk_cloud_id,
             "bk_cloud_name": bk_cloud_name,
             "major_version": cluster.major_version,
@@ -593,6 +637,7 @@ class ListRetrieveResource(BaseListRetrieveResource):
         # 查询访问入口
         cluster_ids = [instance["cluster__id"] for instance in instances]
         cluster_entry_map = ClusterEntry.get_cluster_entry_map(cluster_ids)
+        kwargs.setdefault("cloud_info", ResourceQueryHelper.search_cc_cloud(get_cache=True))
         # 将实例的查询结果序列化为实例字典信息
         instance_infos = [cls._to_instance_representation(inst, cluster_entry_map, **kwargs) for inst in instances]
         # 特例：如果有extra参数，则补充额外实例信息
@@ -669,7 +714,7 @@ class ListRetrieveResource(BaseListRetrieveResource):
         @param instance: 实例信息
         @param cluster_entry_map: key 是 cluster.id, value 是当前集群对应的 entry 映射
         """
-        cloud_info = ResourceQueryHelper.search_cc_cloud(get_cache=True)
+        cloud_info = kwargs.get("cloud_info") or ResourceQueryHelper.search_cc_cloud(get_cache=True)
         bk_cloud_name = cloud_info.get(str(instance["machine__bk_cloud_id"]), {}).get("bk_cloud_name", "")
         return {
             "id": instance["id"],
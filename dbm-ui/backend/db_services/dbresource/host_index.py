@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import json
+from typing import Any, Dict, List
+
+from backend import env
+from backend.components.dbresource.client import DBResourceApi
+from backend.utils.redis import RedisConn
+
+# 资源池主机索引，set结构: {bk_host_id, ...}
+RESOURCE_POOL_HOST_INDEX_KEY = "dbresource_pool_host_ids"
+# 索引的构建标记，过期后重新全量构建
+RESOURCE_POOL_HOST_INDEX_BUILT_KEY = "dbresource_pool_host_index_built"
+# 索引构建锁，避免并发全量拉取资源池
+RESOURCE_POOL_HOST_INDEX_LOCK_KEY = "dbresource_pool_host_index_lock"
+RESOURCE_POOL_HOST_INDEX_LOCK_EXPIRE = 60
+# 重建期间的增量变更日志，list结构: [{"op": "sadd"/"srem", "bk_host_ids": [...]}, ...]，重建完成后按顺序重放
+RESOURCE_POOL_HOST_INDEX_JOURNAL_KEY = "dbresource_pool_host_index_journal"
+# 全量构建时每批写入的主机数量
+RESOURCE_POOL_HOST_INDEX_BATCH_SIZE = 1000
+
+
+class ResourcePoolHostIndex(object):
+    """
+    资源池主机索引，用于判断主机是否已在资源池中
+    - 资源导入/申请确认/删除成功后增量维护索引，无需每次全量拉取资源池
+    - 其他无法获知主机的变更(如直接申请资源)使索引失效；索引按照 RESOURCE_POOL_HOST_INDEX_TTL 定期全量重建兜底
+    - 重建期间的增量变更同时记录到变更日志，替换索引后重放，避免被重建前拉取的资源池数据覆盖
+    - 资源预申请只是在资源池中锁定主机，主机确认申请后才移出资源池，因此预申请不需要维护索引
+    """
+
+    @staticmethod
+    def _list_resource_host_ids() -> List[int]:
+        return [host["bk_host_id"] for host in DBResourceApi.resource_list_all()["details"] or []]
+
+    @classmethod
+    def _replay_journal(cls):
+        """按顺序重放重建期间的增量变更，直到变更日志为空"""
+        while True:
+            entries = RedisConn.lrange(RESOURCE_POOL_HOST_INDEX_JOURNAL_KEY, 0, -1)
+            if not entries:
+                return
+
+            pipeline = RedisConn.pipeline()
+            for entry in map(json.loads, entries):
+                getattr(pipeline, entry["op"])(RESOURCE_POOL_HOST_INDEX_KEY, *entry["bk_host_ids"])
+            pipeline.ltrim(RESOURCE_POOL_HOST_INDEX_JOURNAL_KEY, len(entries), -1)
+            pipeline.execute()
+
+    @classmethod
+    def rebuild(cls) -> bool:
+        """全量拉取资源池主机，重建索引。其他进程正在重建时跳过，返回是否重建"""
+        if not RedisConn.set(RESOURCE_POOL_HOST_INDEX_LOCK_KEY, 1, nx=True, ex=RESOURCE_POOL_HOST_INDEX_LOCK_EXPIRE):
+            return False
+
+        try:
+            # 持有锁之后的增量变更都会记录到变更日志，需要在拉取资源池之前清理旧的日志
+            RedisConn.delete(RESOURCE_POOL_HOST_INDEX_JOURNAL_KEY)
+            host_ids = cls._list_resource_host_ids()
+
+            # 写入临时key后替换，避免重建过程中读到不完整的索引
+            tmp_key = f"{RESOURCE_POOL_HOST_INDEX_KEY}_tmp"
+            pipeline = RedisConn.pipeline()
+            pipeline.delete(tmp_key)
+            for index in range(0, len(host_ids), RESOURCE_POOL_HOST_INDEX_BATCH_SIZE):
+                pipeline.sadd(tmp_key, *host_ids[index : index + RESOURCE_POOL_HOST_INDEX_BATCH_SIZE])
+            if host_ids:
+                pipeline.rename(tmp_key, RESOURCE_POOL_HOST_INDEX_KEY)
+            else:
+                pipeline.delete(RESOURCE_POOL_HOST_INDEX_KEY)
+            pipeline.set(RESOURCE_POOL_HOST_INDEX_BUILT_KEY, 1, ex=env.RESOURCE_POOL_HOST_INDEX_TTL)
+            pipeline.execute()
+
+            cls._replay_journal()
+            return True
+        finally:
+            RedisConn.delete(RESOURCE_POOL_HOST_INDEX_LOCK_KEY)
+
+    @classmethod
+    def contains(cls, bk_host_ids: List[int]) -> Dict[int, bool]:
+        """
+        判断主机是否在资源池中，返回 {bk_host_id: 是否在资源池}
+        @param bk_host_ids: 主机ID列表
+        """
+        if not bk_host_ids:
+            return {}
+
+        if not RedisConn.exists(RESOURCE_POOL_HOST_INDEX_BUILT_KEY) and not cls.rebuild():
+            # 其他进程正在重建索引，本次请求直接查询资源池
+            resource_host_ids = set(cls._list_resource_host_ids())
+            return {bk_host_id: bk_host_id in resource_host_ids for bk_host_id in bk_host_ids}
+
+        pipeline = RedisConn.pipeline()
+        for bk_host_id in bk_host_ids:
+            pipeline.sismember(RESOURCE_POOL_HOST_INDEX_KEY, bk_host_id)
+        return dict(zip(bk_host_ids, pipeline.execute()))
+
+    @classmethod
+    def _update(cls, op: str, bk_host_ids: List[int]):
+        """增量更新索引，正在重建时同时记录到变更日志"""
+        if not bk_host_ids:
+            return
+
+        getattr(RedisConn, op)(RESOURCE_POOL_HOST_INDEX_KEY, *bk_host_ids)
+        if RedisConn.exists(RESOURCE_POOL_HOST_INDEX_LOCK_KEY):
+            pipeline = RedisConn.pipeline()
+            pipeline.rpush(RESOURCE_POOL_HOST_INDEX_JOURNAL_KEY, json.dumps({"op": op, "bk_host_ids": bk_host_ids}))
+            pipeline.expire(RESOURCE_POOL_HOST_INDEX_JOURNAL_KEY, RESOURCE_POOL_HOST_INDEX_LOCK_EXPIRE)
+            pipeline.execute()
+
+    @classmethod
+    def add(cls, bk_host_ids: List[int]):
+        """主机导入资源池后加入索引"""
+        cls._update("sadd", bk_host_ids)
+
+    @classmethod
+    def remove(cls, bk_host_ids: List[int]):
+        """主机被申请或者从资源池删除后移出索引"""
+        cls._update("srem", bk_host_ids)
+
+    @classmethod
+    def invalidate(cls):
+        """使索引失效，下一次查询时全量重建"""
+        RedisConn.delete(RESOURCE_POOL_HOST_INDEX_BUILT_KEY)
+
+
+def resource_import_callback(params: Dict[str, Any], *args, **kwargs):
+    """资源导入flow调用资源池导入接口成功后的回调，将导入的主机加入索引"""
+    ResourcePoolHostIndex.add([host["host_id"] for host in params["hosts"]])
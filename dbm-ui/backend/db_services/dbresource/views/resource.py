@@ -33,6 +33,7 @@ from backend.db_services.dbresource.constants import (
     SWAGGER_TAG,
 )
 from backend.db_services.dbresource.handlers import ResourceHandler
+from backend.db_services.dbresource.host_index import ResourcePoolHostIndex
 from backend.db_services.dbresource.serializers import (
     GetDiskTypeResponseSerializer,
     GetMountPointResponseSerializer,
@@ -157,12 +158,11 @@ class DBResourceViewSet(viewsets.SystemViewSet):
         ]
         params.update(readable_node_list=node_list)
 
-        # 查询DBA业务下的空闲机，并排除掉已经在资源池的空闲机
-        resource_hosts = DBResourceApi.resource_list_all()["details"] or []
-        resource_host_ids = [host["bk_host_id"] for host in resource_hosts]
+        # 查询DBA业务下的空闲机，并通过资源池主机索引标记当前页中已经在资源池的空闲机
         host_infos = TopoHandler.query_hosts(**params)
+        occupancy = ResourcePoolHostIndex.contains([host["host_id"] for host in host_infos["data"]])
         for host in host_infos["data"]:
-            host.update(occupancy=(host["host_id"] in resource_host_ids))
+            host.update(occupancy=occupancy[host["host_id"]])
 
         return Response(host_infos)
 
@@ -250,7 +250,10 @@ class DBResourceViewSet(viewsets.SystemViewSet):
     @action(detail=False, methods=["POST"], url_path="apply", serializer_class=ResourceApplySerializer)
     def resource_apply(self, request):
         validated_data = self.params_validate(self.get_serializer_class())
-        return Response(DBResourceApi.resource_apply(params=validated_data))
+        resp = DBResourceApi.resource_apply(params=validated_data)
+        # 申请的主机从资源池移出，索引需要重建
+        ResourcePoolHostIndex.invalidate()
+        return Response(resp)
 
     @common_swagger_auto_schema(
         operation_summary=_("获取挂载点"),
@@ -304,6 +307,7 @@ class DBResourceViewSet(viewsets.SystemViewSet):
     @action(detail=False, methods=["POST"], url_path="pre_apply", serializer_class=ResourceApplySerializer)
     def resource_pre_apply(self, request):
         validated_data = self.params_validate(self.get_serializer_class())
+        # 预申请只在资源池中锁定主机，确认申请后主机才移出资源池并更新主机索引
         resp = DBResourceApi.resource_pre_apply(params=validated_data, raw=True)
         resp["resource_request_id"] = resp["request_id"]
         return Response(resp)
@@ -316,7 +320,9 @@ class DBResourceViewSet(viewsets.SystemViewSet):
     @action(detail=False, methods=["POST"], url_path="confirm", serializer_class=ResourceConfirmSerializer)
     def resource_confirm(self, request):
         validated_data = self.params_validate(self.get_serializer_class())
-        return Response(DBResourceApi.resource_confirm(params=validated_data))
+        resp = DBResourceApi.resource_confirm(params=validated_data)
+        ResourcePoolHostIndex.remove(validated_data["host_ids"])
+        return Response(resp)
 
     @common_swagger_auto_schema(
         operation_summary=_("资源删除"),
@@ -328,6 +334,7 @@ class DBResourceViewSet(viewsets.SystemViewSet):
         validated_data = self.params_validate(self.get_serializer_class())
         # 从资源池删除机器
         resp = DBResourceApi.resource_delete(params=validated_data)
+        ResourcePoolHostIndex.remove(validated_data["bk_host_ids"])
         # 将在资源池模块的机器移到空闲机，若机器处于其他模块，则忽略
         move_idle_hosts: List[int] = []
         resource_topo = SystemSettings.get_setting_value(key=SystemSettingsEnum.MANAGE_TOPO.value)
@@ -132,7 +132,14 @@ class TopoHandler:
         # 获取主机信息
         start, page_size = page["start"], page["page_size"]
         resp = ResourceQueryHelper.query_cc_hosts(
-            tree_node, conditions, start, page_size, fields, return_status=True, bk_cloud_id=bk_cloud_id
+            tree_node,
+            conditions,
+            start,
+            page_size,
+            fields,
+            return_status=True,
+            bk_cloud_id=bk_cloud_id,
+            use_mirror=True,
         )
 
         return {"total": resp["count"], "data": BaseHandler.format_hosts(resp["info"], tree_node["bk_biz_id"])}
@@ -166,6 +173,7 @@ class TopoHandler:
             start,
             page_size,
             ["bk_host_id", "bk_host_innerip", "bk_host_innerip_v6", "bk_cloud_id", "bk_agent_id"],
+            use_mirror=True,
         )
 
         return {"total": resp["count"], "data": BaseHandler.format_host_id_infos(resp["info"], tree_node["bk_biz_id"])}
@@ -55,7 +55,7 @@ class TopoCacheManager:
             )
 
             resp = ResourceQueryHelper.query_cc_hosts(
-                tree_node=idle_node, fields=["bk_host_id"], bk_cloud_id=bk_cloud_id
+                tree_node=idle_node, fields=["bk_host_id"], bk_cloud_id=bk_cloud_id, use_mirror=True
             )
 
             idle_count = resp["count"]
@@ -0,0 +1,413 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+import typing
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from backend import env
+from backend.components import CCApi
+from backend.utils.batch_request import batch_request
+from backend.utils.redis import RedisConn
+
+from .. import constants, types
+
+logger = logging.getLogger("app")
+
+# 业务的拓扑镜像，hash结构: {"version": 版本, "digest": 内容摘要, "topo": 拓扑树, "relations": 主机拓扑关系, "hosts": 主机}
+IPCHOOSER_MIRROR_KEY = "ipchooser_mirror_{bk_biz_id}"
+# 镜像构建锁，避免并发重复拉取CMDB
+IPCHOOSER_MIRROR_LOCK_KEY = "ipchooser_mirror_lock_{bk_biz_id}"
+IPCHOOSER_MIRROR_LOCK_EXPIRE = 5 * 60
+# 异步构建任务的排队标记，避免镜像构建完成前每次请求都下发任务
+IPCHOOSER_MIRROR_PENDING_KEY = "ipchooser_mirror_pending_{bk_biz_id}"
+IPCHOOSER_MIRROR_PENDING_EXPIRE = 60
+# 活跃业务，zset结构: {bk_biz_id: 最近访问时间}，只维护活跃业务的镜像
+IPCHOOSER_MIRROR_BIZS_KEY = "ipchooser_mirror_bizs"
+# 资源变更事件的游标，hash结构: {bk_resource: bk_cursor}
+IPCHOOSER_MIRROR_CURSOR_KEY = "ipchooser_mirror_watch_cursors"
+# 监听的CMDB资源: 主机属性、主机拓扑关系、集群、模块、自定义拓扑层级
+IPCHOOSER_MIRROR_WATCH_RESOURCES = ["host", "host_relation", "set", "module", "mainline_instance"]
+# 每次监听时每种资源最多拉取的事件页数，剩余事件由下一次监听继续消费
+IPCHOOSER_MIRROR_WATCH_MAX_PAGES = 20
+# 镜像在redis中的保留时间
+IPCHOOSER_MIRROR_EXPIRE = 2 * 24 * 60 * 60
+
+
+class UnsupportedCondition(Exception):
+    """镜像不支持的查询条件，需要回退到CMDB查询"""
+
+
+class BizMirror(object):
+    """
+    业务拓扑和主机的内存索引
+    - 拓扑树已填充各节点的主机数量
+    - 主机按照 bk_host_innerip 排序(与CMDB的分页排序一致)，每个拓扑节点记录所包含的主机下标
+    """
+
+    def __init__(
+        self, version: str, topo: types.TreeNode, relations: typing.List[typing.List[int]], hosts: typing.List
+    ):
+        """
+        @param version: 镜像版本
+        @param topo: 业务拓扑树(包含空闲机拓扑)
+        @param relations: 主机拓扑关系 [[bk_host_id, bk_set_id, bk_module_id], ...]
+        @param hosts: 主机列表
+        """
+        self.version = version
+        self.hosts = sorted(hosts, key=lambda x: (x.get("bk_host_innerip") or "", x["bk_host_id"]))
+        self.fields = set().union(*[host.keys() for host in self.hosts]) if self.hosts else set()
+
+        host_index = {host["bk_host_id"]: index for index, host in enumerate(self.hosts)}
+        module_hosts: typing.Dict[int, typing.Set[int]] = defaultdict(set)
+        for bk_host_id, __, bk_module_id in relations:
+            if bk_host_id in host_index:
+                module_hosts[bk_module_id].add(host_index[bk_host_id])
+
+        # 拓扑节点 -> 所包含主机的下标(有序)
+        self.node_hosts: typing.Dict[typing.Tuple[str, int], typing.List[int]] = {}
+        self.topo = self._fill_count(topo, module_hosts)
+
+    def _fill_count(self, node: types.TreeNode, module_hosts: typing.Dict[int, typing.Set[int]]) -> types.TreeNode:
+        """后序遍历拓扑树，计算每个节点所包含的主机，与 TopoTool.fill_host_count_to_tree 的统计口径一致"""
+        stack, visited = [node], []
+        while stack:
+            current = stack.pop()
+            visited.append(current)
+            stack.extend(current.get("child") or [])
+
+        node_host_sets: typing.Dict[int, typing.Set[int]] = {}
+        for current in reversed(visited):
+            if current["bk_obj_id"] == constants.ObjectType.MODULE.value:
+                host_set = module_hosts.get(current["bk_inst_id"], set())
+            else:
+                host_set = set().union(*[node_host_sets[id(child)] for child in current.get("child") or []])
+            node_host_sets[id(current)] = host_set
+            current["count"] = len(host_set)
+            self.node_hosts[(current["bk_obj_id"], current["bk_inst_id"])] = sorted(host_set)
+        return node
+
+    def get_topo_tree(self) -> types.TreeNode:
+        """获取填充了主机数量的拓扑树，返回副本，调用方可以修改"""
+        return copy.deepcopy(self.topo)
+
+    @classmethod
+    def _rule_fields(cls, rule: typing.Dict) -> typing.Set[str]:
+        """获取过滤规则中用到的字段"""
+        if "condition" in rule:
+            return set().union(*[cls._rule_fields(sub_rule) for sub_rule in rule["rules"]])
+        return {rule["field"]}
+
+    @classmethod
+    def _match(cls, host: typing.Dict, rule: typing.Dict) -> bool:
+        """判断主机是否满足CMDB格式的过滤规则"""
+        if "condition" in rule:
+            results = [cls._match(host, sub_rule) for sub_rule in rule["rules"]]
+            return all(results) if rule["condition"] == "AND" else any(results)
+
+        value, operator, expected = host.get(rule["field"]), rule["operator"], rule["value"]
+        if operator == "equal":
+            return value == expected
+        if operator == "not_equal":
+            return value != expected
+        if operator == "in":
+            return value in expected
+        if operator == "not_in":
+            return value not in expected
+        if operator == "contains":
+            return str(expected).lower() in str(value or "").lower()
+        raise UnsupportedCondition(operator)
+
+    def query_hosts(
+        self,
+        tree_node: types.TreeNode,
+        conditions: typing.Optional[typing.List[types.Condition]],
+        start: int,
+        page_size: int,
+        fields: typing.List[str],
+        bk_cloud_id: typing.Optional[int] = None,
+    ) -> typing.Optional[typing.Dict]:
+        """
+        按照 ResourceQueryHelper.query_cc_hosts 的语义查询主机，镜像无法满足时返回None
+        @param tree_node: 拓扑节点
+        @param conditions: 查询条件，条件之间为OR
+        @param start: 数据起始位置
+        @param page_size: 拉取数据数量
+        @param fields: 返回字段
+        @param bk_cloud_id: 过滤主机的云区域ID
+        """
+        if not set(fields).issubset(self.fields):
+            return None
+
+        object_id = getattr(tree_node["bk_obj_id"], "value", tree_node["bk_obj_id"])
+        if object_id == constants.ObjectType.BIZ.value:
+            host_indexes = range(len(self.hosts))
+        else:
+            host_indexes = self.node_hosts.get((object_id, tree_node["bk_inst_id"]))
+            # 节点尚未同步到镜像
+            if host_indexes is None:
+                return None
+
+        rules = []
+        if bk_cloud_id is not None:
+            rules.append({"field": "bk_cloud_id", "operator": "equal", "value": bk_cloud_id})
+        if conditions:
+            rules.append({"condition": "OR", "rules": conditions})
+        rule = {"condition": "AND", "rules": rules}
+        # 过滤字段不在镜像中时，无法判断主机是否满足条件
+        if not self._rule_fields(rule).issubset(self.fields):
+            return None
+
+        try:
+            hosts = [self.hosts[index] for index in host_indexes if not rules or self._match(self.hosts[index], rule)]
+        except UnsupportedCondition:
+            return None
+
+        return {
+            "count": len(hosts),
+            "info": [{field: host.get(field) for field in fields} for host in hosts[start : start + page_size]],
+        }
+
+
+class TopoMirror(object):
+    """
+    ipchooser 的本地拓扑和主机镜像，替代每次交互都请求CMDB
+    - 镜像按业务存储在redis中，由周期任务根据CMDB资源变更事件刷新，并定期全量比对兜底
+    - 内容无变化时版本号不变；各进程在本地缓存镜像的内存索引，每隔 IPCHOOSER_MIRROR_CHECK_INTERVAL 秒比对一次版本号
+    - 内存索引在后台线程构建，构建完成前继续使用旧版本；进程内最多缓存 IPCHOOSER_MIRROR_LOCAL_LIMIT 个业务
+    - 只维护最近访问过的业务，业务首次访问(或长时间未访问被清理)时异步构建镜像，构建完成前回退到CMDB查询
+    """
+
+    _lock = threading.Lock()
+    # 按最近访问排序，超过上限时淘汰最久未访问的业务
+    _mirrors: "OrderedDict[int, BizMirror]" = OrderedDict()
+    _next_check_times: typing.Dict[int, float] = {}
+    # 构建内存索引的后台线程，以及正在构建的业务
+    _executor = ThreadPoolExecutor(max_workers=1)
+    _loading_bizs: typing.Set[int] = set()
+
+    @staticmethod
+    def _key(bk_biz_id: int) -> str:
+        return IPCHOOSER_MIRROR_KEY.format(bk_biz_id=bk_biz_id)
+
+    @staticmethod
+    def _digest(*items) -> str:
+        return hashlib.md5(json.dumps(items, sort_keys=True, default=str).encode()).hexdigest()
+
+    @staticmethod
+    def _fetch(
+        bk_biz_id: int,
+    ) -> typing.Tuple[types.TreeNode, typing.List[typing.List[int]], typing.List[typing.Dict]]:
+        """从CMDB拉取业务的拓扑树、主机拓扑关系和主机"""
+        from .resource import ResourceQueryHelper
+
+        topo = ResourceQueryHelper.get_topo_tree(bk_biz_id, return_all=True)
+        relations = sorted(
+            [
+                [relation["bk_host_id"], relation["bk_set_id"], relation["bk_module_id"]]
+                for relation in ResourceQueryHelper.fetch_host_topo_relations(bk_biz_id)
+            ]
+        )
+        hosts = batch_request(
+            func=CCApi.list_biz_hosts,
+            params={"bk_biz_id": bk_biz_id, "fields": constants.CommonEnum.DEFAULT_HOST_FIELDS.value},
+            sort="bk_host_id",
+            use_admin=True,
+        )
+        return topo, relations, sorted(hosts, key=lambda x: x["bk_host_id"])
+
+    @classmethod
+    def refresh(cls, bk_biz_id: int) -> bool:
+        """
+        从CMDB拉取并比对业务镜像，内容有变化时才发布新版本，返回是否刷新成功
+        @param bk_biz_id: 业务ID
+        """
+        lock_key = IPCHOOSER_MIRROR_LOCK_KEY.format(bk_biz_id=bk_biz_id)
+        if not RedisConn.set(lock_key, 1, nx=True, ex=IPCHOOSER_MIRROR_LOCK_EXPIRE):
+            return False
+
+        try:
+            topo, relations, hosts = cls._fetch(bk_biz_id)
+            digest = cls._digest(topo, relations, hosts)
+            key = cls._key(bk_biz_id)
+            if RedisConn.hget(key, "digest") != digest:
+                pipeline = RedisConn.pipeline()
+                pipeline.hset(
+                    key,
+                    mapping={
+                        "digest": digest,
+                        "topo": json.dumps(topo),
+                        "relations": json.dumps(relations),
+                        "hosts": json.dumps(hosts),
+                    },
+                )
+                pipeline.hincrby(key, "version", 1)
+                pipeline.execute()
+            RedisConn.expire(key, IPCHOOSER_MIRROR_EXPIRE)
+            return True
+        except Exception as e:  # pylint: disable=broad-except
+            logger.exception(f"refresh ipchooser mirror of biz {bk_biz_id} failed: {e}")
+            return False
+        finally:
+            RedisConn.delete(lock_key)
+
+    @classmethod
+    def refresh_async(cls, bk_biz_id: int):
+        """
+        异步构建业务镜像，构建任务已在排队时不重复下发
+        @param bk_biz_id: 业务ID
+        """
+        from ..tasks import refresh_biz_mirror
+
+        pending_key = IPCHOOSER_MIRROR_PENDING_KEY.format(bk_biz_id=bk_biz_id)
+        if not RedisConn.set(pending_key, 1, nx=True, ex=IPCHOOSER_MIRROR_PENDING_EXPIRE):
+            return
+
+        try:
+            refresh_biz_mirror.delay(bk_biz_id)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.exception(f"send refresh ipchooser mirror task of biz {bk_biz_id} failed: {e}")
+            RedisConn.delete(pending_key)
+
+    @classmethod
+    def _cache(cls, bk_biz_id: int, mirror: BizMirror):
+        """缓存业务镜像，超过数量上限时淘汰最久未访问的业务"""
+        with cls._lock:
+            cls._mirrors[bk_biz_id] = mirror
+            cls._mirrors.move_to_end(bk_biz_id)
+            while len(cls._mirrors) > env.IPCHOOSER_MIRROR_LOCAL_LIMIT:
+                evicted_biz_id, __ = cls._mirrors.popitem(last=False)
+                cls._next_check_times.pop(evicted_biz_id, None)
+
+    @classmethod
+    def _load(cls, bk_biz_id: int):
+        """从redis读取业务镜像并构建内存索引"""
+        try:
+            version, topo, relations, hosts = RedisConn.hmget(
+                cls._key(bk_biz_id), ["version", "topo", "relations", "hosts"]
+            )
+            if version is not None:
+                cls._cache(bk_biz_id, BizMirror(version, json.loads(topo), json.loads(relations), json.loads(hosts)))
+        except Exception as e:  # pylint: disable=broad-except
+            logger.exception(f"load ipchooser mirror of biz {bk_biz_id} failed: {e}")
+        finally:
+            with cls._lock:
+                cls._loading_bizs.discard(bk_biz_id)
+
+    @classmethod
+    def _load_async(cls, bk_biz_id: int):
+        """在后台线程构建内存索引，业务正在构建时不重复提交"""
+        with cls._lock:
+            if bk_biz_id in cls._loading_bizs:
+                return
+            cls._loading_bizs.add(bk_biz_id)
+        cls._executor.submit(cls._load, bk_biz_id)
+
+    @classmethod
+    def get(cls, bk_biz_id: int) -> typing.Optional[BizMirror]:
+        """
+        获取业务镜像，镜像不可用(未开启/尚未构建)时返回None并异步构建镜像，调用方应回退到CMDB查询
+        镜像有新版本时在后台构建内存索引，构建完成前返回旧版本
+        @param bk_biz_id: 业务ID
+        """
+        if not env.IPCHOOSER_MIRROR_ENABLE:
+            return None
+
+        with cls._lock:
+            mirror = cls._mirrors.get(bk_biz_id)
+            if mirror:
+                cls._mirrors.move_to_end(bk_biz_id)
+        if mirror and time.time() < cls._next_check_times.get(bk_biz_id, 0):
+            return mirror
+
+        RedisConn.zadd(IPCHOOSER_MIRROR_BIZS_KEY, {bk_biz_id: time.time()})
+        version = RedisConn.hget(cls._key(bk_biz_id), "version")
+        if version is None:
+            # 全量拉取CMDB耗时较长，不阻塞当前请求
+            cls.refresh_async(bk_biz_id)
+            with cls._lock:
+                cls._mirrors.pop(bk_biz_id, None)
+                cls._next_check_times.pop(bk_biz_id, None)
+            return None
+
+        if not mirror or mirror.version != version:
+            cls._load_async(bk_biz_id)
+        if mirror:
+            with cls._lock:
+                cls._next_check_times[bk_biz_id] = time.time() + env.IPCHOOSER_MIRROR_CHECK_INTERVAL
+        return mirror
+
+    @classmethod
+    def active_bizs(cls) -> typing.List[int]:
+        """获取活跃业务，并清理长时间未访问的业务镜像"""
+        expired_time = time.time() - env.IPCHOOSER_MIRROR_ACTIVE_TIME
+        expired_bizs = RedisConn.zrangebyscore(IPCHOOSER_MIRROR_BIZS_KEY, "-inf", expired_time)
+        if expired_bizs:
+            RedisConn.zrem(IPCHOOSER_MIRROR_BIZS_KEY, *expired_bizs)
+            RedisConn.delete(*[cls._key(bk_biz_id) for bk_biz_id in expired_bizs])
+        return [
+            int(bk_biz_id) for bk_biz_id in RedisConn.zrangebyscore(IPCHOOSER_MIRROR_BIZS_KEY, expired_time, "+inf")
+        ]
+
+    @classmethod
+    def watch(cls) -> typing.Set[int]:
+        """
+        消费CMDB资源变更事件，返回拓扑或主机发生变化的活跃业务
+        游标失效或者监听失败时，视为所有活跃业务都有变化
+        """
+        active_bizs = set(cls.active_bizs())
+        if not active_bizs:
+            return set()
+
+        changed_bizs: typing.Set[int] = set()
+        changed_host_ids: typing.Set[int] = set()
+        for resource in IPCHOOSER_MIRROR_WATCH_RESOURCES:
+            # 持续拉取直到没有新事件，单次最多拉取 IPCHOOSER_MIRROR_WATCH_MAX_PAGES 页
+            for __ in range(IPCHOOSER_MIRROR_WATCH_MAX_PAGES):
+                params = {"bk_resource": resource, "bk_event_types": ["create", "update", "delete"]}
+                cursor = RedisConn.hget(IPCHOOSER_MIRROR_CURSOR_KEY, resource)
+                if cursor:
+                    params["bk_cursor"] = cursor
+                else:
+                    params["bk_start_from"] = int(time.time())
+
+                try:
+                    data = CCApi.resource_watch(params, use_admin=True)
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.warning(f"watch cmdb resource {resource} failed, resync all mirrors: {e}")
+                    RedisConn.hdel(IPCHOOSER_MIRROR_CURSOR_KEY, resource)
+                    return active_bizs
+
+                events = data.get("bk_events") or []
+                if events:
+                    RedisConn.hset(IPCHOOSER_MIRROR_CURSOR_KEY, resource, events[-1]["bk_cursor"])
+                # 没有新事件时，只返回最新的游标
+                if not data.get("bk_watched") or not events:
+                    break
+
+                for event in events:
+                    detail = event.get("bk_detail") or {}
+                    if detail.get("bk_biz_id"):
+                        changed_bizs.add(int(detail["bk_biz_id"]))
+                    elif detail.get("bk_host_id"):
+                        changed_host_ids.add(int(detail["bk_host_id"]))
+
+        # 主机属性变更事件不带业务信息，需要查询主机所属的业务
+        if changed_host_ids:
+            relations = CCApi.find_host_biz_relations({"bk_host_id": list(changed_host_ids)}, use_admin=True)
+            changed_bizs.update(relation["bk_biz_id"] for relation in relations)
+
+        return changed_bizs & active_bizs
@@ -27,6 +27,7 @@ from backend.utils.cache import func_cache_decorator
 
 from .. import constants, exceptions, types
 from ..constants import IDLE_HOST_MODULE
+from .mirror import TopoMirror
 
 logger = logging.getLogger("app")
 
@@ -142,6 +143,7 @@ class ResourceQueryHelper:
         fields: typing.List[str] = constants.CommonEnum.DEFAULT_HOST_FIELDS.value,
         return_status: bool = False,
         bk_cloud_id: int = None,
+        use_mirror: bool = False,
     ) -> typing.Dict:
         """
         查询主机
@@ -152,8 +154,16 @@ class ResourceQueryHelper:
         :param start: 数据起始位置
         :param page_size: 拉取数据数量
         :param return_status: 返回agent状态
+        :param use_mirror: 优先从本地拓扑镜像查询，镜像无法满足时回退到CMDB
         :return:
         """
+        if use_mirror:
+            mirror = TopoMirror.get(tree_node["bk_biz_id"])
+            resp = mirror.query_hosts(tree_node, conditions, start, page_size, fields, bk_cloud_id) if mirror else None
+            if resp is not None:
+                if resp["info"] and return_status:
+                    ResourceQueryHelper.fill_agent_status(resp["info"])
+                return resp
 
         instance_id = tree_node["bk_inst_id"]
         object_id = tree_node["bk_obj_id"]
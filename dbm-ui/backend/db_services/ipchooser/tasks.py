@@ -8,3 +8,21 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import logging
+
+from celery import shared_task
+
+from backend.db_services.ipchooser.query.mirror import IPCHOOSER_MIRROR_PENDING_KEY, TopoMirror
+from backend.utils.redis import RedisConn
+
+logger = logging.getLogger("celery")
+
+
+@shared_task
+def refresh_biz_mirror(bk_biz_id: int):
+    """构建业务的拓扑镜像，业务首次访问时由 TopoMirror.get 异步下发"""
+    try:
+        if not TopoMirror.refresh(bk_biz_id):
+            logger.warning(f"refresh ipchooser mirror of biz {bk_biz_id} skipped or failed")
+    finally:
+        RedisConn.delete(IPCHOOSER_MIRROR_PENDING_KEY.format(bk_biz_id=bk_biz_id))
@@ -18,6 +18,7 @@ from .. import constants, types
 from ..handlers.base import BaseHandler
 from ..models import TopoCacheManager
 from ..query import resource
+from ..query.mirror import TopoMirror
 
 logger = logging.getLogger("app")
 
@@ -42,6 +43,13 @@ class TopoTool:
 
     @classmethod
     def get_topo_tree_with_count(cls, bk_biz_id: int, return_all: bool = True) -> types.TreeNode:
+        # 优先使用本地拓扑镜像，镜像中的拓扑树已填充主机数量
+        mirror = TopoMirror.get(bk_biz_id) if return_all else None
+        if mirror:
+            topo_tree = mirror.get_topo_tree()
+            topo_tree.update({"meta": BaseHandler.get_meta_data(bk_biz_id)})
+            return topo_tree
+
         topo_tree: types.TreeNode = resource.ResourceQueryHelper.get_topo_tree(bk_biz_id, return_all=return_all)
 
         # 这个接口较慢，缓存5min
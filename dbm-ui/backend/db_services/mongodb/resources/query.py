@@ -10,13 +10,14 @@ specific language governing permissions and limitations under the License.
 """
 from typing import Any, Callable, Dict, List
 
-from django.db.models import CharField, ExpressionWrapper, F, Q, QuerySet, Value
+from django.db.models import CharField, Count, ExpressionWrapper, F, Q, QuerySet, Value
 from django.db.models.functions import Concat
 from django.utils.translation import ugettext_lazy as _
 
 from backend.db_meta.enums import ClusterType, MachineType
 from backend.db_meta.models.cluster import Cluster
 from backend.db_meta.models.instance import ProxyInstance, StorageInstance
+from backend.db_meta.models.storage_set_dtl import NosqlStorageSetDtl
 from backend.db_services.dbbase.resources import query
 from backend.db_services.dbbase.resources.query import ResourceList
 from backend.db_services.dbbase.resources.register import register_resource_decorator
@@ -56,6 +57,34 @@ class MongoDBListRetrieveResource(query.ListRetrieveResource):
             bk_biz_id, query_params, limit, offset, filter_params_map, filter_func_map, **kwargs
         )
 
+    @classmethod
+    def _prefetch_cluster_extra_maps(cls, clusters: List[Cluster]) -> Dict[str, Any]:
+        extra_maps = super()._prefetch_cluster_extra_maps(clusters)
+        # 批量获取分片集群的分片数，以及mongodb机器上的实例数
+        shard_num_map = dict(
+            NosqlStorageSetDtl.objects.filter(
+                cluster_id__in=[cluster.id for cluster in clusters],
+                instance__machine__machine_type=MachineType.MONGODB,
+            )
+            .values("cluster_id")
+            .annotate(shard_num=Count("id"))
+            .values_list("cluster_id", "shard_num")
+        )
+        bk_host_ids = {
+            inst.machine.bk_host_id
+            for cluster in clusters
+            for inst in cluster.storages
+            if inst.machine.machine_type == MachineType.MONGODB
+        }
+        machine_instance_num_map = dict(
+            StorageInstance.objects.filter(machine__bk_host_id__in=bk_host_ids)
+            .values("machine__bk_host_id")
+            .annotate(instance_num=Count("id"))
+            .values_list("machine__bk_host_id", "instance_num")
+        )
+        extra_maps.update(shard_num_map=shard_num_map, machine_instance_num_map=machine_instance_num_map)
+        return extra_maps
+
     @classmethod
     def _to_cluster_representation(
         cls,
@@ -82,21 +111,30 @@ class MongoDBListRetrieveResource(query.ListRetrieveResource):
         ]
 
         # 获取mongodb的分片数和单分片实例数
+        shard_num_map = kwargs.get("shard_num_map", {})
         if cluster.cluster_type == ClusterType.MongoReplicaSet:
             shard_node_count, shard_num = len(mongodb), 1
         else:
-            shard_num = cluster.nosqlstoragesetdtl_set.filter(
-                instance__machine__machine_type=MachineType.MONGODB
-            ).count()
+            shard_num = (
+                shard_num_map[cluster.id]
+                if cluster.id in shard_num_map
+                else cluster.nosqlstoragesetdtl_set.filter(instance__machine__machine_type=MachineType.MONGODB).count()
+            )
             shard_node_count = len(mongodb) / shard_num
 
         # 获取单机部署实例数、mongodb总机器数量、机器组数
-        machine_instance_num = mongodb_insts[0].machine.storageinstance_set.count()
+        machine_instance_num_map = kwargs.get("machine_instance_num_map", {})
+        first_machine = mongodb_insts[0].machine
+        machine_instance_num = (
+            machine_instance_num_map[first_machine.bk_host_id]
+            if first_machine.bk_host_id in machine_instance_num_map
+            else first_machine.storageinstance_set.count()
+        )
         mongodb_machine_num = len(set([m.machine.bk_host_id for m in mongodb_insts]))
         mongodb_machine_pair = mongodb_machine_num // shard_node_count
 
         # 获取shard分片规格
-        mongodb_spec = mongodb_insts[0].machine.spec_config
+        mongodb_spec = first_machine.spec_config
         mount_point__size = {disk["mount_point"]: disk["size"] for disk in mongodb_spec["storage_spec"]}
         mongodb_spec.update(
             capacity=mount_point__size.get("/data1") or mount_point__size["/data"] / 2,
@@ -11,7 +11,7 @@ specific language governing permissions and limitations under the License.
 
 from typing import Any, Callable, Dict, List
 
-from django.db.models import F, Q, Value
+from django.db.models import F, Q, QuerySet, Value
 from django.forms import model_to_dict
 from django.utils.translation import ugettext_lazy as _
 
@@ -19,7 +19,7 @@ from backend.db_meta.api.cluster.tendbcluster.detail import scan_cluster
 from backend.db_meta.enums import InstanceInnerRole, TenDBClusterSpiderRole
 from backend.db_meta.enums.cluster_type import ClusterType
 from backend.db_meta.exceptions import DBMetaException
-from backend.db_meta.models import Machine, Spec
+from backend.db_meta.models import Spec
 from backend.db_meta.models.cluster import Cluster
 from backend.db_meta.models.instance import ProxyInstance, StorageInstance
 from backend.db_services.dbbase.resources import query
@@ -65,6 +65,26 @@ class ListRetrieveResource(query.ListRetrieveResource):
             bk_biz_id, query_params, limit, offset, filter_params_map, filter_func_map, **kwargs
         )
 
+    @classmethod
+    def _filter_cluster_hook(
+        cls,
+        bk_biz_id,
+        cluster_queryset: QuerySet,
+        proxy_queryset: QuerySet,
+        storage_queryset: QuerySet,
+        limit: int,
+        offset: int,
+        **kwargs,
+    ) -> ResourceList:
+        """预取spider角色和remote分片信息，避免序列化时逐个实例查询"""
+        proxy_queryset = proxy_queryset.select_related("tendbclusterspiderext")
+        storage_queryset = storage_queryset.prefetch_related(
+            "as_ejector__tendbclusterstorageset", "as_receiver__tendbclusterstorageset"
+        )
+        return super()._filter_cluster_hook(
+            bk_biz_id, cluster_queryset, proxy_queryset, storage_queryset, limit, offset, **kwargs
+        )
+
     @classmethod
     def _to_cluster_representation(
         cls,
@@ -82,7 +102,8 @@ class ListRetrieveResource(query.ListRetrieveResource):
             for inst in insts:
                 try:
                     related = "as_ejector" if inst.instance_inner_role == InstanceInnerRole.MASTER else "as_receiver"
-                    shard_id = getattr(inst, related).first().tendbclusterstorageset.shard_id
+                    # 使用预取的结果，这里不能用first()，否则会重新发起查询
+                    shard_id = next(iter(getattr(inst, related).all())).tendbclusterstorageset.shard_id
                 except Exception:
                     # 如果无法找到shard_id，则默认为-1。有可能实例处于restoring状态(比如集群容量变更时)
                     shard_id = -1
@@ -102,8 +123,9 @@ class ListRetrieveResource(query.ListRetrieveResource):
         machine_list = list(set([inst["bk_host_id"] for inst in [*remote_db, *remote_dr]]))
         machine_pair_cnt = len(machine_list) / 2
 
-        spec_id = Machine.objects.get(bk_host_id=machine_list[0]).spec_id
-        cluster_spec = Spec.objects.get(spec_id=spec_id)
+        spec_id = next(inst.machine.spec_id for inst in cluster.storages if inst.machine.bk_host_id == machine_list[0])
+        spec_map = kwargs.get("spec_map") or {}
+        cluster_spec = spec_map.get(spec_id) or Spec.objects.get(spec_id=spec_id)
 
         cluster_extra_info = {
             "cluster_spec": model_to_dict(cluster_spec),
@@ -92,7 +92,7 @@ class ListRetrieveResource(query.ListRetrieveResource):
         slaves = [m.simple_desc for m in cluster.storages if m.instance_inner_role == InstanceInnerRole.SLAVE]
         cluster_role_info = {"proxies": proxies, "masters": masters, "slaves": slaves}
         cluster_info = super()._to_cluster_representation(
-            cluster, db_module_names_map, cluster_entry_map, cluster_operate_records_map
+            cluster, db_module_names_map, cluster_entry_map, cluster_operate_records_map, **kwargs
         )
         cluster_info.update(cluster_role_info)
         return cluster_info
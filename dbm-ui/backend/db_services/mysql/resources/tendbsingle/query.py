@@ -56,7 +56,7 @@ class ListRetrieveResource(query.ListRetrieveResource):
         masters = [m.simple_desc for m in cluster.storages if m.instance_inner_role == InstanceInnerRole.ORPHAN]
         cluster_role_info = {"masters": masters}
         cluster_info = super()._to_cluster_representation(
-            cluster, db_module_names_map, cluster_entry_map, cluster_operate_records_map
+            cluster, db_module_names_map, cluster_entry_map, cluster_operate_records_map, **kwargs
         )
         cluster_info.update(cluster_role_info)
         return cluster_info
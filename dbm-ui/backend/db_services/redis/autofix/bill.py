@@ -98,6 +98,7 @@ def create_ticket(cluster: RedisAutofixCore, redis_proxies: list, redis_slaves:
     # 初始化builder类
     builder = BuilderFactory.create_builder(ticket)
     builder.patch_ticket_detail()
+    builder.init_ticket_relations()
     builder.init_ticket_flows()
 
     cluster.ticket_id = ticket.id
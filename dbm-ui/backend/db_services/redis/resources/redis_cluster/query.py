@@ -97,6 +97,8 @@ class RedisListRetrieveResource(query.ListRetrieveResource):
     ) -> query.ResourceList:
         """为查询的集群填充额外信息"""
         cluster_stats_map = Cluster.get_cluster_stats(cls.cluster_types)
+        # 预取访问入口及其转发关系，用于判断dns是否指向clb
+        cluster_queryset = cluster_queryset.prefetch_related("clusterentry_set__forward_to")
         return super()._filter_cluster_hook(
             bk_biz_id,
             cluster_queryset,
@@ -125,28 +127,33 @@ class RedisListRetrieveResource(query.ListRetrieveResource):
         machine_pair_cnt = len(machine_list) / 2
 
         # 补充集群的规格和容量信息
-        spec_id = Machine.objects.get(bk_host_id=machine_list[0]).spec_id
+        spec_id = next(inst.machine.spec_id for inst in cluster.storages if inst.machine.bk_host_id == machine_list[0])
         if not spec_id:
             # TODO: 暂时兼容手动部署的情况，后续会删除该逻辑
             cluster_spec = cluster_capacity = ""
         else:
-            spec = Spec.objects.get(spec_id=spec_id)
+            spec = (kwargs.get("spec_map") or {}).get(spec_id) or Spec.objects.get(spec_id=spec_id)
             cluster_spec = model_to_dict(spec)
             cluster_capacity = spec.capacity * machine_pair_cnt
 
         # dns是否指向clb
-        dns_to_clb = cluster.clusterentry_set.filter(
-            cluster_entry_type=ClusterEntryType.DNS.value,
-            entry=cluster.immute_domain,
-            forward_to__cluster_entry_type=ClusterEntryType.CLB.value,
-        ).exists()
+        cluster_entries = cluster.clusterentry_set.all()
+        dns_to_clb = any(
+            entry.cluster_entry_type == ClusterEntryType.DNS.value
+            and entry.entry == cluster.immute_domain
+            and entry.forward_to is not None
+            and entry.forward_to.cluster_entry_type == ClusterEntryType.CLB.value
+            for entry in cluster_entries
+        )
 
         # 集群额外信息
         cluster_extra_info = {
             "cluster_spec": cluster_spec,
             "cluster_stats": cluster_stats_map.get(cluster.immute_domain, {}),
             "cluster_capacity": cluster_capacity,
-            "cluster_entry": list(cluster.clusterentry_set.values("cluster_entry_type", "entry")),
+            "cluster_entry": [
+                {"cluster_entry_type": entry.cluster_entry_type, "entry": entry.entry} for entry in cluster_entries
+            ],
             "dns_to_clb": dns_to_clb,
             "proxy": [m.simple_desc for m in cluster.proxies],
             "redis_master": redis_master,
@@ -14,3 +14,19 @@ MAX_AUTO_RETRY_TIMES = 5
 RETRY_INTERVAL = 30
 
 LOG_START_STRIP_PATTERN = re.compile(r"^\[.*?\] ")
+
+# 节点日志的采集项及过滤条件，dbm_log 仅采集worker和模拟执行的日志
+NODE_LOG_COLLECTOR_QUERIES = {
+    "dbm_log": "({root_id} AND {node_id} AND {version_id})"
+    " AND (__ext.io_kubernetes_pod:*worker* OR __ext.io_kubernetes_pod:*dbsimulation*)",
+    "dbm_dbactuator": "{root_id} AND {node_id} AND {version_id}",
+}
+# 增量获取节点日志时，每个采集项单次最多返回的条数
+NODE_LOG_TAIL_LIMIT = 5000
+# 一次性获取节点完整日志(日志查看/下载)时，每个采集项最多返回的条数，超出部分通过增量获取
+NODE_LOG_FULL_LIMIT = 20000
+# 节点结束后等待日志上报完成的时间(秒)，超过该时间认为节点日志不会再变化
+NODE_LOG_REPORT_DELAY = 5 * 60
+# 已结束节点版本的完整日志缓存
+NODE_LOG_CACHE_KEY = "taskflow_node_log_{root_id}_{node_id}_{version_id}"
+NODE_LOG_CACHE_EXPIRE = 24 * 60 * 60
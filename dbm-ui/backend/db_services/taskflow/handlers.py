@@ -9,6 +9,7 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import heapq
 import json
 import logging
 import re
@@ -16,18 +17,27 @@ import time
 from datetime import timedelta
 from json import JSONDecodeError
 from operator import itemgetter
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from bamboo_engine.api import EngineAPIResult
 from bamboo_engine.eri import NodeType
+from django.core.cache import cache
 from django.utils import timezone
 from django.utils.translation import gettext as _
 
 from backend import env
 from backend.bk_web.constants import LogLevelName
-from backend.components import BKLogApi
+from backend.components.bklog.handler import BKLogHandler
 from backend.db_services.taskflow import task
-from backend.db_services.taskflow.constants import LOG_START_STRIP_PATTERN
+from backend.db_services.taskflow.constants import (
+    LOG_START_STRIP_PATTERN,
+    NODE_LOG_CACHE_EXPIRE,
+    NODE_LOG_CACHE_KEY,
+    NODE_LOG_COLLECTOR_QUERIES,
+    NODE_LOG_FULL_LIMIT,
+    NODE_LOG_REPORT_DELAY,
+    NODE_LOG_TAIL_LIMIT,
+)
 from backend.db_services.taskflow.exceptions import (
     CallbackNodeException,
     ForceFailNodeException,
@@ -37,8 +47,9 @@ from backend.db_services.taskflow.exceptions import (
 from backend.flow.consts import StateType
 from backend.flow.engine.bamboo.engine import BambooEngine
 from backend.flow.models import FlowNode, FlowTree
+from backend.utils.batch_request import inject_request, request_multi_thread
 from backend.utils.string import format_json_string
-from backend.utils.time import calculate_cost_time, datetime2str
+from backend.utils.time import calculate_cost_time
 
 logger = logging.getLogger("root")
 
@@ -164,22 +175,89 @@ class TaskFlowHandler:
         return sorted(histories, key=itemgetter("started_time"), reverse=True)
 
     @staticmethod
-    def bklog_esquery_search(indices, query_string, start_time, end_time):
-        """esquery搜索"""
-        resp = BKLogApi.esquery_search(
+    def _is_version_log_finished(flow_node: FlowNode, version_id: str) -> bool:
+        """节点版本已结束，并且日志已上报完成，此后日志不会再变化"""
+        if flow_node.version_id == version_id and flow_node.status not in [
+            StateType.FINISHED,
+            StateType.FAILED,
+            StateType.REVOKED,
+        ]:
+            return False
+        return flow_node.updated_at < timezone.now() - timedelta(seconds=NODE_LOG_REPORT_DELAY)
+
+    def _search_version_logs(
+        self, flow_node: FlowNode, version_id: str, cursor: Dict[str, List], limit: Optional[int] = None
+    ) -> Tuple[List[Dict], Dict[str, List], bool]:
+        """
+        并发查询各采集项在游标之后的日志，并按时间顺序多路归并
+        @param flow_node: 节点
+        @param version_id: 节点版本
+        @param cursor: 各采集项的游标，{collector: sort_key}
+        @param limit: 每个采集项最多查询的条数，为空表示不限制
+        返回 (日志记录, 新的游标, 是否被截断)
+        """
+        start_time = flow_node.started_at
+        end_time = flow_node.updated_at + timedelta(days=7)
+
+        def _search(collector, query_string):
+            hits = BKLogHandler.iter_hits(
+                collector,
+                start_time,
+                end_time,
+                query_string,
+                limit=limit,
+                search_after=cursor.get(collector),
+                use_admin=False,
+            )
+            return [(BKLogHandler.hit_sort_key(hit), collector, hit) for hit in hits]
+
+        params_list = [
             {
-                "indices": indices,
-                "start_time": start_time,
-                "end_time": end_time,
-                "query_string": query_string,
-                "start": 0,
-                "size": 1000,
+                "collector": collector,
+                "query_string": query.format(root_id=self.root_id, node_id=flow_node.node_id, version_id=version_id),
             }
+            for collector, query in NODE_LOG_COLLECTOR_QUERIES.items()
+        ]
+        # 将当前请求注入到工作线程，日志查询以当前用户的身份进行
+        hits_list = request_multi_thread(inject_request(_search), params_list, get_data=itemgetter(1), in_order=True)
+
+        # 某个采集项被截断时，只能归并到其最后一条日志为止，剩余的日志留给下一次查询，保证日志顺序
+        truncated_keys = [hits[-1][0] for hits in hits_list if limit and len(hits) >= limit]
+        boundary = min(truncated_keys) if truncated_keys else None
+
+        logs, new_cursor = [], dict(cursor)
+        for sort_key, collector, hit in heapq.merge(*hits_list, key=itemgetter(0)):
+            if boundary is not None and sort_key > boundary:
+                break
+            new_cursor[collector] = sort_key
+            log = self._format_log(hit["_source"]["log"], hit["_source"]["serverIp"], hit["_index"])
+            if log:
+                logs.append(
+                    self.generate_log_record(
+                        timestamp=hit["_source"].get("time"), levelname=log["levelname"], message=log["log"]
+                    )
+                )
+        return logs, new_cursor, boundary is not None
+
+    def _get_full_version_logs(self, flow_node: FlowNode, version_id: str) -> Tuple[List[Dict], Dict[str, List], bool]:
+        """
+        获取节点版本的完整日志，每个采集项最多 NODE_LOG_FULL_LIMIT 条，已结束的节点版本日志不会再变化，缓存后直接读取
+        返回 (日志记录, 游标, 是否被截断)
+        """
+        cache_key = NODE_LOG_CACHE_KEY.format(root_id=self.root_id, node_id=flow_node.node_id, version_id=version_id)
+        cached = cache.get(cache_key)
+        if cached:
+            return cached["logs"], cached["cursor"], cached.get("truncated", False)
+
+        logs, cursor, truncated = self._search_version_logs(
+            flow_node, version_id, cursor={}, limit=NODE_LOG_FULL_LIMIT
         )
-        return resp["hits"]["hits"]
+        if logs and self._is_version_log_finished(flow_node, version_id):
+            cache.set(cache_key, {"logs": logs, "cursor": cursor, "truncated": truncated}, NODE_LOG_CACHE_EXPIRE)
+        return logs, cursor, truncated
 
     def get_version_logs(self, node_id: str, version_id: str) -> List[Dict[str, Dict[str, str]]]:
-        """获取节点的日志信息"""
+        """获取节点的日志信息，日志过多时只返回前面的部分，完整日志可通过增量接口获取"""
         try:
             flow_node = FlowNode.objects.get(root_id=self.root_id, node_id=node_id)
         except FlowNode.DoesNotExist:
@@ -187,39 +265,56 @@ class TaskFlowHandler:
         if flow_node.updated_at < timezone.now() - timedelta(days=7):
             return [self.generate_log_record(message=_("节点日志仅保留7天"))]
 
-        start_time = datetime2str(flow_node.started_at)
-        end_time = datetime2str(flow_node.updated_at + timedelta(days=7))
-        dbm_logs = self.bklog_esquery_search(
-            indices=f"{env.DBA_APP_BK_BIZ_ID}_bklog.dbm_log",
-            query_string=f"({self.root_id} AND {node_id} AND {version_id})"
-            f" AND (__ext.io_kubernetes_pod:*worker* OR __ext.io_kubernetes_pod:*dbsimulation*)",
-            start_time=start_time,
-            end_time=end_time,
-        )
-        dbm_dbactuator_logs = self.bklog_esquery_search(
-            indices=f"{env.DBA_APP_BK_BIZ_ID}_bklog.dbm_dbactuator",
-            query_string=f"{self.root_id} AND {node_id} AND {version_id}",
-            start_time=start_time,
-            end_time=end_time,
-        )
-        logs = []
-        sorted_hits = sorted(
-            dbm_logs + dbm_dbactuator_logs,
-            key=lambda x: (x["_source"]["dtEventTimeStamp"], x["_source"]["gseIndex"], x["_source"]["iterationIndex"]),
-        )
-
-        for hit in sorted_hits:
-            log = self._format_log(hit["_source"]["log"], hit["_source"]["serverIp"], hit["_index"])
-            if log:
-                logs.append(
-                    self.generate_log_record(
-                        timestamp=hit["_source"].get("time"), levelname=log["levelname"], message=log["log"]
-                    )
-                )
+        logs, __, truncated = self._get_full_version_logs(flow_node, version_id)
         if not logs:
             return [self.generate_log_record(message=_("日志上报中，请稍后查看"))]
+        if truncated:
+            logs = logs + [
+                self.generate_log_record(
+                    message=_("日志过多，仅展示前{}条，请通过增量获取查看后续日志").format(len(logs)),
+                    levelname=LogLevelName.WARNING.value,
+                )
+            ]
         return logs
 
+    def tail_version_logs(self, node_id: str, version_id: str, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        增量获取节点的日志，只返回游标之后的新日志，供前端轮询
+        @param node_id: 节点ID
+        @param version_id: 节点版本
+        @param cursor: 上一次返回的游标，为空表示从头获取
+        返回 {"logs": 新日志, "cursor": 新的游标, "finished": 日志是否不会再更新}
+        """
+        try:
+            flow_node = FlowNode.objects.get(root_id=self.root_id, node_id=node_id)
+        except FlowNode.DoesNotExist:
+            return {"logs": [], "cursor": cursor, "finished": False}
+        if flow_node.updated_at < timezone.now() - timedelta(days=7):
+            return {
+                "logs": [self.generate_log_record(message=_("节点日志仅保留7天"))],
+                "cursor": cursor,
+                "finished": True,
+            }
+
+        try:
+            cursor_map = json.loads(cursor) if cursor else {}
+        except JSONDecodeError:
+            cursor_map = {}
+
+        finished = self._is_version_log_finished(flow_node, version_id)
+        if finished:
+            # 已结束的节点版本，首次获取直接返回完整日志(优先读取缓存)，已读到末尾则无需再查询
+            logs, full_cursor, truncated = self._get_full_version_logs(flow_node, version_id)
+            if not cursor_map:
+                return {"logs": logs, "cursor": json.dumps(full_cursor), "finished": not truncated}
+            if cursor_map == full_cursor and not truncated:
+                return {"logs": [], "cursor": cursor, "finished": True}
+
+        logs, cursor_map, truncated = self._search_version_logs(
+            flow_node, version_id, cursor=cursor_map, limit=NODE_LOG_TAIL_LIMIT
+        )
+        return {"logs": logs, "cursor": json.dumps(cursor_map), "finished": finished and not truncated}
+
     @staticmethod
     def generate_log_record(
         message: str, levelname: str = LogLevelName.INFO.value, timestamp: Optional[float] = None
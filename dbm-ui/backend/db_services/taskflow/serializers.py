@@ -61,6 +61,11 @@ class VersionSerializer(NodeSerializer):
     download = serializers.BooleanField(help_text=_("是否下载日志"), default=False)
 
 
+class VersionLogTailSerializer(NodeSerializer):
+    version_id = serializers.CharField(help_text=_("版本ID"))
+    cursor = serializers.CharField(help_text=_("上一次返回的日志游标，为空表示从头获取"), required=False, allow_blank=True)
+
+
 class BatchDownloadSerializer(serializers.Serializer):
     full_paths = serializers.ListField(
         help_text=_("文件路径列表"), child=serializers.CharField(help_text="full_path"), min_length=1
@@ -25,6 +25,7 @@ from backend.db_services.taskflow.serializers import (
     CallbackNodeSerializer,
     FlowTaskSerializer,
     NodeSerializer,
+    VersionLogTailSerializer,
     VersionSerializer,
 )
 from backend.flow.consts import StateType
@@ -203,6 +204,23 @@ class TaskFlowViewSet(viewsets.AuditedModelViewSet):
         else:
             return Response(logs)
 
+    @common_swagger_auto_schema(
+        operation_summary=_("节点日志增量获取"),
+        query_serializer=VersionLogTailSerializer(),
+        tags=[SWAGGER_TAG],
+    )
+    @action(methods=["GET"], detail=True, serializer_class=VersionLogTailSerializer)
+    def node_log_tail(self, requests, *args, **kwargs):
+        root_id = kwargs["root_id"]
+        validated_data = self.params_validate(self.get_serializer_class())
+        return Response(
+            TaskFlowHandler(root_id=root_id).tail_version_logs(
+                node_id=validated_data["node_id"],
+                version_id=validated_data["version_id"],
+                cursor=validated_data.get("cursor"),
+            )
+        )
+
     @common_swagger_auto_schema(
         operation_summary=_("回调节点"),
         query_serializer=CallbackNodeSerializer(),
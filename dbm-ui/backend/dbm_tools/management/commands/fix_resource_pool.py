@@ -17,6 +17,7 @@ from backend import env
 from backend.components import CCApi
 from backend.components.dbresource.client import DBResourceApi
 from backend.db_meta.utils import remove_cluster_ips
+from backend.db_services.dbresource.host_index import ResourcePoolHostIndex
 from backend.db_services.ipchooser.constants import CommonEnum
 from backend.db_services.ipchooser.query.resource import ResourceQueryHelper
 
@@ -55,6 +56,7 @@ class Command(BaseCommand):
         logger.info("clean: count=%s, details: %s", len(free_host_ips), free_host_ips)
 
         res = DBResourceApi.resource_delete(params={"bk_host_ids": free_host_ids}, raise_exception=False)
+        ResourcePoolHostIndex.remove(free_host_ids)
         logger.info("clean: res=%s", res)
 
         remove_cluster_ips(free_host_ids, False, True)
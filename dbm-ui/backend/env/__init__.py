@@ -156,3 +156,51 @@ GCS_SCR_OPERATOR = get_type_env(key="GCS_SCR_OPERATOR", _type=str, default="scr-
 
 # 是否启动mysql-dbbackup程序的版本逻辑选择，不启动默认统一安装社区版本
 MYSQL_BACKUP_PKG_MAP_ENABLE = get_type_env(key="MYSQL_BACKUP_PKG_MAP_ENABLE", _type=bool, default=False)
+
+# 第三方接口调用的HTTP连接池配置
+HTTP_POOL_CONNECTIONS = get_type_env(key="HTTP_POOL_CONNECTIONS", _type=int, default=10)
+HTTP_POOL_MAXSIZE = get_type_env(key="HTTP_POOL_MAXSIZE", _type=int, default=50)
+HTTP_POOL_MAX_RETRIES = get_type_env(key="HTTP_POOL_MAX_RETRIES", _type=int, default=2)
+HTTP_POOL_RETRY_BACKOFF = get_type_env(key="HTTP_POOL_RETRY_BACKOFF", _type=float, default=0.3)
+HTTP_POOL_KEEP_ALIVE = get_type_env(key="HTTP_POOL_KEEP_ALIVE", _type=bool, default=True)
+
+# job任务状态集中轮询，节点从缓存读取job状态和日志
+JOB_POLLER_ENABLE = get_type_env(key="JOB_POLLER_ENABLE", _type=bool, default=True)
+# 登记后超过该时间仍未获取到轮询缓存，节点回退为直接请求job
+JOB_POLLER_STALE_SECONDS = get_type_env(key="JOB_POLLER_STALE_SECONDS", _type=int, default=30)
+
+# 多ip聚合下发db-actuator时，脚本参数(base64编码后)的长度上限，超过则拆分为多个job任务依次执行
+JOB_SCRIPT_PARAM_MAX_LENGTH = get_type_env(key="JOB_SCRIPT_PARAM_MAX_LENGTH", _type=int, default=65536)
+
+# flow节点回调模式：JOB/SOPS任务结束后通过回调唤醒节点，不再固定间隔轮询
+FLOW_CALLBACK_SCHEDULE_ENABLE = get_type_env(key="FLOW_CALLBACK_SCHEDULE_ENABLE", _type=bool, default=False)
+# 回调模式下兜底轮询的初始间隔和最大间隔(秒)，按指数退避
+FLOW_CALLBACK_POLL_BASE_INTERVAL = get_type_env(key="FLOW_CALLBACK_POLL_BASE_INTERVAL", _type=int, default=10)
+FLOW_CALLBACK_POLL_MAX_INTERVAL = get_type_env(key="FLOW_CALLBACK_POLL_MAX_INTERVAL", _type=int, default=300)
+
+# 云区域代理路由缓存的过期时间(秒)，以及是否在云区域的多个代理间轮询
+CLOUD_PROXY_ROUTE_TTL = get_type_env(key="CLOUD_PROXY_ROUTE_TTL", _type=int, default=60)
+CLOUD_PROXY_ROUND_ROBIN = get_type_env(key="CLOUD_PROXY_ROUND_ROBIN", _type=bool, default=False)
+
+# 单据构造器按清单懒加载，关闭后启动时导入全部构造器
+TICKET_BUILDER_LAZY_LOAD = get_type_env(key="TICKET_BUILDER_LAZY_LOAD", _type=bool, default=True)
+
+# 进程内介质注册表比对全局版本号的间隔(秒)，介质包变更后其他进程最多延迟该时间生效
+PACKAGE_REGISTRY_CHECK_INTERVAL = get_type_env(key="PACKAGE_REGISTRY_CHECK_INTERVAL", _type=int, default=10)
+
+# 下发介质前根据主机介质清单过滤掉主机上已存在(md5一致)的文件
+MEDIUM_INVENTORY_ENABLE = get_type_env(key="MEDIUM_INVENTORY_ENABLE", _type=bool, default=True)
+
+# dbha 探测拓扑快照的最长有效期(秒)，兜底绕过信号的元数据写入；关闭快照后 instances 接口每次实时查询
+DBHA_TOPOLOGY_SNAPSHOT_ENABLE = get_type_env(key="DBHA_TOPOLOGY_SNAPSHOT_ENABLE", _type=bool, default=True)
+DBHA_TOPOLOGY_SNAPSHOT_TTL = get_type_env(key="DBHA_TOPOLOGY_SNAPSHOT_TTL", _type=int, default=30)
+
+# ipchooser 使用本地拓扑和主机镜像；进程内镜像比对版本号的间隔(秒)；超过该时间(秒)未访问的业务不再维护镜像
+IPCHOOSER_MIRROR_ENABLE = get_type_env(key="IPCHOOSER_MIRROR_ENABLE", _type=bool, default=True)
+IPCHOOSER_MIRROR_CHECK_INTERVAL = get_type_env(key="IPCHOOSER_MIRROR_CHECK_INTERVAL", _type=int, default=10)
+IPCHOOSER_MIRROR_ACTIVE_TIME = get_type_env(key="IPCHOOSER_MIRROR_ACTIVE_TIME", _type=int, default=24 * 60 * 60)
+# 每个进程最多缓存的业务镜像数量，超过时淘汰最久未访问的业务
+IPCHOOSER_MIRROR_LOCAL_LIMIT = get_type_env(key="IPCHOOSER_MIRROR_LOCAL_LIMIT", _type=int, default=20)
+
+# 资源池主机索引的全量重建间隔(秒)，兜底无法增量维护的资源池变更
+RESOURCE_POOL_HOST_INDEX_TTL = get_type_env(key="RESOURCE_POOL_HOST_INDEX_TTL", _type=int, default=5 * 60)
@@ -129,6 +129,8 @@ FAILED_FORCIBLY_TERMINATED = 12
 
 SUCCESS_LIST = [SUCCESS, IGNORE_ERROR, SKIPPED, MANUAL_TERMINAL, SUCCESS_FORCIBLY_TERMINATED]
 FAILED_LIST = [FAILED, ABNORMAL_STATE, FAILED_FORCIBLY_TERMINATED]
+# JOB任务中单台主机的执行成功状态
+JOB_IP_SUCCESS = 9
 DBA_SYSTEM_USER = "mysql"
 DBA_ROOT_USER = "root"
 
@@ -8,9 +8,8 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
-import copy
 import logging
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from bamboo_engine import api, builder
 from bamboo_engine.builder import (
@@ -25,6 +24,7 @@ from bamboo_engine.builder import (
     SubProcess,
     Var,
 )
+from django.db import transaction
 from django.utils import translation
 from django.utils.translation import ugettext as _
 from pipeline.eri.runtime import BambooDjangoRuntime
@@ -35,6 +35,9 @@ from backend.flow.plugins.components.collections.common.drop_random_job_user imp
 
 logger = logging.getLogger("json")
 
+# 批量登记流程节点的单批数量
+FLOW_NODE_BATCH_SIZE = 500
+
 
 class Builder(object):
     """
@@ -136,7 +139,6 @@ class Builder(object):
 
         self.rewritable_node_source_keys.append({"source_act": act.id, "source_key": "trans_data"})
 
-        FlowNode.objects.create(uid=self.data.get("uid"), root_id=self.root_id, node_id=act.id)
         if extend:
             self.pipe = self.pipe.extend(act)
         return act
@@ -149,7 +151,6 @@ class Builder(object):
         pg = ParallelGateway()
         cg = ConvergeGateway()
         acts = []
-        flow_node_list = []
 
         # 增加对传入的acts_list做合法判断
         if not isinstance(acts_list, list) or len(acts_list) == 0:
@@ -172,11 +173,8 @@ class Builder(object):
             )
 
             self.rewritable_node_source_keys.append({"source_act": act.id, "source_key": "trans_data"})
-
-            flow_node_list.append(FlowNode(uid=self.data["uid"], root_id=self.root_id, node_id=act.id))
             acts.append(act)
 
-        FlowNode.objects.bulk_create(flow_node_list)
         self.pipe = self.pipe.extend(pg).connect(*acts).to(pg).converge(cg)
 
     def add_sub_pipeline(self, sub_flow):
@@ -218,19 +216,22 @@ class Builder(object):
         )
         self.pipe.extend(self.end_act)
         pipeline = builder.build_tree(self.start_act, id=self.root_id, data=self.global_data)
-        pipeline_copy = copy.deepcopy(pipeline)
-        insensitive_data = self.hide_sensitive_data(pipeline_copy)
+        # 单次遍历流程树，得到隐藏敏感数据后的精简树，同时收集所有活动节点(包括子流程中的节点)统一登记
+        flow_nodes: List[FlowNode] = []
+        insensitive_data = self.compact_tree(pipeline, flow_nodes)
         # 考虑到有些任务没有单据关联，因此uid一般为root_id，此时创建FlowTree的时候uid应该为null
         uid = self.data.get("uid") if isinstance(self.data.get("uid"), int) else None
-        FlowTree.objects.create(
-            uid=uid,
-            ticket_type=self.data["ticket_type"],
-            root_id=self.root_id,
-            tree=insensitive_data,
-            bk_biz_id=self.data["bk_biz_id"],
-            status=StateType.CREATED,
-            created_by=self.data["created_by"],
-        )
+        with transaction.atomic():
+            FlowNode.objects.bulk_create(flow_nodes, batch_size=FLOW_NODE_BATCH_SIZE)
+            FlowTree.objects.create(
+                uid=uid,
+                ticket_type=self.data["ticket_type"],
+                root_id=self.root_id,
+                tree=insensitive_data,
+                bk_biz_id=self.data["bk_biz_id"],
+                status=StateType.CREATED,
+                created_by=self.data["created_by"],
+            )
 
         if not api.run_pipeline(runtime=BambooDjangoRuntime(), pipeline=pipeline).result:
             logger.error(_("部署bamboo流程任务创建失败，任务结束"))
@@ -238,15 +239,21 @@ class Builder(object):
 
         return True
 
-    def hide_sensitive_data(self, copy_data: Optional[Dict]) -> Optional[Dict]:
-        """隐藏pipeline中敏感数据"""
-        for key, value in list(copy_data.items()):
+    def compact_tree(self, tree: Dict, flow_nodes: List[FlowNode]) -> Dict:
+        """
+        投影出隐藏敏感数据(inputs)后的精简流程树，不修改也不拷贝原始pipeline
+        @param tree: build_tree生成的流程树
+        @param flow_nodes: 收集遍历到的活动节点，用于批量登记FlowNode
+        """
+        compact = {}
+        for key, value in tree.items():
             if key == "inputs":
-                copy_data.pop(key)
                 continue
-            if type(value) == dict:
-                self.hide_sensitive_data(value)
-        return copy_data
+            compact[key] = self.compact_tree(value, flow_nodes) if isinstance(value, dict) else value
+
+        if tree.get("type") == "ServiceActivity" and "component" in tree:
+            flow_nodes.append(FlowNode(uid=self.data.get("uid"), root_id=self.root_id, node_id=tree["id"]))
+        return compact
 
     @staticmethod
     def get_ip_list(ips: list) -> list:
@@ -11,7 +11,7 @@ specific language governing permissions and limitations under the License.
 from backend import env
 from backend.components.constants import SSLEnum
 from backend.configuration.constants import DBType
-from backend.db_package.models import Package
+from backend.db_package.registry import PackageRegistry
 from backend.db_services.redis.util import is_predixy_proxy_type
 from backend.db_services.version.constants import PredixyVersion, TwemproxyVersion
 from backend.flow.consts import CLOUD_SSL_PATH, MediumEnum, MysqlVersionToDBBackupForMap
@@ -28,7 +28,7 @@ class GetFileList(object):
         """
         @param db_type: db类型，默认是MySQL，如果是Redis这actuator包不一样
         """
-        self.actuator_pkg = Package.get_latest_package(
+        self.actuator_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.DBActuator, db_type=db_type
         )
 
@@ -42,7 +42,7 @@ class GetFileList(object):
         """
         最新的dba_toolkit包
         """
-        dba_toolkit = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLToolKit)
+        dba_toolkit = PackageRegistry.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLToolKit)
         return [f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{dba_toolkit.path}"]
 
     @staticmethod
@@ -55,10 +55,14 @@ class GetFileList(object):
         @param is_install_monitor 是否要下发监控程序的介质包
         @param db_backup_pkg_type 下发备份程序的介质包类型
         """
-        checksum_pkg = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLChecksum)
-        rotate_binlog = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLRotateBinlog)
-        mysql_crond_pkg = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLCrond)
-        dba_toolkit_pkg = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLToolKit)
+        checksum_pkg = PackageRegistry.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLChecksum)
+        rotate_binlog = PackageRegistry.get_latest_package(
+            version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLRotateBinlog
+        )
+        mysql_crond_pkg = PackageRegistry.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLCrond)
+        dba_toolkit_pkg = PackageRegistry.get_latest_package(
+            version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLToolKit
+        )
         pkg_list = [
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{checksum_pkg.path}",
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{rotate_binlog.path}",
@@ -67,20 +71,24 @@ class GetFileList(object):
         ]
         if is_install_monitor:
             # 下发监控程序的介质包
-            mysql_monitor_pkg = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLMonitor)
+            mysql_monitor_pkg = PackageRegistry.get_latest_package(
+                version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLMonitor
+            )
             pkg_list.append(f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{mysql_monitor_pkg.path}")
 
         if is_install_backup:
             # 下发备份程序的介质包
             if db_backup_pkg_type:
                 # 如果直接传db_backup_pkg_type，则以它为准
-                db_backup_pkg = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=db_backup_pkg_type)
+                db_backup_pkg = PackageRegistry.get_latest_package(
+                    version=MediumEnum.Latest, pkg_type=db_backup_pkg_type
+                )
                 pkg_list.append(f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{db_backup_pkg.path}")
                 return pkg_list
 
             elif env.MYSQL_BACKUP_PKG_MAP_ENABLE:
                 # 内部环境，追加内部版本介质包
-                txsql_db_backup_pkg = Package.get_latest_package(
+                txsql_db_backup_pkg = PackageRegistry.get_latest_package(
                     version=MediumEnum.Latest, pkg_type=MediumEnum.DbBackupTXSQL
                 )
                 pkg_list.append(f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{txsql_db_backup_pkg.path}")
@@ -88,7 +96,7 @@ class GetFileList(object):
                 pass
 
             # 默认情况下
-            db_backup_pkg = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.DbBackup)
+            db_backup_pkg = PackageRegistry.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.DbBackup)
             pkg_list.append(f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{db_backup_pkg.path}")
 
         return pkg_list
@@ -102,13 +110,17 @@ class GetFileList(object):
         else:
             db_backup_pkg_type = MediumEnum.DbBackup
 
-        mysql_pkg = Package.get_latest_package(version=db_version, pkg_type=MediumEnum.MySQL)
-        db_backup_pkg = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=db_backup_pkg_type)
-        checksum_pkg = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLChecksum)
-        dba_toolkit = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLToolKit)
-        rotate_binlog = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLRotateBinlog)
-        mysql_crond_pkg = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLCrond)
-        mysql_monitor_pkg = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLMonitor)
+        mysql_pkg = PackageRegistry.get_latest_package(version=db_version, pkg_type=MediumEnum.MySQL)
+        db_backup_pkg = PackageRegistry.get_latest_package(version=MediumEnum.Latest, pkg_type=db_backup_pkg_type)
+        checksum_pkg = PackageRegistry.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLChecksum)
+        dba_toolkit = PackageRegistry.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLToolKit)
+        rotate_binlog = PackageRegistry.get_latest_package(
+            version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLRotateBinlog
+        )
+        mysql_crond_pkg = PackageRegistry.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLCrond)
+        mysql_monitor_pkg = PackageRegistry.get_latest_package(
+            version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLMonitor
+        )
         return [
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{mysql_pkg.path}",
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{db_backup_pkg.path}",
@@ -130,9 +142,9 @@ class GetFileList(object):
         else:
             db_backup_pkg_type = MediumEnum.DbBackup
 
-        mysql_pkg = Package.get_latest_package(version=db_version, pkg_type=MediumEnum.MySQL)
-        db_backup_pkg = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=db_backup_pkg_type)
-        mysql_crond_pkg = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLCrond)
+        mysql_pkg = PackageRegistry.get_latest_package(version=db_version, pkg_type=MediumEnum.MySQL)
+        db_backup_pkg = PackageRegistry.get_latest_package(version=MediumEnum.Latest, pkg_type=db_backup_pkg_type)
+        mysql_crond_pkg = PackageRegistry.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLCrond)
         return [
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{mysql_pkg.path}",
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{db_backup_pkg.path}",
@@ -144,9 +156,11 @@ class GetFileList(object):
         """
         mysql_proxy安装需要的安装包列表
         """
-        proxy_pkg = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLProxy)
-        mysql_crond_pkg = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLCrond)
-        mysql_monitor_pkg = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLMonitor)
+        proxy_pkg = PackageRegistry.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLProxy)
+        mysql_crond_pkg = PackageRegistry.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLCrond)
+        mysql_monitor_pkg = PackageRegistry.get_latest_package(
+            version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLMonitor
+        )
         return [
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{self.actuator_pkg.path}",
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{proxy_pkg.path}",
@@ -158,7 +172,7 @@ class GetFileList(object):
         """
         mysql_proxy 升级需要的安装包列表
         """
-        proxy_pkg = Package.get_latest_package(version=version, pkg_type=MediumEnum.MySQLProxy)
+        proxy_pkg = PackageRegistry.get_latest_package(version=version, pkg_type=MediumEnum.MySQLProxy)
         return [
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{self.actuator_pkg.path}",
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{proxy_pkg.path}",
@@ -168,7 +182,7 @@ class GetFileList(object):
         """
         mysql 升级需要的安装包列表
         """
-        mysql_pkg = Package.get_latest_package(version=db_version, pkg_type=MediumEnum.MySQL)
+        mysql_pkg = PackageRegistry.get_latest_package(version=db_version, pkg_type=MediumEnum.MySQL)
         return [
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{self.actuator_pkg.path}",
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{mysql_pkg.path}",
@@ -178,9 +192,11 @@ class GetFileList(object):
         """
         riak安装需要的安装包列表
         """
-        riak_pkg = Package.get_latest_package(version=db_version, pkg_type=MediumEnum.Riak, db_type=DBType.Riak)
-        mysql_crond_pkg = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLCrond)
-        riak_monitor_pkg = Package.get_latest_package(
+        riak_pkg = PackageRegistry.get_latest_package(
+            version=db_version, pkg_type=MediumEnum.Riak, db_type=DBType.Riak
+        )
+        mysql_crond_pkg = PackageRegistry.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLCrond)
+        riak_monitor_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.RiakMonitor, db_type=DBType.Riak.value
         )
         return [
@@ -200,11 +216,11 @@ class GetFileList(object):
             version = PredixyVersion.PredixyLatest
             pkg_type = MediumEnum.Predixy
 
-        proxy_pkg = Package.get_latest_package(version=version, pkg_type=pkg_type, db_type=DBType.Redis)
-        bkdbmon_pkg = Package.get_latest_package(
+        proxy_pkg = PackageRegistry.get_latest_package(version=version, pkg_type=pkg_type, db_type=DBType.Redis)
+        bkdbmon_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.DbMon, db_type=DBType.Redis
         )
-        redis_tool_pkg = Package.get_latest_package(
+        redis_tool_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.RedisTools, db_type=DBType.Redis
         )
         return [
@@ -219,10 +235,10 @@ class GetFileList(object):
         部署redis,所有节点需要的redis pkg包
         """
         redis_pkg = get_latest_redis_package_by_version(db_version)
-        redis_tool_pkg = Package.get_latest_package(
+        redis_tool_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.RedisTools, db_type=DBType.Redis
         )
-        bkdbmon_pkg = Package.get_latest_package(
+        bkdbmon_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.DbMon, db_type=DBType.Redis
         )
         return [
@@ -237,7 +253,7 @@ class GetFileList(object):
         redis集群版本升级
         """
         redis_pkg = get_latest_redis_package_by_version(db_version)
-        bkdbmon_pkg = Package.get_latest_package(
+        bkdbmon_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.DbMon, db_type=DBType.Redis
         )
         return [
@@ -256,10 +272,10 @@ class GetFileList(object):
         """
         安装 或者重装 dbmon
         """
-        bkdbmon_pkg = Package.get_latest_package(
+        bkdbmon_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.DbMon, db_type=DBType.Redis
         )
-        redis_tool_pkg = Package.get_latest_package(
+        redis_tool_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.RedisTools, db_type=DBType.Redis
         )
         return [
@@ -274,7 +290,7 @@ class GetFileList(object):
         """
         Redis actuator 包
         """
-        redis_tool_pkg = Package.get_latest_package(
+        redis_tool_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.RedisTools, db_type=DBType.Redis
         )
         return [
@@ -283,13 +299,13 @@ class GetFileList(object):
         ]
 
     def tendisplus_apply_proxy(self) -> list:
-        proxy_pkg = Package.get_latest_package(
+        proxy_pkg = PackageRegistry.get_latest_package(
             version=PredixyVersion.PredixyLatest, pkg_type=MediumEnum.Predixy, db_type=DBType.Redis
         )
-        bkdbmon_pkg = Package.get_latest_package(
+        bkdbmon_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.DbMon, db_type=DBType.Redis
         )
-        redis_tool_pkg = Package.get_latest_package(
+        redis_tool_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.RedisTools, db_type=DBType.Redis
         )
         return [
@@ -300,13 +316,13 @@ class GetFileList(object):
         ]
 
     def tendisplus_apply_backend(self, db_version: str) -> list:
-        redis_pkg = Package.get_latest_package(
+        redis_pkg = PackageRegistry.get_latest_package(
             version=db_version, pkg_type=MediumEnum.TendisPlus, db_type=DBType.Redis
         )
-        redis_tool_pkg = Package.get_latest_package(
+        redis_tool_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.RedisTools, db_type=DBType.Redis
         )
-        bkdbmon_pkg = Package.get_latest_package(
+        bkdbmon_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.DbMon, db_type=DBType.Redis
         )
         return [
@@ -328,7 +344,7 @@ class GetFileList(object):
 
     def es_apply(self, db_version: str) -> list:
         # 部署es所有节点需要的pkg列表
-        es_pkg = Package.get_latest_package(version=db_version, pkg_type=MediumEnum.Es, db_type=DBType.Es)
+        es_pkg = PackageRegistry.get_latest_package(version=db_version, pkg_type=MediumEnum.Es, db_type=DBType.Es)
         return [
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{es_pkg.path}",
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{self.actuator_pkg.path}",
@@ -336,7 +352,7 @@ class GetFileList(object):
 
     def es_scale_up(self, db_version: str) -> list:
         # 扩容es所有节点需要的pkg列表
-        es_pkg = Package.get_latest_package(version=db_version, pkg_type=MediumEnum.Es, db_type=DBType.Es)
+        es_pkg = PackageRegistry.get_latest_package(version=db_version, pkg_type=MediumEnum.Es, db_type=DBType.Es)
         return [
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{es_pkg.path}",
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{self.actuator_pkg.path}",
@@ -364,7 +380,9 @@ class GetFileList(object):
 
     def kafka_apply(self, db_version: str) -> list:
         # 部署kafka集群，所有节点需要的pkg列表
-        kafka_pkg = Package.get_latest_package(version=db_version, pkg_type=MediumEnum.Kafka, db_type=DBType.Kafka)
+        kafka_pkg = PackageRegistry.get_latest_package(
+            version=db_version, pkg_type=MediumEnum.Kafka, db_type=DBType.Kafka
+        )
         return [
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{self.actuator_pkg.path}",
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{kafka_pkg.path}",
@@ -376,7 +394,7 @@ class GetFileList(object):
 
     def influxdb_apply(self, db_version: str) -> list:
         # 部署kafka集群，所有节点需要的pkg列表
-        influxdb_pkg = Package.get_latest_package(
+        influxdb_pkg = PackageRegistry.get_latest_package(
             version=db_version, pkg_type=MediumEnum.Influxdb, db_type=DBType.InfluxDB
         )
         return [
@@ -396,10 +414,10 @@ class GetFileList(object):
         """
         redis单据基础包：act + tool工具包 + dbmon
         """
-        redis_tool_pkg = Package.get_latest_package(
+        redis_tool_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.RedisTools, db_type=DBType.Redis
         )
-        bkdbmon_pkg = Package.get_latest_package(
+        bkdbmon_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.DbMon, db_type=DBType.Redis
         )
         return [
@@ -413,10 +431,10 @@ class GetFileList(object):
         """
         redis add dts_server
         """
-        redis_actuator_pkg = Package.get_latest_package(
+        redis_actuator_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.DBActuator, db_type=DBType.Redis
         )
-        redis_dts_pkg = Package.get_latest_package(
+        redis_dts_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.RedisDts, db_type=DBType.Redis
         )
         return [
@@ -434,7 +452,9 @@ class GetFileList(object):
 
     def hdfs_apply(self, db_version: str) -> list:
         # 部署hdfs集群需要的pkg列表
-        hdfs_pkg = Package.get_latest_package(version=db_version, pkg_type=MediumEnum.Hdfs, db_type=DBType.Hdfs)
+        hdfs_pkg = PackageRegistry.get_latest_package(
+            version=db_version, pkg_type=MediumEnum.Hdfs, db_type=DBType.Hdfs
+        )
         return [
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{hdfs_pkg.path}",
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{self.actuator_pkg.path}",
@@ -449,7 +469,7 @@ class GetFileList(object):
     @classmethod
     def nginx_apply(cls) -> list:
         # 部署云区域nginx服务的文件列表
-        nginx_pkg = Package.get_latest_package(
+        nginx_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.CloudNginx, db_type=DBType.Cloud
         )
         return [
@@ -463,10 +483,10 @@ class GetFileList(object):
     @classmethod
     def dns_apply(cls) -> list:
         # 部署云区域nginx服务的文件列表
-        dns_bind_pkg = Package.get_latest_package(
+        dns_bind_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.CloudDNSBind, db_type=DBType.Cloud
         )
-        dns_pull_crond_pkg = Package.get_latest_package(
+        dns_pull_crond_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.CloudDNSPullCrond, db_type=DBType.Cloud
         )
         return [
@@ -477,7 +497,7 @@ class GetFileList(object):
     @classmethod
     def dbha_apply(cls) -> list:
         # 部署云区域dbha服务的文件列表
-        dbha_pkg = Package.get_latest_package(
+        dbha_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.CloudDBHA, db_type=DBType.Cloud
         )
         return [
@@ -487,10 +507,10 @@ class GetFileList(object):
     @classmethod
     def drs_apply(cls) -> list:
         # 部署云区域drs服务的文件列表
-        drs_pkg = Package.get_latest_package(
+        drs_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.CloudDRS, db_type=DBType.Cloud
         )
-        tmysqlparse_pkg = Package.get_latest_package(
+        tmysqlparse_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.CloudDRSTymsqlParse, db_type=DBType.Cloud
         )
         return [
@@ -502,7 +522,9 @@ class GetFileList(object):
 
     def pulsar_apply(self, db_version: str) -> list:
         # 部署es所有节点需要的pkg列表
-        pulsar_pkg = Package.get_latest_package(version=db_version, pkg_type=MediumEnum.Pulsar, db_type=DBType.Pulsar)
+        pulsar_pkg = PackageRegistry.get_latest_package(
+            version=db_version, pkg_type=MediumEnum.Pulsar, db_type=DBType.Pulsar
+        )
         return [
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{pulsar_pkg.path}",
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{self.actuator_pkg.path}",
@@ -519,13 +541,13 @@ class GetFileList(object):
         部署spider master节点时需要的介质包
         spider master 和 spider ctl 混合部署一起，所以下发两个介质包
         """
-        spider_master_pkg = Package.get_latest_package(
+        spider_master_pkg = PackageRegistry.get_latest_package(
             version=spider_version, pkg_type=MediumEnum.Spider, db_type=DBType.MySQL
         )
-        tdbctl_pkg = Package.get_latest_package(
+        tdbctl_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.tdbCtl, db_type=DBType.MySQL
         )
-        mysql_crond_pkg = Package.get_latest_package(
+        mysql_crond_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLCrond, db_type=DBType.MySQL
         )
         return [
@@ -539,10 +561,10 @@ class GetFileList(object):
         """
         部署spider slave节点需要的介质包
         """
-        spider_slave_pkg = Package.get_latest_package(
+        spider_slave_pkg = PackageRegistry.get_latest_package(
             version=spider_version, pkg_type=MediumEnum.Spider, db_type=DBType.MySQL
         )
-        mysql_crond_pkg = Package.get_latest_package(
+        mysql_crond_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLCrond, db_type=DBType.MySQL
         )
         return [
@@ -552,10 +574,10 @@ class GetFileList(object):
         ]
 
     def tdbctl_install_package(self) -> list:
-        tdbctl_pkg = Package.get_latest_package(
+        tdbctl_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.tdbCtl, db_type=DBType.MySQL
         )
-        db_backup_pkg = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.DbBackup)
+        db_backup_pkg = PackageRegistry.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.DbBackup)
 
         return [
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{self.actuator_pkg.path}",
@@ -568,9 +590,11 @@ class GetFileList(object):
         """
         spider 安装周边程序所需要下载介质包列表
         """
-        db_backup_pkg = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.DbBackup)
-        mysql_monitor_pkg = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLMonitor)
-        dba_toolkit = Package.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLToolKit)
+        db_backup_pkg = PackageRegistry.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.DbBackup)
+        mysql_monitor_pkg = PackageRegistry.get_latest_package(
+            version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLMonitor
+        )
+        dba_toolkit = PackageRegistry.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQLToolKit)
         return [
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{dba_toolkit.path}",
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{db_backup_pkg.path}",
@@ -581,7 +605,7 @@ class GetFileList(object):
         """
         获取tbinlogdumper安装的
         """
-        tbinlogdumper_pkg = Package.get_latest_package(
+        tbinlogdumper_pkg = PackageRegistry.get_latest_package(
             version=MediumEnum.Latest, pkg_type=MediumEnum.TBinlogDumper, db_type=DBType.MySQL
         )
         return [
@@ -591,7 +615,9 @@ class GetFileList(object):
 
     def doris_apply(self, db_version: str) -> list:
         # 部署doris所有节点需要的pkg列表
-        doris_pkg = Package.get_latest_package(version=db_version, pkg_type=MediumEnum.Doris, db_type=DBType.Doris)
+        doris_pkg = PackageRegistry.get_latest_package(
+            version=db_version, pkg_type=MediumEnum.Doris, db_type=DBType.Doris
+        )
         return [
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{doris_pkg.path}",
             f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/{self.actuator_pkg.path}",
@@ -607,7 +633,7 @@ class GetFileList(object):
         """
         获取Sqlserver的安装包
         """
-        sqlserver_pkg = Package.get_latest_package(
+        sqlserver_pkg = PackageRegistry.get_latest_package(
             version=db_version, pkg_type=MediumEnum.Sqlserver, db_type=DBType.Sqlserver
         )
         return [
@@ -620,10 +646,10 @@ class GetFileList(object):
         部署mongodb,需要的pkg包
         """
 
-        mongodb_pkg = Package.get_latest_package(
+        mongodb_pkg = PackageRegistry.get_latest_package(
             version=db_version, pkg_type=MediumEnum.MongoDB, db_type=DBType.MongoDB
         )
-        # bkdbmon_pkg = Package.get_latest_package(
+        # bkdbmon_pkg = PackageRegistry.get_latest_package(
         #     version=MediumEnum.Latest, pkg_type=MediumEnum.DbMon, db_type=DBType.MongoDB
         # )
         return [
@@ -18,6 +18,7 @@ from backend import env
 from backend.components.dbresource.client import DBResourceApi
 from backend.configuration.constants import SystemSettingsEnum
 from backend.configuration.models import SystemSettings
+from backend.db_services.dbresource.host_index import resource_import_callback
 from backend.flow.engine.bamboo.scene.common.builder import Builder
 from backend.flow.plugins.components.collections.common.external_service import ExternalServiceComponent
 from backend.flow.plugins.components.collections.common.sa_idle_check import CheckMachineIdleComponent
@@ -65,6 +66,7 @@ class ImportResourceInitStepFlow(object):
                 "api_import_path": DBResourceApi.__module__,
                 "api_import_module": "DBResourceApi",
                 "api_call_func": "resource_import",
+                "success_callback_path": f"{resource_import_callback.__module__},{resource_import_callback.__name__}",
             },
         )
 
@@ -45,6 +45,7 @@ class L5AgentInstall(BkSopsService):
                         "${job_ip_list}": ip,
                         "${job_account}": DBA_ROOT_USER,
                     },
+                    **self.sops_callback_payload(),
                 }
             )
 
@@ -28,6 +28,8 @@ from backend.core.encrypt.constants import AsymmetricCipherConfigType
 from backend.core.encrypt.handlers import AsymmetricHandler
 from backend.core.translation.constants import Language
 from backend.flow.consts import DEFAULT_FLOW_CACHE_EXPIRE_TIME, SUCCESS_LIST, WriteContextOpType
+from backend.flow.utils.job_poller import JobStatusPoller
+from backend.flow.utils.node_callback import CallbackSource, NodeCallbackHandler
 from backend.ticket.constants import TicketFlowStatus
 from backend.ticket.models import Flow
 from backend.utils.redis import RedisConn
@@ -210,9 +212,68 @@ class BaseService(Service, ServiceLogMixin, metaclass=ABCMeta):
         return _format_to_list(ticket_ips) + _format_to_list(pool_ips)
 
 
-class BkJobService(BaseService, metaclass=ABCMeta):
+class CallbackScheduleMixin:
+    """
+    回调模式的调度：节点执行后进入休眠，由外部平台回调或者兜底轮询(指数退避)唤醒节点
+    开启 FLOW_CALLBACK_SCHEDULE_ENABLE 后生效，否则保持固定5s轮询
+    """
+
+    # 采用多次回调，唤醒时任务若仍未结束，节点可以继续等待下一次回调
+    __multi_callback_enabled__ = env.FLOW_CALLBACK_SCHEDULE_ENABLE
+    interval = None if env.FLOW_CALLBACK_SCHEDULE_ENABLE else StaticIntervalGenerator(5)
+    callback_source: str = None
+    # 是否向外部平台传入了回调地址，未传入的节点不会收到回调
+    _callback_url_sent = False
+
+    @property
+    def is_callback_mode(self) -> bool:
+        return self.interval is None
+
+    def callback_url(self) -> str:
+        return f"{env.BK_SAAS_CALLBACK_URL}/apis/proxypass/flow_{self.callback_source}_callback/"
+
+    def callback_payload(self) -> Dict:
+        """回调模式下，外部任务结束后回调唤醒节点。子类在调用外部接口时合并到请求参数中"""
+        if not self.is_callback_mode:
+            return {}
+        self._callback_url_sent = True
+        return {"callback_url": self.callback_url()}
+
+    def register_callback(self, data, task_id: Optional[Union[int, str]], extra: Optional[Dict] = None):
+        """
+        登记等待回调，task_id为空表示无需等待外部任务，节点会被立即唤醒
+        首次登记时记录是否传入了回调地址，节点被唤醒后重新登记时沿用
+        """
+        notify = data.get_one_of_outputs("callback_notify")
+        if notify is None:
+            notify = data.outputs.callback_notify = self._callback_url_sent
+        NodeCallbackHandler.register(
+            source=self.callback_source,
+            task_id=task_id,
+            node_id=self.runtime_attrs.get("id"),
+            version=self.runtime_attrs.get("version"),
+            extra=extra,
+            notify=notify,
+        )
+
+
+class BkJobService(CallbackScheduleMixin, BaseService, metaclass=ABCMeta):
     __need_schedule__ = True
-    interval = StaticIntervalGenerator(5)
+    callback_source = CallbackSource.JOB.value
+
+    def job_callback_payload(self) -> Dict:
+        """回调模式下，job任务结束后回调唤醒节点。子类在调用job接口时合并到请求参数中"""
+        return self.callback_payload()
+
+    def execute(self, data, parent_data):
+        result = super().execute(data, parent_data)
+        if result and self.is_callback_mode:
+            ext_result = data.get_one_of_outputs("ext_result")
+            job_instance_id = None
+            if isinstance(ext_result, dict) and ext_result.get("result"):
+                job_instance_id = ext_result["data"]["job_instance_id"]
+            self.register_callback(data, job_instance_id)
+        return result
 
     @staticmethod
     def __status__(instance_id: str) -> Optional[Dict]:
@@ -227,6 +288,29 @@ class BkJobService(BaseService, metaclass=ABCMeta):
         resp = JobApi.get_job_instance_status(payload, raw=True)
         return resp
 
+    def __poll_status__(self, job_instance_id: int, ip_dicts: List[Dict], need_log: bool) -> Optional[Dict]:
+        """
+        通过集中轮询器获取任务状态，返回None表示状态暂未就绪
+        首次调度时直接请求job，未结束则登记到轮询器，之后读取轮询器缓存
+        若轮询器长时间没有产出或者更新缓存，则回退为直接请求job
+        """
+        if not env.JOB_POLLER_ENABLE:
+            return self.__status__(job_instance_id)
+
+        resp = JobStatusPoller.get_status(job_instance_id)
+        if resp is not None:
+            return resp
+
+        register_time = JobStatusPoller.get_register_time(job_instance_id)
+        if register_time and not JobStatusPoller.is_stale(register_time):
+            return None
+
+        resp = self.__status__(job_instance_id)
+        # 回调模式由节点唤醒器负责兜底轮询，无需登记到集中轮询器
+        if not self.is_callback_mode and not register_time and resp["result"] and not resp["data"]["finished"]:
+            JobStatusPoller.register(job_instance_id, ip_dicts, need_log)
+        return resp
+
     def __log__(
         self,
         job_instance_id: int,
@@ -241,6 +325,11 @@ class BkJobService(BaseService, metaclass=ABCMeta):
             "job_instance_id": job_instance_id,
             "step_instance_id": step_instance_id,
         }
+        # 优先读取集中轮询器批量拉取的日志
+        if env.JOB_POLLER_ENABLE:
+            log_content = JobStatusPoller.get_ip_log(job_instance_id, ip_dict)
+            if log_content is not None:
+                return {"result": True, "data": {"log_content": log_content}}
         return JobApi.get_job_instance_ip_log({**payload, **ip_dict}, raw=True)
 
     def __get_target_ip_context(
@@ -310,7 +399,26 @@ class BkJobService(BaseService, metaclass=ABCMeta):
             return False
 
         job_instance_id = ext_result["data"]["job_instance_id"]
-        resp = self.__status__(job_instance_id)
+
+        # 获取本次执行的所有ip信息
+        # ip_dict = {"bk_cloud_id": kwargs["bk_cloud_id"], "ip": exec_ips[0]} if exec_ips else {}
+        # ip_dicts = [{"bk_cloud_id": kwargs["bk_cloud_id"], "ip": ip} for ip in exec_ips] if exec_ips else []
+        ip_dicts = []
+        if exec_ips:
+            for i in exec_ips:
+                if isinstance(i, dict) and i.get("ip") is not None and i.get("bk_cloud_id") is not None:
+                    ip_dicts.append(i)
+                else:
+                    # 兼容之前代码
+                    ip_dicts.append({"bk_cloud_id": kwargs["bk_cloud_id"], "ip": i})
+
+        resp = self.__poll_status__(job_instance_id, ip_dicts, need_log=bool(write_payload_var))
+        if resp is None:
+            self.log_info(_("[{}] 任务正在执行🤔").format(node_name))
+            return True
+        if self.is_callback_mode and not (resp["result"] and resp["data"]["finished"]):
+            # 被提前唤醒时任务仍未结束，重新登记等待下一次回调
+            self.register_callback(data, job_instance_id)
 
         # 获取任务状态：
         # """
@@ -327,18 +435,6 @@ class BkJobService(BaseService, metaclass=ABCMeta):
         # 默认dbm调用job是一个步骤，所以统一获取第一个步骤id
         step_instance_id = resp["data"]["step_instance_list"][0]["step_instance_id"]
 
-        # 获取本次执行的所有ip信息
-        # ip_dict = {"bk_cloud_id": kwargs["bk_cloud_id"], "ip": exec_ips[0]} if exec_ips else {}
-        # ip_dicts = [{"bk_cloud_id": kwargs["bk_cloud_id"], "ip": ip} for ip in exec_ips] if exec_ips else []
-        ip_dicts = []
-        if exec_ips:
-            for i in exec_ips:
-                if isinstance(i, dict) and i.get("ip") is not None and i.get("bk_cloud_id") is not None:
-                    ip_dicts.append(i)
-                else:
-                    # 兼容之前代码
-                    ip_dicts.append({"bk_cloud_id": kwargs["bk_cloud_id"], "ip": i})
-
         # 判断本次job任务是否异常
         if job_status not in SUCCESS_LIST:
             self.log_info("{} job status: {}".format(node_name, resp))
@@ -387,13 +483,26 @@ class BkJobService(BaseService, metaclass=ABCMeta):
         return True
 
 
-class BkSopsService(BaseService, metaclass=ABCMeta):
+class BkSopsService(CallbackScheduleMixin, BaseService, metaclass=ABCMeta):
     __need_schedule__ = True
-    interval = StaticIntervalGenerator(5)
+    callback_source = CallbackSource.SOPS.value
     """
     定义调用标准运维的基类
     """
 
+    def sops_callback_payload(self) -> Dict:
+        """回调模式下，标准运维任务结束后回调唤醒节点。子类在创建任务时合并到请求参数中"""
+        return self.callback_payload()
+
+    def execute(self, data, parent_data):
+        result = super().execute(data, parent_data)
+        if result and self.is_callback_mode:
+            kwargs = data.get_one_of_inputs("kwargs")
+            self.register_callback(
+                data, data.get_one_of_outputs("task_id"), extra={"bk_biz_id": kwargs.get("bk_biz_id")}
+            )
+        return result
+
     def _schedule(self, data, parent_data, callback_data=None):
         kwargs = data.get_one_of_inputs("kwargs")
         bk_biz_id = kwargs["bk_biz_id"]
@@ -414,3 +523,8 @@ class BkSopsService(BaseService, metaclass=ABCMeta):
             # 查询异常日志
             self.log_error(rp_data.get("ex_data", _("查询日志失败")))
             return False
+
+        if self.is_callback_mode:
+            # 被提前唤醒时任务仍未结束(RUNNING/CREATED/READY等)，重新登记等待下一次回调
+            self.register_callback(data, task_id, extra={"bk_biz_id": bk_biz_id})
+            return True
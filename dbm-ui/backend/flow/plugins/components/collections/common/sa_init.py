@@ -33,7 +33,7 @@ class SaInit(BkSopsService):
                 "${bk_biz_id}": bk_biz_id,
             },
         }
-        rpdata = BkSopsApi.create_task(param)
+        rpdata = BkSopsApi.create_task({**param, **self.sops_callback_payload()})
         task_id = rpdata["task_id"]
         # start task
         self.log_info(f"job url:{env.BK_SOPS_URL}/taskflow/execute/{env.BK_SOPS_PROJECT_ID}/?instance_id={task_id}")
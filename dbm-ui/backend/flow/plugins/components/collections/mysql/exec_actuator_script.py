@@ -9,10 +9,12 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 import copy
+import functools
 import json
 import logging
 import re
 from dataclasses import asdict, is_dataclass
+from typing import Callable, List
 
 from django.conf import settings
 from django.utils.translation import ugettext as _
@@ -21,12 +23,17 @@ from pipeline.component_framework.component import Component
 
 from backend import env
 from backend.components import JobApi
-from backend.flow.consts import DBA_ROOT_USER
+from backend.flow.consts import DBA_ROOT_USER, JOB_IP_SUCCESS
 from backend.flow.models import FlowNode
 from backend.flow.plugins.components.collections.common.base_service import BkJobService
 from backend.flow.utils.mysql.get_mysql_sys_user import get_mysql_sys_users
 from backend.flow.utils.mysql.mysql_act_playload import MysqlActPayload
-from backend.flow.utils.script_template import actuator_template, fast_execute_script_common_kwargs
+from backend.flow.utils.script_template import (
+    MULTI_IP_PAYLOAD_NOT_FOUND_EXIT_CODE,
+    actuator_template,
+    fast_execute_script_common_kwargs,
+    multi_ip_actuator_template,
+)
 from backend.utils.string import base64_encode
 
 logger = logging.getLogger("json")
@@ -36,7 +43,9 @@ cpl = re.compile("<ctx>(?P<context>.+?)</ctx>")  # 非贪婪模式，只匹配
 class ExecuteDBActuatorScriptService(BkJobService):
     """
     根据db-actuator组件，绑定fast_execute_script api接口访问。
-    目前只能兼容传入一个ip执行，如果传入多ip列表模块，会有可能影响payload的拼接情况
+    默认只能兼容传入一个ip执行，如果传入多ip列表模块，所有ip共用第一个ip拼接的payload
+    开启 multi_ip_payload 后，对每个ip分别拼接payload，通过一个job任务下发到所有ip，每个ip执行各自的payload
+    脚本参数超过长度上限时拆分为多个job任务依次执行，无法匹配本机ip的主机回退为单ip模式执行
     同时支持跨云管理，根据传入的 kwargs["bk_cloud_id"]来执行
     """
 
@@ -52,58 +61,30 @@ class ExecuteDBActuatorScriptService(BkJobService):
 
         return exec_ips
 
-    def _execute(self, data, parent_data) -> bool:
+    def _get_actuator_template(
+        self, kwargs: dict, global_data: dict, trans_data: dict, ip: str, cluster: dict, get_sys_users: Callable
+    ) -> dict:
         """
-        执行fast_execute_script脚本
-        global_data 单据全局变量，格式字典
-        trans_data  单据上下文
-        kwargs 字典传入格式：
-        {
-           root_id:  db-actuator任务必须参数，做录入日志平台的条件
-           node_id:  db-actuator任务必须参数，做录入日志平台的条件
-           node_name: db-actuator任务必须参数，做录入日志平台的条件
-           get_mysql_payload_func : 表示获取执行 mysql的db-actuator 参数方法名称，对应MysqlActPayload类
-           exec_ip: 表示执行的ip节点
-           get_trans_data_ip_name: 表示从上下文获取到执行ip的变量名，对应单据的获取到上下文dataclass类
-           cluster: 操作的集群名称
-
-        }
+        拼接某个ip执行db-actuator的模板参数，payload已转换为base64格式
+        @param ip: 执行的ip
+        @param cluster: 该ip操作的集群信息，为空则使用kwargs["cluster"]
+        @param get_sys_users: 获取mysql系统账号列表的方法，多ip时复用查询结果
         """
-        global_data = data.get_one_of_inputs("global_data")
-        trans_data = data.get_one_of_inputs("trans_data")
-        kwargs = data.get_one_of_inputs("kwargs")
-
-        root_id = kwargs["root_id"]
-        node_name = kwargs["node_name"]
-        node_id = kwargs["node_id"]
-
-        exec_ips = self.__get_exec_ips(kwargs=kwargs, trans_data=trans_data)
-        if not exec_ips:
-            self.log_error(_("该节点获取到执行ip信息为空，请联系系统管理员{}").format(exec_ips))
-            return False
-
-        target_ip_info = [{"bk_cloud_id": kwargs["bk_cloud_id"], "ip": ip} for ip in exec_ips]
-
         # 获取mysql actuator 组件所需要执行的参数
         mysql_act_payload = MysqlActPayload(
             bk_cloud_id=kwargs["bk_cloud_id"],
             ticket_data=global_data,
-            cluster=kwargs.get("cluster", None),
+            cluster=cluster or kwargs.get("cluster", None),
             cluster_type=kwargs.get("cluster_type", None),
         )
-        if is_dataclass(trans_data):
-            trans_data = asdict(trans_data)
-
-        db_act_template = getattr(mysql_act_payload, kwargs["get_mysql_payload_func"])(
-            ip=exec_ips[0], trans_data=trans_data
-        )
-        db_act_template["root_id"] = root_id
-        db_act_template["node_id"] = node_id
+        db_act_template = getattr(mysql_act_payload, kwargs["get_mysql_payload_func"])(ip=ip, trans_data=trans_data)
+        db_act_template["root_id"] = kwargs["root_id"]
+        db_act_template["node_id"] = kwargs["node_id"]
         db_act_template["version_id"] = self._runtime_attrs.get("version")
         db_act_template["uid"] = global_data["uid"]
         if "general" in db_act_template["payload"]:
             db_act_template["payload"]["general"].update(
-                {"runtime_extend": {"mysql_sys_users": get_mysql_sys_users(kwargs["bk_cloud_id"])}}
+                {"runtime_extend": {"mysql_sys_users": get_sys_users(kwargs["bk_cloud_id"])}}
             )
 
         # mycnf_configs 参数很多，放到非敏感参数去处理
@@ -117,20 +98,67 @@ class ExecuteDBActuatorScriptService(BkJobService):
 
         # payload参数转换base64格式
         db_act_template["payload"] = base64_encode(json.dumps(db_act_template["payload"]))
+        return db_act_template
+
+    @staticmethod
+    def _multi_ip_script_param(ip_templates: dict) -> str:
+        """多ip聚合模式的脚本参数，格式为 "{ip},{payload},{non_sensitive_payload}"，多个ip以空格分隔"""
+        return " ".join(
+            f"{ip},{ip_template['payload']},{ip_template['non_sensitive_payload']}"
+            for ip, ip_template in ip_templates.items()
+        )
 
-        FlowNode.objects.filter(root_id=kwargs["root_id"], node_id=node_id).update(hosts=exec_ips)
+    def _split_ip_batches(self, ip_templates: dict) -> List[List[str]]:
+        """
+        按job脚本参数的长度上限把ip切分为多批，每批下发一个job任务
+        单个ip的参数已超过上限时单独成批
+        """
+        # 脚本参数base64编码后的长度约为原来的4/3
+        max_length = env.JOB_SCRIPT_PARAM_MAX_LENGTH * 3 // 4
+        batches, length = [], 0
+        for ip, ip_template in ip_templates.items():
+            entry_length = len(self._multi_ip_script_param({ip: ip_template})) + 1
+            if not batches or length + entry_length > max_length:
+                batches.append([])
+                length = 0
+            batches[-1].append(ip)
+            length += entry_length
+        return batches
 
-        # 脚本内容
-        jinja_env = Environment()
-        template = jinja_env.from_string(actuator_template)
+    def _get_ip_templates(self, data, ips: list) -> dict:
+        """多ip聚合模式下，根据 cluster_map 对每个ip分别拼接db-actuator的模板参数"""
+        global_data = data.get_one_of_inputs("global_data")
+        trans_data = data.get_one_of_inputs("trans_data")
+        kwargs = data.get_one_of_inputs("kwargs")
+        if is_dataclass(trans_data):
+            trans_data = asdict(trans_data)
+
+        get_sys_users = functools.lru_cache()(get_mysql_sys_users)
+        cluster_map = kwargs.get("cluster_map") or {}
+        return {
+            ip: self._get_actuator_template(kwargs, global_data, trans_data, ip, cluster_map.get(ip), get_sys_users)
+            for ip in ips
+        }
+
+    def _fast_execute(self, data, exec_ips: list, db_act_template: dict, script_content: str, script_param: str):
+        """
+        下发fast_execute_script任务，记录任务结果和本次执行的ip，用于监听任务状态
+        @param exec_ips: 本次job任务执行的ip
+        @param db_act_template: 渲染脚本内容的模板参数
+        @param script_content: 脚本模板
+        @param script_param: 脚本参数，未经base64编码
+        """
+        kwargs = data.get_one_of_inputs("kwargs")
+        node_name = kwargs["node_name"]
+        node_id = kwargs["node_id"]
 
         body = {
             "bk_biz_id": env.JOB_BLUEKING_BIZ_ID,
             "task_name": f"DBM_{node_name}_{node_id}",
-            "script_content": base64_encode(template.render(db_act_template)),
+            "script_content": base64_encode(Environment().from_string(script_content).render(db_act_template)),
             "script_language": 1,
-            "target_server": {"ip_list": target_ip_info},
-            "script_param": base64_encode(json.dumps(db_act_template["payload"])),
+            "target_server": {"ip_list": [{"bk_cloud_id": kwargs["bk_cloud_id"], "ip": ip} for ip in exec_ips]},
+            "script_param": base64_encode(script_param),
         }
         # self.log_info("[{}] ready start task with body {}".format(node_name, body))
 
@@ -146,13 +174,132 @@ class ExecuteDBActuatorScriptService(BkJobService):
             # debug模式下打开
             common_kwargs["is_param_sensitive"] = 0
 
-        resp = JobApi.fast_execute_script({**common_kwargs, **body}, raw=True)
+        resp = JobApi.fast_execute_script({**common_kwargs, **body, **self.job_callback_payload()}, raw=True)
         self.log_info(f"{node_name} fast execute script response: {resp}")
         self.log_info(f"job url:{env.BK_JOB_URL}/api_execute/{resp['data']['job_instance_id']}")
 
         # 传入调用结果，并单调监听任务状态
         data.outputs.ext_result = resp
         data.outputs.exec_ips = exec_ips
+
+    def _fast_execute_ip_batch(self, data, ip_templates: dict):
+        """
+        多ip聚合模式下对一批ip下发job任务
+        单个ip时以单ip模式执行，不依赖主机识别本机ip，多个ip时由主机根据本机ip选择各自的payload
+        """
+        exec_ips = list(ip_templates)
+        if len(exec_ips) == 1:
+            db_act_template = ip_templates[exec_ips[0]]
+            self._fast_execute(
+                data, exec_ips, db_act_template, actuator_template, json.dumps(db_act_template["payload"])
+            )
+            return
+
+        db_act_template = {
+            **ip_templates[exec_ips[0]],
+            "payload_not_found_exit_code": MULTI_IP_PAYLOAD_NOT_FOUND_EXIT_CODE,
+        }
+        script_param = self._multi_ip_script_param(ip_templates)
+        self._fast_execute(data, exec_ips, db_act_template, multi_ip_actuator_template, script_param)
+
+    def _execute(self, data, parent_data) -> bool:
+        """
+        执行fast_execute_script脚本
+        global_data 单据全局变量，格式字典
+        trans_data  单据上下文
+        kwargs 字典传入格式：
+        {
+           root_id:  db-actuator任务必须参数，做录入日志平台的条件
+           node_id:  db-actuator任务必须参数，做录入日志平台的条件
+           node_name: db-actuator任务必须参数，做录入日志平台的条件
+           get_mysql_payload_func : 表示获取执行 mysql的db-actuator 参数方法名称，对应MysqlActPayload类
+           exec_ip: 表示执行的ip节点
+           multi_ip_payload: 是否对每个ip分别拼接payload，聚合为一个job任务执行
+           cluster_map: 多ip模式下每个ip各自的集群信息{ip: cluster}
+           get_trans_data_ip_name: 表示从上下文获取到执行ip的变量名，对应单据的获取到上下文dataclass类
+           cluster: 操作的集群名称
+
+        }
+        """
+        global_data = data.get_one_of_inputs("global_data")
+        trans_data = data.get_one_of_inputs("trans_data")
+        kwargs = data.get_one_of_inputs("kwargs")
+
+        root_id = kwargs["root_id"]
+        node_id = kwargs["node_id"]
+
+        exec_ips = self.__get_exec_ips(kwargs=kwargs, trans_data=trans_data)
+        if not exec_ips:
+            self.log_error(_("该节点获取到执行ip信息为空，请联系系统管理员{}").format(exec_ips))
+            return False
+
+        FlowNode.objects.filter(root_id=root_id, node_id=node_id).update(hosts=exec_ips)
+
+        if kwargs.get("multi_ip_payload"):
+            # 多ip聚合模式: 每个ip分别拼接payload，脚本参数携带所有ip的payload
+            # 脚本参数超过job的长度上限时拆分为多个job任务，在调度时依次下发
+            ip_templates = self._get_ip_templates(data, exec_ips)
+            ip_batches = self._split_ip_batches(ip_templates)
+            if len(ip_batches) > 1:
+                self.log_info(_("脚本参数超过长度上限，拆分为{}个job任务依次执行").format(len(ip_batches)))
+            data.outputs.pending_ip_batches = ip_batches[1:]
+            self._fast_execute_ip_batch(data, {ip: ip_templates[ip] for ip in ip_batches[0]})
+            return True
+
+        if is_dataclass(trans_data):
+            trans_data = asdict(trans_data)
+        get_sys_users = functools.lru_cache()(get_mysql_sys_users)
+        db_act_template = self._get_actuator_template(
+            kwargs, global_data, trans_data, exec_ips[0], None, get_sys_users
+        )
+        self._fast_execute(data, exec_ips, db_act_template, actuator_template, json.dumps(db_act_template["payload"]))
+        return True
+
+    def _get_payload_not_found_ips(self, data) -> List[str]:
+        """
+        多ip聚合的job任务失败时，获取未匹配到本机ip的主机
+        只有其余主机都执行成功，才能对这些主机回退为单ip模式，否则返回空列表
+        """
+        ext_result = data.get_one_of_outputs("ext_result")
+        exec_ips = data.get_one_of_outputs("exec_ips")
+        if len(exec_ips) < 2 or not ext_result["result"]:
+            return []
+
+        resp = self.__status__(ext_result["data"]["job_instance_id"])
+        if not resp["result"]:
+            return []
+        not_found_ips = []
+        for ip_result in resp["data"]["step_instance_list"][0].get("step_ip_result_list") or []:
+            if ip_result["exit_code"] == MULTI_IP_PAYLOAD_NOT_FOUND_EXIT_CODE:
+                not_found_ips.append(ip_result["ip"])
+            elif ip_result["status"] != JOB_IP_SUCCESS:
+                return []
+        return not_found_ips
+
+    def _schedule(self, data, parent_data, callback_data=None) -> bool:
+        result = super()._schedule(data, parent_data, callback_data)
+        pending_ip_batches = data.get_one_of_outputs("pending_ip_batches")
+        if pending_ip_batches is None or not self.is_schedule_finished():
+            return result
+
+        if not result:
+            # 未匹配到本机ip的主机(如NAT/VIP主机)，回退为单ip模式逐个下发
+            not_found_ips = self._get_payload_not_found_ips(data)
+            if not not_found_ips:
+                return False
+            self.log_info(_("主机{}未匹配到本机ip，回退为单ip模式重新执行").format(not_found_ips))
+            pending_ip_batches.extend([ip] for ip in not_found_ips)
+
+        if not pending_ip_batches:
+            return True
+
+        # 上一批执行完成，下发下一批job任务，节点继续调度
+        data.outputs.pending_ip_batches = pending_ip_batches[1:]
+        self._fast_execute_ip_batch(data, self._get_ip_templates(data, pending_ip_batches[0]))
+        self.clean_status()
+        if self.is_callback_mode:
+            ext_result = data.get_one_of_outputs("ext_result")
+            self.register_callback(data, ext_result["data"]["job_instance_id"] if ext_result["result"] else None)
         return True
 
 
@@ -9,6 +9,7 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 import copy
+import itertools
 import logging
 
 from django.utils.translation import ugettext as _
@@ -17,12 +18,17 @@ from pipeline.component_framework.component import Component
 from backend import env
 from backend.components import JobApi
 from backend.core import consts
-from backend.flow.consts import DBA_ROOT_USER, MediumFileTypeEnum
+from backend.flow.consts import DBA_ROOT_USER, SUCCESS_LIST, MediumFileTypeEnum
 from backend.flow.models import FlowNode
 from backend.flow.plugins.components.collections.common.base_service import BkJobService
+from backend.flow.utils.medium_inventory import MediumInventory
+from backend.utils.string import base64_encode
 
 logger = logging.getLogger("flow")
 
+# 在主机上校验介质md5的超时时间(秒)
+MEDIUM_VERIFY_TIMEOUT = 300
+
 
 class TransFileService(BkJobService):
     """
@@ -108,13 +114,148 @@ class TransFileService(BkJobService):
 
         if kwargs.get("job_timeout"):
             payload["timeout"] = kwargs["job_timeout"]
+
+        if not env.MEDIUM_INVENTORY_ENABLE or kwargs.get("file_type") == MediumFileTypeEnum.Server.value:
+            return self._transfer_medium(data, node_name, {"payload": payload, "missing_files": None})
+
+        # 根据主机介质清单，只下发主机上缺少或者md5不一致的介质
+        inventory_params = {
+            "bk_cloud_id": kwargs["bk_cloud_id"],
+            "file_list": kwargs["file_list"],
+            "target_path": payload["file_target_path"],
+            "account": payload["account_alias"],
+        }
+        inventory = MediumInventory(**inventory_params)
+        missing_files = inventory.get_missing_files(exec_ips) if inventory.md5s else None
+        transfer = {"payload": payload, "inventory": inventory_params, "missing_files": missing_files}
+        # 清单中记录的主机介质(包括只命中部分介质的主机)，复用前都需要先在主机上校验md5
+        cached_files = {
+            ip: [file for file in inventory.file_list if file not in files]
+            for ip, files in (missing_files or {}).items()
+        }
+        cached_files = {ip: files for ip, files in cached_files.items() if files}
+        if not cached_files:
+            return self._transfer_medium(data, node_name, transfer)
+
+        verify_files = set(itertools.chain(*cached_files.values()))
+        body = {
+            "bk_biz_id": env.JOB_BLUEKING_BIZ_ID,
+            "task_name": f"DBM_{node_name}_{node_id}_verify_medium",
+            "script_content": base64_encode(
+                inventory.verify_script([file for file in inventory.file_list if file in verify_files])
+            ),
+            "script_language": 1,
+            "target_server": {"ip_list": [{"bk_cloud_id": kwargs["bk_cloud_id"], "ip": ip} for ip in cached_files]},
+            "account_alias": DBA_ROOT_USER,
+            "timeout": MEDIUM_VERIFY_TIMEOUT,
+        }
+        self.log_info(_("[{}] 主机介质清单命中{}台主机，在主机上校验介质md5").format(node_name, len(cached_files)))
+        resp = JobApi.fast_execute_script({**body, **self.job_callback_payload()}, raw=True)
+        if not resp["result"]:
+            # 校验任务下发失败，回退为全量下发
+            self.log_warning(_("[{}] 校验介质md5失败，回退为全量下发: {}").format(node_name, resp.get("message")))
+            transfer["missing_files"] = {ip: inventory.file_list for ip in exec_ips}
+            return self._transfer_medium(data, node_name, transfer)
+
+        data.outputs.ext_result = resp
+        data.outputs.medium_transfer = transfer
+        data.outputs.medium_verify = {"ips": list(cached_files), "files": cached_files}
+        return True
+
+    def _transfer_medium(self, data, node_name: str, transfer: dict) -> bool:
+        """
+        请求job下发介质
+        @param transfer: 下发信息，missing_files 为每台主机需要下发的文件，为None表示全量下发
+        """
+        payload = copy.deepcopy(transfer["payload"])
+        missing_files = transfer["missing_files"]
+        if missing_files is not None:
+            # 同一个job任务只能向所有主机下发相同的文件，取需要下发的主机所缺文件的并集
+            transfer_ips = [ip for ip, files in missing_files.items() if files]
+            transfer_files = set(itertools.chain(*missing_files.values()))
+            transfer_files = [file for file in transfer["inventory"]["file_list"] if file in transfer_files]
+            if not transfer_ips:
+                self.log_info(_("[{}] 目标主机上已存在全部介质，跳过下发").format(node_name))
+                data.outputs.ext_result = True
+                return True
+
+            self.log_info(_("[{}] 根据主机介质清单，向{}台主机下发{}个文件").format(node_name, len(transfer_ips), len(transfer_files)))
+            bk_cloud_id = transfer["inventory"]["bk_cloud_id"]
+            payload["file_source_list"][0]["file_list"] = transfer_files
+            payload["target_server"]["ip_list"] = [{"bk_cloud_id": bk_cloud_id, "ip": ip} for ip in transfer_ips]
+            # 下发成功后据此更新主机介质清单
+            data.outputs.medium_transfer = {**transfer, "transfer_ips": transfer_ips, "transfer_files": transfer_files}
+
         # 请求传输
+        payload.update(self.job_callback_payload())
         resp = JobApi.fast_transfer_file(payload, raw=True)
 
         # 传入调用结果，并单调监听任务状态
         data.outputs.ext_result = resp
         return True
 
+    def _schedule_verify(self, data, kwargs: dict, medium_verify: dict) -> bool:
+        """等待md5校验任务结束，校验不通过的主机重新下发介质"""
+        ext_result = data.get_one_of_outputs("ext_result")
+        transfer = data.get_one_of_outputs("medium_transfer")
+        node_name = kwargs["node_name"]
+
+        job_instance_id = ext_result["data"]["job_instance_id"]
+        ip_dicts = [{"bk_cloud_id": kwargs["bk_cloud_id"], "ip": ip} for ip in medium_verify["ips"]]
+        resp = self.__poll_status__(job_instance_id, ip_dicts, need_log=True)
+        if resp is None:
+            return True
+        if not (resp["result"] and resp["data"]["finished"]):
+            if self.is_callback_mode:
+                self.register_callback(data, job_instance_id)
+            return True
+
+        inventory = MediumInventory(**transfer["inventory"])
+        verify_succeeded = resp["data"]["job_instance"]["status"] in SUCCESS_LIST
+        step_instance_id = resp["data"]["step_instance_list"][0]["step_instance_id"]
+        for ip_dict in ip_dicts:
+            ip, cached_files = ip_dict["ip"], medium_verify["files"][ip_dict["ip"]]
+            log = self.__log__(job_instance_id, step_instance_id, ip_dict) if verify_succeeded else {"result": False}
+            if log["result"]:
+                invalid_files = inventory.parse_verify_log(cached_files, log["data"]["log_content"])
+            else:
+                invalid_files = cached_files
+            if invalid_files:
+                self.log_info(_("[{}] 主机{}上的介质已失效: {}").format(node_name, ip, invalid_files))
+                inventory.discard(ip, invalid_files)
+                missing_files = set(transfer["missing_files"][ip]) | set(invalid_files)
+                transfer["missing_files"][ip] = [file for file in inventory.file_list if file in missing_files]
+
+            # 校验通过的介质刷新清单的过期时间
+            verified_files = [file for file in cached_files if file not in invalid_files]
+            if verified_files:
+                inventory.record([ip], verified_files)
+
+        data.outputs.medium_verify = None
+        self._transfer_medium(data, node_name, transfer)
+
+        ext_result = data.get_one_of_outputs("ext_result")
+        if isinstance(ext_result, bool):
+            self.finish_schedule()
+            return ext_result
+        if self.is_callback_mode:
+            self.register_callback(data, ext_result["data"]["job_instance_id"] if ext_result["result"] else None)
+        return True
+
+    def _schedule(self, data, parent_data, callback_data=None) -> bool:
+        kwargs = data.get_one_of_inputs("kwargs")
+        medium_verify = data.get_one_of_outputs("medium_verify")
+        if medium_verify:
+            return self._schedule_verify(data, kwargs, medium_verify)
+
+        result = super()._schedule(data, parent_data, callback_data)
+
+        # 下发成功后，更新主机介质清单
+        transfer = data.get_one_of_outputs("medium_transfer")
+        if result and self.is_schedule_finished() and transfer and transfer.get("transfer_ips"):
+            MediumInventory(**transfer["inventory"]).record(transfer["transfer_ips"], transfer["transfer_files"])
+        return result
+
 
 class TransFileComponent(Component):
     name = __name__
@@ -122,7 +122,9 @@ class ExecuteDBActuatorScriptService(BkJobService):
         self.log_info(
             "[{}] ready start task with body {} {}".format(node_name, redis_fast_execute_script_common_kwargs, body)
         )
-        resp = JobApi.fast_execute_script({**redis_fast_execute_script_common_kwargs, **body}, raw=True)
+        resp = JobApi.fast_execute_script(
+            {**redis_fast_execute_script_common_kwargs, **body, **self.job_callback_payload()}, raw=True
+        )
 
         # 传入调用结果，并单调监听任务状态
         data.outputs.ext_result = resp
@@ -48,6 +48,7 @@ class RedisTicketService(BaseService):
         # 初始化builder类
         builder = BuilderFactory.create_builder(ticket)
         builder.patch_ticket_detail()
+        builder.init_ticket_relations()
         builder.init_ticket_flows()
         TicketFlowManager(ticket=ticket).run_next_flow()
 
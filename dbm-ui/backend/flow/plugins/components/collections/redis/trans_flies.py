@@ -79,6 +79,7 @@ class TransFileService(BkJobService):
         FlowNode.objects.filter(root_id=root_id, node_id=node_id).update(hosts=exec_ips)
 
         # 请求传输
+        payload.update(self.job_callback_payload())
         retry_times = kwargs["cluster"].get("retry_times", 0) + 1
         for retry in range(0, retry_times):
             resp = JobApi.fast_transfer_file(payload, raw=True)
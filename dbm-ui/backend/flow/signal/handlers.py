@@ -19,6 +19,7 @@ from backend.db_dirty.handlers import DBDirtyMachineHandler
 from backend.flow.consts import StateType
 from backend.flow.engine.bamboo.engine import BambooEngine
 from backend.flow.models import FlowNode, FlowTree
+from backend.flow.utils.state_summary import FlowStateSummaryHandler
 from backend.ticket.constants import FlowCallbackType, FlowType, TicketFlowStatus
 from backend.ticket.flow_manager.inner import InnerFlow
 from backend.ticket.flow_manager.manager import TicketFlowManager
@@ -28,18 +29,19 @@ logger = logging.getLogger("flow")
 
 
 def post_set_state_signal_handler(sender, node_id, to_state, version, root_id, *args, **kwargs):
-    engine = BambooEngine(root_id=root_id)
-    pipeline_states = engine.get_pipeline_states().data
+    # 增量汇总流程状态，避免每次流转都重建整棵状态树
+    pipeline_state = FlowStateSummaryHandler.transit(root_id, node_id, to_state).pipeline_state
+    if pipeline_state is None:
+        # 汇总数据缺失(如升级前已启动的流程)，回退为查询完整状态树
+        pipeline_state = BambooEngine(root_id=root_id).get_pipeline_states().data[root_id]["state"]
 
     now = timezone.now()
     logger.debug(_("【状态信号捕获】{} root_id={}, node_id={}, status:{}").format(now, root_id, node_id, to_state))
+    node_fields = {"version_id": version, "status": to_state, "updated_at": now}
     if to_state == StateType.RUNNING:
         # 记录开始时间
-        FlowNode.objects.filter(root_id=root_id, node_id=node_id).update(started_at=now)
-
-    FlowNode.objects.filter(root_id=root_id, node_id=node_id).update(
-        version_id=version, status=to_state, updated_at=now
-    )
+        node_fields.update(started_at=now)
+    FlowNode.objects.filter(root_id=root_id, node_id=node_id).update(**node_fields)
     try:
         tree = FlowTree.objects.get(root_id=root_id)
     except FlowTree.DoesNotExist:
@@ -49,16 +51,16 @@ def post_set_state_signal_handler(sender, node_id, to_state, version, root_id, *
     # 流转当前的flow状态
     origin_tree_status = tree.status
     # 如果当前节点或者流程已失败，则状态为失败
-    if to_state == StateType.FAILED or pipeline_states[root_id]["state"] == StateType.FAILED:
+    if to_state == StateType.FAILED or pipeline_state == StateType.FAILED:
         target_tree_status = StateType.FAILED
     # 如果流程已撤销，则状态为撤销
-    elif pipeline_states[root_id]["state"] == StateType.REVOKED:
+    elif pipeline_state == StateType.REVOKED:
         target_tree_status = StateType.REVOKED
     # 如果当前节点和流程都已完成，则状态为完成
-    elif to_state == StateType.FINISHED and pipeline_states[root_id]["state"] == StateType.FINISHED:
+    elif to_state == StateType.FINISHED and pipeline_state == StateType.FINISHED:
         target_tree_status = StateType.FINISHED
     # 如果当前节点已完成，流程不处于完成态，则状态为进行
-    elif to_state == StateType.FINISHED and pipeline_states[root_id]["state"] != StateType.FINISHED:
+    elif to_state == StateType.FINISHED and pipeline_state != StateType.FINISHED:
         target_tree_status = StateType.RUNNING
     else:
         target_tree_status = to_state
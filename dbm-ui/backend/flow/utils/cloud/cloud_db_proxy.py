@@ -17,6 +17,7 @@ from django.utils.translation import ugettext as _
 
 from backend.db_proxy.constants import ExtensionServiceStatus, ExtensionType
 from backend.db_proxy.models import DBCloudProxy, DBExtension
+from backend.db_proxy.routing import CloudProxyRouter
 from backend.flow.consts import CloudServiceModuleName
 from backend.flow.utils.cloud.cloud_context_dataclass import (
     CloudDBHADetail,
@@ -150,6 +151,8 @@ class CloudDBProxy:
             self.cloud_base_replace(
                 new_host=nginx_host, old_host=old_nginx_host, change_module=CloudServiceModuleName.Nginx
             )
+        # update 不会触发信号，需要主动失效路由缓存
+        CloudProxyRouter.invalidate(self.bk_cloud_id)
 
         return True
 
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from backend import env
+from backend.components import JobApi
+from backend.flow.consts import SUCCESS_LIST
+from backend.utils.batch_request import request_multi_thread
+from backend.utils.redis import RedisConn
+
+logger = logging.getLogger("flow")
+
+# 正在轮询中的job任务，hash结构: {job_instance_id: {"ip_list": [...], "need_log": bool, "register_time": xxx}}
+JOB_POLLER_INFLIGHT_KEY = "flow_job_poller_inflight"
+# job任务状态缓存: {"resp": get_job_instance_status 的原始返回, "update_time": 写入时间}
+JOB_POLLER_STATUS_KEY = "flow_job_poller_status_{job_instance_id}"
+# job任务日志缓存，hash结构: {"{bk_cloud_id}:{ip}": log_content}
+JOB_POLLER_LOG_KEY = "flow_job_poller_log_{job_instance_id}"
+# 轮询互斥锁，避免上一轮未结束时重复轮询
+JOB_POLLER_LOCK_KEY = "flow_job_poller_lock"
+# 缓存过期时间
+JOB_POLLER_CACHE_EXPIRE = 30 * 60
+# 登记超过该时间仍未结束的任务不再轮询(节点被撤销/强制失败等场景)
+JOB_POLLER_INFLIGHT_EXPIRE = 24 * 60 * 60
+# 批量获取ip日志，job接口单次最多支持500个ip
+JOB_POLLER_LOG_BATCH_SIZE = 500
+
+
+class JobStatusPoller(object):
+    """
+    job任务状态的集中轮询器
+    - 节点在调度时将job_instance_id登记到inflight集合中，由周期任务统一查询状态
+    - 任务结束后通过 batch_get_job_instance_ip_log 批量拉取所有ip的日志
+    - 节点从redis缓存中读取状态和日志，缓存未就绪或者长时间未更新(轮询器未在工作)时，由节点回退为直接请求job
+    """
+
+    @staticmethod
+    def ip_key(ip_dict: Dict[str, Any]) -> str:
+        return f"{ip_dict['bk_cloud_id']}:{ip_dict['ip']}"
+
+    @classmethod
+    def register(cls, job_instance_id: int, ip_list: List[Dict[str, Any]], need_log: bool = False) -> float:
+        """
+        登记需要轮询的job任务，返回登记时间
+        @param job_instance_id: job任务id
+        @param ip_list: 任务执行的ip列表，用于批量拉取日志
+        @param need_log: 任务成功后是否需要拉取日志，任务失败时总是会拉取日志
+        """
+        register_time = time.time()
+        RedisConn.hset(
+            JOB_POLLER_INFLIGHT_KEY,
+            job_instance_id,
+            json.dumps({"ip_list": ip_list, "need_log": need_log, "register_time": register_time}),
+        )
+        return register_time
+
+    @classmethod
+    def get_register_time(cls, job_instance_id: int) -> Optional[float]:
+        info = RedisConn.hget(JOB_POLLER_INFLIGHT_KEY, job_instance_id)
+        return json.loads(info)["register_time"] if info else None
+
+    @classmethod
+    def is_stale(cls, register_time: Optional[float]) -> bool:
+        """登记后超过一定时间仍然没有状态缓存，认为轮询器未在工作"""
+        if not register_time:
+            return True
+        return time.time() - register_time > env.JOB_POLLER_STALE_SECONDS
+
+    @classmethod
+    def get_status(cls, job_instance_id: int) -> Optional[Dict]:
+        """
+        获取缓存的任务状态，没有缓存时返回None
+        未结束的状态超过 JOB_POLLER_STALE_SECONDS 没有更新时，认为轮询器未在工作，同样返回None
+        """
+        status = RedisConn.get(JOB_POLLER_STATUS_KEY.format(job_instance_id=job_instance_id))
+        if not status:
+            return None
+
+        status = json.loads(status)
+        resp = status["resp"]
+        if resp["result"] and resp["data"]["finished"]:
+            return resp
+        if time.time() - status["update_time"] > env.JOB_POLLER_STALE_SECONDS:
+            return None
+        return resp
+
+    @classmethod
+    def set_status(cls, job_instance_id: int, resp: Dict):
+        RedisConn.set(
+            JOB_POLLER_STATUS_KEY.format(job_instance_id=job_instance_id),
+            json.dumps({"resp": resp, "update_time": time.time()}),
+            ex=JOB_POLLER_CACHE_EXPIRE,
+        )
+
+    @classmethod
+    def get_ip_log(cls, job_instance_id: int, ip_dict: Dict[str, Any]) -> Optional[str]:
+        return RedisConn.hget(JOB_POLLER_LOG_KEY.format(job_instance_id=job_instance_id), cls.ip_key(ip_dict))
+
+    @classmethod
+    def fetch_status(cls, job_instance_ids: List[int]) -> Dict[int, Dict]:
+        """并发查询一批job任务的状态"""
+
+        def _get_status(job_instance_id):
+            payload = {
+                "bk_biz_id": env.JOB_BLUEKING_BIZ_ID,
+                "job_instance_id": job_instance_id,
+                "return_ip_result": True,
+            }
+            return job_instance_id, JobApi.get_job_instance_status(payload, raw=True)
+
+        params_list = [{"job_instance_id": job_instance_id} for job_instance_id in job_instance_ids]
+        results = request_multi_thread(_get_status, params_list, get_data=lambda x: x)
+        return {job_instance_id: resp for job_instance_id, resp in results}
+
+    @classmethod
+    def _fetch_ip_logs(cls, job_instance_id: int, step_instance_id: int, ip_list: List[Dict]) -> Dict[str, str]:
+        """批量拉取某个job任务所有ip的日志"""
+        ip_logs: Dict[str, str] = {}
+        for index in range(0, len(ip_list), JOB_POLLER_LOG_BATCH_SIZE):
+            payload = {
+                "bk_biz_id": env.JOB_BLUEKING_BIZ_ID,
+                "job_instance_id": job_instance_id,
+                "step_instance_id": step_instance_id,
+                "ip_list": ip_list[index : index + JOB_POLLER_LOG_BATCH_SIZE],
+            }
+            resp = JobApi.batch_get_job_instance_ip_log(payload, raw=True)
+            if not resp["result"]:
+                continue
+            for log in resp["data"].get("script_task_logs") or []:
+                ip_logs[cls.ip_key(log)] = log.get("log_content") or ""
+        return ip_logs
+
+    @classmethod
+    def poll(cls):
+        """轮询一次所有正在执行的job任务"""
+        if not RedisConn.set(JOB_POLLER_LOCK_KEY, 1, nx=True, ex=JOB_POLLER_CACHE_EXPIRE):
+            return
+
+        try:
+            inflight = RedisConn.hgetall(JOB_POLLER_INFLIGHT_KEY)
+            expired = [
+                job_instance_id
+                for job_instance_id, info in inflight.items()
+                if time.time() - json.loads(info)["register_time"] > JOB_POLLER_INFLIGHT_EXPIRE
+            ]
+            if expired:
+                RedisConn.hdel(JOB_POLLER_INFLIGHT_KEY, *expired)
+                inflight = {k: v for k, v in inflight.items() if k not in expired}
+            if not inflight:
+                return
+
+            status_map = cls.fetch_status([int(job_instance_id) for job_instance_id in inflight.keys()])
+            for job_instance_id, resp in status_map.items():
+                if not resp["result"]:
+                    continue
+
+                # 任务结束后先写入日志，再写入状态，保证节点读到结束态时日志已就绪
+                if resp["data"]["finished"]:
+                    info = json.loads(inflight[str(job_instance_id)])
+                    need_log = info["need_log"] or resp["data"]["job_instance"]["status"] not in SUCCESS_LIST
+                    step_instance_id = resp["data"]["step_instance_list"][0]["step_instance_id"]
+                    ip_logs = {}
+                    if need_log and info["ip_list"]:
+                        ip_logs = cls._fetch_ip_logs(job_instance_id, step_instance_id, info["ip_list"])
+                    if ip_logs:
+                        log_key = JOB_POLLER_LOG_KEY.format(job_instance_id=job_instance_id)
+                        RedisConn.hset(log_key, mapping=ip_logs)
+                        RedisConn.expire(log_key, JOB_POLLER_CACHE_EXPIRE)
+                    RedisConn.hdel(JOB_POLLER_INFLIGHT_KEY, job_instance_id)
+
+                cls.set_status(job_instance_id, resp)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.exception(f"job status poller failed: {e}")
+        finally:
+            RedisConn.delete(JOB_POLLER_LOCK_KEY)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import os
+import re
+from typing import Dict, List, Optional
+
+from backend import env
+from backend.db_package.registry import PackageRegistry
+from backend.utils.redis import RedisConn
+
+# 主机上已下发的介质，hash结构: {"{account}:{host_path}": md5}
+MEDIUM_INVENTORY_KEY = "flow_medium_inventory_{bk_cloud_id}_{ip}"
+# 清单过期时间，每次下发都会刷新
+MEDIUM_INVENTORY_EXPIRE = 7 * 24 * 60 * 60
+# md5sum 的输出格式: "{md5}  {path}"，job日志可能带有时间前缀
+MD5SUM_LINE_RE = re.compile(r"\b(?P<md5>[0-9a-fA-F]{32})\s+\*?(?P<path>/\S+)\s*$")
+
+
+class MediumInventory(object):
+    """
+    主机介质清单，记录每台主机上已下发介质的路径和md5
+    - 只有能在介质库中找到md5的文件才会纳入清单，其他文件(如sql文件)总是需要下发
+    - 清单只是加速手段，清单缺失或者过期只会导致重新下发；主机上的文件可能被清理，复用前需要在主机上校验md5
+    """
+
+    def __init__(self, bk_cloud_id: int, file_list: List[str], target_path: str, account: str):
+        """
+        @param bk_cloud_id: 云区域id
+        @param file_list: 制品库文件列表，格式为 {project}/{bucket}/{path}
+        @param target_path: 主机上的下发目录
+        @param account: 下发文件使用的账号，属主不同的文件不能复用
+        """
+        self.bk_cloud_id = bk_cloud_id
+        self.file_list = file_list
+        self.account = account
+        # 制品库文件 -> 主机上的文件路径
+        self.host_paths = {file: os.path.join(target_path, os.path.basename(file)) for file in file_list}
+        # 制品库文件 -> 介质md5，不在介质库中的文件不记录
+        self.md5s: Dict[str, str] = {}
+        repo_prefix = f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}/"
+        for file in file_list:
+            package = (
+                PackageRegistry.get_package_by_path(file[len(repo_prefix) :]) if file.startswith(repo_prefix) else None
+            )
+            if package and package.md5:
+                self.md5s[file] = package.md5
+
+    def _key(self, ip: str) -> str:
+        return MEDIUM_INVENTORY_KEY.format(bk_cloud_id=self.bk_cloud_id, ip=ip)
+
+    def _field(self, file: str) -> str:
+        return f"{self.account}:{self.host_paths[file]}"
+
+    def get_missing_files(self, ips: List[str]) -> Dict[str, List[str]]:
+        """
+        根据清单计算每台主机缺少(或md5不一致)的文件，返回 {ip: [file, ...]}
+        @param ips: 目标主机ip列表
+        """
+        pipeline = RedisConn.pipeline()
+        for ip in ips:
+            pipeline.hmget(self._key(ip), [self._field(file) for file in self.file_list])
+
+        missing_files: Dict[str, List[str]] = {}
+        for ip, md5s in zip(ips, pipeline.execute()):
+            missing_files[ip] = [
+                file for file, md5 in zip(self.file_list, md5s) if not self.md5s.get(file) or md5 != self.md5s[file]
+            ]
+        return missing_files
+
+    def record(self, ips: List[str], files: Optional[List[str]] = None):
+        """
+        记录主机上已下发的介质
+        @param ips: 主机ip列表
+        @param files: 已下发的文件，不指定则为全部文件
+        """
+        mapping = {self._field(file): self.md5s[file] for file in files or self.file_list if file in self.md5s}
+        if not mapping:
+            return
+
+        pipeline = RedisConn.pipeline()
+        for ip in ips:
+            pipeline.hset(self._key(ip), mapping=mapping)
+            pipeline.expire(self._key(ip), MEDIUM_INVENTORY_EXPIRE)
+        pipeline.execute()
+
+    def discard(self, ip: str, files: List[str]):
+        """从清单中移除主机上已失效的介质"""
+        if files:
+            RedisConn.hdel(self._key(ip), *[self._field(file) for file in files])
+
+    def verify_script(self, files: List[str]) -> str:
+        """在主机上计算文件md5的脚本，文件不存在时不输出，脚本总是执行成功"""
+        host_paths = " ".join(self.host_paths[file] for file in files)
+        return f"md5sum {host_paths} 2>/dev/null\nexit 0\n"
+
+    def parse_verify_log(self, files: List[str], log_content: str) -> List[str]:
+        """
+        解析校验脚本的输出，返回主机上缺少或者md5不一致的文件
+        @param files: 校验的文件
+        @param log_content: 校验脚本在该主机上的输出
+        """
+        host_md5s = {}
+        for line in (log_content or "").splitlines():
+            match = MD5SUM_LINE_RE.search(line.strip())
+            if match:
+                host_md5s[match.group("path")] = match.group("md5").lower()
+        return [file for file in files if host_md5s.get(self.host_paths[file]) != self.md5s.get(file, "").lower()]
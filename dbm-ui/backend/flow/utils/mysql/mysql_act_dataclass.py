@@ -44,6 +44,8 @@ class ExecActuatorBaseKwargs:
     cluster: dict = field(default_factory=dict)  # 表示单据执行的集群信息，比如集群名称，集群域名等
     job_timeout: int = DEFAULT_JOB_TIMEOUT
     write_op: str = None
+    multi_ip_payload: bool = False  # 为True时对每个ip分别拼接payload，通过一个job任务下发到所有ip，每个ip执行各自的payload
+    cluster_map: dict = field(default_factory=dict)  # 多ip模式下每个ip各自的集群信息{ip: cluster}，未指定的ip使用cluster
 
 
 @dataclass()
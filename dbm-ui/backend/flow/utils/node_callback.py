@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Union
+
+from bamboo_engine import api, states
+from django.utils.translation import ugettext_lazy as _
+from pipeline.eri.runtime import BambooDjangoRuntime
+
+from backend import env
+from backend.components.sops.client import BkSopsApi
+from backend.flow.utils.job_poller import JobStatusPoller
+from backend.utils.redis import RedisConn
+from blue_krill.data_types.enum import EnumField, StructuredEnum
+
+logger = logging.getLogger("flow")
+
+# 等待回调的节点，hash结构: {"{source}:{task_id}": {"node_id": xx, "version": xx, "next_poll_time": xx, ...}}
+FLOW_NODE_CALLBACK_KEY = "flow_node_callback_waiting"
+# 兜底轮询的锁
+FLOW_NODE_CALLBACK_LOCK_KEY = "flow_node_callback_lock"
+
+# 登记信息未变化时才更新，避免覆盖期间已被回调删除或者重新登记的节点
+# KEYS[1]: 等待回调的key; ARGV: field, 读取到的登记信息, 新的登记信息
+FLOW_NODE_CALLBACK_UPDATE_SCRIPT = """
+if redis.call('HGET', KEYS[1], ARGV[1]) == ARGV[2] then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[3])
+    return 1
+end
+return 0
+"""
+
+
+class CallbackSource(str, StructuredEnum):
+    JOB = EnumField("job", _("作业平台"))
+    SOPS = EnumField("sops", _("标准运维"))
+
+
+class NodeCallbackHandler(object):
+    """
+    回调模式下的flow节点唤醒器
+    - 节点执行后登记 (来源, 任务id) -> (node_id, version)，随后进入休眠，不再占用调度队列
+    - 作业平台/标准运维通过回调地址通知任务结束，或者兜底轮询发现任务结束时，回调唤醒节点
+    - 兜底轮询采用指数退避，避免长任务(备份、数据拷贝等)持续高频轮询
+    - 未向外部平台传入回调地址的节点不会收到回调，只能依赖兜底轮询，采用固定的短间隔
+    """
+
+    _update_script = None
+
+    @classmethod
+    def _update_waiting(cls, field: str, old_waiting: str, new_waiting: str) -> bool:
+        """登记信息未变化时更新，返回是否更新成功"""
+        if cls._update_script is None:
+            cls._update_script = RedisConn.register_script(FLOW_NODE_CALLBACK_UPDATE_SCRIPT)
+        return bool(cls._update_script(keys=[FLOW_NODE_CALLBACK_KEY], args=[field, old_waiting, new_waiting]))
+
+    @staticmethod
+    def _field(source: str, task_id: Union[int, str]) -> str:
+        return f"{source}:{task_id}"
+
+    @classmethod
+    def register(
+        cls,
+        source: str,
+        task_id: Optional[Union[int, str]],
+        node_id: str,
+        version: str,
+        extra: Optional[Dict[str, Any]] = None,
+        notify: bool = True,
+    ):
+        """
+        登记等待回调的节点
+        @param source: 回调来源
+        @param task_id: 任务id，为空表示节点无需等待外部任务，下次轮询时会立即唤醒
+        @param node_id: 节点id
+        @param version: 节点执行版本
+        @param extra: 兜底轮询需要的额外信息，如标准运维的bk_biz_id
+        @param notify: 外部平台是否会回调，不会回调时兜底轮询采用固定间隔
+        """
+        waiting = {
+            "node_id": node_id,
+            "version": version,
+            "extra": extra or {},
+            "notify": notify,
+            "poll_times": 0,
+            "next_poll_time": time.time() + (env.FLOW_CALLBACK_POLL_BASE_INTERVAL if task_id else 0),
+        }
+        RedisConn.hset(FLOW_NODE_CALLBACK_KEY, cls._field(source, task_id or node_id), json.dumps(waiting))
+
+    @classmethod
+    def callback(cls, source: str, task_id: Union[int, str], data: Optional[Dict] = None) -> bool:
+        """唤醒等待该任务的节点，返回是否唤醒成功"""
+        field = cls._field(source, task_id)
+        waiting = RedisConn.hget(FLOW_NODE_CALLBACK_KEY, field)
+        # 回调和兜底轮询可能同时到达，只允许一方唤醒节点
+        if not waiting or not RedisConn.hdel(FLOW_NODE_CALLBACK_KEY, field):
+            return False
+
+        raw_waiting, waiting = waiting, json.loads(waiting)
+        try:
+            result = api.callback(
+                runtime=BambooDjangoRuntime(),
+                node_id=waiting["node_id"],
+                version=waiting["version"],
+                data={"source": source, "task_id": task_id, **(data or {})},
+            )
+        except Exception:
+            # 唤醒失败时恢复登记，由兜底轮询继续尝试唤醒，避免节点永远休眠。节点期间已重新登记则不覆盖
+            RedisConn.hsetnx(FLOW_NODE_CALLBACK_KEY, field, raw_waiting)
+            raise
+        if not result.result:
+            # 节点已被重试/跳过/撤销，无需再唤醒
+            logger.warning(f"callback node {waiting['node_id']} ignored: {result.message}")
+        return result.result
+
+    @classmethod
+    def _due_waitings(cls) -> Dict[str, List]:
+        """
+        获取到达轮询时间的节点，并计算下一次轮询时间：会收到回调的节点按照指数退避，否则固定间隔
+        读取后已被回调删除或者重新登记的节点，不再轮询也不覆盖
+        """
+        now = time.time()
+        due_waitings: Dict[str, List] = {source: [] for source in CallbackSource.get_values()}
+        for field, raw_waiting in RedisConn.hgetall(FLOW_NODE_CALLBACK_KEY).items():
+            waiting = json.loads(raw_waiting)
+            if waiting["next_poll_time"] > now:
+                continue
+
+            waiting["poll_times"] += 1
+            interval = env.FLOW_CALLBACK_POLL_BASE_INTERVAL
+            if waiting.get("notify", True):
+                interval = min(interval * 2 ** waiting["poll_times"], env.FLOW_CALLBACK_POLL_MAX_INTERVAL)
+            waiting["next_poll_time"] = now + interval
+            if not cls._update_waiting(field, raw_waiting, json.dumps(waiting)):
+                continue
+
+            source, task_id = field.split(":", 1)
+            due_waitings[source].append((task_id, waiting))
+
+        return due_waitings
+
+    @classmethod
+    def poll(cls):
+        """兜底轮询：对迟迟没有收到回调的节点，主动查询任务状态，结束则唤醒节点"""
+        if not RedisConn.set(FLOW_NODE_CALLBACK_LOCK_KEY, 1, nx=True, ex=env.FLOW_CALLBACK_POLL_MAX_INTERVAL):
+            return
+
+        try:
+            due_waitings = cls._due_waitings()
+
+            # 无需等待外部任务的节点，直接唤醒
+            job_instance_ids = []
+            for task_id, waiting in due_waitings[CallbackSource.JOB.value]:
+                if task_id == waiting["node_id"]:
+                    cls.callback(CallbackSource.JOB.value, task_id)
+                else:
+                    job_instance_ids.append(int(task_id))
+
+            for job_instance_id, resp in JobStatusPoller.fetch_status(job_instance_ids).items():
+                if resp["result"] and resp["data"]["finished"]:
+                    # 缓存job任务状态，节点被唤醒后直接读取，无需再次请求job
+                    JobStatusPoller.set_status(job_instance_id, resp)
+                    cls.callback(CallbackSource.JOB.value, job_instance_id)
+
+            for task_id, waiting in due_waitings[CallbackSource.SOPS.value]:
+                if task_id == waiting["node_id"]:
+                    cls.callback(CallbackSource.SOPS.value, task_id)
+                    continue
+                params = {"bk_biz_id": waiting["extra"]["bk_biz_id"], "task_id": task_id, "with_ex_data": True}
+                state = BkSopsApi.get_task_status(params).get("state", states.RUNNING)
+                if state in [states.FINISHED, states.FAILED, states.REVOKED, states.SUSPENDED]:
+                    cls.callback(CallbackSource.SOPS.value, task_id)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.exception(f"flow node callback poll failed: {e}")
+        finally:
+            RedisConn.delete(FLOW_NODE_CALLBACK_LOCK_KEY)
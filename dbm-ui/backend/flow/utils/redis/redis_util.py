@@ -11,7 +11,7 @@ specific language governing permissions and limitations under the License.
 import re
 
 from backend.configuration.constants import DBType
-from backend.db_package.models import Package
+from backend.db_package.registry import PackageRegistry
 from backend.flow.consts import MediumEnum
 
 
@@ -107,5 +107,5 @@ def get_latest_redis_package_by_version(db_version):
         pkg_type = MediumEnum.TendisSsd
     if db_version.startswith("Tendisplus"):
         pkg_type = MediumEnum.TendisPlus
-    redis_pkg = Package.get_latest_package(version=db_version, pkg_type=pkg_type, db_type=DBType.Redis)
+    redis_pkg = PackageRegistry.get_latest_package(version=db_version, pkg_type=pkg_type, db_type=DBType.Redis)
     return redis_pkg
@@ -39,6 +39,46 @@ chmod +x dbactuator
 ./dbactuator {{db_type}} {{action}} --uid {{uid}} --root_id {{root_id}} --node_id {{node_id}} --version_id {{version_id}} -c {{non_sensitive_payload}} --payload $1 
 """  # noqa
 
+# 多ip聚合模式下主机未匹配到本机ip(如NAT/VIP主机)时的退出码，节点据此对这些主机回退为单ip模式重新下发
+MULTI_IP_PAYLOAD_NOT_FOUND_EXIT_CODE = 3
+
+# 多ip聚合执行mysql actuator的shell命令，一个job任务下发到所有主机
+# 脚本参数为多个 "{ip},{payload},{non_sensitive_payload}"，每台主机根据本机ip选择各自的参数执行
+multi_ip_actuator_template = """
+local_ips=" $(hostname -I 2>/dev/null) $(ip -o addr show 2>/dev/null | awk '{split($4, a, "/"); printf a[1] " "}') "
+payload=""
+non_sensitive_payload=""
+for arg in "$@"; do
+   ip=${arg%%,*}
+   if [[ "${local_ips}" == *" ${ip} "* ]];then
+      params=${arg#*,}
+      payload=${params%%,*}
+      non_sensitive_payload=${params#*,}
+      break
+   fi
+done
+if [[ -z "${payload}" ]];then
+   echo "no payload found for local ips: ${local_ips}"
+   exit {{payload_not_found_exit_code}}
+fi
+
+mkdir -p /data/install/dbactuator-{{uid}}/logs
+if [[ ! -f /data/install/dbactuator-{{uid}}/dbactuator ]];then
+   cp /data/install/dbactuator /data/install/dbactuator-{{uid}}
+
+else
+   md5_1=`md5sum /data/install/dbactuator | cut -d ' ' -f1 `
+   md5_2=`md5sum /data/install/dbactuator-{{uid}}/dbactuator | cut -d ' ' -f1`
+   if [[ ${md5_1} != ${md5_2} ]];then
+      cp /data/install/dbactuator /data/install/dbactuator-{{uid}}
+   fi
+fi
+
+cd /data/install/dbactuator-{{uid}}
+chmod +x dbactuator
+./dbactuator {{db_type}} {{action}} --uid {{uid}} --root_id {{root_id}} --node_id {{node_id}} --version_id {{version_id}} -c ${non_sensitive_payload} --payload ${payload}
+"""  # noqa
+
 # 运行dba_toolkit的命令
 dba_toolkit_actuator_template = """
 cd /home/mysql/dba-toolkit
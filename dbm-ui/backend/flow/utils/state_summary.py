@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+from backend.flow.consts import StateType
+from backend.utils.redis import RedisConn
+
+# 流程状态汇总，hash结构: {"node:{node_id}": state, "count:{state}": 处于该状态的节点数}
+FLOW_STATE_SUMMARY_KEY = "flow_state_summary_{root_id}"
+# 汇总数据过期时间，每次状态流转都会刷新
+FLOW_STATE_SUMMARY_EXPIRE = 7 * 24 * 60 * 60
+
+# 原子地记录节点的新状态，并调整新旧状态的计数，返回根节点状态和异常节点计数
+# KEYS[1]: 汇总key; ARGV: node_id, to_state, root_id, expire
+FLOW_STATE_TRANSITION_SCRIPT = """
+local node_field = 'node:' .. ARGV[1]
+local old_state = redis.call('HGET', KEYS[1], node_field)
+if old_state then
+    redis.call('HINCRBY', KEYS[1], 'count:' .. old_state, -1)
+end
+redis.call('HSET', KEYS[1], node_field, ARGV[2])
+redis.call('HINCRBY', KEYS[1], 'count:' .. ARGV[2], 1)
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return redis.call(
+    'HMGET', KEYS[1], 'node:' .. ARGV[3], 'count:FAILED', 'count:REVOKED', 'count:SUSPENDED', 'count:RUNNING',
+    'count:FINISHED'
+)
+"""
+
+
+@dataclass
+class FlowStateSummary:
+    root_state: Optional[str]
+    failed: int = 0
+    revoked: int = 0
+    suspended: int = 0
+    running: int = 0
+    finished: int = 0
+
+    @property
+    def pipeline_state(self) -> Optional[str]:
+        """
+        推导流程的整体状态，与 BambooEngine.get_pipeline_states 格式化后的根节点状态保持一致：
+        根节点运行中时，若存在失败/撤销/暂停的节点，则流程状态分别视为失败/撤销/暂停
+        """
+        if self.root_state != StateType.RUNNING:
+            return self.root_state
+        if self.failed > 0:
+            return StateType.FAILED.value
+        if self.revoked > 0:
+            return StateType.REVOKED.value
+        if self.suspended > 0:
+            return StateType.SUSPENDED.value
+        return self.root_state
+
+
+class FlowStateSummaryHandler(object):
+    """
+    流程状态的增量汇总
+    - 每次节点状态流转时，在redis中记录节点的当前状态，并对新旧状态的节点计数做加减，复杂度O(1)
+    - 流程状态由根节点状态和计数推导得到，无需每次都重建并格式化整棵状态树
+    """
+
+    _script = None
+
+    @classmethod
+    def _transition_script(cls):
+        if cls._script is None:
+            cls._script = RedisConn.register_script(FLOW_STATE_TRANSITION_SCRIPT)
+        return cls._script
+
+    @classmethod
+    def transit(cls, root_id: str, node_id: str, to_state: str) -> FlowStateSummary:
+        """
+        记录节点的状态流转，并返回流转后的流程状态汇总
+        @param root_id: 流程id
+        @param node_id: 节点id
+        @param to_state: 节点流转后的状态
+        """
+        root_state, failed, revoked, suspended, running, finished = cls._transition_script()(
+            keys=[FLOW_STATE_SUMMARY_KEY.format(root_id=root_id)],
+            args=[node_id, to_state, root_id, FLOW_STATE_SUMMARY_EXPIRE],
+        )
+        return FlowStateSummary(
+            root_state=root_state,
+            failed=int(failed or 0),
+            revoked=int(revoked or 0),
+            suspended=int(suspended or 0),
+            running=int(running or 0),
+            finished=int(finished or 0),
+        )
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import json
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from backend.components.bklog.handler import BKLogHandler
+
+LOG_TOTAL = 2500
+
+
+class EsQuerySearchMock(object):
+    """模拟日志平台按照 search_after 分页返回日志"""
+
+    def __init__(self, with_sort: bool = True):
+        self.with_sort = with_sort
+        self.call_times = 0
+        self.hits = [
+            {"_source": {"log": json.dumps({"ClusterId": idx % 3, "Index": idx})}, "sort": [idx]}
+            for idx in range(LOG_TOTAL)
+        ]
+
+    def __call__(self, params, use_admin=False):
+        self.call_times += 1
+        begin = params["search_after"][0] + 1 if params.get("search_after") else params["start"]
+        hits = self.hits[begin : begin + params["size"]]
+        if not self.with_sort:
+            hits = [{"_source": hit["_source"]} for hit in hits]
+        return {"hits": {"hits": hits}}
+
+
+class TestBKLogHandler:
+    end_time = datetime.now()
+    start_time = end_time - timedelta(days=1)
+
+    def test_iter_logs_without_truncation(self):
+        for with_sort in [True, False]:
+            esquery_search = EsQuerySearchMock(with_sort=with_sort)
+            with patch("backend.components.bklog.handler.BKLogApi.esquery_search", esquery_search):
+                logs = list(BKLogHandler.iter_logs("test", self.start_time, self.end_time, page_size=1000))
+            assert [log["index"] for log in logs] == list(range(LOG_TOTAL))
+            assert esquery_search.call_times == 3
+
+    def test_query_logs_limit(self):
+        with patch("backend.components.bklog.handler.BKLogApi.esquery_search", EsQuerySearchMock()):
+            logs = BKLogHandler.query_logs("test", self.start_time, self.end_time, size=1200)
+        assert len(logs) == 1200
+
+    def test_query_logs_group_by(self):
+        with patch("backend.components.bklog.handler.BKLogApi.esquery_search", EsQuerySearchMock()):
+            grouped_logs = BKLogHandler.query_logs_group_by(
+                "test", self.start_time, self.end_time, group_key="cluster_id"
+            )
+        assert set(grouped_logs.keys()) == {0, 1, 2}
+        assert sum(len(logs) for logs in grouped_logs.values()) == LOG_TOTAL
+
+    def test_iter_hits_after_cursor(self):
+        esquery_search = EsQuerySearchMock()
+        with patch("backend.components.bklog.handler.BKLogApi.esquery_search", esquery_search):
+            hits = list(BKLogHandler.iter_hits("test", self.start_time, self.end_time, search_after=[LOG_TOTAL - 11]))
+        assert [BKLogHandler.hit_sort_key(hit) for hit in hits] == [[idx] for idx in range(LOG_TOTAL - 10, LOG_TOTAL)]
+        assert esquery_search.call_times == 1
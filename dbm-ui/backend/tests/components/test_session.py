@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import os
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from backend.components.session import SessionPool
+
+
+@pytest.fixture(autouse=True)
+def session_pool():
+    with patch.dict(SessionPool._sessions, clear=True):
+        SessionPool.clear()
+        yield
+        SessionPool.clear()
+
+
+class TestSessionPool:
+    def test_reuse_by_host(self):
+        session = SessionPool.get_session("http://127.0.0.1:8000/api/a/", module="cc")
+        # 同一个 scheme://host:port 复用session，路径和参数不影响
+        assert SessionPool.get_session("http://127.0.0.1:8000/api/b/?x=1", module="cc") is session
+        assert SessionPool.get_session("https://127.0.0.1:8000/api/a/", module="cc") is not session
+        assert SessionPool.get_session("http://127.0.0.1:8001/api/a/", module="cc") is not session
+
+    def test_isolated_by_pid(self):
+        session = SessionPool.get_session("http://127.0.0.1:8000/", module="cc")
+
+        # fork出的子进程不复用父进程的session
+        with patch("backend.components.session.os.getpid", return_value=os.getpid() + 1):
+            child_session = SessionPool.get_session("http://127.0.0.1:8000/", module="cc")
+            assert child_session is not session
+
+            # 子进程清理时只清理自己的session
+            SessionPool.clear()
+            assert (os.getpid(), "http://127.0.0.1:8000") in SessionPool._sessions
+            assert SessionPool.get_session("http://127.0.0.1:8000/", module="cc") is not child_session
+
+        assert SessionPool.get_session("http://127.0.0.1:8000/", module="cc") is session
+
+    def test_stats(self):
+        SessionPool.get_session("http://127.0.0.1:8000/", module="cc")
+        SessionPool.get_session("http://127.0.0.1:8000/", module="cc")
+        SessionPool.get_session("http://127.0.0.1:8000/", module="job")
+        SessionPool.get_session("http://127.0.0.1:8001/", module="job")
+        assert SessionPool.get_stats() == {"cc": {"hit": 1, "miss": 1}, "job": {"hit": 1, "miss": 1}}
+
+        SessionPool.clear()
+        assert SessionPool.get_stats() == {}
+
+    def test_concurrent_stats(self):
+        thread_num, times = 8, 200
+
+        def _get_session():
+            for __ in range(times):
+                SessionPool.get_session("http://127.0.0.1:8000/", module="cc")
+
+        threads = [threading.Thread(target=_get_session) for __ in range(thread_num)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 并发获取时只创建一个session，计数不丢失
+        stats = SessionPool.get_stats()["cc"]
+        assert stats == {"hit": thread_num * times - 1, "miss": 1}
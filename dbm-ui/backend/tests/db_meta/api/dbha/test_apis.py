@@ -11,12 +11,15 @@ specific language governing permissions and limitations under the License.
 import ipaddress
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.exceptions import ValidationError
 
 from backend.constants import IP_PORT_DIVIDER
 from backend.db_meta import api, models
 from backend.db_meta.enums import (
     AccessLayer,
+    ClusterEntryType,
     ClusterPhase,
     ClusterStatus,
     ClusterType,
@@ -25,6 +28,7 @@ from backend.db_meta.enums import (
     InstanceStatus,
     MachineType,
 )
+from backend.db_meta.exceptions import ClusterNotExistException
 from backend.tests.mock_data import constant
 from backend.tests.mock_data.components import cc
 
@@ -38,6 +42,10 @@ TEST_STORAGE_PORT1 = 20000
 TEST_STORAGE_PORT2 = 20001
 TEST_STORAGE_PORT3 = 20002
 
+# 批量更新状态的压测规模: 机器数 * 每台机器的实例数
+BULK_MACHINE_COUNT = 50
+BULK_INSTANCE_PER_MACHINE = 100
+
 
 @pytest.fixture
 def dbha_fixture(create_city):
@@ -133,10 +141,108 @@ def dbha_fixture(create_city):
     cluster.proxyinstance_set.add(p1, p2, p3)
 
 
+@pytest.fixture
+def dbha_bulk_fixture(create_city):
+    city = models.BKCity.objects.get(bk_idc_city_name="南京")
+    ips = [f"10.100.{i // 250}.{i % 250 + 1}" for i in range(BULK_MACHINE_COUNT)]
+    models.Machine.objects.bulk_create(
+        [
+            models.Machine(
+                ip=ip,
+                bk_biz_id=constant.BK_BIZ_ID,
+                machine_type=MachineType.BACKEND,
+                access_layer=AccessLayer.STORAGE,
+                bk_city=city,
+                bk_host_id=int(ipaddress.IPv4Address(ip)),
+            )
+            for ip in ips
+        ]
+    )
+    machines = models.Machine.objects.filter(ip__in=ips)
+    models.StorageInstance.objects.bulk_create(
+        [
+            models.StorageInstance(
+                port=TEST_STORAGE_PORT1 + i,
+                machine=machine,
+                status=InstanceStatus.RUNNING,
+                instance_role=InstanceRole.BACKEND_MASTER,
+                instance_inner_role=InstanceInnerRole.MASTER,
+            )
+            for machine in machines
+            for i in range(BULK_INSTANCE_PER_MACHINE)
+        ]
+    )
+    cluster = models.Cluster.objects.create(
+        bk_biz_id=constant.BK_BIZ_ID,
+        name=constant.CLUSTER_NAME,
+        db_module_id=constant.DB_MODULE_ID,
+        immute_domain=constant.CLUSTER_IMMUTE_DOMAIN,
+        cluster_type=ClusterType.TenDBCluster.value,
+        phase=ClusterPhase.ONLINE.value,
+        status=ClusterStatus.NORMAL.value,
+    )
+    cluster.storageinstance_set.add(*models.StorageInstance.objects.filter(machine__ip__in=ips))
+    return ips
+
+
+@pytest.fixture
+def entry_detail_fixture(dbha_fixture):
+    proxies = list(models.ProxyInstance.objects.filter(machine__ip=cc.NORMAL_IP))
+    storage = models.StorageInstance.objects.get(machine__ip=cc.NORMAL_IP2, port=TEST_STORAGE_PORT1)
+    domains = []
+    for i in range(5):
+        cluster = models.Cluster.objects.create(
+            bk_biz_id=constant.BK_BIZ_ID,
+            name=f"entry_detail_cluster{i}",
+            db_module_id=constant.DB_MODULE_ID,
+            immute_domain=f"entry{i}.{constant.CLUSTER_IMMUTE_DOMAIN}",
+            cluster_type=ClusterType.TenDBHA.value,
+            phase=ClusterPhase.ONLINE.value,
+            status=ClusterStatus.NORMAL.value,
+        )
+        proxy_entry = models.ClusterEntry.objects.create(
+            cluster=cluster, cluster_entry_type=ClusterEntryType.DNS, entry=cluster.immute_domain
+        )
+        proxy_entry.proxyinstance_set.add(*proxies)
+        storage_entry = models.ClusterEntry.objects.create(
+            cluster=cluster, cluster_entry_type=ClusterEntryType.DNS, entry=f"slave.{cluster.immute_domain}"
+        )
+        storage_entry.storageinstance_set.add(storage)
+        clb_entry = models.ClusterEntry.objects.create(
+            cluster=cluster, cluster_entry_type=ClusterEntryType.CLB, entry=f"1.1.1.{i}"
+        )
+        models.CLBEntryDetail.objects.create(entry=clb_entry, clb_ip=f"1.1.1.{i}", clb_id=f"lb-{i}")
+        domains.append(cluster.immute_domain)
+    return domains
+
+
 class TestDBHA:
     def test_cities(self, dbha_fixture):
         assert len(api.dbha.cities()) > 0
 
+    def test_entry_detail(self, entry_detail_fixture):
+        entries = api.dbha.entry_detail(entry_detail_fixture[:1])
+        domain = entry_detail_fixture[0]
+        dns_entries = {ele["domain"]: ele for ele in entries[domain][ClusterEntryType.DNS]}
+        assert dns_entries[domain]["bind_ips"] == [cc.NORMAL_IP]
+        assert dns_entries[f"slave.{domain}"]["bind_ips"] == [cc.NORMAL_IP2]
+        assert dns_entries[f"slave.{domain}"]["bind_port"] == TEST_STORAGE_PORT1
+        assert entries[domain][ClusterEntryType.CLB][0]["clb_ip"] == "1.1.1.0"
+
+    def test_entry_detail_query_count(self, entry_detail_fixture):
+        with CaptureQueriesContext(connection) as single_ctx:
+            api.dbha.entry_detail(entry_detail_fixture[:1])
+        with CaptureQueriesContext(connection) as bulk_ctx:
+            entries = api.dbha.entry_detail(entry_detail_fixture)
+
+        # 查询次数与域名数量无关
+        assert len(entries) == len(entry_detail_fixture)
+        assert len(bulk_ctx.captured_queries) == len(single_ctx.captured_queries)
+
+    def test_entry_detail_cluster_not_exist(self, entry_detail_fixture):
+        with pytest.raises(ClusterNotExistException):
+            api.dbha.entry_detail([*entry_detail_fixture, "not.exist.db"])
+
     def test_instance_all(self, dbha_fixture):
         assert len(api.dbha.instances()) == 9
 
@@ -192,6 +298,26 @@ class TestDBHA:
         )
         assert p.cluster.first().status == ClusterStatus.ABNORMAL.value
 
+    def test_update_bulk_payloads(self, dbha_bulk_fixture):
+        payloads = [
+            {"ip": ip, "port": TEST_STORAGE_PORT1 + i, "status": InstanceStatus.UNAVAILABLE.value}
+            for ip in dbha_bulk_fixture
+            for i in range(BULK_INSTANCE_PER_MACHINE)
+        ]
+        assert len(payloads) == 5000
+
+        with CaptureQueriesContext(connection) as ctx:
+            api.dbha.update_status(payloads, bk_cloud_id=0)
+
+        # 查询次数与实例数量无关，只与批量写入的批次数有关
+        assert len(ctx.captured_queries) <= 30
+        assert models.StorageInstance.objects.filter(
+            machine__ip__in=dbha_bulk_fixture, status=InstanceStatus.UNAVAILABLE.value
+        ).count() == len(payloads)
+        assert models.Cluster.objects.get(immute_domain=constant.CLUSTER_IMMUTE_DOMAIN).status == (
+            ClusterStatus.ABNORMAL.value
+        )
+
     def test_update_invalid_status(self):
         with pytest.raises(Exception):
             api.dbha.update_status(
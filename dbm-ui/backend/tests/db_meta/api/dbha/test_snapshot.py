@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import ipaddress
+
+import pytest
+from mock import patch
+from rest_framework.test import APIRequestFactory
+
+from backend import env
+from backend.constants import IP_PORT_DIVIDER
+from backend.db_meta import models
+from backend.db_meta.api.dbha import snapshot
+from backend.db_meta.api.dbha.snapshot import DBHA_TOPOLOGY_SOURCE_KEY, DBHATopologySnapshot
+from backend.db_meta.enums import (
+    AccessLayer,
+    ClusterPhase,
+    ClusterStatus,
+    ClusterType,
+    InstanceInnerRole,
+    InstanceRole,
+    InstanceStatus,
+    MachineType,
+)
+from backend.db_proxy.views.db_meta.views import DBMetaApiProxyPassViewSet
+from backend.tests.mock_data import constant
+from backend.tests.mock_data.components import cc
+from backend.tests.mock_data.fake_redis import FakeRedis
+
+pytestmark = pytest.mark.django_db
+
+TEST_STORAGE_PORTS = [20000, 20001, 20002]
+
+
+@pytest.fixture
+def snapshot_redis():
+    redis = FakeRedis()
+    with patch.object(snapshot, "RedisConn", redis):
+        yield redis
+
+
+@pytest.fixture
+def topology_fixture(create_city):
+    city = models.BKCity.objects.get(bk_idc_city_name="上海")
+    machine = models.Machine.objects.create(
+        ip=cc.NORMAL_IP2,
+        bk_biz_id=constant.BK_BIZ_ID,
+        machine_type=MachineType.BACKEND,
+        access_layer=AccessLayer.STORAGE,
+        bk_city=city,
+        bk_host_id=int(ipaddress.IPv4Address(cc.NORMAL_IP2)),
+    )
+    cluster = models.Cluster.objects.create(
+        bk_biz_id=constant.BK_BIZ_ID,
+        name=constant.CLUSTER_NAME,
+        db_module_id=constant.DB_MODULE_ID,
+        immute_domain=constant.CLUSTER_IMMUTE_DOMAIN,
+        cluster_type=ClusterType.TenDBHA.value,
+        phase=ClusterPhase.ONLINE.value,
+        status=ClusterStatus.NORMAL.value,
+    )
+    for port in TEST_STORAGE_PORTS:
+        instance = models.StorageInstance.objects.create(
+            port=port,
+            machine=machine,
+            status=InstanceStatus.RUNNING,
+            cluster_type=ClusterType.TenDBHA.value,
+            instance_role=InstanceRole.BACKEND_MASTER,
+            instance_inner_role=InstanceInnerRole.MASTER,
+        )
+        cluster.storageinstance_set.add(instance)
+
+
+def address(port):
+    return f"{cc.NORMAL_IP2}{IP_PORT_DIVIDER}{port}"
+
+
+def get_instance(port):
+    return models.StorageInstance.objects.get(machine__ip=cc.NORMAL_IP2, port=port)
+
+
+def invalidate(redis):
+    # 测试用例运行在事务中，on_commit 不会触发，这里直接递增写入计数
+    redis.incr(DBHA_TOPOLOGY_SOURCE_KEY)
+
+
+class TestDBHATopologySnapshot:
+    def test_full_query(self, snapshot_redis, topology_fixture):
+        __, instances = DBHATopologySnapshot(bk_cloud_id=0).query()
+        assert sorted(ele["port"] for ele in instances) == TEST_STORAGE_PORTS
+
+        __, data = DBHATopologySnapshot(bk_cloud_id=0).query(since_version=0)
+        assert data["full"] is False
+        assert data["version"] > 0
+        assert len(data["instances"]) == len(TEST_STORAGE_PORTS)
+
+    def test_version_bump_on_change(self, snapshot_redis, topology_fixture):
+        version = DBHATopologySnapshot(bk_cloud_id=0).query(since_version=0)[1]["version"]
+
+        # 快照失效但内容未变化时，版本号不变
+        invalidate(snapshot_redis)
+        __, data = DBHATopologySnapshot(bk_cloud_id=0).query(since_version=version)
+        assert data == {"version": version, "full": False, "instances": [], "deleted": []}
+
+        # 内容变化后版本号递增，增量数据只包含变更的实例
+        models.StorageInstance.objects.filter(port=TEST_STORAGE_PORTS[0]).update(status=InstanceStatus.UNAVAILABLE)
+        invalidate(snapshot_redis)
+        __, data = DBHATopologySnapshot(bk_cloud_id=0).query(since_version=version)
+        assert data["version"] > version
+        assert data["full"] is False
+        assert [(ele["port"], ele["status"]) for ele in data["instances"]] == [
+            (TEST_STORAGE_PORTS[0], InstanceStatus.UNAVAILABLE)
+        ]
+        assert data["deleted"] == []
+
+    def test_since_version_deleted(self, snapshot_redis, topology_fixture):
+        version = DBHATopologySnapshot(bk_cloud_id=0).query(since_version=0)[1]["version"]
+
+        get_instance(TEST_STORAGE_PORTS[0]).delete()
+        models.StorageInstance.objects.filter(port=TEST_STORAGE_PORTS[1]).update(status=InstanceStatus.UNAVAILABLE)
+        invalidate(snapshot_redis)
+
+        # 删除的实例，以及变更后不再满足过滤条件的实例，都需要客户端删除
+        __, data = DBHATopologySnapshot(bk_cloud_id=0).query(statuses=[InstanceStatus.RUNNING], since_version=version)
+        assert data["full"] is False
+        assert data["instances"] == []
+        assert data["deleted"] == [address(TEST_STORAGE_PORTS[0]), address(TEST_STORAGE_PORTS[1])]
+
+    def test_tombstone_pruning(self, snapshot_redis, topology_fixture):
+        version = DBHATopologySnapshot(bk_cloud_id=0).query(since_version=0)[1]["version"]
+
+        with patch.object(snapshot, "DBHA_TOPOLOGY_TOMBSTONE_LIMIT", 1):
+            get_instance(TEST_STORAGE_PORTS[0]).delete()
+            invalidate(snapshot_redis)
+            first_deleted_version = DBHATopologySnapshot(bk_cloud_id=0).query(since_version=version)[1]["version"]
+
+            get_instance(TEST_STORAGE_PORTS[1]).delete()
+            invalidate(snapshot_redis)
+            __, data = DBHATopologySnapshot(bk_cloud_id=0).query(since_version=first_deleted_version)
+
+        # 只保留最新的删除记录，仍可以做增量
+        assert data["full"] is False
+        assert data["deleted"] == [address(TEST_STORAGE_PORTS[1])]
+
+        # 早于被丢弃的删除记录的版本，退化为全量
+        __, data = DBHATopologySnapshot(bk_cloud_id=0).query(since_version=version)
+        assert data["full"] is True
+        assert data["deleted"] == []
+        assert [ele["port"] for ele in data["instances"]] == [TEST_STORAGE_PORTS[2]]
+
+    def test_future_version_full(self, snapshot_redis, topology_fixture):
+        version = DBHATopologySnapshot(bk_cloud_id=0).query(since_version=0)[1]["version"]
+
+        # 客户端版本比当前版本还新(如快照被重置)时，返回全量数据
+        __, data = DBHATopologySnapshot(bk_cloud_id=0).query(since_version=version + 1)
+        assert data["full"] is True
+        assert len(data["instances"]) == len(TEST_STORAGE_PORTS)
+
+    def test_etag(self, snapshot_redis, topology_fixture):
+        etag, __ = DBHATopologySnapshot(bk_cloud_id=0).query()
+        assert DBHATopologySnapshot(bk_cloud_id=0).query(etag=etag) == (etag, None)
+
+        # 过滤条件不同时etag不同
+        assert DBHATopologySnapshot(bk_cloud_id=0).query(statuses=[InstanceStatus.RUNNING], etag=etag)[1]
+
+        models.StorageInstance.objects.filter(port=TEST_STORAGE_PORTS[0]).update(status=InstanceStatus.UNAVAILABLE)
+        invalidate(snapshot_redis)
+        new_etag, instances = DBHATopologySnapshot(bk_cloud_id=0).query(etag=etag)
+        assert new_etag != etag
+        assert len(instances) == len(TEST_STORAGE_PORTS)
+
+
+@patch.object(DBMetaApiProxyPassViewSet, "get_permissions", lambda x: [])
+@patch.object(env, "DBHA_TOPOLOGY_SNAPSHOT_ENABLE", True)
+class TestDBHAInstancesView:
+    view = DBMetaApiProxyPassViewSet.as_view({"post": "instances"})
+
+    def request(self, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": f'"{etag}"'} if etag else {}
+        request = APIRequestFactory().post("/", {"bk_cloud_id": 0}, format="json", **headers)
+        return self.view(request)
+
+    def test_etag_unchanged(self, snapshot_redis, topology_fixture):
+        response = self.request()
+        assert response.status_code == 200
+        assert len(response.data) == len(TEST_STORAGE_PORTS)
+
+        # POST请求不返回304，拓扑未变化时返回显式的unchanged标记
+        etag = response["ETag"].strip('"')
+        response = self.request(etag)
+        assert response.status_code == 200
+        assert response.data == {"unchanged": True}
+        assert response["ETag"].strip('"') == etag
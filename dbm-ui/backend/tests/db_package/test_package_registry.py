@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from unittest.mock import patch
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from backend.configuration.constants import DBType
+from backend.db_package.exceptions import PackageNotExistException
+from backend.db_package.models import Package
+from backend.db_package.registry import PackageRegistry
+from backend.db_package.views import DBPackageViewSet
+from backend.flow.consts import MediumEnum
+from backend.tests.conftest import mock_bk_user
+from backend.tests.mock_data import constant
+
+pytestmark = pytest.mark.django_db
+
+factory = APIRequestFactory()
+
+
+def create_package(version, allow_biz_ids=None, enable=True):
+    return Package.objects.create(
+        name=f"mysql-{version}.tar.gz",
+        version=version,
+        pkg_type=MediumEnum.MySQL,
+        db_type=DBType.MySQL,
+        path=f"mysql/{version}",
+        size=1,
+        md5="md5",
+        allow_biz_ids=allow_biz_ids,
+        enable=enable,
+    )
+
+
+@pytest.fixture(autouse=True)
+def registry():
+    with patch("backend.db_package.registry.RedisConn") as redis_conn:
+        redis_conn.get.return_value = "0"
+        PackageRegistry.invalidate()
+        yield
+        PackageRegistry.invalidate()
+
+
+class TestPackageRegistry:
+    def test_get_latest_package(self):
+        create_package("5.7")
+        latest = create_package("8.0")
+        create_package("5.6", enable=False)
+        gray = create_package("5.7", allow_biz_ids=[constant.BK_BIZ_ID + 1])
+
+        assert PackageRegistry.get_latest_package(version=MediumEnum.Latest, pkg_type=MediumEnum.MySQL) == gray
+        assert (
+            PackageRegistry.get_latest_package(
+                version=MediumEnum.Latest, pkg_type=MediumEnum.MySQL, bk_biz_id=constant.BK_BIZ_ID
+            )
+            == latest
+        )
+        with pytest.raises(PackageNotExistException):
+            PackageRegistry.get_latest_package(version="5.6", pkg_type=MediumEnum.MySQL)
+
+        # 注册表加载后，再次解析介质不访问DB
+        with CaptureQueriesContext(connection) as ctx:
+            PackageRegistry.get_latest_package(version="8.0", pkg_type=MediumEnum.MySQL)
+        assert len(ctx.captured_queries) == 0
+
+    def test_invalidate_on_save(self):
+        create_package("5.7")
+        PackageRegistry.get_latest_package(version="5.7", pkg_type=MediumEnum.MySQL)
+
+        package = create_package("8.0")
+        assert PackageRegistry.get_latest_package(version="8.0", pkg_type=MediumEnum.MySQL) == package
+        package.delete()
+        with pytest.raises(PackageNotExistException):
+            PackageRegistry.get_latest_package(version="8.0", pkg_type=MediumEnum.MySQL)
+
+    @patch.object(DBPackageViewSet, "get_permissions", lambda x: [])
+    def test_invalidate_on_sync_medium(self):
+        # 该存储类型没有存量介质时，同步介质只有bulk_create，不会触发信号
+        with pytest.raises(PackageNotExistException):
+            PackageRegistry.get_latest_package(version="8.0", pkg_type=MediumEnum.MySQL)
+
+        medium = {
+            "name": "mysql-8.0.tar.gz",
+            "version": "8.0",
+            "pkg_type": MediumEnum.MySQL,
+            "db_type": DBType.MySQL,
+            "path": "mysql/8.0",
+            "size": 1,
+            "md5": "md5",
+        }
+        request = factory.post(
+            "/apis/package/sync_medium/", data={"db_type": DBType.MySQL, "sync_medium_infos": [medium]}, format="json"
+        )
+        force_authenticate(request, user=mock_bk_user("admin"))
+        DBPackageViewSet.as_view({"post": "sync_medium"})(request)
+
+        assert PackageRegistry.get_latest_package(version="8.0", pkg_type=MediumEnum.MySQL).path == "mysql/8.0"
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from unittest.mock import patch
+
+import pytest
+
+from backend.db_meta.enums import ClusterType
+from backend.db_meta.models import Cluster
+from backend.db_periodic_task.local_tasks.mysql_backup import bklog_query
+from backend.db_periodic_task.local_tasks.mysql_backup.check_full_backup import check_full_backup
+from backend.db_report.models import MysqlBackupCheckReport
+
+pytestmark = pytest.mark.django_db
+
+BK_BIZ_ID = 3
+TENDBHA_OK, TENDBHA_MISSING = "ha-ok.blueking.db", "ha-missing.blueking.db"
+SPIDER_OK, SPIDER_BROKEN = "spider-ok.blueking.db", "spider-broken.blueking.db"
+
+
+def backup_log(domain, backup_id, shard_value=0, is_full_backup=1, file_types=("index", "tar")):
+    return {
+        "bk_biz_id": BK_BIZ_ID,
+        "backup_id": backup_id,
+        "cluster_address": domain,
+        "cluster_id": 1,
+        "backup_host": "127.0.0.1",
+        "backup_port": 20000,
+        "mysql_role": "slave",
+        "backup_type": "physical",
+        "file_list": [
+            {"file_name": f"{backup_id}.{file_type}", "file_size": 1, "file_type": file_type, "task_id": "1"}
+            for file_type in file_types
+        ],
+        "data_schema_grant": "all",
+        "is_full_backup": is_full_backup,
+        "total_filesize": 1,
+        "encrypt_enable": False,
+        "mysql_version": "5.7",
+        "backup_begin_time": "",
+        "backup_end_time": "",
+        "backup_consistent_time": "",
+        "shard_value": shard_value,
+    }
+
+
+BACKUP_LOGS = [
+    backup_log(TENDBHA_OK, "b1"),
+    # 非全备的记录不算作全备
+    backup_log(TENDBHA_MISSING, "b2", is_full_backup=0),
+    backup_log(SPIDER_OK, "b3", shard_value=0),
+    backup_log(SPIDER_OK, "b3", shard_value=1),
+    # 任一分片缺少文件，整个备份无效
+    backup_log(SPIDER_BROKEN, "b4", shard_value=0),
+    backup_log(SPIDER_BROKEN, "b4", shard_value=1, file_types=("index",)),
+    # 不在巡检范围内的集群
+    backup_log("unknown.blueking.db", "b5"),
+]
+
+
+@pytest.fixture
+def backup_clusters():
+    for domain, cluster_type in [
+        (TENDBHA_OK, ClusterType.TenDBHA),
+        (TENDBHA_MISSING, ClusterType.TenDBHA),
+        (SPIDER_OK, ClusterType.TenDBCluster),
+        (SPIDER_BROKEN, ClusterType.TenDBCluster),
+    ]:
+        Cluster.objects.create(
+            bk_biz_id=BK_BIZ_ID, name=domain.split(".")[0], immute_domain=domain, cluster_type=cluster_type
+        )
+
+
+@patch.object(bklog_query, "BKLogHandler")
+def test_check_full_backup(bklog_handler, backup_clusters):
+    bklog_handler.iter_logs.return_value = iter(BACKUP_LOGS)
+
+    check_full_backup()
+
+    # 全天的全备日志只拉取一次，各集群类型共用
+    bklog_handler.iter_logs.assert_called_once()
+    reports = MysqlBackupCheckReport.objects.filter(bk_biz_id=BK_BIZ_ID, status=False)
+    assert sorted(reports.values_list("cluster", "cluster_type")) == [
+        (TENDBHA_MISSING, ClusterType.TenDBHA.value),
+        (SPIDER_BROKEN, ClusterType.TenDBCluster.value),
+    ]
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from backend import env
+from backend.db_meta.models import AppCache
+from backend.db_periodic_task.local_tasks.db_meta import update_app_cache
+from backend.db_periodic_task.local_tasks.db_meta.update_app_cache import (
+    APP_CACHE_SYNC_METRICS_KEY,
+    bulk_update_app_cache,
+)
+from backend.tests.mock_data.fake_redis import FakeRedis
+
+pytestmark = pytest.mark.django_db
+
+NEW_BIZ_ID, CHANGED_BIZ_ID, UNCHANGED_BIZ_ID, EMPTY_BIZ_ID = 9901, 9902, 9903, 9904
+
+
+def cc_biz(bk_biz_id, bk_biz_name, db_app_abbr, bk_biz_maintainer="admin"):
+    return {
+        "bk_biz_id": bk_biz_id,
+        "bk_biz_name": bk_biz_name,
+        "db_app_abbr": db_app_abbr,
+        "time_zone": "Asia/Shanghai",
+        "bk_biz_maintainer": bk_biz_maintainer,
+    }
+
+
+CC_BIZS = [
+    cc_biz(NEW_BIZ_ID, "new", "New_App"),
+    cc_biz(CHANGED_BIZ_ID, "changed-renamed", "changed"),
+    cc_biz(UNCHANGED_BIZ_ID, "unchanged", "unchanged"),
+    # 为空或者非法的值保留原值，不视为变化
+    cc_biz(EMPTY_BIZ_ID, "", "invalid abbr!", bk_biz_maintainer=""),
+]
+
+
+def search_business(params, **kwargs):
+    """按照分页参数返回CMDB业务"""
+    page = params["page"]
+    return {"count": len(CC_BIZS), "info": CC_BIZS[page["start"] : page["start"] + page["limit"]]}
+
+
+@pytest.fixture
+def cc_api():
+    cc_api = MagicMock()
+    cc_api.search_business.side_effect = search_business
+    with patch.object(update_app_cache, "CCApi", cc_api), patch.object(env, "BK_APP_ABBR", ""):
+        yield cc_api
+
+
+@pytest.fixture
+def metrics_redis():
+    redis = FakeRedis()
+    with patch.object(update_app_cache, "RedisConn", redis):
+        yield redis
+
+
+@pytest.fixture
+def app_caches():
+    for bk_biz_id, name in [(CHANGED_BIZ_ID, "changed"), (UNCHANGED_BIZ_ID, "unchanged"), (EMPTY_BIZ_ID, "empty")]:
+        AppCache.objects.create(
+            bk_biz_id=bk_biz_id,
+            bk_biz_name=name,
+            db_app_abbr=name,
+            time_zone="Asia/Shanghai",
+            bk_biz_maintainer="admin",
+        )
+
+
+class TestBulkUpdateAppCache:
+    def test_sync(self, cc_api, metrics_redis, app_caches):
+        with patch.object(update_app_cache, "BATCH_SIZE", 2), patch.object(
+            AppCache.objects, "bulk_update", wraps=AppCache.objects.bulk_update
+        ) as bulk_update:
+            bulk_update_app_cache()
+
+        # 分页拉取全部业务
+        assert cc_api.search_business.call_count == 3
+
+        # 新业务被创建，英文名清洗后写入
+        new_app = AppCache.objects.get(bk_biz_id=NEW_BIZ_ID)
+        assert (new_app.bk_biz_name, new_app.db_app_abbr) == ("new", "new-app")
+
+        # 只有内容变化的业务被更新，且只更新一次
+        bulk_update.assert_called_once()
+        assert [app.bk_biz_id for app in bulk_update.call_args[0][0]] == [CHANGED_BIZ_ID]
+        assert AppCache.objects.get(bk_biz_id=CHANGED_BIZ_ID).bk_biz_name == "changed-renamed"
+
+        # 为空或者非法的值不覆盖原值
+        empty_app = AppCache.objects.get(bk_biz_id=EMPTY_BIZ_ID)
+        assert (empty_app.bk_biz_name, empty_app.db_app_abbr, empty_app.bk_biz_maintainer) == (
+            "empty",
+            "empty",
+            "admin",
+        )
+
+        metrics = metrics_redis.hgetall(APP_CACHE_SYNC_METRICS_KEY)
+        assert (metrics["total_cnt"], metrics["create_cnt"], metrics["update_cnt"], metrics["unchanged_cnt"]) == (
+            "4",
+            "1",
+            "1",
+            "2",
+        )
+
+    def test_sync_unchanged(self, cc_api, metrics_redis, app_caches):
+        bulk_update_app_cache()
+
+        # 再次同步时没有变化的业务
+        with patch.object(AppCache.objects, "bulk_update", wraps=AppCache.objects.bulk_update) as bulk_update:
+            bulk_update_app_cache()
+        assert bulk_update.call_args[0][0] == []
+        assert metrics_redis.hget(APP_CACHE_SYNC_METRICS_KEY, "unchanged_cnt") == "4"
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import json
+from unittest.mock import patch
+
+import pytest
+from rest_framework.test import APIRequestFactory
+
+from backend.db_proxy.views.job_callback import views
+from backend.db_proxy.views.job_callback.views import JobCallBackViewSet
+from backend.flow.utils.node_callback import CallbackSource
+from backend.tests.mock_data.components.job import JOB_INSTANCE_ID, JOB_SUCCESS_STATUS
+
+
+@pytest.fixture
+def callback_handler():
+    with patch.object(views, "NodeCallbackHandler") as callback_handler:
+        yield callback_handler
+
+
+def job_callback_request(data):
+    # job回调的参数是包裹在key中的json字符串
+    return APIRequestFactory().post("/", json.dumps(data), content_type="application/x-www-form-urlencoded")
+
+
+class TestFlowJobCallback:
+    view = JobCallBackViewSet.as_view({"post": "flow_job_callback"})
+
+    @patch.object(views, "JobStatusPoller")
+    @patch.object(views.BkJobService, "__status__")
+    def test_finished(self, job_status, job_poller, callback_handler):
+        resp = {"result": True, "data": {"finished": True}}
+        job_status.return_value = resp
+
+        response = self.view(job_callback_request({"job_instance_id": JOB_INSTANCE_ID, "status": JOB_SUCCESS_STATUS}))
+
+        assert response.status_code == 200
+        job_status.assert_called_once_with(JOB_INSTANCE_ID)
+        job_poller.set_status.assert_called_once_with(JOB_INSTANCE_ID, resp)
+        callback_handler.callback.assert_called_once_with(CallbackSource.JOB.value, JOB_INSTANCE_ID)
+
+    @patch.object(views, "JobStatusPoller")
+    @patch.object(views.BkJobService, "__status__")
+    def test_not_finished(self, job_status, job_poller, callback_handler):
+        job_status.return_value = {"result": True, "data": {"finished": False}}
+
+        response = self.view(job_callback_request({"job_instance_id": JOB_INSTANCE_ID, "status": 2}))
+
+        # 任务未结束时不唤醒节点，等待兜底轮询
+        assert response.status_code == 200
+        job_poller.set_status.assert_not_called()
+        callback_handler.callback.assert_not_called()
+
+
+class TestFlowSopsCallback:
+    view = JobCallBackViewSet.as_view({"post": "flow_sops_callback"})
+
+    def test_callback(self, callback_handler):
+        response = self.view(APIRequestFactory().post("/", {"task_id": 100}, format="json"))
+        assert response.status_code == 200
+        callback_handler.callback.assert_called_once_with(CallbackSource.SOPS.value, 100)
+
+    def test_without_task_id(self, callback_handler):
+        response = self.view(APIRequestFactory().post("/", {}, format="json"))
+        assert response.status_code == 200
+        callback_handler.callback.assert_not_called()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from functools import partial
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from backend import env
+from backend.db_proxy import routing
+from backend.db_proxy.models import DBCloudProxy
+from backend.db_proxy.routing import CLOUD_PROXY_ROUTE_VERSION_KEY, CloudProxyRouter
+from backend.tests.mock_data.fake_redis import FakeRedis
+
+pytestmark = pytest.mark.django_db
+
+BK_CLOUD_ID = 100
+ADDRESSES = ["1.1.1.1:10000", "2.2.2.2:10000", "3.3.3.3:10000"]
+
+
+@pytest.fixture
+def route_redis():
+    redis = FakeRedis()
+    with patch.object(routing, "RedisConn", redis), patch.dict(CloudProxyRouter._routes, clear=True):
+        yield redis
+
+
+@pytest.fixture
+def cloud_proxies():
+    return [
+        DBCloudProxy.objects.create(bk_cloud_id=BK_CLOUD_ID, internal_address=address, external_address=address)
+        for address in ADDRESSES
+    ]
+
+
+def query_count(func):
+    with CaptureQueriesContext(connection) as ctx:
+        result = func()
+    return result, len(ctx.captured_queries)
+
+
+class TestCloudProxyRouter:
+    def test_load(self, route_redis, cloud_proxies):
+        get_address = partial(CloudProxyRouter.get_external_address, BK_CLOUD_ID)
+
+        # 默认使用最新的代理，只在首次获取时加载路由
+        assert query_count(get_address) == (ADDRESSES[-1], 1)
+        assert query_count(get_address) == (ADDRESSES[-1], 0)
+        assert CloudProxyRouter.get_external_address(BK_CLOUD_ID + 1) is None
+
+    def test_expire(self, route_redis, cloud_proxies):
+        CloudProxyRouter.get_external_address(BK_CLOUD_ID)
+        cloud_proxies[-1].external_address = "4.4.4.4:10000"
+        DBCloudProxy.objects.bulk_update([cloud_proxies[-1]], ["external_address"])
+
+        mock_time = MagicMock()
+        mock_time.time.return_value = routing.time.time() + env.CLOUD_PROXY_ROUTE_TTL + 1
+        with patch.object(routing, "time", mock_time):
+            assert CloudProxyRouter.get_external_address(BK_CLOUD_ID) == "4.4.4.4:10000"
+
+    @patch.object(env, "CLOUD_PROXY_ROUND_ROBIN", True)
+    def test_round_robin(self, route_redis, cloud_proxies):
+        addresses = [CloudProxyRouter.get_external_address(BK_CLOUD_ID) for __ in range(len(ADDRESSES) * 2)]
+        assert addresses == ADDRESSES * 2
+
+    def test_invalidate_by_signal(self, route_redis, cloud_proxies):
+        CloudProxyRouter.get_external_address(BK_CLOUD_ID)
+
+        # 测试用例运行在事务中，on_commit 不会触发，这里直接执行回调
+        with patch.object(transaction, "on_commit", lambda func: func()):
+            DBCloudProxy.objects.create(
+                bk_cloud_id=BK_CLOUD_ID, internal_address="4.4.4.4:10000", external_address="4.4.4.4:10000"
+            )
+        assert route_redis.get(CLOUD_PROXY_ROUTE_VERSION_KEY) == "1"
+        assert CloudProxyRouter.get_external_address(BK_CLOUD_ID) == "4.4.4.4:10000"
+
+    def test_invalidate_by_other_process(self, route_redis, cloud_proxies):
+        CloudProxyRouter.get_external_address(BK_CLOUD_ID)
+
+        # 其他进程变更了代理，当前进程的缓存仍然存在，但路由版本已递增
+        DBCloudProxy.objects.filter(id=cloud_proxies[-1].id).update(external_address="4.4.4.4:10000")
+        assert CloudProxyRouter.get_external_address(BK_CLOUD_ID) == ADDRESSES[-1]
+        route_redis.incr(CLOUD_PROXY_ROUTE_VERSION_KEY)
+        assert CloudProxyRouter.get_external_address(BK_CLOUD_ID) == "4.4.4.4:10000"
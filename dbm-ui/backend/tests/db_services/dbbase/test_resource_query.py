@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import random
+from unittest.mock import patch
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.crypto import get_random_string
+
+from backend.db_meta.enums import ClusterType, InstanceInnerRole, InstanceRole, MachineType
+from backend.db_meta.models import (
+    AppCache,
+    BKCity,
+    Cluster,
+    DBModule,
+    LogicalCity,
+    Machine,
+    NosqlStorageSetDtl,
+    Spec,
+    StorageInstance,
+)
+from backend.db_services.bigdata.es.query import ESListRetrieveResource
+from backend.db_services.bigdata.hdfs.query import HDFSListRetrieveResource
+from backend.db_services.bigdata.influxdb.query import InfluxDBListRetrieveResource
+from backend.db_services.bigdata.kafka.query import KafkaListRetrieveResource
+from backend.db_services.bigdata.pulsar.query import PulsarListRetrieveResource
+from backend.db_services.bigdata.riak.query import RiakListRetrieveResource
+from backend.db_services.dbbase.resources.register import cluster_type__resource_class
+from backend.db_services.ipchooser.query.resource import ResourceQueryHelper
+from backend.db_services.mongodb.resources.query import MongoDBListRetrieveResource
+from backend.db_services.mysql.resources.tendbcluster.query import ListRetrieveResource as TenDBClusterResource
+from backend.db_services.mysql.resources.tendbha.query import ListRetrieveResource as TenDBHAResource
+from backend.db_services.mysql.resources.tendbsingle.query import ListRetrieveResource as TenDBSingleResource
+from backend.db_services.redis.resources.redis_cluster.query import RedisListRetrieveResource
+from backend.db_services.sqlserver.resources.sqlserver_ha.query import ListRetrieveResource as SqlserverHAResource
+from backend.db_services.sqlserver.resources.sqlserver_single.query import (
+    ListRetrieveResource as SqlserverSingleResource,
+)
+
+pytestmark = pytest.mark.django_db
+
+BK_BIZ_ID = 3
+MASTER, ORPHAN = InstanceInnerRole.MASTER, InstanceInnerRole.ORPHAN
+
+# (资源查询类, 集群类型, 存储实例角色, 存储实例内部角色, 存储机器类型)
+RESOURCE_CASES = [
+    (TenDBHAResource, ClusterType.TenDBHA, InstanceRole.BACKEND_MASTER, MASTER, MachineType.BACKEND),
+    (TenDBSingleResource, ClusterType.TenDBSingle, InstanceRole.ORPHAN, ORPHAN, MachineType.SINGLE),
+    (TenDBClusterResource, ClusterType.TenDBCluster, InstanceRole.REMOTE_MASTER, MASTER, MachineType.REMOTE),
+    (
+        RedisListRetrieveResource,
+        ClusterType.TendisRedisInstance,
+        InstanceRole.REDIS_MASTER,
+        MASTER,
+        MachineType.TENDISCACHE,
+    ),
+    (SqlserverHAResource, ClusterType.SqlserverHA, InstanceRole.BACKEND_MASTER, MASTER, MachineType.SQLSERVER_HA),
+    (SqlserverSingleResource, ClusterType.SqlserverSingle, InstanceRole.ORPHAN, ORPHAN, MachineType.SQLSERVER_SINGLE),
+    (MongoDBListRetrieveResource, ClusterType.MongoReplicaSet, InstanceRole.MONGO_M1, MASTER, MachineType.MONGODB),
+    (MongoDBListRetrieveResource, ClusterType.MongoShardedCluster, InstanceRole.MONGO_M1, MASTER, MachineType.MONGODB),
+    (ESListRetrieveResource, ClusterType.Es, InstanceRole.ES_MASTER, ORPHAN, MachineType.ES_MASTER),
+    (KafkaListRetrieveResource, ClusterType.Kafka, InstanceRole.BROKER, ORPHAN, MachineType.BROKER),
+    (HDFSListRetrieveResource, ClusterType.Hdfs, InstanceRole.HDFS_NAME_NODE, ORPHAN, MachineType.HDFS_MASTER),
+    (PulsarListRetrieveResource, ClusterType.Pulsar, InstanceRole.PULSAR_BROKER, ORPHAN, MachineType.PULSAR_BROKER),
+    (InfluxDBListRetrieveResource, ClusterType.Influxdb, InstanceRole.INFLUXDB, ORPHAN, MachineType.INFLUXDB),
+    (RiakListRetrieveResource, ClusterType.Riak, InstanceRole.RIAK_NODE, ORPHAN, MachineType.RIAK),
+]
+
+MONGODB_SPEC_CONFIG = {
+    "cpu": {"min": 4, "max": 4},
+    "mem": {"min": 8, "max": 8},
+    "storage_spec": [{"mount_point": "/data1", "size": 100, "type": "ssd"}],
+}
+
+
+@pytest.fixture
+def resource_env():
+    logical_city, __ = LogicalCity.objects.get_or_create(id=1, defaults={"name": "南京"})
+    bk_city = BKCity.objects.create(logical_city=logical_city, bk_idc_city_id=random.randint(100, 100000))
+    spec = Spec.objects.create(
+        spec_name=get_random_string(6),
+        spec_cluster_type=ClusterType.TenDBCluster,
+        spec_machine_type=MachineType.REMOTE,
+        storage_spec=[{"mount_point": "/data", "size": 100, "type": "ssd"}],
+    )
+    AppCache.objects.get_or_create(bk_biz_id=BK_BIZ_ID, defaults={"bk_biz_name": get_random_string(6)})
+    return bk_city, spec
+
+
+def create_cluster(cluster_type, instance_role, instance_inner_role, machine_type, bk_city, spec):
+    """创建带有一个存储实例的集群"""
+    cluster_name = get_random_string(8)
+    db_module, __ = DBModule.objects.get_or_create(
+        bk_biz_id=BK_BIZ_ID, cluster_type=cluster_type, defaults={"db_module_name": get_random_string(6)}
+    )
+    cluster = Cluster.objects.create(
+        name=cluster_name,
+        cluster_type=cluster_type,
+        immute_domain=f"gamedb.{cluster_name}.blueking.db",
+        bk_biz_id=BK_BIZ_ID,
+        db_module_id=db_module.db_module_id,
+    )
+    ip = f"127.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(1, 254)}"
+    machine = Machine.objects.create(
+        ip=ip,
+        bk_city=bk_city,
+        bk_biz_id=BK_BIZ_ID,
+        db_module_id=db_module.db_module_id,
+        bk_host_id=random.randint(1, 10**9),
+        machine_type=machine_type,
+        spec_id=spec.spec_id,
+        spec_config=MONGODB_SPEC_CONFIG if machine_type == MachineType.MONGODB else {},
+    )
+    inst = StorageInstance.objects.create(
+        machine=machine,
+        port=30000,
+        cluster_type=cluster_type,
+        bk_biz_id=BK_BIZ_ID,
+        instance_role=instance_role,
+        instance_inner_role=instance_inner_role,
+        db_module_id=db_module.db_module_id,
+    )
+    inst.cluster.add(cluster)
+    if cluster_type == ClusterType.MongoShardedCluster:
+        NosqlStorageSetDtl.objects.create(bk_biz_id=BK_BIZ_ID, instance=inst, cluster=cluster, seg_range="shard0")
+    return cluster
+
+
+def test_all_registered_resources_covered():
+    # 新注册的资源查询类需要补充到用例中
+    covered = {(resource_class, cluster_type) for resource_class, cluster_type, *__ in RESOURCE_CASES}
+    registered = {
+        (resource_class, cluster_type) for cluster_type, resource_class in cluster_type__resource_class.items()
+    }
+    assert registered <= covered
+
+
+@pytest.mark.parametrize(
+    "resource_class, cluster_type, instance_role, instance_inner_role, machine_type", RESOURCE_CASES
+)
+@patch.object(ResourceQueryHelper, "search_cc_cloud", lambda *args, **kwargs: {})
+def test_list_clusters_query_count(
+    resource_env, resource_class, cluster_type, instance_role, instance_inner_role, machine_type
+):
+    bk_city, spec = resource_env
+
+    def list_query_count(cluster_num):
+        with CaptureQueriesContext(connection) as ctx:
+            resource_list = resource_class.list_clusters(BK_BIZ_ID, {}, limit=10, offset=0)
+        assert resource_list.count == cluster_num
+        return len(ctx.captured_queries)
+
+    create_cluster(cluster_type, instance_role, instance_inner_role, machine_type, bk_city, spec)
+    single_cluster_queries = list_query_count(cluster_num=1)
+
+    extra_cluster_num = 5
+    for __ in range(extra_cluster_num):
+        create_cluster(cluster_type, instance_role, instance_inner_role, machine_type, bk_city, spec)
+
+    # 序列化所需的信息均为整页批量预取，查询次数与集群数量无关
+    assert list_query_count(cluster_num=1 + extra_cluster_num) == single_cluster_queries
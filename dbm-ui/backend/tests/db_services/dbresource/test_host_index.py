@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from unittest.mock import MagicMock
+
+import pytest
+from mock import patch
+
+from backend.db_services.dbresource import host_index
+from backend.db_services.dbresource.host_index import (
+    RESOURCE_POOL_HOST_INDEX_BUILT_KEY,
+    RESOURCE_POOL_HOST_INDEX_JOURNAL_KEY,
+    RESOURCE_POOL_HOST_INDEX_KEY,
+    RESOURCE_POOL_HOST_INDEX_LOCK_KEY,
+    ResourcePoolHostIndex,
+    resource_import_callback,
+)
+from backend.db_services.dbresource.views.resource import DBResourceViewSet
+from backend.tests.mock_data.fake_redis import FakeRedis
+from backend.utils.pytest import AuthorizedAPIRequestFactory
+
+pytestmark = pytest.mark.django_db
+
+# 资源池中的主机
+RESOURCE_HOST_IDS = [1, 2, 3]
+
+
+@pytest.fixture
+def index_redis():
+    redis = FakeRedis()
+    with patch.object(host_index, "RedisConn", redis):
+        yield redis
+
+
+@pytest.fixture
+def resource_api():
+    api = MagicMock()
+    api.resource_list_all.return_value = {"details": [{"bk_host_id": host_id} for host_id in RESOURCE_HOST_IDS]}
+    with patch.object(host_index, "DBResourceApi", api):
+        yield api
+
+
+class TestResourcePoolHostIndex:
+    def test_rebuild_without_built_marker(self, index_redis, resource_api):
+        assert ResourcePoolHostIndex.contains([1, 4]) == {1: True, 4: False}
+        assert index_redis.exists(RESOURCE_POOL_HOST_INDEX_BUILT_KEY)
+
+        # 索引已构建时，不再全量拉取资源池
+        assert ResourcePoolHostIndex.contains([2, 3]) == {2: True, 3: True}
+        resource_api.resource_list_all.assert_called_once()
+
+    def test_rebuild_in_batches(self, index_redis, resource_api):
+        with patch.object(host_index, "RESOURCE_POOL_HOST_INDEX_BATCH_SIZE", 2):
+            ResourcePoolHostIndex.rebuild()
+        assert index_redis.smembers(RESOURCE_POOL_HOST_INDEX_KEY) == {str(host_id) for host_id in RESOURCE_HOST_IDS}
+        assert index_redis.data.keys() == {RESOURCE_POOL_HOST_INDEX_KEY, RESOURCE_POOL_HOST_INDEX_BUILT_KEY}
+
+    def test_rebuild_empty_pool(self, index_redis, resource_api):
+        ResourcePoolHostIndex.add([4])
+        resource_api.resource_list_all.return_value = {"details": None}
+
+        ResourcePoolHostIndex.rebuild()
+        assert not index_redis.exists(RESOURCE_POOL_HOST_INDEX_KEY)
+        assert ResourcePoolHostIndex.contains([4]) == {4: False}
+
+    def test_rebuild_locked(self, index_redis, resource_api):
+        # 其他进程正在重建时跳过
+        index_redis.set(RESOURCE_POOL_HOST_INDEX_LOCK_KEY, 1)
+        assert not ResourcePoolHostIndex.rebuild()
+        resource_api.resource_list_all.assert_not_called()
+        assert not index_redis.exists(RESOURCE_POOL_HOST_INDEX_BUILT_KEY)
+
+    def test_contains_while_rebuilding(self, index_redis, resource_api):
+        # 其他进程正在构建索引时，直接查询资源池
+        index_redis.set(RESOURCE_POOL_HOST_INDEX_LOCK_KEY, 1)
+        assert ResourcePoolHostIndex.contains([1, 4]) == {1: True, 4: False}
+        resource_api.resource_list_all.assert_called_once()
+        assert not index_redis.exists(RESOURCE_POOL_HOST_INDEX_KEY)
+
+    def test_update_during_rebuild(self, index_redis, resource_api):
+        def resource_list_all():
+            # 拉取资源池之后、替换索引之前发生的增量变更
+            ResourcePoolHostIndex.add([4])
+            ResourcePoolHostIndex.remove([1])
+            return {"details": [{"bk_host_id": host_id} for host_id in RESOURCE_HOST_IDS]}
+
+        resource_api.resource_list_all.side_effect = resource_list_all
+        assert ResourcePoolHostIndex.rebuild()
+
+        # 替换索引后重放变更日志，增量变更不会被覆盖
+        assert ResourcePoolHostIndex.contains([1, 2, 4]) == {1: False, 2: True, 4: True}
+        assert index_redis.data.keys() == {RESOURCE_POOL_HOST_INDEX_KEY, RESOURCE_POOL_HOST_INDEX_BUILT_KEY}
+
+        # 没有在重建时，增量变更不记录变更日志
+        ResourcePoolHostIndex.add([5])
+        assert not index_redis.exists(RESOURCE_POOL_HOST_INDEX_JOURNAL_KEY)
+
+    def test_incremental_update(self, index_redis, resource_api):
+        ResourcePoolHostIndex.rebuild()
+
+        # 导入/申请/删除后增量维护索引，无需重建
+        resource_import_callback({"hosts": [{"host_id": 4}, {"host_id": 5}]})
+        ResourcePoolHostIndex.remove([1])
+        ResourcePoolHostIndex.add([])
+        ResourcePoolHostIndex.remove([])
+        assert ResourcePoolHostIndex.contains([1, 2, 4, 5]) == {1: False, 2: True, 4: True, 5: True}
+        resource_api.resource_list_all.assert_called_once()
+
+    def test_invalidate(self, index_redis, resource_api):
+        ResourcePoolHostIndex.add([4])
+        ResourcePoolHostIndex.rebuild()
+        ResourcePoolHostIndex.add([4])
+
+        # 索引失效后下一次查询全量重建，以资源池的数据为准
+        ResourcePoolHostIndex.invalidate()
+        assert ResourcePoolHostIndex.contains([1, 4]) == {1: True, 4: False}
+        assert resource_api.resource_list_all.call_count == 2
+
+
+class TestListDBAHosts:
+    @patch.object(DBResourceViewSet, "get_permissions", lambda x: [])
+    @patch("backend.db_services.dbresource.views.resource.TopoHandler")
+    def test_occupancy(self, topo_handler, index_redis, resource_api):
+        topo_handler.trees.return_value = [{"instance_id": 1, "meta": {"bk_biz_id": 1}}]
+        topo_handler.query_hosts.return_value = {"total": 2, "data": [{"host_id": 1}, {"host_id": 4}]}
+
+        request = AuthorizedAPIRequestFactory().get("/")
+        response = DBResourceViewSet.as_view({"get": "list_dba_hosts"})(request)
+
+        # 当前页中已经在资源池的主机标记为占用
+        assert response.status_code == 200
+        assert response.data["data"] == [{"host_id": 1, "occupancy": True}, {"host_id": 4, "occupancy": False}]
+        resource_api.resource_list_all.assert_called_once()
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import time
+
+import pytest
+from mock import MagicMock, patch
+
+from backend import env
+from backend.db_services.ipchooser import tasks
+from backend.db_services.ipchooser.query import mirror as mirror_module
+from backend.db_services.ipchooser.query.mirror import (
+    IPCHOOSER_MIRROR_BIZS_KEY,
+    IPCHOOSER_MIRROR_CURSOR_KEY,
+    BizMirror,
+    TopoMirror,
+)
+from backend.tests.mock_data import constant
+from backend.tests.mock_data.fake_redis import FakeRedis
+
+# 业务下的主机数量，按照模块平均分布
+HOST_COUNT = 50000
+MODULE_IDS = [11, 12, 21, 22]
+
+
+def build_topo():
+    return {
+        "bk_obj_id": "biz",
+        "bk_inst_id": constant.BK_BIZ_ID,
+        "bk_inst_name": "biz",
+        "child": [
+            {
+                "bk_obj_id": "set",
+                "bk_inst_id": set_id,
+                "bk_inst_name": f"set{set_id}",
+                "child": [
+                    {"bk_obj_id": "module", "bk_inst_id": module_id, "bk_inst_name": f"module{module_id}", "child": []}
+                    for module_id in MODULE_IDS
+                    if module_id // 10 == set_id
+                ],
+            }
+            for set_id in [1, 2]
+        ],
+    }
+
+
+def build_mirror():
+    hosts = [
+        {
+            "bk_host_id": host_id,
+            "bk_host_innerip": f"10.{host_id // 65536}.{host_id // 256 % 256}.{host_id % 256}",
+            "bk_host_name": f"host-{host_id}",
+            "bk_cloud_id": host_id % 2,
+        }
+        for host_id in range(1, HOST_COUNT + 1)
+    ]
+    relations = [
+        [host["bk_host_id"], MODULE_IDS[index % 4] // 10, MODULE_IDS[index % 4]] for index, host in enumerate(hosts)
+    ]
+    return BizMirror("1", build_topo(), relations, hosts)
+
+
+class TestBizMirror:
+    def test_topo_count(self):
+        topo = build_mirror().get_topo_tree()
+        assert topo["count"] == HOST_COUNT
+        assert [node["count"] for node in topo["child"]] == [HOST_COUNT // 2, HOST_COUNT // 2]
+        assert topo["child"][0]["child"][0]["count"] == HOST_COUNT // 4
+
+    def test_query_hosts(self):
+        mirror = build_mirror()
+        node = {"bk_obj_id": "module", "bk_inst_id": 11, "bk_biz_id": constant.BK_BIZ_ID}
+
+        resp = mirror.query_hosts(node, None, 0, 10, ["bk_host_id", "bk_host_innerip"])
+        assert resp["count"] == HOST_COUNT // 4
+        assert len(resp["info"]) == 10
+        ips = [host["bk_host_innerip"] for host in resp["info"]]
+        assert ips == sorted(ips)
+
+        conditions = [{"field": "bk_host_name", "operator": "contains", "value": "HOST-4999"}]
+        resp = mirror.query_hosts(node, conditions, 0, 1000, ["bk_host_id"], bk_cloud_id=1)
+        assert resp["info"] and all(host["bk_host_id"] % 2 == 1 for host in resp["info"])
+
+    def test_query_hosts_fallback(self):
+        mirror = build_mirror()
+        node = {"bk_obj_id": "module", "bk_inst_id": 11, "bk_biz_id": constant.BK_BIZ_ID}
+
+        # 镜像中不存在的节点、字段和操作符，需要回退到CMDB查询
+        assert mirror.query_hosts({**node, "bk_inst_id": 99}, None, 0, 10, ["bk_host_id"]) is None
+        assert mirror.query_hosts(node, None, 0, 10, ["bk_os_name"]) is None
+        conditions = [{"field": "bk_host_name", "operator": "regex", "value": "host"}]
+        assert mirror.query_hosts(node, conditions, 0, 10, ["bk_host_id"]) is None
+
+        # 条件中的字段不在镜像中时，同样回退到CMDB查询
+        conditions = [
+            {"field": "bk_host_name", "operator": "contains", "value": "host"},
+            {"field": "bk_os_name", "operator": "equal", "value": "linux"},
+        ]
+        assert mirror.query_hosts(node, conditions, 0, 10, ["bk_host_id"]) is None
+
+
+def load(bk_biz_id):
+    """首次获取时在后台构建内存索引，构建完成后再次获取"""
+    assert TopoMirror.get(bk_biz_id) is None
+    return TopoMirror.get(bk_biz_id)
+
+
+class TestTopoMirror:
+    @pytest.fixture(autouse=True)
+    def mirror_redis(self):
+        redis = FakeRedis()
+        with patch.object(mirror_module, "RedisConn", redis), patch.object(tasks, "RedisConn", redis), patch.object(
+            env, "IPCHOOSER_MIRROR_ENABLE", True
+        ), patch.object(env, "IPCHOOSER_MIRROR_CHECK_INTERVAL", 0), patch.dict(
+            TopoMirror._mirrors, clear=True
+        ), patch.dict(
+            TopoMirror._next_check_times, clear=True
+        ), patch.object(
+            TopoMirror, "_loading_bizs", set()
+        ), patch.object(
+            TopoMirror._executor, "submit", side_effect=lambda fn, *args: fn(*args)
+        ):
+            yield redis
+
+    @pytest.fixture(autouse=True)
+    def fetch(self):
+        hosts = [{"bk_host_id": 1, "bk_host_innerip": "10.0.0.1", "bk_cloud_id": 0}]
+        with patch.object(TopoMirror, "_fetch", return_value=(build_topo(), [[1, 1, 11]], hosts)) as fetch:
+            yield fetch
+
+    @pytest.fixture(autouse=True)
+    def delay(self):
+        with patch.object(tasks.refresh_biz_mirror, "delay") as delay:
+            yield delay
+
+    def test_build_async(self, fetch, delay):
+        # 镜像尚未构建时，异步构建镜像，当前请求回退到CMDB查询
+        assert TopoMirror.get(constant.BK_BIZ_ID) is None
+        assert TopoMirror.get(constant.BK_BIZ_ID) is None
+        delay.assert_called_once_with(constant.BK_BIZ_ID)
+        fetch.assert_not_called()
+
+        tasks.refresh_biz_mirror(constant.BK_BIZ_ID)
+        mirror = load(constant.BK_BIZ_ID)
+        assert mirror.get_topo_tree()["count"] == 1
+        delay.assert_called_once()
+
+    def test_rebuild_after_eviction(self, delay):
+        TopoMirror.refresh(constant.BK_BIZ_ID)
+        assert load(constant.BK_BIZ_ID)
+
+        # 长时间未访问的业务镜像被清理后，同样异步重新构建
+        with patch.object(env, "IPCHOOSER_MIRROR_ACTIVE_TIME", -1):
+            assert TopoMirror.active_bizs() == []
+        assert TopoMirror.get(constant.BK_BIZ_ID) is None
+        delay.assert_called_once_with(constant.BK_BIZ_ID)
+
+    def test_send_task_failed(self, delay):
+        # 任务下发失败时清理排队标记，下次请求重新下发
+        delay.side_effect = Exception("broker unavailable")
+        assert TopoMirror.get(constant.BK_BIZ_ID) is None
+        assert TopoMirror.get(constant.BK_BIZ_ID) is None
+        assert delay.call_count == 2
+
+    def test_serve_previous_version(self, fetch):
+        TopoMirror.refresh(constant.BK_BIZ_ID)
+        old_mirror = load(constant.BK_BIZ_ID)
+
+        hosts = [
+            {"bk_host_id": host_id, "bk_host_innerip": f"10.0.0.{host_id}", "bk_cloud_id": 0} for host_id in [1, 2]
+        ]
+        fetch.return_value = (build_topo(), [[1, 1, 11], [2, 1, 11]], hosts)
+        TopoMirror.refresh(constant.BK_BIZ_ID)
+
+        # 新版本的内存索引构建完成前，继续返回旧版本，且只提交一次构建
+        with patch.object(TopoMirror._executor, "submit") as submit:
+            assert TopoMirror.get(constant.BK_BIZ_ID) is old_mirror
+            assert TopoMirror.get(constant.BK_BIZ_ID) is old_mirror
+        submit.assert_called_once()
+
+        TopoMirror._load(constant.BK_BIZ_ID)
+        mirror = TopoMirror.get(constant.BK_BIZ_ID)
+        assert mirror.version != old_mirror.version
+        assert mirror.get_topo_tree()["count"] == 2
+
+    def test_local_limit(self):
+        other_biz_id = constant.BK_BIZ_ID + 1
+        TopoMirror.refresh(constant.BK_BIZ_ID)
+        TopoMirror.refresh(other_biz_id)
+
+        # 超过进程内的缓存上限时，淘汰最久未访问的业务
+        with patch.object(env, "IPCHOOSER_MIRROR_LOCAL_LIMIT", 1):
+            load(constant.BK_BIZ_ID)
+            load(other_biz_id)
+        assert list(TopoMirror._mirrors) == [other_biz_id]
+        assert constant.BK_BIZ_ID not in TopoMirror._next_check_times
+
+
+class TestTopoMirrorWatch:
+    @pytest.fixture(autouse=True)
+    def mirror_redis(self):
+        redis = FakeRedis()
+        redis.zadd(IPCHOOSER_MIRROR_BIZS_KEY, {constant.BK_BIZ_ID: time.time()})
+        with patch.object(mirror_module, "RedisConn", redis):
+            yield redis
+
+    @pytest.fixture
+    def cc_api(self):
+        cc_api = MagicMock()
+        cc_api.find_host_biz_relations.return_value = [{"bk_biz_id": constant.BK_BIZ_ID}]
+        with patch.object(mirror_module, "CCApi", cc_api):
+            yield cc_api
+
+    @staticmethod
+    def watch_host(pages):
+        """主机资源依次返回pages，其余资源没有新事件"""
+
+        def resource_watch(params, use_admin):
+            if params["bk_resource"] == "host" and pages:
+                return pages.pop(0)
+            return {"bk_watched": False, "bk_events": [{"bk_cursor": "latest"}]}
+
+        return resource_watch
+
+    @staticmethod
+    def host_cursors(cc_api):
+        return [
+            call[0][0].get("bk_cursor")
+            for call in cc_api.resource_watch.call_args_list
+            if call[0][0]["bk_resource"] == "host"
+        ]
+
+    def test_watch_until_no_events(self, mirror_redis, cc_api):
+        cc_api.resource_watch.side_effect = self.watch_host(
+            [
+                {"bk_watched": True, "bk_events": [{"bk_cursor": "c1", "bk_detail": {"bk_host_id": 1}}]},
+                {"bk_watched": True, "bk_events": [{"bk_cursor": "c2", "bk_detail": {"bk_host_id": 2}}]},
+            ]
+        )
+
+        # 持续拉取直到没有新事件
+        assert TopoMirror.watch() == {constant.BK_BIZ_ID}
+        assert self.host_cursors(cc_api) == [None, "c1", "c2"]
+        assert mirror_redis.hget(IPCHOOSER_MIRROR_CURSOR_KEY, "host") == "latest"
+        assert sorted(cc_api.find_host_biz_relations.call_args[0][0]["bk_host_id"]) == [1, 2]
+
+    def test_watch_max_pages(self, mirror_redis, cc_api):
+        pages = [
+            {
+                "bk_watched": True,
+                "bk_events": [{"bk_cursor": f"c{page}", "bk_detail": {"bk_biz_id": constant.BK_BIZ_ID}}],
+            }
+            for page in range(3)
+        ]
+        cc_api.resource_watch.side_effect = self.watch_host(pages)
+
+        # 单次监听最多拉取的页数有上限，剩余事件由下一次监听从游标继续消费
+        with patch.object(mirror_module, "IPCHOOSER_MIRROR_WATCH_MAX_PAGES", 2):
+            assert TopoMirror.watch() == {constant.BK_BIZ_ID}
+        assert self.host_cursors(cc_api) == [None, "c0"]
+        assert mirror_redis.hget(IPCHOOSER_MIRROR_CURSOR_KEY, "host") == "c1"
@@ -13,7 +13,12 @@ from unittest.mock import patch
 
 import pytest
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.crypto import get_random_string
 
+from backend.db_meta.enums import ClusterDBHAStatusFlags, ClusterType, InstanceInnerRole, InstanceStatus
+from backend.db_meta.models import AppCache, Cluster
 from backend.db_services.mysql.resources.tendbha import views
 from backend.tests.conftest import mark_global_skip
 from backend.tests.mock_data.components.cc import CCApiMock
@@ -84,6 +89,47 @@ class TestDBHAResources:
         assert {p["ip"] for p in data["proxies"]} == set(dbha_proxy_ip_list)
         assert data["slave_domain"] == f"slave-{dbha_cluster.immute_domain}"
 
+    @patch("backend.db_services.ipchooser.handlers.host_handler.CCApi", CCApiMock())
+    @patch("backend.db_services.ipchooser.query.resource.CCApi", CCApiMock())
+    @patch("backend.db_services.ipchooser.handlers.base.CCApi", CCApiMock())
+    @patch("backend.db_services.ipchooser.query.resource.GseApi", GseApiMock())
+    @patch.object(views.DBHAViewSet, "get_permissions", lambda x: [])
+    def test_list_query_count(self, dbha_cluster, bk_biz_id):
+        AppCache.objects.get_or_create(bk_biz_id=bk_biz_id, defaults={"bk_biz_name": get_random_string(6)})
+        view = views.DBHAViewSet.as_view({"get": "list"})
+
+        def list_query_count():
+            request = factory.get(f"/apis/mysql/bizs/{bk_biz_id}/tendbha_resources/")
+            with CaptureQueriesContext(connection) as ctx:
+                view(request, bk_biz_id=bk_biz_id)
+            return len(ctx.captured_queries)
+
+        single_cluster_queries = list_query_count()
+        extra_cluster_num = 5
+        for __ in range(extra_cluster_num):
+            cluster_name = get_random_string(6)
+            Cluster.objects.create(
+                name=cluster_name,
+                cluster_type=ClusterType.TenDBHA,
+                immute_domain=f"gamedb.{cluster_name}.blueking.db",
+                bk_biz_id=bk_biz_id,
+                db_module_id=dbha_cluster.db_module_id,
+            )
+
+        # 业务名、云区域、访问端口、状态标志等信息均为整页批量获取，查询次数与集群数量无关
+        assert list_query_count() == single_cluster_queries
+
+    def test_bulk_status_flags_and_access_ports(self, dbha_cluster):
+        master = dbha_cluster.storageinstance_set.get(instance_inner_role=InstanceInnerRole.MASTER)
+        master.status = InstanceStatus.UNAVAILABLE.value
+        master.save(update_fields=["status"])
+        cluster = Cluster.objects.get(id=dbha_cluster.id)
+
+        status_flag_map = Cluster.bulk_status_flags([cluster.id])
+        assert status_flag_map[cluster.id] & ClusterDBHAStatusFlags.BackendMasterUnavailable
+        assert status_flag_map[cluster.id].value == cluster.status_flag
+        assert Cluster.bulk_access_ports([cluster.id]) == {cluster.id: cluster.access_port}
+
     @patch.object(views.DBHAViewSet, "get_permissions", lambda x: [])
     def test_get_table_fields(self, bk_biz_id):
         request = factory.get(
@@ -10,19 +10,21 @@ specific language governing permissions and limitations under the License.
 """
 
 import logging
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import pytest
 from django.conf import settings
 from rest_framework.permissions import AllowAny
 from rest_framework.test import APIClient
 
+from backend.db_services.taskflow.handlers import TaskFlowHandler
 from backend.db_services.taskflow.views.flow import TaskFlowViewSet
 from backend.flow.models import FlowNode, FlowTree, StateType
 from backend.tests.mock_data import constant
 from backend.tests.mock_data.components.bklog import BKLogApiMock
 from backend.tests.mock_data.db_services import taskflow
 from backend.ticket.constants import TicketType
+from backend.utils.local import local
 
 logger = logging.getLogger("test")
 client = APIClient()
@@ -80,7 +82,7 @@ class TestTaskflowApi:
         assert len(data) == 1
         assert data[0]["version"] == self.version_id
 
-    @patch("backend.db_services.taskflow.handlers.BKLogApi", BKLogApiMock)
+    @patch("backend.components.bklog.handler.BKLogApi", BKLogApiMock)
     @patch.object(TaskFlowViewSet, "permission_classes")
     @patch.object(TaskFlowViewSet, "get_permissions", lambda x: [])
     def test_node_log(self, mocked_permission_classes, init_taskflow):
@@ -90,3 +92,21 @@ class TestTaskflowApi:
         data = client.get(url, data={"node_id": self.node_id, "version_id": "1"}).data
 
         assert len(data) == 2
+
+    def test_search_version_logs_with_request(self, init_taskflow):
+        # 并发查询各采集项的日志时，工作线程需要携带当前请求，以当前用户的身份查询
+        request, thread_requests = MagicMock(), []
+
+        def iter_hits(*args, **kwargs):
+            thread_requests.append(local.request)
+            return []
+
+        flow_node = FlowNode.objects.get(root_id=self.root_id, node_id=self.node_id)
+        local.request = request
+        try:
+            with patch("backend.db_services.taskflow.handlers.BKLogHandler.iter_hits", side_effect=iter_hits):
+                TaskFlowHandler(self.root_id)._search_version_logs(flow_node, self.version_id, cursor={})
+        finally:
+            local.request = None
+
+        assert thread_requests and all(thread_request is request for thread_request in thread_requests)
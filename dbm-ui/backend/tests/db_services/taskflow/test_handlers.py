@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from backend import env
+from backend.bk_web.constants import LogLevelName
+from backend.db_services.taskflow import handlers
+from backend.db_services.taskflow.constants import NODE_LOG_REPORT_DELAY
+from backend.db_services.taskflow.handlers import TaskFlowHandler
+from backend.db_services.taskflow.views.flow import TaskFlowViewSet
+from backend.flow.models import FlowNode, StateType
+from backend.tests.mock_data.db_services import taskflow
+
+pytestmark = pytest.mark.django_db
+client = APIClient()
+
+ROOT_ID, NODE_ID, VERSION_ID = taskflow.ROOT_ID, taskflow.NODE_ID, taskflow.VERSION_ID
+# 各采集项的日志，按排序值交错
+COLLECTOR_SORTS = {"dbm_log": [1, 3, 5, 7], "dbm_dbactuator": [2, 4, 6]}
+
+
+def make_hit(sort):
+    return {
+        "sort": [sort],
+        "_index": f"{env.DBA_APP_BK_BIZ_ID}_bklog_dbm_log",
+        "_source": {"log": json.dumps({"levelname": "INFO", "msg": f"m{sort}"}), "serverIp": "", "time": sort},
+    }
+
+
+class FakeBKLog:
+    """按照采集项返回排序值在游标之后的日志，并记录查询次数"""
+
+    def __init__(self, collector_sorts):
+        self.collector_sorts = collector_sorts
+        self.calls = []
+
+    def iter_hits(self, collector, start_time, end_time, query_string, limit=None, search_after=None, **kwargs):
+        self.calls.append((collector, search_after, limit))
+        sorts = [sort for sort in self.collector_sorts[collector] if not search_after or [sort] > search_after]
+        return [make_hit(sort) for sort in sorts[:limit]]
+
+
+@pytest.fixture
+def bklog():
+    fake_bklog = FakeBKLog(COLLECTOR_SORTS)
+    with patch.object(handlers.BKLogHandler, "iter_hits", fake_bklog.iter_hits), patch.object(
+        handlers, "cache", LocMemCache("taskflow_node_log", {})
+    ):
+        yield fake_bklog
+
+
+@pytest.fixture
+def running_node():
+    return FlowNode.objects.create(
+        uid=1,
+        root_id=ROOT_ID,
+        node_id=NODE_ID,
+        version_id=VERSION_ID,
+        status=StateType.RUNNING.value,
+        started_at=timezone.now(),
+    )
+
+
+@pytest.fixture
+def finished_node(running_node):
+    # 节点结束且超过日志上报延迟，日志不会再变化
+    FlowNode.objects.filter(id=running_node.id).update(
+        status=StateType.FINISHED.value, updated_at=timezone.now() - timedelta(seconds=NODE_LOG_REPORT_DELAY + 1)
+    )
+
+
+def messages(logs):
+    return [log["message"].rsplit(" ", 1)[-1] for log in logs]
+
+
+def tail_all(cursor=None):
+    """从游标开始增量获取，直到没有新日志为止，返回每一页的日志"""
+    pages = []
+    while True:
+        data = TaskFlowHandler(ROOT_ID).tail_version_logs(NODE_ID, VERSION_ID, cursor)
+        if not data["logs"]:
+            return pages, data
+        pages.append(messages(data["logs"]))
+        cursor = data["cursor"]
+
+
+class TestTailVersionLogs:
+    @patch.object(handlers, "NODE_LOG_TAIL_LIMIT", 2)
+    def test_tail_pages(self, bklog, running_node):
+        pages, data = tail_all()
+
+        # 多次翻页后日志不重不漏，且保持时间顺序
+        assert sum(pages, []) == [f"m{sort}" for sort in range(1, 8)]
+        assert len(pages) > 1
+        assert data["finished"] is False
+
+    @patch.object(handlers, "NODE_LOG_TAIL_LIMIT", 2)
+    def test_truncate_boundary(self, bklog, running_node):
+        bklog.collector_sorts = {"dbm_log": [1, 2, 3, 4], "dbm_dbactuator": [10]}
+        pages, __ = tail_all()
+
+        # dbm_log 被截断时只能归并到其最后一条日志为止，dbm_dbactuator 的日志留到之后的查询
+        assert pages == [["m1", "m2"], ["m3", "m4"], ["m10"]]
+
+    def test_finished_without_new_logs(self, bklog, finished_node):
+        data = TaskFlowHandler(ROOT_ID).tail_version_logs(NODE_ID, VERSION_ID)
+        assert messages(data["logs"]) == [f"m{sort}" for sort in range(1, 8)]
+        assert data["finished"] is True
+
+        # 游标已在末尾，直接读取缓存判断没有新日志，无需再查询日志平台
+        bklog.calls.clear()
+        new_data = TaskFlowHandler(ROOT_ID).tail_version_logs(NODE_ID, VERSION_ID, data["cursor"])
+        assert new_data == {"logs": [], "cursor": data["cursor"], "finished": True}
+        assert bklog.calls == []
+
+    @patch.object(handlers, "NODE_LOG_FULL_LIMIT", 2)
+    def test_finished_truncated(self, bklog, finished_node):
+        data = TaskFlowHandler(ROOT_ID).tail_version_logs(NODE_ID, VERSION_ID)
+        assert messages(data["logs"]) == ["m1", "m2", "m3"]
+        assert data["finished"] is False
+
+        # 完整日志被截断时，继续从截断处增量获取
+        pages, data = tail_all(data["cursor"])
+        assert sum(pages, []) == [f"m{sort}" for sort in range(4, 8)]
+        assert data["finished"] is True
+
+
+class TestFullVersionLogs:
+    def test_cache_finished_version(self, bklog, finished_node):
+        flow_node = FlowNode.objects.get(root_id=ROOT_ID, node_id=NODE_ID)
+        logs, cursor, truncated = TaskFlowHandler(ROOT_ID)._get_full_version_logs(flow_node, VERSION_ID)
+        call_count = len(bklog.calls)
+
+        assert TaskFlowHandler(ROOT_ID)._get_full_version_logs(flow_node, VERSION_ID) == (logs, cursor, truncated)
+        assert len(bklog.calls) == call_count
+
+    def test_not_cache_running_version(self, bklog, running_node):
+        TaskFlowHandler(ROOT_ID)._get_full_version_logs(running_node, VERSION_ID)
+        call_count = len(bklog.calls)
+
+        TaskFlowHandler(ROOT_ID)._get_full_version_logs(running_node, VERSION_ID)
+        assert len(bklog.calls) == 2 * call_count
+
+    @patch.object(handlers, "NODE_LOG_FULL_LIMIT", 2)
+    def test_get_version_logs_limit(self, bklog, finished_node):
+        logs = TaskFlowHandler(ROOT_ID).get_version_logs(NODE_ID, VERSION_ID)
+
+        # 日志过多时只返回前面的部分，并提示通过增量获取查看后续日志
+        assert messages(logs[:-1]) == ["m1", "m2", "m3"]
+        assert logs[-1]["levelname"] == LogLevelName.WARNING.value
+
+
+@patch.object(TaskFlowViewSet, "get_permissions", lambda x: [])
+class TestNodeLogTailView:
+    @patch.object(handlers, "NODE_LOG_TAIL_LIMIT", 3)
+    def test_node_log_tail(self, bklog, running_node):
+        url = f"/apis/taskflow/{ROOT_ID}/node_log_tail/"
+        data = client.get(url, data={"node_id": NODE_ID, "version_id": VERSION_ID}).data
+        assert messages(data["logs"]) == ["m1", "m2", "m3", "m4", "m5"]
+
+        data = client.get(url, data={"node_id": NODE_ID, "version_id": VERSION_ID, "cursor": data["cursor"]}).data
+        assert messages(data["logs"]) == ["m6", "m7"]
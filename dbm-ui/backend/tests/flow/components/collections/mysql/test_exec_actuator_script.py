@@ -9,30 +9,57 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import json
 import logging
+import uuid
 from typing import List, Type
+from unittest.mock import MagicMock
 
 import pytest
 from django.test import TestCase
+from mock import patch
 from pipeline.component_framework.component import Component
+from pipeline.core.data.base import DataObject
 
 from backend import env
 from backend.constants import DEFAULT_BK_CLOUD_ID
 from backend.db_meta.enums import ClusterType
-from backend.flow.plugins.components.collections.mysql.exec_actuator_script import ExecuteDBActuatorScriptComponent
+from backend.flow.consts import FAILED, JOB_IP_SUCCESS, SUCCESS
+from backend.flow.plugins.components.collections.mysql.exec_actuator_script import (
+    ExecuteDBActuatorScriptComponent,
+    ExecuteDBActuatorScriptService,
+)
 from backend.flow.utils.mysql.mysql_act_playload import MysqlActPayload
 from backend.flow.utils.mysql.mysql_context_dataclass import SingleApplyAutoContext
+from backend.flow.utils.script_template import MULTI_IP_PAYLOAD_NOT_FOUND_EXIT_CODE
 from backend.tests.flow.components.collections.base import BaseComponentPatcher as Patcher
 from backend.tests.flow.components.collections.mysql.utils import MySQLSingleApplyComponentTest
 from backend.tests.mock_data.components import cc
 from backend.tests.mock_data.components.dbconfig import DBConfigApiMock
 from backend.tests.mock_data.components.job import JOB_INSTANCE_ID, STEP_INSTANCE_ID
 from backend.tests.mock_data.components.mysql_priv_manager import DBPrivManagerApiMock
+from backend.utils.string import base64_decode
 
 logger = logging.getLogger("test")
 pytestmark = pytest.mark.django_db
 
 
+def job_status_resp(status: int, ip_results: list):
+    """job任务状态，ip_results为每台主机的(ip, 状态, 退出码)"""
+    step_ip_result_list = [
+        {"ip": ip, "bk_cloud_id": DEFAULT_BK_CLOUD_ID, "status": ip_status, "exit_code": exit_code}
+        for ip, ip_status, exit_code in ip_results
+    ]
+    return {
+        "result": True,
+        "data": {
+            "finished": True,
+            "job_instance": {"status": status},
+            "step_instance_list": [{"step_instance_id": STEP_INSTANCE_ID, "step_ip_result_list": step_ip_result_list}],
+        },
+    }
+
+
 class TestExecActuatorScriptComponent(MySQLSingleApplyComponentTest, TestCase):
     def component_cls(self) -> Type[Component]:
         return ExecuteDBActuatorScriptComponent
@@ -89,3 +116,139 @@ class TestExecActuatorScriptComponent(MySQLSingleApplyComponentTest, TestCase):
             },
             "exec_ips": ["127.0.0.1"],
         }
+
+
+class TestMultiIpExecActuatorScriptComponent(TestExecActuatorScriptComponent):
+    @classmethod
+    def _set_kwargs(cls) -> None:
+        super()._set_kwargs()
+        cls.kwargs.update({"multi_ip_payload": True, "cluster_map": {"127.0.0.1": {"new_ip": cc.NORMAL_IP}}})
+
+    @classmethod
+    def _set_excepted_outputs(cls) -> None:
+        super()._set_excepted_outputs()
+        cls.excepted_outputs["pending_ip_batches"] = []
+
+
+class TestMultiIpExecActuatorScriptPayload:
+    """多ip聚合模式：每个ip根据 cluster_map 拼接各自的payload，聚合到一个job任务的脚本参数中"""
+
+    cluster_map = {"1.1.1.1": {"backend_port": 20000}, "2.2.2.2": {"backend_port": 20001}}
+
+    @pytest.fixture(autouse=True)
+    def job_api(self):
+        job_api = MagicMock()
+        job_api.fast_execute_script.return_value = {"result": True, "data": {"job_instance_id": JOB_INSTANCE_ID}}
+        module = ExecuteDBActuatorScriptService.__module__
+        job_api.get_job_instance_status.return_value = job_status_resp(
+            SUCCESS, [(ip, JOB_IP_SUCCESS, 0) for ip in self.cluster_map]
+        )
+        job_api.get_job_instance_ip_log.return_value = {"result": True, "data": {"log_content": ""}}
+        with patch(f"{module}.JobApi", job_api), patch(
+            "backend.flow.plugins.components.collections.common.base_service.JobApi", job_api
+        ), patch(f"{module}.get_mysql_sys_users", lambda bk_cloud_id: ["sys_user"]), patch(
+            "backend.flow.utils.base.payload_handler.DBPrivManagerApi", DBPrivManagerApiMock
+        ), patch.object(
+            ExecuteDBActuatorScriptService, "is_callback_mode", False
+        ), patch.object(
+            env, "JOB_POLLER_ENABLE", False
+        ):
+            yield job_api
+
+    def create_data(self):
+        kwargs = {
+            "root_id": uuid.uuid1().hex,
+            "node_id": uuid.uuid1().hex,
+            "node_name": "uninstall_mysql",
+            "bk_cloud_id": DEFAULT_BK_CLOUD_ID,
+            "exec_ip": list(self.cluster_map),
+            "get_mysql_payload_func": MysqlActPayload.get_uninstall_mysql_payload.__name__,
+            "cluster_type": ClusterType.TenDBHA,
+            "multi_ip_payload": True,
+            "cluster_map": self.cluster_map,
+        }
+        global_data = {"uid": "1", "bk_biz_id": 1, "force": True}
+        return DataObject(inputs={"kwargs": kwargs, "trans_data": None, "global_data": global_data})
+
+    def test_script_param(self, job_api):
+        data = self.create_data()
+        assert ExecuteDBActuatorScriptService().execute(data, {})
+
+        # 所有ip通过一个job任务下发
+        job_api.fast_execute_script.assert_called_once()
+        body = job_api.fast_execute_script.call_args[0][0]
+        assert [ip["ip"] for ip in body["target_server"]["ip_list"]] == list(self.cluster_map)
+        assert data.get_one_of_outputs("exec_ips") == list(self.cluster_map)
+
+        # 脚本参数格式为 "{ip},{payload},{non_sensitive_payload}"，多个ip以空格分隔
+        script_param = base64_decode(body["script_param"])
+        entries = [entry.split(",") for entry in script_param.split(" ")]
+        assert [ip for ip, _, _ in entries] == list(self.cluster_map)
+        for ip, payload, non_sensitive_payload in entries:
+            payload = json.loads(base64_decode(payload))
+            assert payload["extend"]["host"] == ip
+            assert payload["extend"]["ports"] == [self.cluster_map[ip]["backend_port"]]
+            assert payload["general"]["runtime_extend"] == {"mysql_sys_users": ["sys_user"]}
+            assert non_sensitive_payload == "none"
+
+    def sent_ips(self, job_api):
+        """每次下发job任务的目标ip"""
+        return [
+            [ip["ip"] for ip in call[0][0]["target_server"]["ip_list"]]
+            for call in job_api.fast_execute_script.call_args_list
+        ]
+
+    def test_split_by_script_param_length(self, job_api):
+        data = self.create_data()
+        service = ExecuteDBActuatorScriptService()
+        with patch.object(env, "JOB_SCRIPT_PARAM_MAX_LENGTH", 1):
+            assert service.execute(data, {})
+
+        # 脚本参数超过长度上限，每个ip单独成批，以单ip模式执行
+        assert self.sent_ips(job_api) == [["1.1.1.1"]]
+        assert data.get_one_of_outputs("pending_ip_batches") == [["2.2.2.2"]]
+        payload = json.loads(
+            base64_decode(json.loads(base64_decode(job_api.fast_execute_script.call_args[0][0]["script_param"])))
+        )
+        assert payload["extend"]["host"] == "1.1.1.1"
+
+        # 上一批执行成功后下发下一批，节点继续调度
+        assert service.schedule(data, {})
+        assert not service.is_schedule_finished()
+        assert self.sent_ips(job_api) == [["1.1.1.1"], ["2.2.2.2"]]
+        assert data.get_one_of_outputs("exec_ips") == ["2.2.2.2"]
+
+        assert service.schedule(data, {})
+        assert service.is_schedule_finished()
+        assert job_api.fast_execute_script.call_count == 2
+
+    def test_payload_not_found_fallback(self, job_api):
+        data = self.create_data()
+        service = ExecuteDBActuatorScriptService()
+        assert service.execute(data, {})
+        assert self.sent_ips(job_api) == [list(self.cluster_map)]
+
+        # 未匹配到本机ip的主机回退为单ip模式重新下发
+        job_api.get_job_instance_status.return_value = job_status_resp(
+            FAILED, [("1.1.1.1", JOB_IP_SUCCESS, 0), ("2.2.2.2", 11, MULTI_IP_PAYLOAD_NOT_FOUND_EXIT_CODE)]
+        )
+        assert service.schedule(data, {})
+        assert not service.is_schedule_finished()
+        assert self.sent_ips(job_api) == [list(self.cluster_map), ["2.2.2.2"]]
+
+        job_api.get_job_instance_status.return_value = job_status_resp(SUCCESS, [("2.2.2.2", JOB_IP_SUCCESS, 0)])
+        assert service.schedule(data, {})
+        assert service.is_schedule_finished()
+
+    def test_other_failure_not_fallback(self, job_api):
+        data = self.create_data()
+        service = ExecuteDBActuatorScriptService()
+        assert service.execute(data, {})
+
+        # 有主机执行失败时，不再回退下发
+        job_api.get_job_instance_status.return_value = job_status_resp(
+            FAILED, [("1.1.1.1", 11, 1), ("2.2.2.2", 11, MULTI_IP_PAYLOAD_NOT_FOUND_EXIT_CODE)]
+        )
+        assert not service.schedule(data, {})
+        assert service.is_schedule_finished()
+        job_api.fast_execute_script.assert_called_once()
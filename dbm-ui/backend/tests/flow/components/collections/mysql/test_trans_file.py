@@ -13,25 +13,36 @@ import logging
 import uuid
 from dataclasses import asdict
 from typing import Type
+from unittest.mock import MagicMock
 
 import pytest
 from django.test import TestCase
+from mock import patch
 from pipeline.component_framework.component import Component
+from pipeline.core.data.base import DataObject
 
 from backend import env
 from backend.flow.engine.bamboo.scene.common.get_file_list import GetFileList
-from backend.flow.plugins.components.collections.mysql.trans_flies import TransFileComponent
+from backend.flow.plugins.components.collections.mysql.trans_flies import TransFileComponent, TransFileService
+from backend.flow.utils.medium_inventory import MediumInventory
 from backend.flow.utils.mysql.mysql_act_dataclass import DownloadMediaKwargs
 from backend.flow.utils.mysql.mysql_context_dataclass import SingleApplyAutoContext
 from backend.tests.flow.components.collections.mysql.utils import MySQLSingleApplyComponentTest
 from backend.tests.mock_data.components import cc
-from backend.tests.mock_data.components.job import JOB_INSTANCE_ID, STEP_INSTANCE_ID
+from backend.tests.mock_data.components.job import JOB_INSTANCE_ID, JOB_SUCCESS_STATUS, STEP_INSTANCE_ID
+from backend.tests.mock_data.flow.medium_inventory import ACTUATOR_PKG, ACTUATOR_PKG_MD5, MYSQL_PKG, MYSQL_PKG_MD5
 
 logger = logging.getLogger("test")
 pytestmark = pytest.mark.django_db
 
 
 class TestTransFileComponent(MySQLSingleApplyComponentTest, TestCase):
+    def setUp(self):
+        # 主机介质清单依赖redis，这里只验证全量下发
+        patcher = patch.object(env, "MEDIUM_INVENTORY_ENABLE", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
     def component_cls(self) -> Type[Component]:
         return TransFileComponent
 
@@ -64,3 +75,108 @@ class TestTransFileComponent(MySQLSingleApplyComponentTest, TestCase):
                 },
             }
         }
+
+
+@pytest.mark.usefixtures("medium_inventory_redis")
+class TestTransFileWithMediumInventory:
+    """根据主机介质清单下发介质：清单命中的介质先在主机上校验md5，校验不通过的介质重新下发"""
+
+    ips = ["1.1.1.1", "2.2.2.2"]
+    file_list = [MYSQL_PKG, ACTUATOR_PKG]
+
+    @pytest.fixture(autouse=True)
+    def job_api(self):
+        job_api = MagicMock()
+        job_api.fast_execute_script.return_value = {"result": True, "data": {"job_instance_id": 1}}
+        job_api.fast_transfer_file.return_value = {"result": True, "data": {"job_instance_id": 2}}
+        job_api.get_job_instance_status.return_value = {
+            "result": True,
+            "data": {
+                "finished": True,
+                "job_instance": {"status": JOB_SUCCESS_STATUS},
+                "step_instance_list": [{"step_instance_id": STEP_INSTANCE_ID}],
+            },
+        }
+        with patch("backend.flow.plugins.components.collections.mysql.trans_flies.JobApi", job_api), patch(
+            "backend.flow.plugins.components.collections.common.base_service.JobApi", job_api
+        ), patch.object(env, "MEDIUM_INVENTORY_ENABLE", True), patch.object(
+            env, "JOB_POLLER_ENABLE", False
+        ), patch.object(
+            TransFileService, "is_callback_mode", False
+        ):
+            yield job_api
+
+    def create_data(self):
+        kwargs = {
+            "bk_cloud_id": 0,
+            "exec_ip": self.ips,
+            "file_list": self.file_list,
+            "file_target_path": "/data/install",
+            "root_id": uuid.uuid1().hex,
+            "node_id": uuid.uuid1().hex,
+            "node_name": "trans_file",
+        }
+        return DataObject(inputs={"kwargs": kwargs, "trans_data": None, "global_data": {}})
+
+    @classmethod
+    def create_inventory(cls):
+        return MediumInventory(
+            bk_cloud_id=0,
+            file_list=cls.file_list,
+            target_path="/data/install",
+            account="root",
+        )
+
+    def test_verify_and_retransfer(self, job_api):
+        inventory = self.create_inventory()
+        # 1.1.1.1 的清单中有全部介质；2.2.2.2 只有部分介质，且该介质在主机上已被清理
+        inventory.record(["1.1.1.1"])
+        inventory.record(["2.2.2.2"], [MYSQL_PKG])
+        verify_logs = {
+            "1.1.1.1": "\n".join(
+                [f"{MYSQL_PKG_MD5}  /data/install/mysql-5.7.tar.gz", f"{ACTUATOR_PKG_MD5}  /data/install/dbactuator"]
+            ),
+            "2.2.2.2": "",
+        }
+        job_api.get_job_instance_ip_log.side_effect = lambda payload, raw: {
+            "result": True,
+            "data": {"log_content": verify_logs[payload["ip"]]},
+        }
+
+        service, data = TransFileService(), self.create_data()
+        assert service.execute(data, {})
+
+        # 部分命中清单的主机同样需要在主机上校验
+        verify_payload = job_api.fast_execute_script.call_args[0][0]
+        assert [ip["ip"] for ip in verify_payload["target_server"]["ip_list"]] == self.ips
+        assert data.get_one_of_outputs("medium_verify")["files"] == {
+            "1.1.1.1": [MYSQL_PKG, ACTUATOR_PKG],
+            "2.2.2.2": [MYSQL_PKG],
+        }
+        job_api.fast_transfer_file.assert_not_called()
+
+        # 校验结束后，只向介质失效或者缺失的主机重新下发
+        assert service.schedule(data, {})
+        transfer_payload = job_api.fast_transfer_file.call_args[0][0]
+        assert [ip["ip"] for ip in transfer_payload["target_server"]["ip_list"]] == ["2.2.2.2"]
+        assert transfer_payload["file_source_list"][0]["file_list"] == [MYSQL_PKG, ACTUATOR_PKG]
+        assert inventory.get_missing_files(["2.2.2.2"])["2.2.2.2"] == [MYSQL_PKG, ACTUATOR_PKG]
+
+        # 下发成功后更新主机介质清单
+        assert service.schedule(data, {})
+        assert service.is_schedule_finished()
+        assert inventory.get_missing_files(self.ips) == {"1.1.1.1": [], "2.2.2.2": []}
+
+    def test_verify_failed_retransfer_all(self, job_api):
+        inventory = self.create_inventory()
+        inventory.record(self.ips)
+        # 校验任务执行失败时，所有命中清单的介质都视为失效
+        job_api.get_job_instance_status.return_value["data"]["job_instance"]["status"] = -1
+
+        service, data = TransFileService(), self.create_data()
+        assert service.execute(data, {})
+        assert service.schedule(data, {})
+
+        transfer_payload = job_api.fast_transfer_file.call_args[0][0]
+        assert [ip["ip"] for ip in transfer_payload["target_server"]["ip_list"]] == self.ips
+        assert transfer_payload["file_source_list"][0]["file_list"] == self.file_list
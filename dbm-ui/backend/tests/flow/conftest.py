@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from unittest.mock import patch
+
+import pytest
+
+from backend.tests.mock_data.fake_redis import FakeRedis
+from backend.tests.mock_data.flow.medium_inventory import get_package_by_path
+
+
+@pytest.fixture
+def medium_inventory_redis():
+    """主机介质清单使用内存redis，介质md5从 PACKAGE_MD5S 中获取"""
+    redis = FakeRedis()
+    with patch("backend.flow.utils.medium_inventory.RedisConn", redis), patch(
+        "backend.flow.utils.medium_inventory.PackageRegistry.get_package_by_path", side_effect=get_package_by_path
+    ):
+        yield redis
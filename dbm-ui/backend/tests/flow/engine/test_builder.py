@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import math
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from backend.flow.engine.bamboo.scene.common.builder import FLOW_NODE_BATCH_SIZE, Builder, SubBuilder
+from backend.flow.models import FlowNode, FlowTree
+from backend.flow.plugins.components.collections.common.pause import PauseComponent
+from backend.tests.mock_data import constant
+from backend.utils.basic import generate_root_id
+
+pytestmark = pytest.mark.django_db
+
+# 子流程数量，以及每个子流程中并发的活动节点数量
+SUB_FLOW_NUM = 10
+SUB_FLOW_ACT_NUM = 100
+
+
+def build_pipeline(root_id):
+    """构造一个包含主流程节点和多个并发子流程的大流程"""
+    data = {"uid": root_id, "ticket_type": "TEST", "bk_biz_id": constant.BK_BIZ_ID, "created_by": "admin"}
+    pipeline = Builder(root_id=root_id, data=data)
+    pipeline.add_act(act_name="start", act_component_code=PauseComponent.code, kwargs={"password": "xxx"})
+
+    sub_pipelines = []
+    for index in range(SUB_FLOW_NUM):
+        sub_pipeline = SubBuilder(root_id=root_id, data=data)
+        sub_pipeline.add_parallel_acts(
+            acts_list=[
+                {"act_name": f"act-{index}-{i}", "act_component_code": PauseComponent.code, "kwargs": {}}
+                for i in range(SUB_FLOW_ACT_NUM)
+            ]
+        )
+        sub_pipelines.append(sub_pipeline.build_sub_process(sub_name=f"sub-{index}"))
+    pipeline.add_parallel_sub_pipeline(sub_flow_list=sub_pipelines)
+    return pipeline
+
+
+def has_inputs(tree):
+    return any(key == "inputs" or (isinstance(value, dict) and has_inputs(value)) for key, value in tree.items())
+
+
+@patch(
+    "backend.flow.engine.bamboo.scene.common.builder.api.run_pipeline", MagicMock(return_value=MagicMock(result=True))
+)
+def test_run_pipeline_bulk_create_flow_nodes():
+    root_id = generate_root_id()
+    pipeline = build_pipeline(root_id)
+    act_num = 1 + SUB_FLOW_NUM * SUB_FLOW_ACT_NUM
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert pipeline.run_pipeline()
+
+    # 所有活动节点(包括子流程中的节点)均被登记，且按批次写入
+    assert FlowNode.objects.filter(root_id=root_id).count() == act_num
+    flow_node_inserts = [
+        query
+        for query in ctx.captured_queries
+        if query["sql"].startswith("INSERT") and FlowNode._meta.db_table in query["sql"]
+    ]
+    assert len(flow_node_inserts) <= math.ceil(act_num / FLOW_NODE_BATCH_SIZE)
+
+    # 构建流程时不再逐个节点写入
+    assert len(ctx.captured_queries) <= math.ceil(act_num / FLOW_NODE_BATCH_SIZE) + 5
+
+    # 保存的流程树不包含节点的入参(敏感数据)
+    tree = FlowTree.objects.get(root_id=root_id).tree
+    assert not has_inputs(tree)
+    assert "password" not in str(tree)
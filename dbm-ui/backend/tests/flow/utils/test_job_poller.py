@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from backend import env
+from backend.flow.plugins.components.collections.common.base_service import BkJobService
+from backend.flow.utils import job_poller
+from backend.flow.utils.job_poller import (
+    JOB_POLLER_INFLIGHT_EXPIRE,
+    JOB_POLLER_INFLIGHT_KEY,
+    JOB_POLLER_LOCK_KEY,
+    JobStatusPoller,
+)
+from backend.tests.mock_data.components.job import JOB_INSTANCE_ID, JOB_SUCCESS_STATUS, STEP_INSTANCE_ID
+from backend.tests.mock_data.fake_redis import FakeRedis
+
+JOB_FAILED_STATUS = 4
+IP_LIST = [{"bk_cloud_id": 0, "ip": "1.1.1.1"}, {"bk_cloud_id": 0, "ip": "2.2.2.2"}]
+
+
+def status_resp(finished: bool, status: int = JOB_SUCCESS_STATUS):
+    return {
+        "result": True,
+        "data": {
+            "finished": finished,
+            "job_instance": {"status": status},
+            "step_instance_list": [{"step_instance_id": STEP_INSTANCE_ID}],
+        },
+    }
+
+
+@pytest.fixture
+def poller_redis():
+    redis = FakeRedis()
+    with patch.object(job_poller, "RedisConn", redis):
+        yield redis
+
+
+@pytest.fixture
+def job_api():
+    job_api = MagicMock()
+    job_api.get_job_instance_status.return_value = status_resp(finished=False)
+    job_api.batch_get_job_instance_ip_log.return_value = {
+        "result": True,
+        "data": {"script_task_logs": [{**ip, "log_content": f"log of {ip['ip']}"} for ip in IP_LIST]},
+    }
+    with patch.object(job_poller, "JobApi", job_api), patch(
+        "backend.flow.plugins.components.collections.common.base_service.JobApi", job_api
+    ):
+        yield job_api
+
+
+def shift_time(seconds: float):
+    """模拟时间流逝"""
+    mock_time = MagicMock()
+    mock_time.time.return_value = time.time() + seconds
+    return patch.object(job_poller, "time", mock_time)
+
+
+class TestJobStatusPoller:
+    def test_poll_running(self, poller_redis, job_api):
+        JobStatusPoller.register(JOB_INSTANCE_ID, IP_LIST)
+        JobStatusPoller.poll()
+
+        assert JobStatusPoller.get_status(JOB_INSTANCE_ID) == status_resp(finished=False)
+        assert poller_redis.hget(JOB_POLLER_INFLIGHT_KEY, JOB_INSTANCE_ID)
+        job_api.batch_get_job_instance_ip_log.assert_not_called()
+        assert not poller_redis.exists(JOB_POLLER_LOCK_KEY)
+
+    def test_poll_failed_with_log(self, poller_redis, job_api):
+        job_api.get_job_instance_status.return_value = status_resp(finished=True, status=JOB_FAILED_STATUS)
+        JobStatusPoller.register(JOB_INSTANCE_ID, IP_LIST)
+        JobStatusPoller.poll()
+
+        # 任务失败时总是拉取日志，任务结束后不再轮询
+        assert JobStatusPoller.get_status(JOB_INSTANCE_ID)["data"]["finished"]
+        assert JobStatusPoller.get_ip_log(JOB_INSTANCE_ID, IP_LIST[1]) == "log of 2.2.2.2"
+        assert not poller_redis.hget(JOB_POLLER_INFLIGHT_KEY, JOB_INSTANCE_ID)
+
+    def test_poll_success_without_log(self, poller_redis, job_api):
+        job_api.get_job_instance_status.return_value = status_resp(finished=True)
+        JobStatusPoller.register(JOB_INSTANCE_ID, IP_LIST, need_log=False)
+        JobStatusPoller.poll()
+
+        job_api.batch_get_job_instance_ip_log.assert_not_called()
+        assert JobStatusPoller.get_ip_log(JOB_INSTANCE_ID, IP_LIST[0]) is None
+        assert not poller_redis.hget(JOB_POLLER_INFLIGHT_KEY, JOB_INSTANCE_ID)
+
+    def test_poll_log_in_batches(self, poller_redis, job_api):
+        job_api.get_job_instance_status.return_value = status_resp(finished=True)
+        JobStatusPoller.register(JOB_INSTANCE_ID, IP_LIST, need_log=True)
+        with patch.object(job_poller, "JOB_POLLER_LOG_BATCH_SIZE", 1):
+            JobStatusPoller.poll()
+
+        assert [call[0][0]["ip_list"] for call in job_api.batch_get_job_instance_ip_log.call_args_list] == [
+            [IP_LIST[0]],
+            [IP_LIST[1]],
+        ]
+        assert JobStatusPoller.get_ip_log(JOB_INSTANCE_ID, IP_LIST[0]) == "log of 1.1.1.1"
+
+    def test_poll_expired_inflight(self, poller_redis, job_api):
+        with shift_time(-JOB_POLLER_INFLIGHT_EXPIRE - 1):
+            JobStatusPoller.register(JOB_INSTANCE_ID, IP_LIST)
+        JobStatusPoller.poll()
+
+        # 登记过久的任务不再轮询
+        job_api.get_job_instance_status.assert_not_called()
+        assert not poller_redis.exists(JOB_POLLER_INFLIGHT_KEY)
+
+    def test_poll_locked(self, poller_redis, job_api):
+        JobStatusPoller.register(JOB_INSTANCE_ID, IP_LIST)
+        poller_redis.set(JOB_POLLER_LOCK_KEY, 1)
+        JobStatusPoller.poll()
+        job_api.get_job_instance_status.assert_not_called()
+
+    def test_stale_status(self, poller_redis):
+        JobStatusPoller.set_status(JOB_INSTANCE_ID, status_resp(finished=False))
+        assert JobStatusPoller.get_status(JOB_INSTANCE_ID)
+
+        # 未结束的状态长时间没有更新，视为没有缓存
+        with shift_time(env.JOB_POLLER_STALE_SECONDS + 1):
+            assert JobStatusPoller.get_status(JOB_INSTANCE_ID) is None
+
+        # 结束态不会过时
+        JobStatusPoller.set_status(JOB_INSTANCE_ID, status_resp(finished=True))
+        with shift_time(env.JOB_POLLER_STALE_SECONDS + 1):
+            assert JobStatusPoller.get_status(JOB_INSTANCE_ID) == status_resp(finished=True)
+
+
+@patch.object(env, "JOB_POLLER_ENABLE", True)
+@patch.object(BkJobService, "is_callback_mode", False)
+class TestPollStatus:
+    def poll_status(self):
+        return BkJobService().__poll_status__(JOB_INSTANCE_ID, IP_LIST, need_log=False)
+
+    def test_register_and_read_cache(self, poller_redis, job_api):
+        # 首次调度直接请求job，未结束则登记到轮询器
+        assert self.poll_status() == status_resp(finished=False)
+        assert json.loads(poller_redis.hget(JOB_POLLER_INFLIGHT_KEY, JOB_INSTANCE_ID))["ip_list"] == IP_LIST
+
+        # 轮询器尚未产出缓存时，等待下一次调度
+        assert self.poll_status() is None
+
+        # 之后读取轮询器的缓存
+        JobStatusPoller.set_status(JOB_INSTANCE_ID, status_resp(finished=True))
+        assert self.poll_status() == status_resp(finished=True)
+        job_api.get_job_instance_status.assert_called_once()
+
+    def test_finished_not_register(self, poller_redis, job_api):
+        job_api.get_job_instance_status.return_value = status_resp(finished=True)
+        assert self.poll_status() == status_resp(finished=True)
+        assert not poller_redis.exists(JOB_POLLER_INFLIGHT_KEY)
+
+    def test_callback_mode_not_register(self, poller_redis, job_api):
+        with patch.object(BkJobService, "is_callback_mode", True):
+            assert self.poll_status() == status_resp(finished=False)
+        assert not poller_redis.exists(JOB_POLLER_INFLIGHT_KEY)
+
+    def test_fallback_without_cache(self, poller_redis, job_api):
+        self.poll_status()
+
+        # 登记后轮询器长时间没有产出缓存，回退为直接请求job
+        with shift_time(env.JOB_POLLER_STALE_SECONDS + 1):
+            assert self.poll_status() == status_resp(finished=False)
+        assert job_api.get_job_instance_status.call_count == 2
+
+    def test_fallback_with_stale_cache(self, poller_redis, job_api):
+        self.poll_status()
+        JobStatusPoller.set_status(JOB_INSTANCE_ID, status_resp(finished=False))
+
+        # 轮询器缓存了未结束的状态后停止工作，缓存过时后回退为直接请求job
+        job_api.get_job_instance_status.return_value = status_resp(finished=True)
+        with shift_time(env.JOB_POLLER_STALE_SECONDS + 1):
+            assert self.poll_status() == status_resp(finished=True)
+        assert job_api.get_job_instance_status.call_count == 2
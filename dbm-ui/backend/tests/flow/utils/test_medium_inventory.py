@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from unittest.mock import patch
+
+import pytest
+
+from backend.flow.utils.medium_inventory import MediumInventory
+from backend.tests.mock_data.flow.medium_inventory import (
+    ACTUATOR_PKG,
+    ACTUATOR_PKG_MD5,
+    MYSQL_PKG,
+    MYSQL_PKG_MD5,
+    PACKAGE_MD5S,
+    SQL_FILE,
+)
+
+pytestmark = pytest.mark.usefixtures("medium_inventory_redis")
+
+
+def create_inventory(file_list=None, account="root"):
+    return MediumInventory(
+        bk_cloud_id=0,
+        file_list=file_list or [MYSQL_PKG, ACTUATOR_PKG, SQL_FILE],
+        target_path="/data/install",
+        account=account,
+    )
+
+
+class TestMediumInventory:
+    def test_get_missing_files(self):
+        inventory = create_inventory()
+        assert inventory.md5s == {MYSQL_PKG: MYSQL_PKG_MD5, ACTUATOR_PKG: ACTUATOR_PKG_MD5}
+
+        # 没有清单时所有文件都需要下发
+        assert inventory.get_missing_files(["1.1.1.1"]) == {"1.1.1.1": [MYSQL_PKG, ACTUATOR_PKG, SQL_FILE]}
+
+        inventory.record(["1.1.1.1"])
+        inventory.record(["2.2.2.2"], [MYSQL_PKG])
+        missing_files = inventory.get_missing_files(["1.1.1.1", "2.2.2.2", "3.3.3.3"])
+        assert missing_files == {
+            "1.1.1.1": [SQL_FILE],
+            "2.2.2.2": [ACTUATOR_PKG, SQL_FILE],
+            "3.3.3.3": [MYSQL_PKG, ACTUATOR_PKG, SQL_FILE],
+        }
+
+        # 属主不同的文件不能复用
+        assert create_inventory(account="mysql").get_missing_files(["1.1.1.1"])["1.1.1.1"] == [
+            MYSQL_PKG,
+            ACTUATOR_PKG,
+            SQL_FILE,
+        ]
+
+    def test_get_missing_files_md5_changed(self):
+        inventory = create_inventory()
+        inventory.record(["1.1.1.1"])
+
+        # 介质更新后md5变化，需要重新下发
+        with patch.dict(PACKAGE_MD5S, {"mysql/mysql-5.7.tar.gz": "c" * 32}):
+            assert create_inventory().get_missing_files(["1.1.1.1"])["1.1.1.1"] == [MYSQL_PKG, SQL_FILE]
+
+    def test_discard(self):
+        inventory = create_inventory()
+        inventory.record(["1.1.1.1"])
+        inventory.discard("1.1.1.1", [ACTUATOR_PKG])
+        assert inventory.get_missing_files(["1.1.1.1"])["1.1.1.1"] == [ACTUATOR_PKG, SQL_FILE]
+
+    def test_parse_verify_log(self):
+        inventory = create_inventory()
+        log_content = "\n".join(
+            [
+                # job日志带有时间前缀
+                f"[2024-01-01 00:00:00][127.0.0.1] {MYSQL_PKG_MD5}  /data/install/mysql-5.7.tar.gz",
+                "md5sum: /data/install/init.sql: No such file or directory",
+                "",
+            ]
+        )
+        assert inventory.parse_verify_log([MYSQL_PKG, ACTUATOR_PKG], log_content) == [ACTUATOR_PKG]
+
+        # md5不一致的文件视为失效，md5大小写不敏感
+        log_content = f"{MYSQL_PKG_MD5.upper()}  /data/install/mysql-5.7.tar.gz\n{'f' * 32} */data/install/dbactuator"
+        assert inventory.parse_verify_log([MYSQL_PKG, ACTUATOR_PKG], log_content) == [ACTUATOR_PKG]
+
+        # 日志为空表示主机上的文件均不存在
+        assert inventory.parse_verify_log([MYSQL_PKG], "") == [MYSQL_PKG]
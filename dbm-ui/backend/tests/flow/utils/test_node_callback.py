@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import json
+import time
+import uuid
+from unittest.mock import MagicMock, patch
+
+import pytest
+from bamboo_engine import states
+
+from backend import env
+from backend.flow.utils import node_callback
+from backend.flow.utils.node_callback import CallbackSource, NodeCallbackHandler
+from backend.tests.mock_data.components.job import JOB_INSTANCE_ID
+from backend.utils.redis import RedisConn
+
+NODE_ID = "node1"
+VERSION = "version1"
+SOPS_TASK_ID = "100"
+
+
+@pytest.fixture
+def callback_key():
+    key, lock_key = f"test_callback_{uuid.uuid1().hex}", f"test_callback_lock_{uuid.uuid1().hex}"
+    with patch.object(node_callback, "FLOW_NODE_CALLBACK_KEY", key), patch.object(
+        node_callback, "FLOW_NODE_CALLBACK_LOCK_KEY", lock_key
+    ):
+        yield key
+    RedisConn.delete(key, lock_key)
+
+
+@pytest.fixture
+def bamboo_api():
+    bamboo_api = MagicMock()
+    bamboo_api.callback.return_value = MagicMock(result=True)
+    with patch.object(node_callback, "api", bamboo_api), patch.object(node_callback, "BambooDjangoRuntime"):
+        yield bamboo_api
+
+
+def waiting(key, source, task_id):
+    raw_waiting = RedisConn.hget(key, f"{source}:{task_id}")
+    return json.loads(raw_waiting) if raw_waiting else None
+
+
+def make_due(key, source, task_id):
+    """将登记的节点调整为已到达轮询时间"""
+    field = f"{source}:{task_id}"
+    RedisConn.hset(key, field, json.dumps({**waiting(key, source, task_id), "next_poll_time": 0}))
+
+
+class TestNodeCallbackHandler:
+    def test_callback(self, callback_key, bamboo_api):
+        NodeCallbackHandler.register(CallbackSource.JOB.value, JOB_INSTANCE_ID, NODE_ID, VERSION)
+
+        assert NodeCallbackHandler.callback(CallbackSource.JOB.value, JOB_INSTANCE_ID)
+        assert bamboo_api.callback.call_args[1]["node_id"] == NODE_ID
+        assert bamboo_api.callback.call_args[1]["version"] == VERSION
+        assert waiting(callback_key, CallbackSource.JOB.value, JOB_INSTANCE_ID) is None
+
+        # 重复回调不会再次唤醒节点
+        assert not NodeCallbackHandler.callback(CallbackSource.JOB.value, JOB_INSTANCE_ID)
+        bamboo_api.callback.assert_called_once()
+
+    def test_callback_ignored(self, callback_key, bamboo_api):
+        bamboo_api.callback.return_value = MagicMock(result=False, message="node state is not running")
+        NodeCallbackHandler.register(CallbackSource.JOB.value, JOB_INSTANCE_ID, NODE_ID, VERSION)
+
+        assert not NodeCallbackHandler.callback(CallbackSource.JOB.value, JOB_INSTANCE_ID)
+        assert waiting(callback_key, CallbackSource.JOB.value, JOB_INSTANCE_ID) is None
+
+    def test_callback_failed_restore(self, callback_key, bamboo_api):
+        bamboo_api.callback.side_effect = Exception("runtime error")
+        NodeCallbackHandler.register(CallbackSource.JOB.value, JOB_INSTANCE_ID, NODE_ID, VERSION)
+
+        # 唤醒失败时恢复登记，由兜底轮询继续唤醒
+        with pytest.raises(Exception):
+            NodeCallbackHandler.callback(CallbackSource.JOB.value, JOB_INSTANCE_ID)
+        assert waiting(callback_key, CallbackSource.JOB.value, JOB_INSTANCE_ID)["node_id"] == NODE_ID
+
+    def test_due_waitings_backoff(self, callback_key):
+        NodeCallbackHandler.register(CallbackSource.JOB.value, JOB_INSTANCE_ID, NODE_ID, VERSION, notify=True)
+        NodeCallbackHandler.register(CallbackSource.SOPS.value, SOPS_TASK_ID, "node2", VERSION, notify=False)
+
+        # 未到达轮询时间
+        assert NodeCallbackHandler._due_waitings() == {CallbackSource.JOB.value: [], CallbackSource.SOPS.value: []}
+
+        for __ in range(3):
+            make_due(callback_key, CallbackSource.JOB.value, JOB_INSTANCE_ID)
+            make_due(callback_key, CallbackSource.SOPS.value, SOPS_TASK_ID)
+            now = time.time()
+            due_waitings = NodeCallbackHandler._due_waitings()
+            assert [task_id for task_id, __ in due_waitings[CallbackSource.JOB.value]] == [str(JOB_INSTANCE_ID)]
+            assert [task_id for task_id, __ in due_waitings[CallbackSource.SOPS.value]] == [SOPS_TASK_ID]
+
+        # 会收到回调的节点指数退避，未传入回调地址的节点固定间隔
+        job_waiting = waiting(callback_key, CallbackSource.JOB.value, JOB_INSTANCE_ID)
+        assert job_waiting["poll_times"] == 3
+        assert job_waiting["next_poll_time"] - now >= min(
+            env.FLOW_CALLBACK_POLL_BASE_INTERVAL * 2**3, env.FLOW_CALLBACK_POLL_MAX_INTERVAL
+        )
+        sops_waiting = waiting(callback_key, CallbackSource.SOPS.value, SOPS_TASK_ID)
+        assert sops_waiting["poll_times"] == 3
+        assert sops_waiting["next_poll_time"] - now < env.FLOW_CALLBACK_POLL_BASE_INTERVAL + 1
+
+    def test_due_waitings_not_reinsert(self, callback_key, bamboo_api):
+        NodeCallbackHandler.register(CallbackSource.JOB.value, JOB_INSTANCE_ID, NODE_ID, VERSION)
+        make_due(callback_key, CallbackSource.JOB.value, JOB_INSTANCE_ID)
+
+        # 读取登记信息之后，节点被回调唤醒
+        hgetall = RedisConn.hgetall
+
+        def hgetall_then_callback(key):
+            snapshot = hgetall(key)
+            NodeCallbackHandler.callback(CallbackSource.JOB.value, JOB_INSTANCE_ID)
+            return snapshot
+
+        with patch.object(RedisConn, "hgetall", hgetall_then_callback):
+            due_waitings = NodeCallbackHandler._due_waitings()
+
+        # 已被删除的节点不再轮询，也不会被重新写入
+        assert due_waitings[CallbackSource.JOB.value] == []
+        assert waiting(callback_key, CallbackSource.JOB.value, JOB_INSTANCE_ID) is None
+
+    @patch.object(node_callback, "BkSopsApi")
+    @patch.object(node_callback, "JobStatusPoller")
+    def test_poll(self, job_poller, sops_api, callback_key, bamboo_api):
+        finished_resp = {"result": True, "data": {"finished": True}}
+        job_poller.fetch_status.return_value = {JOB_INSTANCE_ID: finished_resp}
+        sops_api.get_task_status.return_value = {"state": states.RUNNING}
+
+        NodeCallbackHandler.register(CallbackSource.JOB.value, JOB_INSTANCE_ID, NODE_ID, VERSION)
+        NodeCallbackHandler.register(CallbackSource.SOPS.value, SOPS_TASK_ID, "node2", VERSION, {"bk_biz_id": 1})
+        # 无需等待外部任务的节点
+        NodeCallbackHandler.register(CallbackSource.JOB.value, None, "node3", VERSION)
+        make_due(callback_key, CallbackSource.JOB.value, JOB_INSTANCE_ID)
+        make_due(callback_key, CallbackSource.SOPS.value, SOPS_TASK_ID)
+
+        NodeCallbackHandler.poll()
+
+        job_poller.fetch_status.assert_called_once_with([JOB_INSTANCE_ID])
+        job_poller.set_status.assert_called_once_with(JOB_INSTANCE_ID, finished_resp)
+        assert sorted(call[1]["node_id"] for call in bamboo_api.callback.call_args_list) == [NODE_ID, "node3"]
+        # 运行中的标准运维任务继续等待
+        assert waiting(callback_key, CallbackSource.SOPS.value, SOPS_TASK_ID)["poll_times"] == 1
+        assert not RedisConn.exists(node_callback.FLOW_NODE_CALLBACK_LOCK_KEY)
+
+    def test_poll_locked(self, callback_key, bamboo_api):
+        NodeCallbackHandler.register(CallbackSource.JOB.value, None, NODE_ID, VERSION)
+        RedisConn.set(node_callback.FLOW_NODE_CALLBACK_LOCK_KEY, 1)
+        NodeCallbackHandler.poll()
+        bamboo_api.callback.assert_not_called()
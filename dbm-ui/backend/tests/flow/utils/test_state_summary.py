@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import uuid
+
+import pytest
+
+from backend.flow.consts import StateType
+from backend.flow.utils.state_summary import FLOW_STATE_SUMMARY_KEY, FlowStateSummary, FlowStateSummaryHandler
+from backend.utils.redis import RedisConn
+
+
+@pytest.fixture
+def root_id():
+    root_id = uuid.uuid1().hex
+    yield root_id
+    RedisConn.delete(FLOW_STATE_SUMMARY_KEY.format(root_id=root_id))
+
+
+def state_counts(root_id):
+    summary = RedisConn.hgetall(FLOW_STATE_SUMMARY_KEY.format(root_id=root_id))
+    return {field.split(":", 1)[1]: int(count) for field, count in summary.items() if field.startswith("count:")}
+
+
+class TestFlowStateSummary:
+    @pytest.mark.parametrize(
+        "summary, pipeline_state",
+        [
+            (FlowStateSummary(root_state=None), None),
+            (FlowStateSummary(root_state=StateType.RUNNING.value, running=3), StateType.RUNNING.value),
+            (FlowStateSummary(root_state=StateType.RUNNING.value, failed=1, suspended=1), StateType.FAILED.value),
+            (FlowStateSummary(root_state=StateType.RUNNING.value, revoked=1, suspended=1), StateType.REVOKED.value),
+            (FlowStateSummary(root_state=StateType.RUNNING.value, suspended=1), StateType.SUSPENDED.value),
+            # 根节点不处于运行态时，以根节点状态为准
+            (FlowStateSummary(root_state=StateType.FINISHED.value, failed=1), StateType.FINISHED.value),
+            (FlowStateSummary(root_state=StateType.REVOKED.value, failed=1), StateType.REVOKED.value),
+        ],
+    )
+    def test_pipeline_state(self, summary, pipeline_state):
+        assert summary.pipeline_state == pipeline_state
+
+
+class TestFlowStateSummaryHandler:
+    def test_transit_counts(self, root_id):
+        FlowStateSummaryHandler.transit(root_id, root_id, StateType.RUNNING.value)
+        FlowStateSummaryHandler.transit(root_id, "node1", StateType.RUNNING.value)
+        FlowStateSummaryHandler.transit(root_id, "node2", StateType.RUNNING.value)
+        summary = FlowStateSummaryHandler.transit(root_id, "node1", StateType.FINISHED.value)
+
+        assert summary.root_state == StateType.RUNNING.value
+        assert (summary.running, summary.finished) == (2, 1)
+        assert summary.pipeline_state == StateType.RUNNING.value
+
+        summary = FlowStateSummaryHandler.transit(root_id, "node2", StateType.FAILED.value)
+        assert (summary.running, summary.finished, summary.failed) == (1, 1, 1)
+        assert summary.pipeline_state == StateType.FAILED.value
+
+        # 失败节点重试后，失败计数回退
+        FlowStateSummaryHandler.transit(root_id, "node2", StateType.READY.value)
+        summary = FlowStateSummaryHandler.transit(root_id, "node2", StateType.RUNNING.value)
+        assert (summary.running, summary.finished, summary.failed) == (2, 1, 0)
+        assert summary.pipeline_state == StateType.RUNNING.value
+
+        FlowStateSummaryHandler.transit(root_id, "node2", StateType.FINISHED.value)
+        summary = FlowStateSummaryHandler.transit(root_id, root_id, StateType.FINISHED.value)
+        assert (summary.running, summary.finished) == (0, 3)
+        assert summary.pipeline_state == StateType.FINISHED.value
+
+    def test_repeated_transit(self, root_id):
+        FlowStateSummaryHandler.transit(root_id, root_id, StateType.RUNNING.value)
+        for __ in range(3):
+            summary = FlowStateSummaryHandler.transit(root_id, "node1", StateType.SUSPENDED.value)
+
+        # 重复的状态流转不会重复计数
+        assert (summary.running, summary.suspended) == (1, 1)
+        assert summary.pipeline_state == StateType.SUSPENDED.value
+        assert state_counts(root_id) == {StateType.RUNNING.value: 1, StateType.SUSPENDED.value: 1}
+
+    def test_out_of_order_transit(self, root_id):
+        # 迟到的状态信号覆盖节点当前状态，每个节点始终只计数一次
+        FlowStateSummaryHandler.transit(root_id, "node1", StateType.FINISHED.value)
+        FlowStateSummaryHandler.transit(root_id, "node2", StateType.FAILED.value)
+        FlowStateSummaryHandler.transit(root_id, "node1", StateType.RUNNING.value)
+        summary = FlowStateSummaryHandler.transit(root_id, root_id, StateType.RUNNING.value)
+
+        assert (summary.running, summary.finished, summary.failed) == (2, 0, 1)
+        assert summary.pipeline_state == StateType.FAILED.value
+        assert sum(state_counts(root_id).values()) == 3
+
+    def test_transit_without_root(self, root_id):
+        # 根节点状态缺失(如升级前已启动的流程)时无法推导流程状态，由调用方回退为查询完整状态树
+        summary = FlowStateSummaryHandler.transit(root_id, "node1", StateType.RUNNING.value)
+        assert summary.root_state is None
+        assert summary.pipeline_state is None
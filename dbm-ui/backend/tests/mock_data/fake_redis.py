@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from typing import Any, Dict, List
+
+
+class FakeRedisPipeline:
+    """记录调用，execute 时依次在 FakeRedis 上执行"""
+
+    def __init__(self, redis: "FakeRedis"):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+
+        return call
+
+    def execute(self) -> List[Any]:
+        calls, self.calls = self.calls, []
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in calls]
+
+
+class FakeRedis:
+    """
+    内存版的redis客户端，用于替换 RedisConn 进行单元测试
+    只实现了业务中用到的字符串、hash、list、set和zset命令，过期时间不生效，返回值与 decode_responses=True 时保持一致
+    """
+
+    def __init__(self):
+        self.data: Dict[str, Any] = {}
+
+    def pipeline(self, *args, **kwargs) -> FakeRedisPipeline:
+        return FakeRedisPipeline(self)
+
+    def _hash(self, key: str) -> Dict[str, str]:
+        return self.data.setdefault(key, {})
+
+    def _set(self, key: str) -> set:
+        return self.data.setdefault(key, set())
+
+    def _drop_if_empty(self, key: str):
+        # 与redis一致，hash和set为空时key不存在
+        if key in self.data and not self.data[key]:
+            self.data.pop(key)
+
+    # 通用命令
+    def exists(self, *keys) -> int:
+        return sum(1 for key in keys if key in self.data)
+
+    def delete(self, *keys) -> int:
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    def expire(self, key, *args, **kwargs) -> bool:
+        return key in self.data
+
+    def rename(self, src, dst) -> bool:
+        self.data[dst] = self.data.pop(src)
+        return True
+
+    # 字符串
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, *keys) -> List:
+        keys = keys[0] if len(keys) == 1 and isinstance(keys[0], (list, tuple)) else keys
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, nx=False, **kwargs):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value)
+        return True
+
+    def incr(self, key, amount=1) -> int:
+        self.data[key] = str(int(self.data.get(key, 0)) + amount)
+        return int(self.data[key])
+
+    # hash
+    def hget(self, key, field):
+        return self.data.get(key, {}).get(str(field))
+
+    def hmget(self, key, fields, *args) -> List:
+        fields = list(fields) if isinstance(fields, (list, tuple)) else [fields, *args]
+        return [self.data.get(key, {}).get(str(field)) for field in fields]
+
+    def hgetall(self, key) -> Dict[str, str]:
+        return dict(self.data.get(key, {}))
+
+    def hset(self, key, field=None, value=None, mapping=None) -> int:
+        items = {**({field: value} if field is not None else {}), **(mapping or {})}
+        values = self._hash(key)
+        added = len([field for field in items if str(field) not in values])
+        values.update({str(field): str(value) for field, value in items.items()})
+        return added
+
+    def hsetnx(self, key, field, value) -> int:
+        values = self._hash(key)
+        if str(field) in values:
+            return 0
+        values[str(field)] = str(value)
+        return 1
+
+    def hdel(self, key, *fields) -> int:
+        values = self.data.get(key, {})
+        deleted = sum(1 for field in fields if values.pop(str(field), None) is not None)
+        self._drop_if_empty(key)
+        return deleted
+
+    def hincrby(self, key, field, amount=1) -> int:
+        values = self._hash(key)
+        values[str(field)] = str(int(values.get(str(field), 0)) + amount)
+        return int(values[str(field)])
+
+    # set
+    def sadd(self, key, *members) -> int:
+        values = self._set(key)
+        added = len({str(member) for member in members} - values)
+        values.update(str(member) for member in members)
+        return added
+
+    def srem(self, key, *members) -> int:
+        values = self.data.get(key, set())
+        removed = len({str(member) for member in members} & values)
+        values.difference_update(str(member) for member in members)
+        self._drop_if_empty(key)
+        return removed
+
+    def sismember(self, key, member) -> bool:
+        return str(member) in self.data.get(key, set())
+
+    def smembers(self, key) -> set:
+        return set(self.data.get(key, set()))
+
+    # list
+    def rpush(self, key, *values) -> int:
+        items = self.data.setdefault(key, [])
+        items.extend(str(value) for value in values)
+        return len(items)
+
+    def lrange(self, key, start, end) -> List[str]:
+        items = self.data.get(key, [])
+        return items[start : (end + 1) or None]
+
+    def ltrim(self, key, start, end) -> bool:
+        if key in self.data:
+            self.data[key] = self.lrange(key, start, end)
+            self._drop_if_empty(key)
+        return True
+
+    # zset
+    def zadd(self, key, mapping: Dict) -> int:
+        values = self.data.setdefault(key, {})
+        added = len([member for member in mapping if str(member) not in values])
+        values.update({str(member): float(score) for member, score in mapping.items()})
+        return added
+
+    def zrem(self, key, *members) -> int:
+        values = self.data.get(key, {})
+        removed = sum(1 for member in members if values.pop(str(member), None) is not None)
+        self._drop_if_empty(key)
+        return removed
+
+    def zrangebyscore(self, key, min, max) -> List[str]:
+        values = self.data.get(key, {})
+        return [
+            member for member, score in sorted(values.items(), key=lambda x: x[1]) if float(min) <= score <= float(max)
+        ]
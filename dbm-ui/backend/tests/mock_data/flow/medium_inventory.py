@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from types import SimpleNamespace
+
+from backend import env
+
+REPO_PREFIX = f"{env.BKREPO_PROJECT}/{env.BKREPO_BUCKET}"
+MYSQL_PKG = f"{REPO_PREFIX}/mysql/mysql-5.7.tar.gz"
+ACTUATOR_PKG = f"{REPO_PREFIX}/mysql/actuator/dbactuator"
+# 不在介质库中的文件(如sql文件)，总是需要下发
+SQL_FILE = f"{REPO_PREFIX}/sqlfile/init.sql"
+MYSQL_PKG_MD5 = "a" * 32
+ACTUATOR_PKG_MD5 = "b" * 32
+PACKAGE_MD5S = {
+    "mysql/mysql-5.7.tar.gz": MYSQL_PKG_MD5,
+    "mysql/actuator/dbactuator": ACTUATOR_PKG_MD5,
+}
+
+
+def get_package_by_path(path):
+    return SimpleNamespace(md5=PACKAGE_MD5S[path]) if path in PACKAGE_MD5S else None
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import json
+
+from backend.ticket.builders import BUILDER_MANIFEST_PATH, BuilderFactory
+from backend.ticket.constants import TicketType
+
+
+class TestBuilderManifest:
+    def test_manifest_consistent_with_builders(self):
+        """新增/移动单据构造器后，需要执行 python manage.py generate_builder_manifest 更新清单"""
+        with open(BUILDER_MANIFEST_PATH, encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        BuilderFactory.register_all()
+        assert manifest == {
+            ticket_type: BuilderFactory.manifest[ticket_type] for ticket_type in BuilderFactory.registry
+        }
+
+    def test_get_builder_cls_imports_on_demand(self):
+        assert BuilderFactory.load_manifest()
+        builder_cls = BuilderFactory.get_builder_cls(TicketType.MYSQL_HA_APPLY)
+        assert builder_cls.ticket_type == TicketType.MYSQL_HA_APPLY
+        assert builder_cls.__module__ == BuilderFactory.manifest[TicketType.MYSQL_HA_APPLY]["module"]
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from backend.ticket.constants import EXCLUSIVE_TICKET_EXCEL_PATH, TicketType
+from backend.ticket.models import ExclusiveTicketMatrix
+from backend.utils.excel import ExcelHandler
+
+
+class TestExclusiveTicketMatrix:
+    def test_compiled_matrix_consistent_with_excel(self):
+        ExclusiveTicketMatrix.compile(force=True)
+        exclusive_matrix = ExcelHandler.paser_matrix(EXCLUSIVE_TICKET_EXCEL_PATH)
+        for row_key, inner_dict in exclusive_matrix.items():
+            ticket_type = TicketType.get_choice_value(row_key)
+            for col_key, value in inner_dict.items():
+                active_ticket_type = TicketType.get_choice_value(col_key)
+                assert ExclusiveTicketMatrix.is_exclusive(ticket_type, active_ticket_type) == (value == "N")
+
+    def test_unknown_ticket_type_not_exclusive(self):
+        assert not ExclusiveTicketMatrix.is_exclusive("unknown_ticket_type", TicketType.MYSQL_HA_APPLY)
+        assert not ExclusiveTicketMatrix.is_exclusive(TicketType.MYSQL_HA_APPLY, "unknown_ticket_type")
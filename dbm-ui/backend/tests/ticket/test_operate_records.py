@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from backend.tests.conftest import mock_bk_user
+from backend.tests.mock_data import constant
+from backend.ticket.constants import FlowType, TicketStatus, TicketType
+from backend.ticket.models import ClusterOperateRecord, Flow, Ticket
+from backend.ticket.serializers import ClusterModifyOpSerializer
+from backend.ticket.views import TicketViewSet
+
+pytestmark = pytest.mark.django_db
+
+CLUSTER_ID = 1
+PAGE_SIZE = 2
+
+
+@pytest.fixture
+def operate_records():
+    """创建操作记录，多条记录的创建时间相同，返回按(create_at, id)倒序排列的记录ID"""
+    ticket = Ticket.objects.create(
+        bk_biz_id=constant.BK_BIZ_ID,
+        ticket_type=TicketType.MYSQL_HA_FULL_BACKUP,
+        status=TicketStatus.RUNNING,
+        creator="admin",
+    )
+    flow = Flow.objects.create(ticket=ticket, flow_type=FlowType.INNER_FLOW)
+    now = timezone.now().replace(microsecond=0)
+    create_times = [now - timedelta(minutes=2)] + [now - timedelta(minutes=1)] * 3 + [now] * 3
+    for create_at in create_times:
+        record = ClusterOperateRecord.objects.create(cluster_id=CLUSTER_ID, flow=flow, ticket=ticket)
+        ClusterOperateRecord.objects.filter(id=record.id).update(create_at=create_at)
+    # 其他集群的操作记录
+    ClusterOperateRecord.objects.create(cluster_id=CLUSTER_ID + 1, flow=flow, ticket=ticket)
+
+    records = ClusterOperateRecord.objects.filter(cluster_id=CLUSTER_ID).order_by("-create_at", "-id")
+    return list(records.values_list("id", flat=True))
+
+
+@pytest.fixture
+def admin_user():
+    return mock_bk_user("admin")
+
+
+@patch.object(TicketViewSet, "get_permissions", lambda x: [])
+def get_operate_records(user, params):
+    request = APIRequestFactory().get("/", {"cluster_id": CLUSTER_ID, "limit": PAGE_SIZE, "offset": 0, **params})
+    force_authenticate(request, user=user)
+    return TicketViewSet.as_view({"get": "get_cluster_operate_records"})(request)
+
+
+class TestOperateRecords:
+    def test_cursor_walk(self, operate_records, admin_user):
+        record_ids, params = [], {}
+        while True:
+            response = get_operate_records(admin_user, params)
+            assert response.status_code == 200
+            page = response.data["results"]
+            if not page:
+                break
+            record_ids.extend(record["id"] for record in page)
+            params = {"last_create_at": page[-1]["create_at"].isoformat(), "last_id": page[-1]["id"]}
+
+        # 创建时间相同的记录按id区分，逐页翻完不重不漏
+        assert record_ids == operate_records
+
+    def test_cursor_tie_break(self, operate_records, admin_user):
+        # 游标位于创建时间相同的一组记录中间时，从该组剩余的记录继续
+        first_page = get_operate_records(admin_user, {}).data["results"]
+        assert [record["id"] for record in first_page] == operate_records[:PAGE_SIZE]
+        assert first_page[0]["create_at"] == first_page[1]["create_at"]
+
+        params = {"last_create_at": first_page[-1]["create_at"].isoformat(), "last_id": first_page[-1]["id"]}
+        second_page = get_operate_records(admin_user, params).data["results"]
+        assert [record["id"] for record in second_page] == operate_records[PAGE_SIZE : PAGE_SIZE * 2]
+
+
+class TestModifyOpSerializer:
+    @pytest.mark.parametrize(
+        "cursor",
+        [{"last_create_at": "2024-01-01 00:00:00"}, {"last_id": 1}],
+    )
+    def test_cursor_incomplete(self, cursor):
+        serializer = ClusterModifyOpSerializer(data={"cluster_id": CLUSTER_ID, **cursor})
+        assert not serializer.is_valid()
+        assert "non_field_errors" in serializer.errors
+
+    def test_cursor_complete(self):
+        serializer = ClusterModifyOpSerializer(
+            data={"cluster_id": CLUSTER_ID, "last_create_at": "2024-01-01 00:00:00", "last_id": 1}
+        )
+        assert serializer.is_valid(), serializer.errors
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+import pytest
+
+from backend.tests.mock_data import constant
+from backend.ticket.constants import TicketStatus, TicketType
+from backend.ticket.exceptions import TicketDuplicationException
+from backend.ticket.models import Ticket, TicketClusterRelation
+from backend.ticket.views import TicketViewSet
+
+pytestmark = pytest.mark.django_db
+
+USERNAME = "admin"
+
+
+@pytest.fixture
+def running_ticket():
+    ticket = Ticket.objects.create(
+        bk_biz_id=constant.BK_BIZ_ID,
+        ticket_type=TicketType.MYSQL_HA_FULL_BACKUP,
+        status=TicketStatus.RUNNING,
+        creator=USERNAME,
+        details={"infos": [{"cluster_id": 1}, {"cluster_ids": [2, 3]}]},
+    )
+    TicketClusterRelation.create_relations(ticket, cluster_ids=[1, 2, 3, 3], instance_ids=[])
+    return ticket
+
+
+class TestTicketClusterRelation:
+    def test_create_relations_deduplicated(self, running_ticket):
+        assert sorted(running_ticket.relations.values_list("cluster_id", flat=True)) == [1, 2, 3]
+
+    def test_verify_duplicate_ticket(self, running_ticket):
+        with pytest.raises(TicketDuplicationException) as err:
+            TicketViewSet()._verify_duplicate_ticket(
+                TicketType.MYSQL_HA_FULL_BACKUP, {"infos": [{"cluster_id": 3}, {"cluster_id": 4}]}, USERNAME
+            )
+        assert err.value.data == {"duplicate_cluster_ids": [3], "duplicate_ticket_id": running_ticket.id}
+
+        # 不同的创建人/集群不视为重复提交
+        TicketViewSet()._verify_duplicate_ticket(TicketType.MYSQL_HA_FULL_BACKUP, {"cluster_id": 3}, "other")
+        TicketViewSet()._verify_duplicate_ticket(TicketType.MYSQL_HA_FULL_BACKUP, {"cluster_id": 4}, USERNAME)
@@ -13,6 +13,8 @@ import logging
 from django.apps import AppConfig
 from django.db.models.signals import post_migrate, post_save
 
+from backend import env
+
 logger = logging.getLogger("root")
 
 
@@ -30,12 +32,20 @@ class TicketConfig(AppConfig):
     name = "backend.ticket"
 
     def ready(self):
-        from backend.ticket.builders import register_all_builders
-        from backend.ticket.models import Flow
+        from backend.ticket.builders import BuilderFactory
+        from backend.ticket.models import ExclusiveTicketMatrix, Flow
         from backend.ticket.signals import update_ticket_status
         from backend.ticket.todos import register_all_todos
 
-        register_all_builders()
+        # 按清单登记单据信息，构造器在首次使用时才导入，清单缺失时导入全部构造器
+        if not (env.TICKET_BUILDER_LAZY_LOAD and BuilderFactory.load_manifest()):
+            BuilderFactory.register_all()
         register_all_todos()
         post_migrate.connect(init_ticket_flow_config, sender=self)
         post_save.connect(update_ticket_status, sender=Flow)
+
+        # 启动时预编译单据互斥矩阵，避免在请求中解析excel
+        try:
+            ExclusiveTicketMatrix.compile()
+        except Exception as err:  # pylint: disable=broad-except:
+            logger.warning(f"compile exclusive ticket matrix occur error, {err}")
@@ -13,7 +13,8 @@ import importlib
 import json
 import logging
 import os
-from typing import Callable, Dict
+import threading
+from typing import Callable, Dict, List, Tuple, Union
 
 from django.utils.translation import ugettext as _
 from rest_framework import serializers
@@ -25,7 +26,7 @@ from backend.db_meta.models import Cluster
 from backend.db_services.dbbase.constants import IpSource
 from backend.iam_app.dataclass.actions import ActionEnum
 from backend.ticket.constants import FlowRetryType, FlowType
-from backend.ticket.models import Flow, Ticket, TicketFlowConfig
+from backend.ticket.models import Flow, Ticket, TicketClusterRelation, TicketFlowConfig
 
 logger = logging.getLogger("root")
 
@@ -396,6 +397,17 @@ class TicketFlowBuilder:
         """自定义补充单据详情，留给子类实现"""
         pass
 
+    def get_relation_ids(self) -> Tuple[List[int], List[Union[int, str]]]:
+        """单据关联的集群ID和实例ID，默认从单据详情中提取集群ID，子类可覆写"""
+        from backend.ticket.builders.common.base import fetch_cluster_ids
+
+        return fetch_cluster_ids(details=self.ticket.details), []
+
+    def init_ticket_relations(self):
+        """登记单据关联的集群和实例，需在 patch_ticket_detail 之后调用"""
+        cluster_ids, instance_ids = self.get_relation_ids()
+        TicketClusterRelation.create_relations(self.ticket, cluster_ids, instance_ids)
+
     def alarm_callback_to_ticket_detail(self):
         """告警回调转化为单据详情"""
         pass
@@ -428,9 +440,15 @@ class TicketFlowBuilder:
         return flow_desc
 
 
+# 单据类型与构造器模块的静态清单，通过 python manage.py generate_builder_manifest 生成
+BUILDER_MANIFEST_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "builder_manifest.json")
+
+
 class BuilderFactory:
     # 单据的注册器类集合
     registry = {}
+    # 单据类型与构造器模块、注册参数的清单，用于按需导入构造器
+    manifest: Dict[str, Dict] = {}
     # 部署类单据集合
     apply_ticket_type = []
     # 单据与集群状态的映射
@@ -440,6 +458,23 @@ class BuilderFactory:
     # 单据和权限动作/资源类型的映射
     ticket_type__iam_action = {}
 
+    _import_lock = threading.RLock()
+    # 是否已经导入了全部的构造器
+    _all_registered = False
+
+    @classmethod
+    def _register_meta(cls, ticket_type: str, **kwargs):
+        """登记单据的注册信息，构造器导入时和加载清单时共用"""
+        if kwargs.get("is_apply") and ticket_type not in cls.apply_ticket_type:
+            cls.apply_ticket_type.append(ticket_type)
+        if kwargs.get("phase"):
+            cls.ticket_type__cluster_phase[ticket_type] = kwargs["phase"]
+        if kwargs.get("cluster_type"):
+            cls.ticket_type__cluster_type[ticket_type] = kwargs["cluster_type"]
+        if hasattr(ActionEnum, ticket_type) or kwargs.get("iam"):
+            # 单据类型和权限动作默认一一对应，如果是特殊指定的则通过iam参数传递
+            cls.ticket_type__iam_action[ticket_type] = getattr(ActionEnum, ticket_type, None) or kwargs.get("iam")
+
     @classmethod
     def register(cls, ticket_type: str, **kwargs) -> Callable:
         """
@@ -457,24 +492,59 @@ class BuilderFactory:
             if ticket_type in cls.registry:
                 logger.warning(f"Builder [{ticket_type}] already exists. Will replace it")
             cls.registry[ticket_type] = wrapped_class
+            cls._register_meta(ticket_type, **kwargs)
 
-            if kwargs.get("is_apply") and kwargs.get("is_apply") not in cls.apply_ticket_type:
-                cls.apply_ticket_type.append(ticket_type)
-            if kwargs.get("phase"):
-                cls.ticket_type__cluster_phase[ticket_type] = kwargs["phase"]
-            if kwargs.get("cluster_type"):
-                cls.ticket_type__cluster_type[ticket_type] = kwargs["cluster_type"]
-            if hasattr(ActionEnum, ticket_type) or kwargs.get("iam"):
-                # 单据类型和权限动作默认一一对应，如果是特殊指定的则通过iam参数传递
-                cls.ticket_type__iam_action[ticket_type] = getattr(ActionEnum, ticket_type, None) or kwargs.get("iam")
+            # 记录清单信息，枚举值和权限动作转为可序列化的值
+            meta = {key: getattr(value, "value", value) for key, value in kwargs.items() if key != "iam"}
+            if kwargs.get("iam"):
+                meta["iam"] = kwargs["iam"].id
+            cls.manifest[ticket_type] = {"module": wrapped_class.__module__, **meta}
 
             return wrapped_class
 
         return inner_wrapper
 
+    @classmethod
+    def load_manifest(cls, path: str = BUILDER_MANIFEST_PATH) -> bool:
+        """
+        加载构造器清单，只登记单据的注册信息，构造器在首次使用时才导入
+        @param path: 清单路径
+        返回清单是否加载成功
+        """
+        try:
+            with open(path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as err:
+            logger.warning(f"load ticket builder manifest failed, {err}")
+            return False
+
+        for ticket_type, meta in manifest.items():
+            kwargs = {key: value for key, value in meta.items() if key not in ["module", "iam"]}
+            if meta.get("iam"):
+                kwargs["iam"] = ActionEnum.get_action_by_id(meta["iam"])
+            cls._register_meta(ticket_type, **kwargs)
+            cls.manifest.setdefault(ticket_type, meta)
+        return True
+
+    @classmethod
+    def register_all(cls):
+        """导入全部的构造器，用于需要遍历所有构造器的场景"""
+        with cls._import_lock:
+            if not cls._all_registered:
+                register_all_builders()
+                cls._all_registered = True
+
     @classmethod
     def get_builder_cls(cls, ticket_type: str):
-        """获取构造器类"""
+        """获取构造器类，构造器在首次使用时按照清单导入"""
+        if ticket_type not in cls.registry:
+            with cls._import_lock:
+                if ticket_type in cls.manifest and ticket_type not in cls.registry:
+                    importlib.import_module(cls.manifest[ticket_type]["module"])
+                # 清单与代码不一致(如新增了构造器但未重新生成清单)时，回退为导入全部构造器
+                if ticket_type not in cls.registry:
+                    cls.register_all()
+
         if ticket_type not in cls.registry:
             logger.warning(f"Ticket Type: [{ticket_type}] does not exist in the registry")
             raise NotImplementedError
@@ -494,17 +564,26 @@ class BuilderFactory:
         builder_cls = cls.get_builder_cls(ticket.ticket_type)
         return builder_cls(ticket)
 
+    @classmethod
+    def dump_manifest(cls, path: str = BUILDER_MANIFEST_PATH):
+        """导入全部构造器后生成清单"""
+        cls.register_all()
+        manifest = {ticket_type: cls.manifest[ticket_type] for ticket_type in sorted(cls.registry)}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+
 
 def register_all_builders(path=os.path.dirname(__file__), module_path="backend.ticket.builders"):
     """递归注册当前目录下所有的构建器"""
     for name in os.listdir(path):
         # 忽略无效文件
-        if name.endswith(".pyc") or name in ["__init__.py", "__pycache__"]:
+        if name in ["__init__.py", "__pycache__"]:
             continue
 
         if os.path.isdir(os.path.join(path, name)):
             register_all_builders(os.path.join(path, name), ".".join([module_path, name]))
-        else:
+        elif name.endswith(".py"):
             try:
                 module_name = name.replace(".py", "")
                 import_path = ".".join([module_path, module_name])
@@ -454,6 +454,10 @@ class InfluxdbTicketFlowBuilderPatchMixin(object):
             return
         self.ticket.update_details(instances=self.get_instances(self.ticket.ticket_type, self.ticket.details))
 
+    def get_relation_ids(self):
+        """influxdb单据通过实例去重，关联补充后的实例"""
+        return [], self.ticket.details.get("instances", [])
+
 
 class MongoDBTicketFlowBuilderPatchMixin(BaseTicketFlowBuilderPatchMixin):
     pass
@@ -90,16 +90,18 @@ class MySQLBaseOperateDetailSerializer(SkipToRepresentationMixin, serializers.Se
         """校验集群状态是否可以提单"""
         clusters = Cluster.objects.filter(id__in=fetch_cluster_ids(details=attrs))
         ticket_type = self.context["ticket_type"]
+        status_flag_map = Cluster.bulk_status_flags([cluster.id for cluster in clusters])
 
         for cluster in clusters:
+            cluster_status_flag = status_flag_map[cluster.id]
             if cluster.cluster_type == ClusterType.TenDBSingle:
                 # 如果单节点异常，则直接报错
-                if cluster.status_flag:
+                if cluster_status_flag:
                     raise serializers.ValidationError(_("单节点实例状态异常，暂时无法执行该单据类型：{}").format(ticket_type))
                 continue
 
             for status_flag, whitelist in self.unavailable_whitelist__status_flag.items():
-                if cluster.status_flag & status_flag and ticket_type not in whitelist:
+                if cluster_status_flag & status_flag and ticket_type not in whitelist:
                     raise serializers.ValidationError(
                         _("集群实例状态异常:{}，暂时无法执行该单据类型：{}").format(status_flag.flag_text(), ticket_type)
                     )
@@ -25,6 +25,7 @@ from backend.configuration.constants import AffinityEnum
 from backend.configuration.models import DBAdministrator
 from backend.db_meta.models import Spec
 from backend.db_services.dbresource.exceptions import ResourceApplyException, ResourceApplyInsufficientException
+from backend.db_services.dbresource.host_index import ResourcePoolHostIndex
 from backend.db_services.ipchooser.constants import CommonEnum
 from backend.db_services.ipchooser.query.resource import ResourceQueryHelper
 from backend.ticket import constants
@@ -158,7 +159,7 @@ class ResourceApplyFlow(BaseTicketFlow):
             "details": self.fetch_apply_params(ticket_data),
         }
 
-        # 向资源池申请机器
+        # 向资源池申请机器，预申请只锁定主机，在 confirm_resource 确认后才移出资源池主机索引
         resp = DBResourceApi.resource_pre_apply(params=apply_params, raw=True)
         if resp["code"] == ResourceApplyErrCode.RESOURCE_LAKE:
             # 如果是资源不足，则创建补货单，用户手动处理后可以重试资源申请
@@ -377,6 +378,7 @@ class ResourceDeliveryFlow(DeliveryFlow):
 
         # 确认资源申请
         DBResourceApi.resource_confirm(params={"request_id": resource_request_id, "host_ids": host_ids})
+        ResourcePoolHostIndex.remove(host_ids)
 
     def _run(self) -> str:
         self.confirm_resource(self.ticket.details)
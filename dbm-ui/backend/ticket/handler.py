@@ -148,6 +148,9 @@ class TicketHandler:
     def ticket_flow_config_init(cls):
         """初始化单据配置"""
 
+        # 需要遍历所有的单据构造器，确保构造器已全部导入
+        BuilderFactory.register_all()
+
         exist_ticket_types = list(TicketFlowConfig.objects.all().values_list("ticket_type", flat=True))
         # 系统新增单据类型配置
         created_configs = [
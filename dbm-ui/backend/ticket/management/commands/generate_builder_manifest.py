@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from django.core.management.base import BaseCommand
+
+from backend.ticket.builders import BUILDER_MANIFEST_PATH, BuilderFactory
+
+
+class Command(BaseCommand):
+    help = "generate ticket builder manifest, run it after adding or moving ticket builders."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", type=str, default=BUILDER_MANIFEST_PATH, help="manifest output path")
+
+    def handle(self, *args, **options):
+        BuilderFactory.dump_manifest(options["path"])
+        self.stdout.write(f"ticket builder manifest saved to {options['path']}")
@@ -0,0 +1,72 @@
+# Generated by Django 3.2.19 on 2026-10-18 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from backend.ticket.constants import TicketStatus
+from backend.utils.basic import get_target_items_from_details
+
+# 与 backend.ticket.builders.common.base.fetch_cluster_ids 保持一致
+CLUSTER_ID_KEYS = ["cluster_id", "cluster_ids", "src_cluster", "dst_cluster"]
+
+
+def init_ticket_cluster_relations(apps, schema_editor):
+    """为正在运行的单据补充关联关系，保证重复单据校验对存量单据生效"""
+    Ticket = apps.get_model("ticket", "Ticket")
+    TicketClusterRelation = apps.get_model("ticket", "TicketClusterRelation")
+
+    relations = []
+    for ticket in Ticket.objects.filter(status=TicketStatus.RUNNING).only("id", "details"):
+        cluster_ids = {
+            item
+            for item in get_target_items_from_details(obj=ticket.details, match_keys=CLUSTER_ID_KEYS)
+            if isinstance(item, int)
+        }
+        relations.extend(
+            TicketClusterRelation(ticket_id=ticket.id, cluster_id=cluster_id) for cluster_id in cluster_ids
+        )
+        relations.extend(
+            TicketClusterRelation(ticket_id=ticket.id, instance_id=str(instance))
+            for instance in set(ticket.details.get("instances") or [])
+        )
+    TicketClusterRelation.objects.bulk_create(relations, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ticket", "0006_alter_flow_flow_obj_id"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TicketClusterRelation",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("cluster_id", models.IntegerField(default=0, verbose_name="集群ID")),
+                ("instance_id", models.CharField(default="", max_length=128, verbose_name="实例ID")),
+                (
+                    "ticket",
+                    models.ForeignKey(
+                        help_text="关联工单",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="relations",
+                        to="ticket.ticket",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "单据关联集群",
+                "verbose_name_plural": "单据关联集群",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="ticketclusterrelation",
+            index=models.Index(fields=["cluster_id"], name="ticket_tick_cluster_370bee_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="ticketclusterrelation",
+            index=models.Index(fields=["instance_id"], name="ticket_tick_instanc_73233a_idx"),
+        ),
+        migrations.RunPython(init_ticket_cluster_relations, migrations.RunPython.noop),
+    ]
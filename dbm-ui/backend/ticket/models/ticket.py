@@ -10,6 +10,7 @@ specific language governing permissions and limitations under the License.
 """
 
 import logging
+import threading
 from collections import defaultdict
 from typing import Any, Dict, List, Union
 
@@ -194,6 +195,7 @@ class Ticket(AuditedModel):
             logger.info(_("正在自动创建单据，单据详情: {}").format(ticket.__dict__))
             builder = BuilderFactory.create_builder(ticket)
             builder.patch_ticket_detail()
+            builder.init_ticket_relations()
             builder.init_ticket_flows()
 
         if auto_execute:
@@ -247,10 +249,14 @@ class ClusterOperateRecordManager(models.Manager):
 
     def filter_inner_actives(self, cluster_id, *args, **kwargs):
         """获取集群正在运行的inner flow的单据记录。此时认为集群会在互斥阶段"""
+        return self.filter_inner_actives_bulk([cluster_id], *args, **kwargs)
+
+    def filter_inner_actives_bulk(self, cluster_ids: List[int], *args, **kwargs):
+        """批量获取集群正在运行的inner flow的单据记录"""
         # 排除特定的单据，如自身单据重试排除自身
         exclude_ticket_ids = kwargs.pop("exclude_ticket_ids", [])
         return self.filter(
-            cluster_id=cluster_id,
+            cluster_id__in=cluster_ids,
             flow__flow_type=FlowType.INNER_FLOW,
             flow__status=TicketFlowStatus.RUNNING,
             *args,
@@ -263,33 +269,81 @@ class ClusterOperateRecordManager(models.Manager):
 
     def has_exclusive_operations(self, ticket_type, cluster_id, **kwargs):
         """判断当前单据类型与集群正在进行中的单据是否互斥"""
-        active_tickets = self.filter_inner_actives(cluster_id, **kwargs)
-        exclusive_infos = []
-        for active_ticket in active_tickets:
-            try:
-                if self.exclusive_ticket_map[ticket_type][active_ticket.ticket.ticket_type]:
-                    exclusive_infos.append(
-                        {"exclusive_ticket": active_ticket.ticket, "root_id": active_ticket.flow.flow_obj_id}
-                    )
-            except KeyError:
-                pass
-
-        return exclusive_infos
+        return self.has_exclusive_operations_bulk(ticket_type, [cluster_id], **kwargs).get(cluster_id, [])
 
-    @property
-    def exclusive_ticket_map(self):
-        if hasattr(self, "_exclusive_ticket_map"):
-            return self._exclusive_ticket_map
+    def has_exclusive_operations_bulk(self, ticket_type, cluster_ids: List[int], **kwargs) -> Dict[int, List[Dict]]:
+        """
+        批量判断当前单据类型与集群正在进行中的单据是否互斥，只返回存在互斥的集群
+        @param ticket_type: 当前单据类型
+        @param cluster_ids: 集群ID列表
+        """
+        cluster_exclusive_infos: Dict[int, List[Dict]] = defaultdict(list)
+        # 该单据类型不与任何单据互斥，无需查询
+        if not ExclusiveTicketMatrix.has_exclusive_ticket_types(ticket_type):
+            return cluster_exclusive_infos
+
+        active_records = self.filter_inner_actives_bulk(cluster_ids, **kwargs).select_related("ticket", "flow")
+        for record in active_records:
+            if ExclusiveTicketMatrix.is_exclusive(ticket_type, record.ticket.ticket_type):
+                cluster_exclusive_infos[record.cluster_id].append(
+                    {"exclusive_ticket": record.ticket, "root_id": record.flow.flow_obj_id}
+                )
 
-        _exclusive_matrix = ExcelHandler.paser_matrix(EXCLUSIVE_TICKET_EXCEL_PATH)
-        _exclusive_ticket_map = defaultdict(dict)
-        for row_key, inner_dict in _exclusive_matrix.items():
-            for col_key, value in inner_dict.items():
-                row_key, col_key = TicketType.get_choice_value(row_key), TicketType.get_choice_value(col_key)
-                _exclusive_ticket_map[row_key][col_key] = value == "N"
+        return cluster_exclusive_infos
 
-        setattr(self, "_exclusive_ticket_map", _exclusive_ticket_map)
-        return self._exclusive_ticket_map
+
+class ExclusiveTicketMatrix(object):
+    """
+    单据执行互斥矩阵，每个进程只从 exclusive_ticket.xlsx 编译一次
+    - 每个单据类型分配一个序号，互斥关系编译为 bitset: 第i位为1表示与序号为i的单据类型互斥
+    - 矩阵中不存在的单据类型，认为不互斥
+    """
+
+    _lock = threading.Lock()
+    _compiled = False
+    # 单据类型 -> 序号
+    _ticket_type_index: Dict[str, int] = {}
+    # 单据类型 -> 互斥单据类型的 bitset
+    _exclusive_bitsets: Dict[str, int] = {}
+
+    @classmethod
+    def compile(cls, excel_path: str = EXCLUSIVE_TICKET_EXCEL_PATH, force: bool = False):
+        """解析互斥表并编译为 bitset"""
+        if cls._compiled and not force:
+            return
+
+        with cls._lock:
+            if cls._compiled and not force:
+                return
+
+            exclusive_matrix = ExcelHandler.paser_matrix(excel_path)
+            ticket_type_index: Dict[str, int] = {}
+            exclusive_bitsets: Dict[str, int] = defaultdict(int)
+            for row_key, inner_dict in exclusive_matrix.items():
+                ticket_type = TicketType.get_choice_value(row_key)
+                for col_key, value in inner_dict.items():
+                    active_ticket_type = TicketType.get_choice_value(col_key)
+                    index = ticket_type_index.setdefault(active_ticket_type, len(ticket_type_index))
+                    if value == "N":
+                        exclusive_bitsets[ticket_type] |= 1 << index
+
+            cls._ticket_type_index, cls._exclusive_bitsets = ticket_type_index, dict(exclusive_bitsets)
+            cls._compiled = True
+
+    @classmethod
+    def has_exclusive_ticket_types(cls, ticket_type: str) -> bool:
+        """该单据类型是否存在互斥的单据类型"""
+        cls.compile()
+        return bool(cls._exclusive_bitsets.get(ticket_type, 0))
+
+    @classmethod
+    def is_exclusive(cls, ticket_type: str, active_ticket_type: str) -> bool:
+        """判断单据类型与正在运行的单据类型是否互斥"""
+        cls.compile()
+        index = cls._ticket_type_index.get(active_ticket_type)
+        if index is None:
+            return False
+        return bool(cls._exclusive_bitsets.get(ticket_type, 0) >> index & 1)
 
 
 class ClusterOperateRecord(AuditedModel):
@@ -306,6 +360,7 @@ class ClusterOperateRecord(AuditedModel):
     class Meta:
         # cluster_id, flow和ticket组成唯一性校验
         unique_together = (("cluster_id", "flow", "ticket"),)
+        indexes = [models.Index(fields=["cluster_id", "create_at"])]
 
     @property
     def summary(self):
@@ -371,6 +426,9 @@ class InstanceOperateRecord(AuditedModel):
 
     objects = InstanceOperateRecordManager()
 
+    class Meta:
+        indexes = [models.Index(fields=["instance_id", "create_at"])]
+
     @property
     def summary(self):
         return {
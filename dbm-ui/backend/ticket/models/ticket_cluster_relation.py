@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+TencentBlueKing is pleased to support the open source community by making 蓝鲸智云-DB管理系统(BlueKing-BK-DBM) available.
+Copyright (C) 2017-2023 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at https://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+from typing import List, Union
+
+from django.db import models
+from django.utils.translation import ugettext_lazy as _
+
+
+class TicketClusterRelation(models.Model):
+    """
+    单据与集群/实例的关联关系，单据创建时从单据详情中提取写入
+    用于重复单据校验等按集群/实例查询单据的场景，避免逐个解析单据的details
+    """
+
+    ticket = models.ForeignKey("Ticket", help_text=_("关联工单"), related_name="relations", on_delete=models.CASCADE)
+    cluster_id = models.IntegerField(_("集群ID"), default=0)
+    # 与 InstanceOperateRecord 保持一致，可以是实例ID或者IP
+    instance_id = models.CharField(_("实例ID"), max_length=128, default="")
+
+    class Meta:
+        verbose_name = _("单据关联集群")
+        verbose_name_plural = _("单据关联集群")
+        indexes = [models.Index(fields=["cluster_id"]), models.Index(fields=["instance_id"])]
+
+    @classmethod
+    def create_relations(cls, ticket, cluster_ids: List[int], instance_ids: List[Union[int, str]]):
+        """
+        登记单据关联的集群和实例
+        @param ticket: 单据
+        @param cluster_ids: 集群ID列表
+        @param instance_ids: 实例ID列表
+        """
+        relations = [cls(ticket=ticket, cluster_id=cluster_id) for cluster_id in set(cluster_ids)]
+        relations.extend(cls(ticket=ticket, instance_id=str(instance_id)) for instance_id in set(instance_ids))
+        cls.objects.bulk_create(relations)
@@ -252,20 +252,27 @@ class CountTicketSLZ(serializers.Serializer):
     count_type = serializers.ChoiceField(help_text=_("类型"), choices=CountType.get_choices(), default=CountType.MY_TODO)
 
 
-class ClusterModifyOpSerializer(serializers.Serializer):
-    cluster_id = serializers.IntegerField(help_text=_("集群ID"))
+class BaseModifyOpSerializer(serializers.Serializer):
     start_time = serializers.DateTimeField(help_text=_("查询起始时间"), required=False)
     end_time = serializers.DateTimeField(help_text=_("查询终止时间"), required=False)
     op_type = serializers.ChoiceField(help_text=_("操作类型"), choices=TicketType.get_choices(), required=False)
     op_status = serializers.ChoiceField(help_text=_("操作状态"), choices=TicketStatus.get_choices(), required=False)
+    # 游标翻页：传入上一页最后一条记录的create_at和id，此时offset应为0
+    last_create_at = serializers.DateTimeField(help_text=_("上一页最后一条记录的创建时间"), required=False)
+    last_id = serializers.IntegerField(help_text=_("上一页最后一条记录的ID"), required=False)
+
+    def validate(self, attrs):
+        if ("last_create_at" in attrs) != ("last_id" in attrs):
+            raise serializers.ValidationError(_("last_create_at和last_id需要同时传入"))
+        return attrs
+
 
+class ClusterModifyOpSerializer(BaseModifyOpSerializer):
+    cluster_id = serializers.IntegerField(help_text=_("集群ID"))
 
-class InstanceModifyOpSerializer(serializers.Serializer):
+
+class InstanceModifyOpSerializer(BaseModifyOpSerializer):
     instance_id = serializers.IntegerField(help_text=_("实例ID"))
-    start_time = serializers.DateTimeField(help_text=_("查询起始时间"), required=False)
-    end_time = serializers.DateTimeField(help_text=_("查询终止时间"), required=False)
-    op_type = serializers.ChoiceField(help_text=_("操作类型"), choices=TicketType.get_choices(), required=False)
-    op_status = serializers.ChoiceField(help_text=_("操作状态"), choices=TicketStatus.get_choices(), required=False)
 
 
 class QueryTicketFlowDescribeSerializer(serializers.Serializer):
@@ -9,11 +9,12 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 import operator
+from collections import defaultdict
 from functools import reduce
 from typing import Dict, List
 
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Q, QuerySet
 from django.forms.models import model_to_dict
 from django.utils.translation import ugettext_lazy as _
 from drf_yasg.utils import swagger_auto_schema
@@ -40,7 +41,15 @@ from backend.ticket.contexts import TicketContext
 from backend.ticket.exceptions import TicketDuplicationException
 from backend.ticket.flow_manager.manager import TicketFlowManager
 from backend.ticket.handler import TicketHandler
-from backend.ticket.models import ClusterOperateRecord, Flow, InstanceOperateRecord, Ticket, TicketFlowConfig, Todo
+from backend.ticket.models import (
+    ClusterOperateRecord,
+    Flow,
+    InstanceOperateRecord,
+    Ticket,
+    TicketClusterRelation,
+    TicketFlowConfig,
+    Todo,
+)
 from backend.ticket.serializers import (
     ClusterModifyOpSerializer,
     CountTicketSLZ,
@@ -157,7 +166,9 @@ class TicketViewSet(viewsets.AuditedModelViewSet):
     def _verify_duplicate_ticket(self, ticket_type, details, user):
         """校验是否重复提交"""
 
-        active_tickets = self.get_queryset().filter(ticket_type=ticket_type, status=TicketStatus.RUNNING, creator=user)
+        active_relations = TicketClusterRelation.objects.filter(
+            ticket__ticket_type=ticket_type, ticket__status=TicketStatus.RUNNING, ticket__creator=user
+        ).order_by("-ticket_id")
 
         # influxdb 相关操作单独适配，这里暂时没有找到更好的写法，唯一的改进就是创建单据时，会提前提取出对比内容，比如instances
         if ticket_type in [
@@ -168,25 +179,31 @@ class TicketViewSet(viewsets.AuditedModelViewSet):
             TicketType.INFLUXDB_REPLACE,
         ]:
             current_instances = InfluxdbTicketFlowBuilderPatchMixin.get_instances(ticket_type, details)
-            for ticket in active_tickets:
-                active_instances = ticket.details["instances"]
-                duplicate_ids = list(set(active_instances).intersection(current_instances))
-                if duplicate_ids:
-                    raise TicketDuplicationException(
-                        context=_("实例{}已存在相同类型的单据[{}]正在运行，请确认是否重复提交").format(duplicate_ids, ticket.id),
-                        data={"duplicate_instance_ids": duplicate_ids, "duplicate_ticket_id": ticket.id},
-                    )
-            return
-
-        cluster_ids = fetch_cluster_ids(details=details)
-        for ticket in active_tickets:
-            active_cluster_ids = fetch_cluster_ids(details=ticket.details)
-            duplicate_ids = list(set(active_cluster_ids).intersection(cluster_ids))
-            if duplicate_ids:
-                raise TicketDuplicationException(
-                    context=_("集群{}已存在相同类型的单据[{}]正在运行，请确认是否重复提交").format(duplicate_ids, ticket.id),
-                    data={"duplicate_cluster_ids": duplicate_ids, "duplicate_ticket_id": ticket.id},
-                )
+            duplicate_relations = active_relations.filter(instance_id__in=[str(inst) for inst in current_instances])
+            relation_field, duplicate_key, message = (
+                "instance_id",
+                "duplicate_instance_ids",
+                _("实例{}已存在相同类型的单据[{}]正在运行，请确认是否重复提交"),
+            )
+        else:
+            duplicate_relations = active_relations.filter(cluster_id__in=fetch_cluster_ids(details=details))
+            relation_field, duplicate_key, message = (
+                "cluster_id",
+                "duplicate_cluster_ids",
+                _("集群{}已存在相同类型的单据[{}]正在运行，请确认是否重复提交"),
+            )
+
+        # 通过关联表的索引一次查出重复的单据，与最近的一个重复单据进行提示
+        duplicate_ids_map: Dict[int, List] = defaultdict(list)
+        for ticket_id, object_id in duplicate_relations.values_list("ticket_id", relation_field):
+            duplicate_ids_map[ticket_id].append(object_id)
+        if duplicate_ids_map:
+            ticket_id = next(iter(duplicate_ids_map))
+            duplicate_ids = duplicate_ids_map[ticket_id]
+            raise TicketDuplicationException(
+                context=message.format(duplicate_ids, ticket_id),
+                data={duplicate_key: duplicate_ids, "duplicate_ticket_id": ticket_id},
+            )
 
     def perform_create(self, serializer):
         ticket_type = self.request.data["ticket_type"]
@@ -202,6 +219,7 @@ class TicketViewSet(viewsets.AuditedModelViewSet):
             # 初始化builder类
             builder = BuilderFactory.create_builder(ticket)
             builder.patch_ticket_detail()
+            builder.init_ticket_relations()
             builder.init_ticket_flows()
 
         TicketFlowManager(ticket=ticket).run_next_flow()
@@ -426,15 +444,12 @@ class TicketViewSet(viewsets.AuditedModelViewSet):
 
         return Response(my_tickets.count())
 
-    @common_swagger_auto_schema(
-        operation_summary=_("查询集群变更单据事件"),
-        query_serializer=ClusterModifyOpSerializer(),
-        tags=[TICKET_TAG],
-    )
-    @action(methods=["GET"], detail=False, serializer_class=ClusterModifyOpSerializer)
-    def get_cluster_operate_records(self, request, *args, **kwargs):
-        validated_data = self.params_validate(self.get_serializer_class())
-        op_filters = Q(cluster_id=validated_data["cluster_id"])
+    def _paginate_operate_records(self, records: QuerySet, validated_data: Dict):
+        """
+        在数据库中分页查询操作记录，只投影需要的字段
+        传入上一页最后一条记录的(create_at, id)时使用游标翻页，利用(对象ID, create_at)的联合索引跳过已读记录
+        """
+        op_filters = Q()
         if validated_data.get("start_time"):
             op_filters &= Q(create_at__gte=validated_data.get("start_time"))
 
@@ -447,20 +462,39 @@ class TicketViewSet(viewsets.AuditedModelViewSet):
         if validated_data.get("op_status"):
             op_filters &= Q(ticket__status=validated_data.get("op_status"))
 
-        op_records = ClusterOperateRecord.objects.select_related("ticket").filter(op_filters).order_by("-create_at")
-        op_records_info = [
+        if validated_data.get("last_create_at"):
+            last_create_at, last_id = validated_data["last_create_at"], validated_data["last_id"]
+            op_filters &= Q(create_at__lt=last_create_at) | Q(create_at=last_create_at, id__lt=last_id)
+
+        op_records = (
+            records.filter(op_filters)
+            .order_by("-create_at", "-id")
+            .values("id", "create_at", "creator", "ticket_id", "ticket__ticket_type", "ticket__status")
+        )
+        op_records_page = [
             {
-                "create_at": record.create_at,
-                "op_type": TicketType.get_choice_label(record.ticket.ticket_type),
-                "op_status": record.ticket.status,
-                "ticket_id": record.ticket.id,
-                "creator": record.creator,
+                "id": record["id"],
+                "create_at": record["create_at"],
+                "op_type": TicketType.get_choice_label(record["ticket__ticket_type"]),
+                "op_status": record["ticket__status"],
+                "ticket_id": record["ticket_id"],
+                "creator": record["creator"],
             }
-            for record in op_records
+            for record in self.paginate_queryset(op_records)
         ]
-        op_records_page = self.paginate_queryset(op_records_info)
         return self.get_paginated_response(op_records_page)
 
+    @common_swagger_auto_schema(
+        operation_summary=_("查询集群变更单据事件"),
+        query_serializer=ClusterModifyOpSerializer(),
+        tags=[TICKET_TAG],
+    )
+    @action(methods=["GET"], detail=False, serializer_class=ClusterModifyOpSerializer)
+    def get_cluster_operate_records(self, request, *args, **kwargs):
+        validated_data = self.params_validate(self.get_serializer_class())
+        records = ClusterOperateRecord.objects.filter(cluster_id=validated_data["cluster_id"])
+        return self._paginate_operate_records(records, validated_data)
+
     @common_swagger_auto_schema(
         operation_summary=_("查询集群实例变更单据事件"),
         query_serializer=InstanceModifyOpSerializer(),
@@ -469,32 +503,8 @@ class TicketViewSet(viewsets.AuditedModelViewSet):
     @action(methods=["GET"], detail=False, serializer_class=InstanceModifyOpSerializer)
     def get_instance_operate_records(self, request, *args, **kwargs):
         validated_data = self.params_validate(self.get_serializer_class())
-        op_filters = Q(instance_id=validated_data["instance_id"])
-        if validated_data.get("start_time"):
-            op_filters &= Q(create_at__gte=validated_data.get("start_time"))
-
-        if validated_data.get("end_time"):
-            op_filters &= Q(create_at__lte=validated_data.get("end_time"))
-
-        if validated_data.get("op_type"):
-            op_filters &= Q(ticket__ticket_type=validated_data.get("op_type"))
-
-        if validated_data.get("op_status"):
-            op_filters &= Q(ticket__status=validated_data.get("op_status"))
-
-        op_records = InstanceOperateRecord.objects.select_related("ticket").filter(op_filters).order_by("-create_at")
-        op_records_info = [
-            {
-                "create_at": record.create_at,
-                "op_type": TicketType.get_choice_label(record.ticket.ticket_type),
-                "op_status": record.ticket.status,
-                "ticket_id": record.ticket.id,
-                "creator": record.creator,
-            }
-            for record in op_records
-        ]
-        op_records_page = self.paginate_queryset(op_records_info)
-        return self.get_paginated_response(op_records_page)
+        records = InstanceOperateRecord.objects.filter(instance_id=validated_data["instance_id"])
+        return self._paginate_operate_records(records, validated_data)
 
     @swagger_auto_schema(
         operation_summary=_("查询可编辑单据流程描述"),
@@ -536,7 +546,7 @@ class TicketViewSet(viewsets.AuditedModelViewSet):
             flow_config_info["ticket_type_display"] = flow_config.get_ticket_type_display()
             flow_config_info["update_at"] = flow_config.update_at
             # 获取当前单据的执行流程
-            flow_desc = BuilderFactory.registry[flow_config.ticket_type].describe_ticket_flows(flow_config_map)
+            flow_desc = BuilderFactory.get_builder_cls(flow_config.ticket_type).describe_ticket_flows(flow_config_map)
             flow_config_info["flow_desc"] = flow_desc
             flow_desc_list.append(flow_config_info)
 
@@ -0,0 +1,30 @@
+#!/bin/sh
+# 统计web进程(manage.py)和celery worker启动时的模块导入耗时
+# 用法: ./bin/importtime.sh [展示的模块数量，默认30]
+SCRIPT_DIR=`dirname $0`
+cd $SCRIPT_DIR && cd .. || exit 1
+
+source bin/environ.sh
+
+TOP=${1:-30}
+OUTPUT_DIR=${IMPORTTIME_OUTPUT_DIR:-/tmp/dbm_importtime}
+mkdir -p $OUTPUT_DIR
+
+summary() {
+  # importtime 输出格式: import time: self [us] | cumulative | imported package
+  # 顶层导入(模块名前只有一个空格)的累计耗时之和即为总耗时
+  echo "==== $1: total `grep '^import time:' $2 | awk -F'|' '$3 ~ /^ [^ ]/ {sum += $2} END {printf "%.2fs", sum / 1000000}'`"
+  echo "---- ticket builders: `grep -c 'backend.ticket.builders\.' $2` modules imported"
+  grep '^import time:' $2 | sort -t'|' -k2 -n -r | head -n $TOP
+}
+
+python -X importtime manage.py check 2> $OUTPUT_DIR/manage.log > /dev/null
+summary "manage.py" $OUTPUT_DIR/manage.log
+
+python -X importtime -c "
+import django
+django.setup()
+from blueapps.core.celery import celery_app
+celery_app.loader.import_default_modules()
+" 2> $OUTPUT_DIR/worker.log
+summary "celery worker" $OUTPUT_DIR/worker.log